@@ -1,4 +1,3 @@
-import redis.asyncio as redis
 import structlog
 from aiogram import Bot, Dispatcher, types
 from aiogram.fsm.storage.memory import MemoryStorage
@@ -71,11 +70,15 @@ from app.middlewares.display_name_restriction import DisplayNameRestrictionMiddl
 from app.middlewares.global_error import GlobalErrorMiddleware
 from app.middlewares.logging import LoggingMiddleware
 from app.middlewares.maintenance import MaintenanceMiddleware
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.profiling import setup_profiling
 from app.middlewares.subscription_checker import SubscriptionStatusMiddleware
 from app.middlewares.throttling import ThrottlingMiddleware
 from app.services.maintenance_service import maintenance_service
 from app.utils.cache import cache
+from app.utils.callback_index import setup_callback_index
 from app.utils.message_patch import patch_message_methods
+from app.utils.redis_registry import redis_registry
 
 
 patch_message_methods()
@@ -90,6 +93,66 @@ async def debug_callback_handler(callback: types.CallbackQuery):
     logger.info('Username', username=callback.from_user.username)
 
 
+def register_handlers(dp: Dispatcher) -> None:
+    """Регистрирует все обработчики бота (используется и бенчмарком диспетчеризации callback)."""
+    start.register_handlers(dp)
+    menu.register_handlers(dp)
+    subscription.register_handlers(dp)
+    from app.plugins.c2c import register_c2c_plugin
+
+    register_c2c_plugin(dp)
+    balance.register_balance_handlers(dp)
+    promocode.register_handlers(dp)
+    referral.register_handlers(dp)
+    support.register_handlers(dp)
+    server_status.register_handlers(dp)
+    tickets.register_handlers(dp)
+    admin_main.register_handlers(dp)
+    admin_users.register_handlers(dp)
+    admin_subscriptions.register_handlers(dp)
+    admin_servers.register_handlers(dp)
+    admin_promocodes.register_handlers(dp)
+    admin_messages.register_handlers(dp)
+    admin_monitoring.register_handlers(dp)
+    admin_referrals.register_handlers(dp)
+    admin_rules.register_handlers(dp)
+    admin_remnawave.register_handlers(dp)
+    admin_statistics.register_handlers(dp)
+    admin_polls.register_handlers(dp)
+    admin_promo_groups.register_handlers(dp)
+    admin_campaigns.register_handlers(dp)
+    admin_contests.register_handlers(dp)
+    admin_daily_contests.register_handlers(dp)
+    admin_promo_offers.register_handlers(dp)
+    admin_maintenance.register_handlers(dp)
+    admin_user_messages.register_handlers(dp)
+    admin_updates.register_handlers(dp)
+    admin_backup.register_handlers(dp)
+    admin_system_logs.register_handlers(dp)
+    admin_welcome_text.register_welcome_text_handlers(dp)
+    admin_tickets.register_handlers(dp)
+    admin_reports.register_handlers(dp)
+    admin_bot_configuration.register_handlers(dp)
+    admin_pricing.register_handlers(dp)
+    admin_privacy_policy.register_handlers(dp)
+    admin_public_offer.register_handlers(dp)
+    admin_faq.register_handlers(dp)
+    admin_payments.register_handlers(dp)
+    admin_trials.register_handlers(dp)
+    admin_tariffs.register_handlers(dp)
+    admin_bulk_ban.register_bulk_ban_handlers(dp)
+    admin_blacklist.register_blacklist_handlers(dp)
+    admin_blocked_users.register_handlers(dp)
+    admin_required_channels.register_handlers(dp)
+    register_channel_member_handlers(dp)
+    register_gift_activation_handlers(dp)
+    common.register_handlers(dp)
+    register_stars_handlers(dp)
+    user_contests.register_handlers(dp)
+    user_polls.register_handlers(dp)
+    simple_subscription.register_simple_subscription_handlers(dp)
+
+
 async def setup_bot() -> tuple[Bot, Dispatcher]:
     try:
         await cache.connect()
@@ -117,7 +180,7 @@ async def setup_bot() -> tuple[Bot, Dispatcher]:
     logger.info('Бот установлен в maintenance_service')
 
     try:
-        redis_client = redis.from_url(settings.REDIS_URL)
+        redis_client = redis_registry.client('fsm')
         await redis_client.ping()
         storage = RedisStorage(redis_client)
         logger.info('Подключено к Redis для FSM storage')
@@ -135,6 +198,10 @@ async def setup_bot() -> tuple[Bot, Dispatcher]:
     dp.message.middleware(ContextVarsMiddleware())
     dp.callback_query.middleware(ContextVarsMiddleware())
     dp.pre_checkout_query.middleware(ContextVarsMiddleware())
+    if settings.METRICS_ENABLED:
+        dp.message.middleware(MetricsMiddleware('message'))
+        dp.callback_query.middleware(MetricsMiddleware('callback_query'))
+        dp.pre_checkout_query.middleware(MetricsMiddleware('pre_checkout_query'))
     chat_type_filter = ChatTypeFilterMiddleware()
     dp.message.middleware(chat_type_filter)
     dp.callback_query.middleware(chat_type_filter)
@@ -173,62 +240,11 @@ async def setup_bot() -> tuple[Bot, Dispatcher]:
     dp.message.middleware(SubscriptionStatusMiddleware())
     dp.callback_query.middleware(SubscriptionStatusMiddleware())
     dp.pre_checkout_query.middleware(SubscriptionStatusMiddleware())
-    start.register_handlers(dp)
-    menu.register_handlers(dp)
-    subscription.register_handlers(dp)
-    from app.plugins.c2c import register_c2c_plugin
-
-    register_c2c_plugin(dp)
-    balance.register_balance_handlers(dp)
-    promocode.register_handlers(dp)
-    referral.register_handlers(dp)
-    support.register_handlers(dp)
-    server_status.register_handlers(dp)
-    tickets.register_handlers(dp)
-    admin_main.register_handlers(dp)
-    admin_users.register_handlers(dp)
-    admin_subscriptions.register_handlers(dp)
-    admin_servers.register_handlers(dp)
-    admin_promocodes.register_handlers(dp)
-    admin_messages.register_handlers(dp)
-    admin_monitoring.register_handlers(dp)
-    admin_referrals.register_handlers(dp)
-    admin_rules.register_handlers(dp)
-    admin_remnawave.register_handlers(dp)
-    admin_statistics.register_handlers(dp)
-    admin_polls.register_handlers(dp)
-    admin_promo_groups.register_handlers(dp)
-    admin_campaigns.register_handlers(dp)
-    admin_contests.register_handlers(dp)
-    admin_daily_contests.register_handlers(dp)
-    admin_promo_offers.register_handlers(dp)
-    admin_maintenance.register_handlers(dp)
-    admin_user_messages.register_handlers(dp)
-    admin_updates.register_handlers(dp)
-    admin_backup.register_handlers(dp)
-    admin_system_logs.register_handlers(dp)
-    admin_welcome_text.register_welcome_text_handlers(dp)
-    admin_tickets.register_handlers(dp)
-    admin_reports.register_handlers(dp)
-    admin_bot_configuration.register_handlers(dp)
-    admin_pricing.register_handlers(dp)
-    admin_privacy_policy.register_handlers(dp)
-    admin_public_offer.register_handlers(dp)
-    admin_faq.register_handlers(dp)
-    admin_payments.register_handlers(dp)
-    admin_trials.register_handlers(dp)
-    admin_tariffs.register_handlers(dp)
-    admin_bulk_ban.register_bulk_ban_handlers(dp)
-    admin_blacklist.register_blacklist_handlers(dp)
-    admin_blocked_users.register_handlers(dp)
-    admin_required_channels.register_handlers(dp)
-    register_channel_member_handlers(dp)
-    register_gift_activation_handlers(dp)
-    common.register_handlers(dp)
-    register_stars_handlers(dp)
-    user_contests.register_handlers(dp)
-    user_polls.register_handlers(dp)
-    simple_subscription.register_simple_subscription_handlers(dp)
+    if settings.BOT_PROFILING_ENABLED:
+        setup_profiling(dp)
+    register_handlers(dp)
+    if settings.BOT_CALLBACK_INDEX_ENABLED:
+        setup_callback_index(dp)
     logger.info('⭐ Зарегистрированы обработчики Telegram Stars платежей')
     logger.info('⚡ Зарегистрированы обработчики простой покупки')
     logger.info('⚡ Зарегистрированы обработчики простой подписки')
@@ -25,4 +25,9 @@ def create_bot(token: str | None = None, **kwargs) -> Bot:
         session = AiohttpSession(**session_kwargs)
 
     kwargs.setdefault('default', DefaultBotProperties(parse_mode=ParseMode.HTML))
-    return Bot(token=token or settings.BOT_TOKEN, session=session, **kwargs)
+    bot = Bot(token=token or settings.BOT_TOKEN, session=session, **kwargs)
+    if settings.BOT_PROFILING_ENABLED:
+        from app.middlewares.profiling import TelegramCallProfiler
+
+        bot.session.middleware(TelegramCallProfiler())
+    return bot
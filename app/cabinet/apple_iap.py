@@ -13,6 +13,7 @@ from app.config import settings
 from app.database.models import User
 from app.services.apple_iap import AppleIAPFulfillmentService, apple_iap_fulfillment_service
 from app.services.apple_iap_reconciliation_service import apple_iap_reconciliation_service
+from app.utils.redis_registry import redis_registry
 
 from .dependencies import get_cabinet_db, get_current_admin_user, get_current_cabinet_user
 from .ip_utils import get_client_ip
@@ -23,26 +24,14 @@ logger = structlog.get_logger(__name__)
 APPLE_IAP_REDIS_STATE_KEY = 'apple_iap_redis_client'
 
 
-async def _close_redis_client(client: redis.Redis) -> None:
-    close = getattr(client, 'aclose', None)
-    if close is not None:
-        await close()
-        return
-    await client.close()
-
-
 @asynccontextmanager
 async def apple_iap_lifespan(app: FastAPI) -> AsyncIterator[None]:
-    client = redis.from_url(settings.REDIS_URL)
-    setattr(app.state, APPLE_IAP_REDIS_STATE_KEY, client)
+    # Пул общий для всех потребителей Redis и закрывается при остановке бота (redis_registry.close)
+    setattr(app.state, APPLE_IAP_REDIS_STATE_KEY, redis_registry.client('apple_iap'))
     try:
         yield
     finally:
         setattr(app.state, APPLE_IAP_REDIS_STATE_KEY, None)
-        try:
-            await _close_redis_client(client)
-        except RedisError as error:  # pragma: no cover - defensive shutdown logging
-            logger.warning('Apple IAP Redis client close failed', error=error)
 
 
 router = APIRouter(tags=['Cabinet Apple IAP'], lifespan=apple_iap_lifespan)
@@ -12,6 +12,7 @@ from app.database.crud.user import get_user_by_id
 from app.localization.texts import get_texts
 from app.database.database import AsyncSessionLocal
 from app.database.models import User, UserStatus
+from app.database.read_routing import set_current_reader
 from app.services.blacklist_service import blacklist_service
 from app.services.maintenance_service import maintenance_service
 from app.services.user_revival_service import NotDeletedError, revive_deleted_user
@@ -19,6 +20,7 @@ from app.services.user_revival_service import NotDeletedError, revive_deleted_us
 from .auth.jwt_handler import get_token_payload
 from .auth.telegram_auth import validate_telegram_init_data
 from .ip_utils import get_client_ip
+from .principal_cache import CabinetPrincipal, principal_cache
 
 
 logger = structlog.get_logger(__name__)
@@ -35,6 +37,60 @@ async def get_cabinet_db() -> AsyncSession:
             await session.close()
 
 
+def _cached_principal(
+    request: Request, credentials: HTTPAuthorizationCredentials | None
+) -> tuple[CabinetPrincipal | None, tuple[str, str] | None]:
+    """Look up an already verified principal for this token + initData pair."""
+    if not credentials or not principal_cache.enabled:
+        return None, None
+    key = principal_cache.key(credentials.credentials, request.headers.get('X-Telegram-Init-Data'))
+    return principal_cache.get(key), key
+
+
+async def _check_access_gates(user: User | CabinetPrincipal) -> None:
+    """Maintenance mode and required channel subscription — re-checked on every request, cached or not."""
+    # Check maintenance mode (allow admins to pass)
+    if maintenance_service.is_maintenance_active():
+        # Проверяем админа по telegram_id ИЛИ email
+        is_admin = settings.is_admin(telegram_id=user.telegram_id, email=user.email if user.email_verified else None)
+        if not is_admin:
+            status_info = maintenance_service.get_status_info()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    'code': 'maintenance',
+                    'message': maintenance_service.get_maintenance_message() or 'Service is under maintenance',
+                    'reason': status_info.get('reason'),
+                },
+            )
+
+    # Check required channel subscription - Telegram users only
+    if settings.CHANNEL_IS_REQUIRED_SUB:
+        # Skip for email-only users (no telegram_id)
+        if user.telegram_id is not None:
+            # Skip admin check
+            is_admin = settings.is_admin(
+                telegram_id=user.telegram_id, email=user.email if user.email_verified else None
+            )
+            if not is_admin:
+                from app.services.channel_subscription_service import channel_subscription_service
+
+                channels_with_status = await channel_subscription_service.get_channels_with_status(user.telegram_id)
+                is_subscribed = (
+                    all(ch['is_subscribed'] for ch in channels_with_status) if channels_with_status else True
+                )
+
+                if not is_subscribed:
+                    raise HTTPException(
+                        status_code=status.HTTP_403_FORBIDDEN,
+                        detail={
+                            'code': 'channel_subscription_required',
+                            'message': 'Please subscribe to the required channels to continue',
+                            'channels': channels_with_status,
+                        },
+                    )
+
+
 async def get_current_cabinet_user(
     request: Request,
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
@@ -43,6 +99,12 @@ async def get_current_cabinet_user(
     """
     Get current authenticated cabinet user from JWT token.
 
+    When the token + initData pair was verified recently (principal cache), only
+    the bare user row is loaded (one primary-key SELECT); initData signature and
+    blacklist checks are skipped. Relationships are not loaded on a hit — routes
+    that read subscriptions or promo groups from the user depend on
+    get_current_cabinet_user_with_relations instead.
+
     Args:
         request: FastAPI request object (for reading X-Telegram-Init-Data header)
         credentials: HTTP Bearer credentials
@@ -54,11 +116,70 @@ async def get_current_cabinet_user(
     Raises:
         HTTPException: If token is invalid, expired, or user not found
     """
-    # Check maintenance mode first (except for admins - checked later)
-    if maintenance_service.is_maintenance_active():
-        # We need to check token first to see if user is admin
-        pass  # Will check after getting user
+    return await _resolve_cabinet_user(request, credentials, db, with_relations=False)
+
+
+async def get_current_cabinet_user_with_relations(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+    db: AsyncSession = Depends(get_cabinet_db),
+) -> User:
+    """
+    Same as get_current_cabinet_user, but the user always comes with subscriptions
+    (and their tariffs), promo groups and referrer eagerly loaded.
+    """
+    return await _resolve_cabinet_user(request, credentials, db, with_relations=True)
+
+
+async def _resolve_cabinet_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None,
+    db: AsyncSession,
+    *,
+    with_relations: bool,
+) -> User:
+    principal, cache_key = _cached_principal(request, credentials)
+    if principal is not None:
+        user = await get_user_by_id(db, principal.id) if with_relations else await db.get(User, principal.id)
+        if user is not None and user.status == UserStatus.ACTIVE.value:
+            await _check_access_gates(principal)
+            set_current_reader(user.id)
+            return user
+        # Статус сменился, а инвалидация ещё не дошла — полная проверка ниже
+        principal_cache.invalidate_users({principal.id})
+
+    return await _authenticate_cabinet_user(request, credentials, db, cache_key)
+
+
+async def get_cabinet_principal(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+    db: AsyncSession = Depends(get_cabinet_db),
+) -> CabinetPrincipal:
+    """
+    Get the authenticated cabinet user as a compact principal.
+
+    For routes that only need the user's id, telegram_id, language or email:
+    a cache hit answers without touching the database. On a miss the full
+    check of get_current_cabinet_user runs and its result is cached.
+    """
+    principal, cache_key = _cached_principal(request, credentials)
+    if principal is not None:
+        await _check_access_gates(principal)
+        set_current_reader(principal.id)
+        return principal
+
+    user = await _authenticate_cabinet_user(request, credentials, db, cache_key)
+    return CabinetPrincipal.from_user(user)
 
+
+async def _authenticate_cabinet_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None,
+    db: AsyncSession,
+    cache_key: tuple[str, str] | None,
+) -> User:
+    """Full check: JWT, user row, initData, blacklist, status, maintenance and channel subscription."""
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -143,8 +264,7 @@ async def get_current_cabinet_user(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail={
                     'code': 'blacklisted',
-                    'message': blacklist_reason
-                    or texts.t('CABINET_ACCESS_DENIED', 'Доступ запрещен'),
+                    'message': blacklist_reason or texts.t('CABINET_ACCESS_DENIED', 'Доступ запрещен'),
                 },
             )
 
@@ -196,48 +316,10 @@ async def get_current_cabinet_user(
     # users see the blacklist message instead of the friendly revival
     # screen. No duplicate check needed here.
 
-    # Check maintenance mode (allow admins to pass)
-    if maintenance_service.is_maintenance_active():
-        # Проверяем админа по telegram_id ИЛИ email
-        is_admin = settings.is_admin(telegram_id=user.telegram_id, email=user.email if user.email_verified else None)
-        if not is_admin:
-            status_info = maintenance_service.get_status_info()
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail={
-                    'code': 'maintenance',
-                    'message': maintenance_service.get_maintenance_message() or 'Service is under maintenance',
-                    'reason': status_info.get('reason'),
-                },
-            )
-
-    # Check required channel subscription - Telegram users only
-    if settings.CHANNEL_IS_REQUIRED_SUB:
-        # Skip for email-only users (no telegram_id)
-        if user.telegram_id is not None:
-            # Skip admin check
-            is_admin = settings.is_admin(
-                telegram_id=user.telegram_id, email=user.email if user.email_verified else None
-            )
-            if not is_admin:
-                from app.services.channel_subscription_service import channel_subscription_service
-
-                channels_with_status = await channel_subscription_service.get_channels_with_status(user.telegram_id)
-                is_subscribed = (
-                    all(ch['is_subscribed'] for ch in channels_with_status) if channels_with_status else True
-                )
+    await _check_access_gates(user)
 
-                if not is_subscribed:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail={
-                            'code': 'channel_subscription_required',
-                            'message': 'Please subscribe to the required channels to continue',
-                            'channels': channels_with_status,
-                        },
-                    )
-
-    # Throttled update of cabinet_last_login (at most every 5 minutes)
+    # Throttled update of cabinet_last_login (at most every 5 minutes).
+    # Cache hits skip this; entries live far shorter than the throttle window.
     now = datetime.now(UTC)
     if not user.cabinet_last_login or (now - user.cabinet_last_login).total_seconds() > 300:
         try:
@@ -246,6 +328,10 @@ async def get_current_cabinet_user(
         except Exception:
             pass
 
+    if cache_key is not None:
+        principal_cache.put(cache_key, CabinetPrincipal.from_user(user), token_expires_at=payload.get('exp'))
+
+    set_current_reader(user.id)
     return user
 
 
@@ -294,6 +380,22 @@ async def get_optional_cabinet_user(
     return user
 
 
+async def is_cabinet_admin(db: AsyncSession, user: User | CabinetPrincipal) -> bool:
+    """Admin by legacy config (ADMIN_IDS / ADMIN_EMAILS) or by any active RBAC role with level > 0."""
+    # Legacy check: config-based admin list
+    if settings.is_admin(telegram_id=user.telegram_id, email=user.email if user.email_verified else None):
+        return True
+
+    # RBAC check: user has any active role with level > 0
+    max_level = principal_cache.get_role_level(user.id)
+    if max_level is None:
+        from app.database.crud.rbac import UserRoleCRUD
+
+        _permissions, _role_names, max_level = await UserRoleCRUD.get_user_permissions(db, user.id)
+        principal_cache.put_role_level(user.id, max_level)
+    return max_level > 0
+
+
 async def get_current_admin_user(
     request: Request,
     user: User = Depends(get_current_cabinet_user),
@@ -316,19 +418,7 @@ async def get_current_admin_user(
     Raises:
         HTTPException: If user is not an admin by either mechanism
     """
-    # Legacy check: config-based admin list
-    is_legacy_admin = settings.is_admin(
-        telegram_id=user.telegram_id,
-        email=user.email if user.email_verified else None,
-    )
-    if is_legacy_admin:
-        return user
-
-    # RBAC check: user has any active role with level > 0
-    from app.database.crud.rbac import UserRoleCRUD
-
-    _permissions, _role_names, max_level = await UserRoleCRUD.get_user_permissions(db, user.id)
-    if max_level > 0:
+    if await is_cabinet_admin(db, user):
         return user
 
     raise HTTPException(
@@ -0,0 +1,257 @@
+"""Кэш проверенных принципалов кабинета.
+
+Каждый запрос кабинета заново декодирует JWT, грузит пользователя с четырьмя selectinload,
+проверяет подпись initData и черный список — хотя фронтенд шлёт десятки запросов в минуту
+с одним и тем же токеном и initData. После полной проверки результат кладётся сюда под
+ключом sha256(токен) + sha256(initData): компактный ``CabinetPrincipal`` без ORM-связей.
+Кэшируются только успешные проверки активных пользователей.
+
+Запись живёт не дольше ``CABINET_PRINCIPAL_CACHE_TTL_SECONDS`` и срока действия токена и
+сбрасывается:
+
+* при commit, изменившем статус/telegram_id/username/email/язык пользователя или его роли
+  (события Session, как в pricing_catalog), — локально и через cache_invalidation_bus;
+* при обновлении черного списка (меняется ``blacklist_service.last_update``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import structlog
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.models import AdminRole, User, UserRole
+from app.services.blacklist_service import blacklist_service
+from app.utils.cache_invalidation import cache_invalidation_bus
+
+
+logger = structlog.get_logger(__name__)
+
+CABINET_PRINCIPAL_TOPIC = 'cabinet_principals'
+
+_MAX_ENTRIES = 20_000
+_SESSION_PENDING_KEY = 'cabinet_principal_pending'
+_ALL = 'all'
+# Поля, от которых зависит результат проверки доступа
+_PRINCIPAL_FIELDS = frozenset({'status', 'telegram_id', 'username', 'email', 'email_verified', 'language'})
+
+
+@dataclass(frozen=True, slots=True)
+class CabinetPrincipal:
+    """Проверенный пользователь кабинета — только скалярные поля, без сессии и связей."""
+
+    id: int
+    telegram_id: int | None
+    username: str | None
+    email: str | None
+    email_verified: bool
+    language: str | None
+    status: str
+
+    @classmethod
+    def from_user(cls, user: User) -> CabinetPrincipal:
+        return cls(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            username=user.username,
+            email=user.email,
+            email_verified=bool(user.email_verified),
+            language=user.language,
+            status=user.status,
+        )
+
+
+@dataclass(slots=True)
+class _Entry:
+    principal: CabinetPrincipal
+    expires_at: float
+    blacklist_version: Any
+
+
+class PrincipalCache:
+    def __init__(self) -> None:
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._keys_by_user: dict[int, set[tuple[str, str]]] = {}
+        self._role_levels: dict[int, tuple[int, float]] = {}
+
+    @property
+    def ttl(self) -> int:
+        return max(0, settings.CABINET_PRINCIPAL_CACHE_TTL_SECONDS)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(token: str, init_data: str | None) -> tuple[str, str]:
+        return (
+            hashlib.sha256(token.encode()).hexdigest(),
+            hashlib.sha256((init_data or '').encode()).hexdigest(),
+        )
+
+    def get(self, key: tuple[str, str]) -> CabinetPrincipal | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic() or entry.blacklist_version != blacklist_service.last_update:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.principal
+
+    def put(self, key: tuple[str, str], principal: CabinetPrincipal, *, token_expires_at: float | None = None) -> None:
+        """Запомнить успешную проверку; token_expires_at — exp из JWT (unix time)."""
+        if not self.enabled:
+            return
+        lifetime = float(self.ttl)
+        if token_expires_at is not None:
+            lifetime = min(lifetime, token_expires_at - time.time())
+        if lifetime <= 0:
+            return
+
+        self._drop(key)
+        self._entries[key] = _Entry(principal, time.monotonic() + lifetime, blacklist_service.last_update)
+        self._keys_by_user.setdefault(principal.id, set()).add(key)
+        while len(self._entries) > _MAX_ENTRIES:
+            self._drop(next(iter(self._entries)))
+
+    def get_role_level(self, user_id: int) -> int | None:
+        """Максимальный уровень RBAC-ролей пользователя, если он ещё свежий."""
+        if not self.enabled:
+            return None
+        cached = self._role_levels.get(user_id)
+        if cached is None or cached[1] <= time.monotonic():
+            return None
+        return cached[0]
+
+    def put_role_level(self, user_id: int, level: int) -> None:
+        if not self.enabled:
+            return
+        if len(self._role_levels) >= _MAX_ENTRIES:
+            self._role_levels.clear()
+        self._role_levels[user_id] = (level, time.monotonic() + self.ttl)
+
+    def invalidate_users(self, user_ids: set[int] | frozenset[int]) -> None:
+        for user_id in user_ids:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+            self._role_levels.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+        self._role_levels.clear()
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry.principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry.principal.id]
+
+
+principal_cache = PrincipalCache()
+
+
+# --- Автоматическая инвалидация ---
+
+
+def _affected_user_ids(session: Session) -> set[int] | str:
+    user_ids: set[int] = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, AdminRole):
+            if instance not in session.new:
+                return _ALL
+        elif isinstance(instance, UserRole):
+            user_ids.add(instance.user_id)
+        elif isinstance(instance, User) and instance not in session.new:
+            if instance in session.deleted:
+                user_ids.add(instance.id)
+                continue
+            state = inspect(instance)
+            if any(state.attrs[name].history.has_changes() for name in _PRINCIPAL_FIELDS):
+                user_ids.add(instance.id)
+    return user_ids
+
+
+def _mark_pending(session: Session, user_ids: set[int] | str) -> None:
+    pending = session.info.get(_SESSION_PENDING_KEY)
+    if pending == _ALL:
+        return
+    if user_ids == _ALL:
+        session.info[_SESSION_PENDING_KEY] = _ALL
+    elif user_ids:
+        session.info[_SESSION_PENDING_KEY] = (pending or set()) | user_ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_principal_changes(session: Session, _flush_context: Any) -> None:
+    _mark_pending(session, _affected_user_ids(session))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_principal_changes(orm_execute_state: Any) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in (User, UserRole, AdminRole):
+        return
+    if orm_execute_state.is_update and mapper.class_ is User:
+        updated = set(orm_execute_state.statement.compile().params)
+        if not updated & _PRINCIPAL_FIELDS:
+            return
+    _mark_pending(orm_execute_state.session, _ALL)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session: Session) -> None:
+    pending = session.info.pop(_SESSION_PENDING_KEY, None)
+    if not pending:
+        return
+    if pending == _ALL:
+        principal_cache.clear()
+        keys = None
+    else:
+        principal_cache.invalidate_users(pending)
+        keys = [str(user_id) for user_id in pending]
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(cache_invalidation_bus.publish(CABINET_PRINCIPAL_TOPIC, keys))
+    _pending_publishes.add(task)
+    task.add_done_callback(_pending_publishes.discard)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_PENDING_KEY, None)
+
+
+_pending_publishes: set[asyncio.Task] = set()
+
+
+async def _on_principals_invalidated(keys: frozenset[str] | None) -> None:
+    if keys is None:
+        principal_cache.clear()
+        return
+    principal_cache.invalidate_users({int(key) for key in keys if key.isdigit()})
+
+
+cache_invalidation_bus.register(CABINET_PRINCIPAL_TOPIC, _on_principals_invalidated)
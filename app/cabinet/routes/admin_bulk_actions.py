@@ -1,4 +1,8 @@
-"""Admin routes for bulk actions on users."""
+"""Admin routes for bulk actions on users.
+
+``/execute`` runs small batches and dry runs inside the request; ``/jobs``
+starts a persisted background job (see app/services/bulk_action_job_service.py).
+"""
 
 import json
 from datetime import UTC, datetime, timedelta
@@ -6,8 +10,9 @@ from datetime import UTC, datetime, timedelta
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy import delete as sa_delete, select
+from sqlalchemy import delete as sa_delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
 from app.config import settings
 from app.utils.price_display import balance_from_display_amount
@@ -21,7 +26,9 @@ from app.database.crud.subscription import (
 from app.database.crud.tariff import get_tariff_by_id
 from app.database.crud.user import add_user_balance, get_user_by_id
 from app.database.crud.user_promo_group import sync_user_primary_promo_group
+from app.services.bulk_action_job_service import bulk_action_job_service
 from app.database.models import (
+    BulkActionJob,
     PaymentMethod,
     PromoGroup,
     Subscription,
@@ -40,6 +47,9 @@ from ..schemas.bulk_actions import (
     BulkActionType,
     BulkExecuteRequest,
     BulkExecuteResponse,
+    BulkJobCreateRequest,
+    BulkJobListResponse,
+    BulkJobResponse,
     BulkSubscriptionInfo,
     BulkUserResult,
 )
@@ -136,6 +146,19 @@ def _resolve_subscription(user: User, override: Subscription | None = None) -> S
 # ---------------------------------------------------------------------------
 
 
+async def _enable_subscription_on_panel(user: User, sub: Subscription) -> None:
+    """Explicitly enable an active subscription on the panel (PATCH may not clear LIMITED status)."""
+    _enable_uuid = sub.remnawave_uuid if settings.is_multi_tariff_enabled() else getattr(user, 'remnawave_uuid', None)
+    if _enable_uuid and sub.status == 'active':
+        try:
+            from app.services.subscription_service import SubscriptionService
+
+            subscription_service = SubscriptionService()
+            await subscription_service.enable_remnawave_user(_enable_uuid)
+        except Exception:
+            pass  # "User already enabled" is expected for active subscriptions
+
+
 async def _do_extend_subscription(
     db: AsyncSession,
     user: User,
@@ -377,17 +400,7 @@ async def _do_add_traffic(
     await db.refresh(sub)
 
     await _sync_subscription_to_panel(db, user, sub)
-
-    # Explicitly enable user on panel (PATCH may not clear LIMITED status)
-    _enable_uuid = sub.remnawave_uuid if settings.is_multi_tariff_enabled() else getattr(user, 'remnawave_uuid', None)
-    if _enable_uuid and sub.status == 'active':
-        try:
-            from app.services.subscription_service import SubscriptionService
-
-            subscription_service = SubscriptionService()
-            await subscription_service.enable_remnawave_user(_enable_uuid)
-        except Exception:
-            pass  # "User already enabled" is expected for active subscriptions
+    await _enable_subscription_on_panel(user, sub)
 
     return BulkUserResult(
         user_id=user.id,
@@ -906,6 +919,30 @@ async def _execute_for_subscription(
         return BulkUserResult(user_id=0, subscription_id=sub_id, success=False, message='Action failed: internal error')
 
 
+async def _check_action_allowed(
+    db: AsyncSession,
+    admin: User,
+    action: BulkActionType,
+    use_subscription_ids: bool,
+) -> None:
+    # Delete user requires elevated permission
+    if action == BulkActionType.DELETE_USER:
+        from app.services.permission_service import PermissionService
+
+        allowed, _ = await PermissionService.check_permission(db, admin, 'users:delete')
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail='Permission users:delete is required for this action',
+            )
+
+    if use_subscription_ids and action in _USER_LEVEL_ACTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Action {action} operates on users, not subscriptions. Use user_ids instead.',
+        )
+
+
 # ---------------------------------------------------------------------------
 # Endpoint
 # ---------------------------------------------------------------------------
@@ -928,25 +965,10 @@ async def bulk_execute(
     params = request.params
     dry_run = request.dry_run
 
-    # Delete user requires elevated permission
-    if action == BulkActionType.DELETE_USER:
-        from app.services.permission_service import PermissionService
-
-        allowed, _ = await PermissionService.check_permission(db, admin, 'users:delete')
-        if not allowed:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail='Permission users:delete is required for this action',
-            )
-
     # Determine target mode: subscription_ids or user_ids
     use_subscription_ids = request.subscription_ids is not None
 
-    if use_subscription_ids and action in _USER_LEVEL_ACTIONS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f'Action {action} operates on users, not subscriptions. Use user_ids instead.',
-        )
+    await _check_action_allowed(db, admin, action, use_subscription_ids)
 
     tariff = await _validate_and_prepare(db, action, params)
 
@@ -1169,3 +1191,117 @@ async def _stream_bulk_execute_subscriptions(
         'dry_run': dry_run,
     }
     yield f'data: {json.dumps(summary, ensure_ascii=False)}\n\n'
+
+
+# ---------------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------------
+
+
+async def _get_job_or_404(db: AsyncSession, job_id: int) -> BulkActionJob:
+    job = await db.get(BulkActionJob, job_id, populate_existing=True)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Bulk job not found')
+    return job
+
+
+@router.post('/jobs', response_model=BulkJobResponse, status_code=status.HTTP_201_CREATED)
+async def create_bulk_job(
+    request: BulkJobCreateRequest,
+    admin: User = Depends(require_permission('bulk_actions:execute')),
+    db: AsyncSession = Depends(get_cabinet_db),
+):
+    """Start a bulk action as a persisted background job.
+
+    The job survives closing the page and process restarts; poll
+    ``GET /admin/bulk/jobs/{job_id}`` for progress. Use ``/execute`` with
+    ``dry_run=true`` for a preview.
+    """
+    action = request.action
+    params = request.params
+    use_subscription_ids = request.subscription_ids is not None
+
+    await _check_action_allowed(db, admin, action, use_subscription_ids)
+    await _validate_and_prepare(db, action, params)
+    if action == BulkActionType.ADD_BALANCE:
+        params = params.model_copy(update={'amount_kopeks': _require_amount_kopeks(params), 'amount_display': None})
+
+    job = await bulk_action_job_service.create_job(
+        db,
+        action=action,
+        target_ids=request.subscription_ids if use_subscription_ids else request.user_ids,
+        by_subscription=use_subscription_ids,
+        params=params,
+        admin_id=admin.id,
+    )
+    bulk_action_job_service.launch(job.id)
+    return BulkJobResponse.model_validate(job)
+
+
+@router.get('/jobs', response_model=BulkJobListResponse)
+async def list_bulk_jobs(
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    admin: User = Depends(require_permission('bulk_actions:read')),
+    db: AsyncSession = Depends(get_cabinet_db),
+):
+    total = await db.scalar(select(func.count(BulkActionJob.id)))
+    result = await db.execute(
+        select(BulkActionJob)
+        .options(defer(BulkActionJob.target_ids), defer(BulkActionJob.params))
+        .order_by(BulkActionJob.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return BulkJobListResponse(
+        items=[BulkJobResponse.model_validate(job) for job in result.scalars().all()],
+        total=total or 0,
+    )
+
+
+@router.get('/jobs/{job_id}', response_model=BulkJobResponse)
+async def get_bulk_job(
+    job_id: int,
+    admin: User = Depends(require_permission('bulk_actions:read')),
+    db: AsyncSession = Depends(get_cabinet_db),
+):
+    return BulkJobResponse.model_validate(await _get_job_or_404(db, job_id))
+
+
+async def _change_job_status(db: AsyncSession, job_id: int, change, verb: str) -> BulkJobResponse:
+    job = await _get_job_or_404(db, job_id)
+    if not await change(db, job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f'Job in status {job.status} cannot be {verb}',
+        )
+    return BulkJobResponse.model_validate(await _get_job_or_404(db, job_id))
+
+
+@router.post('/jobs/{job_id}/pause', response_model=BulkJobResponse)
+async def pause_bulk_job(
+    job_id: int,
+    admin: User = Depends(require_permission('bulk_actions:execute')),
+    db: AsyncSession = Depends(get_cabinet_db),
+):
+    """Pause after the current chunk; resume continues from the same cursor."""
+    return await _change_job_status(db, job_id, bulk_action_job_service.pause, 'paused')
+
+
+@router.post('/jobs/{job_id}/resume', response_model=BulkJobResponse)
+async def resume_bulk_job(
+    job_id: int,
+    admin: User = Depends(require_permission('bulk_actions:execute')),
+    db: AsyncSession = Depends(get_cabinet_db),
+):
+    return await _change_job_status(db, job_id, bulk_action_job_service.resume, 'resumed')
+
+
+@router.post('/jobs/{job_id}/cancel', response_model=BulkJobResponse)
+async def cancel_bulk_job(
+    job_id: int,
+    admin: User = Depends(require_permission('bulk_actions:execute')),
+    db: AsyncSession = Depends(get_cabinet_db),
+):
+    """Cancel after the current chunk. Already applied chunks are not rolled back."""
+    return await _change_job_status(db, job_id, bulk_action_job_service.cancel, 'cancelled')
@@ -12,10 +12,12 @@ from app.utils.button_styles_cache import (
     ALLOWED_STYLE_VALUES,
     BOT_LOCALES,
     BUTTON_STYLES_KEY,
+    BUTTON_STYLES_TOPIC,
     DEFAULT_BUTTON_STYLES,
     SECTIONS,
     load_button_styles_cache,
 )
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 from ..dependencies import get_cabinet_db, require_permission
 
@@ -231,8 +233,9 @@ async def update_button_styles(
     # Persist
     await _set_setting_value(db, BUTTON_STYLES_KEY, json.dumps(current))
 
-    # Refresh in-process cache
+    # Refresh in-process cache and notify other processes
     await load_button_styles_cache()
+    await cache_invalidation_bus.publish(BUTTON_STYLES_TOPIC)
 
     logger.info(
         'Admin updated button styles for sections', telegram_id=admin.telegram_id, changed_sections=changed_sections
@@ -249,6 +252,7 @@ async def reset_button_styles(
     """Reset all button styles to defaults. Admin only."""
     await _set_setting_value(db, BUTTON_STYLES_KEY, json.dumps(DEFAULT_BUTTON_STYLES))
     await load_button_styles_cache()
+    await cache_invalidation_bus.publish(BUTTON_STYLES_TOPIC)
 
     logger.info('Admin reset button styles to defaults', telegram_id=admin.telegram_id)
 
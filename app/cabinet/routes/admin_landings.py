@@ -10,6 +10,7 @@ from pydantic import BaseModel, Field, field_validator, model_validator
 from sqlalchemy import and_, case, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.cabinet.services.landing_cache import invalidate_landing_config_cache
 from app.cabinet.utils.locale import (
     ensure_locale_dict,
     validate_locale_dict,
@@ -776,6 +777,7 @@ async def update_landing_page(
         )
 
     logger.info('Admin updated landing page', admin_id=admin.id, slug=landing.slug, landing_id=landing.id)
+    await invalidate_landing_config_cache()
 
     return _landing_to_detail(landing)
 
@@ -794,6 +796,7 @@ async def delete_landing_page(
             detail='Landing page not found',
         )
     logger.info('Admin deleted landing page', admin_id=admin.id, landing_id=landing_id)
+    await invalidate_landing_config_cache()
     return {'success': True}
 
 
@@ -820,6 +823,7 @@ async def toggle_landing_active(
         landing_id=landing_id,
         is_active=new_active,
     )
+    await invalidate_landing_config_cache()
 
     return _landing_to_detail(landing)
 
@@ -19,14 +19,17 @@ from app.utils.button_styles_cache import (
     ALLOWED_STYLE_VALUES,
     BOT_LOCALES,
     BUTTON_STYLES_KEY,
+    BUTTON_STYLES_TOPIC,
     DEFAULT_BUTTON_STYLES,
     get_cached_button_styles,
     load_button_styles_cache,
 )
+from app.utils.cache_invalidation import cache_invalidation_bus
 from app.utils.menu_layout_cache import (
     BUILTIN_SECTIONS,
     DEFAULT_MENU_LAYOUT,
     MENU_LAYOUT_KEY,
+    MENU_LAYOUT_TOPIC,
     VALID_CUSTOM_BUTTON_STYLES,
     get_cached_menu_layout,
     load_menu_layout_cache,
@@ -358,9 +361,11 @@ async def update_menu_layout(
     # Single atomic commit for both settings
     await db.commit()
 
-    # Refresh caches after commit
+    # Refresh caches after commit and notify other processes
     await load_button_styles_cache()
     await load_menu_layout_cache()
+    await cache_invalidation_bus.publish(BUTTON_STYLES_TOPIC)
+    await cache_invalidation_bus.publish(MENU_LAYOUT_TOPIC)
 
     logger.info(
         'Admin updated menu layout',
@@ -387,9 +392,11 @@ async def reset_menu_layout(
     # Single atomic commit for both settings
     await db.commit()
 
-    # Refresh caches after commit
+    # Refresh caches after commit and notify other processes
     await load_button_styles_cache()
     await load_menu_layout_cache()
+    await cache_invalidation_bus.publish(BUTTON_STYLES_TOPIC)
+    await cache_invalidation_bus.publish(MENU_LAYOUT_TOPIC)
 
     logger.info('Admin reset menu layout and button styles to defaults', telegram_id=admin.telegram_id)
 
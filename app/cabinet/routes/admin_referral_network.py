@@ -23,9 +23,10 @@ from app.database.models import (
     TransactionType,
     User,
 )
+from app.database.read_routing import get_read_db, get_user_read_db
 from app.utils.cache import RateLimitCache
 
-from ..dependencies import get_cabinet_db, require_permission
+from ..dependencies import require_permission
 
 
 logger = structlog.get_logger(__name__)
@@ -581,7 +582,7 @@ async def _fetch_campaign_stats(
 @router.get('/', response_model=NetworkGraphResponse)
 async def get_referral_network(
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> NetworkGraphResponse:
     """Return full referral network graph data for visualization."""
     if await RateLimitCache.is_rate_limited(
@@ -718,7 +719,7 @@ async def get_referral_network(
 @router.get('/scope-options', response_model=ScopeOptionsResponse)
 async def get_scope_options(
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> ScopeOptionsResponse:
     """Return lightweight lists of campaigns and partners for the scope selector."""
     if await RateLimitCache.is_rate_limited(
@@ -978,7 +979,7 @@ async def get_scoped_referral_network(
     partner_ids: list[int] = Query(default=[], max_length=MAX_SCOPE_ITEMS),
     user_ids: list[int] = Query(default=[], max_length=MAX_SCOPE_ITEMS),
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> NetworkGraphResponse:
     """Return scoped referral network graph for selected campaigns, partners, and/or users."""
     if await RateLimitCache.is_rate_limited(
@@ -1088,7 +1089,7 @@ async def get_scoped_referral_network(
 async def get_network_user_detail(
     user_id: int,
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_user_read_db),
 ) -> NetworkUserDetail:
     """Return detailed info about a specific user in the referral network."""
     if await RateLimitCache.is_rate_limited(
@@ -1244,7 +1245,7 @@ async def get_network_user_detail(
 async def get_network_campaign_detail(
     campaign_id: int,
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> NetworkCampaignDetail:
     """Return detailed info about a specific advertising campaign."""
     if await RateLimitCache.is_rate_limited(
@@ -1362,7 +1363,7 @@ async def get_network_campaign_detail(
 async def search_referral_network(
     q: str = Query(..., min_length=1, max_length=200, description='Search query'),
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> NetworkSearchResult:
     """Search users and campaigns in the referral network by telegram_id, username, email, or campaign name."""
     if await RateLimitCache.is_rate_limited(
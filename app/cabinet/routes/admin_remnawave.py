@@ -15,7 +15,7 @@ from app.database.crud.server_squad import (
     sync_with_remnawave,
 )
 from app.database.models import User
-from app.utils.cache import cache
+from app.utils.cache import AVAILABLE_COUNTRIES_CACHE_TAG, cache
 
 from ..dependencies import get_cabinet_db, require_permission
 from ..schemas.remnawave import (
@@ -980,7 +980,7 @@ async def sync_servers(
     created, updated, removed = await sync_with_remnawave(db, squads)
 
     try:
-        await cache.delete_pattern('available_countries*')
+        await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
     except Exception as e:
         logger.warning('Failed to clear countries cache', error=e)
 
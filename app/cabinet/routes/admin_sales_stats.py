@@ -27,8 +27,9 @@ from app.database.models import (
     TransactionType,
     User,
 )
+from app.database.read_routing import get_read_db
 
-from ..dependencies import get_cabinet_db, require_permission
+from ..dependencies import require_permission
 
 
 logger = structlog.get_logger(__name__)
@@ -115,7 +116,7 @@ async def get_sales_summary(
     start_date: str | None = Query(default=None, description='Custom start date ISO format'),
     end_date: str | None = Query(default=None, description='Custom end date ISO format'),
     admin: User = Depends(require_permission('sales_stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> SalesSummary:
     """Get summary statistics for sales dashboard cards."""
     try:
@@ -377,7 +378,7 @@ async def get_trials_stats(
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
     admin: User = Depends(require_permission('sales_stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> TrialsStatsResponse:
     """Get trial registration statistics with provider breakdown."""
     try:
@@ -587,7 +588,7 @@ async def get_sales_stats(
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
     admin: User = Depends(require_permission('sales_stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> SalesStatsResponse:
     """Get subscription sales statistics."""
     try:
@@ -774,7 +775,7 @@ async def get_renewals_stats(
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
     admin: User = Depends(require_permission('sales_stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> RenewalsStatsResponse:
     """Get renewal statistics with period comparison."""
     try:
@@ -1001,7 +1002,7 @@ async def get_addons_stats(
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
     admin: User = Depends(require_permission('sales_stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> AddonsStatsResponse:
     """Get add-on purchase statistics."""
     try:
@@ -1157,7 +1158,7 @@ async def get_deposits_stats(
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
     admin: User = Depends(require_permission('sales_stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> DepositsStatsResponse:
     """Get deposit statistics with payment method breakdown."""
     try:
@@ -1284,7 +1285,7 @@ async def get_payment_health(
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
     admin: User = Depends(require_permission('sales_stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> PaymentHealthResponse:
     """Payment reliability: per-gateway success-rate + failed-purchase rollbacks.
 
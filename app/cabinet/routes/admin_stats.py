@@ -24,10 +24,11 @@ from app.database.models import (
     TransactionType,
     User,
 )
+from app.database.read_routing import get_read_db
 from app.services.remnawave_service import RemnaWaveService
 from app.services.version_service import version_service
 
-from ..dependencies import get_cabinet_db, require_permission
+from ..dependencies import require_permission
 
 
 logger = structlog.get_logger(__name__)
@@ -244,7 +245,7 @@ class RecentPaymentsResponse(BaseModel):
 @router.get('/dashboard', response_model=DashboardStats)
 async def get_dashboard_stats(
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get complete dashboard statistics for admin panel."""
     try:
@@ -336,7 +337,7 @@ async def get_dashboard_stats(
 @router.get('/system-info', response_model=SystemInfoResponse)
 async def get_system_info(
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get system information for admin dashboard."""
     try:
@@ -602,7 +603,7 @@ async def _get_tariff_stats(db: AsyncSession) -> TariffStats | None:
 async def get_top_referrers(
     limit: int = 20,
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get top referrers with earnings breakdown by period."""
     try:
@@ -771,7 +772,7 @@ async def get_top_referrers(
 async def get_top_campaigns(
     limit: int = 20,
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get top advertising campaigns with statistics."""
     try:
@@ -828,7 +829,7 @@ async def get_top_campaigns(
 async def get_recent_payments(
     limit: int = 50,
     admin: User = Depends(require_permission('stats:read')),
-    db: AsyncSession = Depends(get_cabinet_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get recent payments with user info."""
     try:
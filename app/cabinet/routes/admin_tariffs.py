@@ -41,6 +41,7 @@ from ..schemas.tariffs import (
     TariffTrialResponse,
     TariffUpdateRequest,
 )
+from ..services.landing_cache import invalidate_landing_config_cache
 
 
 logger = structlog.get_logger(__name__)
@@ -198,6 +199,7 @@ async def update_tariff_order(
     """Update the display order of tariffs."""
     await reorder_tariffs(db, request.tariff_ids)
     await db.commit()
+    await invalidate_landing_config_cache()
 
     logger.info('Admin updated tariff order', admin_id=admin.id, tariff_ids=request.tariff_ids)
 
@@ -337,6 +339,7 @@ async def create_new_tariff(
 
     # Перезагружаем периоды из БД для синхронизации с ботом
     await load_period_prices_from_db(db)
+    await invalidate_landing_config_cache()
 
     # Return full detail
     return await get_tariff(tariff.id, admin, db)
@@ -442,6 +445,7 @@ async def update_existing_tariff(
 
     # Перезагружаем периоды из БД для синхронизации с ботом
     await load_period_prices_from_db(db)
+    await invalidate_landing_config_cache()
 
     # Auto-sync squads to active subscriptions in Remnawave when squads changed
     new_squads = tariff.allowed_squads or []
@@ -484,6 +488,7 @@ async def delete_existing_tariff(
 
     # Перезагружаем периоды из БД для синхронизации с ботом
     await load_period_prices_from_db(db)
+    await invalidate_landing_config_cache()
 
     return {'message': 'Tariff deleted successfully', 'affected_subscriptions': subs_count}
 
@@ -510,6 +515,7 @@ async def toggle_tariff(
 
     # Перезагружаем периоды из БД для синхронизации с ботом
     await load_period_prices_from_db(db)
+    await invalidate_landing_config_cache()
 
     return TariffToggleResponse(
         id=tariff_id,
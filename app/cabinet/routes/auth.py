@@ -73,8 +73,9 @@ from ..auth.merge_service import (
     get_email_merge_otp,
     store_email_merge_otp,
 )
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user, is_cabinet_admin
 from ..ip_utils import get_client_ip
+from ..principal_cache import CabinetPrincipal
 from ..schemas.auth import (
     AuthResponse,
     AutoLoginRequest,
@@ -1963,20 +1964,11 @@ async def get_my_permissions(
 
 @router.get('/me/is-admin')
 async def check_is_admin(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Check if current user is an admin (legacy config or RBAC)."""
-    # Legacy check: config-based admin list
-    is_admin = settings.is_admin(telegram_id=user.telegram_id, email=user.email if user.email_verified else None)
-
-    if not is_admin:
-        # RBAC check: user has any active role with level > 0
-        _permissions, _role_names, max_level = await UserRoleCRUD.get_user_permissions(db, user.id)
-        if max_level > 0:
-            is_admin = True
-
-    return {'is_admin': is_admin}
+    return {'is_admin': await is_cabinet_admin(db, user)}
 
 
 @router.post('/email/change', response_model=EmailChangeResponse)
@@ -31,7 +31,8 @@ from app.localization.texts import get_texts
 from app.utils.currency_converter import currency_converter
 from app.utils.price_display import display_balance_from_storage, display_transaction_amount_from_storage
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user
+from ..principal_cache import CabinetPrincipal
 from ..schemas.balance import (
     BalanceResponse,
     ManualCheckResponse,
@@ -56,7 +57,7 @@ router = APIRouter(prefix='/balance', tags=['Cabinet Balance'])
 
 @router.get('', response_model=BalanceResponse)
 async def get_balance(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get current user's balance."""
@@ -77,7 +78,7 @@ async def get_transactions(
     page: int = Query(1, ge=1, description='Page number'),
     per_page: int = Query(20, ge=1, le=100, description='Items per page'),
     type: str | None = Query(None, description='Filter by transaction type'),
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get transaction history."""
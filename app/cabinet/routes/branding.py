@@ -1,13 +1,15 @@
 """Branding routes for cabinet - logo, project name, and theme colors management."""
 
 import asyncio
+import hashlib
 import json
 import os
+import time
 from pathlib import Path
 from typing import Literal
 
 import structlog
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field, field_validator
 from sqlalchemy import select
@@ -16,6 +18,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.database.crud.system_setting import get_setting_value
 from app.database.models import SystemSetting, User
+from app.utils.cache import cache
 
 from ..dependencies import get_cabinet_db, get_current_cabinet_user, require_permission
 
@@ -59,6 +62,12 @@ DEFAULT_ANIMATION_CONFIG = {
     'reducedOnMobile': True,
 }
 
+# Aggregated public branding payload (see /branding/bootstrap)
+BOOTSTRAP_CACHE_KEY = 'cabinet:branding:bootstrap'
+BOOTSTRAP_CACHE_TTL = 300  # Bounds staleness for settings changed outside branding routes
+# Fallback when Redis is unavailable: (expires_at, body, etag)
+_bootstrap_local: tuple[float, str, str] | None = None
+
 # Allowed image types
 ALLOWED_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/jpg', 'image/webp', 'image/svg+xml'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB for larger logos
@@ -319,6 +328,21 @@ class AnalyticsCountersUpdate(BaseModel):
     google_ads_label: str | None = None
 
 
+class BrandingBootstrapResponse(BaseModel):
+    """All public branding settings and feature flags in one payload."""
+
+    branding: BrandingResponse
+    colors: ThemeColorsResponse
+    themes: EnabledThemesResponse
+    animation: AnimationConfigResponse
+    fullscreen: FullscreenEnabledResponse
+    email_auth: EmailAuthEnabledResponse
+    telegram_widget: TelegramWidgetConfigResponse
+    analytics: AnalyticsCountersResponse
+    lite_mode: LiteModeEnabledResponse
+    gift: GiftEnabledResponse
+
+
 # Default theme colors
 DEFAULT_THEME_COLORS = {
     'accent': '#3b82f6',
@@ -356,6 +380,14 @@ async def set_setting_value(db: AsyncSession, key: str, value: str):
         db.add(setting)
 
     await db.commit()
+    await invalidate_branding_bootstrap()
+
+
+async def invalidate_branding_bootstrap() -> None:
+    """Drop the cached bootstrap payload after any branding setting change."""
+    global _bootstrap_local
+    _bootstrap_local = None
+    await cache.delete(BOOTSTRAP_CACHE_KEY)
 
 
 def get_logo_path() -> Path | None:
@@ -407,6 +439,58 @@ async def get_branding(
     )
 
 
+async def _build_bootstrap(db: AsyncSession) -> BrandingBootstrapResponse:
+    return BrandingBootstrapResponse(
+        branding=await get_branding(db),
+        colors=await get_theme_colors(db),
+        themes=await get_enabled_themes(db),
+        animation=await get_animation_config(db),
+        fullscreen=await get_fullscreen_enabled(db),
+        email_auth=await get_email_auth_enabled(db),
+        telegram_widget=await get_telegram_widget_config(db),
+        analytics=await get_analytics_counters(db),
+        lite_mode=await get_lite_mode_enabled(db),
+        gift=await get_gift_enabled(db),
+    )
+
+
+async def _get_bootstrap_payload(db: AsyncSession) -> tuple[str, str]:
+    """Return (body, etag) of the bootstrap payload, rendering it on a cache miss."""
+    global _bootstrap_local
+
+    cached = await cache.get(BOOTSTRAP_CACHE_KEY)
+    if isinstance(cached, dict) and 'body' in cached and 'etag' in cached:
+        return cached['body'], cached['etag']
+    if not cache._connected and _bootstrap_local is not None and _bootstrap_local[0] > time.monotonic():
+        return _bootstrap_local[1], _bootstrap_local[2]
+
+    body = (await _build_bootstrap(db)).model_dump_json()
+    etag = f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+    if not await cache.set(BOOTSTRAP_CACHE_KEY, {'body': body, 'etag': etag}, expire=BOOTSTRAP_CACHE_TTL):
+        _bootstrap_local = (time.monotonic() + BOOTSTRAP_CACHE_TTL, body, etag)
+    return body, etag
+
+
+@router.get('/bootstrap', response_model=BrandingBootstrapResponse)
+async def get_branding_bootstrap(
+    request: Request,
+    db: AsyncSession = Depends(get_cabinet_db),
+):
+    """
+    Get every public branding setting and feature flag in one request.
+    This is a public endpoint - no authentication required.
+    Versioned by a content hash: send ``If-None-Match`` to get 304 when nothing changed.
+    """
+    body, etag = await _get_bootstrap_payload(db)
+
+    # no-cache: клиент всегда ревалидирует, поэтому изменения видны сразу, а ответ — пустой 304
+    headers = {'ETag': etag, 'Cache-Control': 'public, no-cache'}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and etag in {tag.strip() for tag in if_none_match.split(',')}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
 @router.get('/logo')
 async def get_logo():
     """
@@ -41,7 +41,8 @@ from app.services.contest_rotation_service import (
     GAME_SERVER,
 )
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user
+from ..principal_cache import CabinetPrincipal
 
 
 logger = structlog.get_logger(__name__)
@@ -161,7 +162,7 @@ class ContestsCountResponse(BaseModel):
 
 @router.get('/count', response_model=ContestsCountResponse)
 async def get_contests_count(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get count of contests available for the user."""
@@ -33,7 +33,7 @@ from app.services.payment_method_config_service import get_enabled_methods_for_u
 from app.utils.cache import RateLimitCache
 from app.utils.promo_offer import get_user_active_promo_discount_percent
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ..schemas.gift import (
     ActivateGiftRequest,
     ActivateGiftResponse,
@@ -71,7 +71,7 @@ async def _is_gift_enabled(db: AsyncSession) -> bool:
 
 @router.get('/config', response_model=GiftConfigResponse)
 async def get_gift_config(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get gift subscription configuration: tariffs, payment methods, balance."""
@@ -206,7 +206,7 @@ async def get_gift_config(
 @router.post('/purchase', response_model=GiftPurchaseResponse)
 async def create_gift_purchase(
     body: GiftPurchaseRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Create a gift subscription purchase from the cabinet."""
@@ -551,7 +551,7 @@ async def create_gift_purchase(
 
 @router.get('/pending', response_model=list[PendingGiftResponse])
 async def get_pending_gifts(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get pending gift purchases that the current user can activate."""
@@ -592,7 +592,7 @@ async def get_pending_gifts(
 @router.get('/purchase/{token}', response_model=GiftPurchaseStatusResponse)
 async def get_gift_purchase_status(
     token: str,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get the status of a cabinet gift purchase."""
@@ -647,7 +647,7 @@ async def get_gift_purchase_status(
 
 @router.get('/sent', response_model=list[SentGiftResponse])
 async def get_sent_gifts(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get all gifts the current user has sent."""
@@ -688,7 +688,7 @@ async def get_sent_gifts(
 
 @router.get('/received', response_model=list[ReceivedGiftResponse])
 async def get_received_gifts(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get all gifts the current user has received."""
@@ -731,7 +731,7 @@ async def get_received_gifts(
 @router.post('/activate', response_model=ActivateGiftResponse)
 async def activate_gift_by_code(
     body: ActivateGiftRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Activate a gift subscription by its code (token)."""
@@ -12,7 +12,8 @@ from app.services.faq_service import FaqService
 from app.services.privacy_policy_service import PrivacyPolicyService
 from app.services.public_offer_service import PublicOfferService
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user
+from ..principal_cache import CabinetPrincipal
 
 
 logger = structlog.get_logger(__name__)
@@ -253,7 +254,7 @@ async def get_available_languages():
 
 @router.get('/user/language')
 async def get_user_language(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
 ):
     """Get current user's language."""
     return {'language': user.language or 'ru'}
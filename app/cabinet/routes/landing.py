@@ -4,13 +4,14 @@ import re
 from datetime import UTC, datetime, timedelta
 
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
 from pydantic import BaseModel, Field, model_validator
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.cabinet.dependencies import get_cabinet_db
 from app.cabinet.ip_utils import get_client_ip
+from app.cabinet.services.landing_cache import landing_config_cache, landing_expires_at
 from app.cabinet.utils.locale import DEFAULT_LOCALE, resolve_locale_text
 from app.config import settings
 from app.database.crud.landing import get_active_landing_by_slug, get_purchase_by_token
@@ -626,18 +627,35 @@ async def get_landing_config(
     """Get public landing page configuration with tariffs and payment methods.
 
     No authentication required. Pass ``?lang=en`` to get localized text.
+    The rendered response is cached and carries a strong ETag (``If-None-Match`` → 304).
     """
     client_ip = get_client_ip(raw_request)
     if await RateLimitCache.is_ip_rate_limited(client_ip, 'landing_config', limit=60, window=60, fail_closed=True):
         raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail='Too many requests')
 
-    landing = await get_active_landing_by_slug(db, slug)
-    if landing is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail='Landing page not found',
+    cache_version = await landing_config_cache.version()
+    cached = await landing_config_cache.get(cache_version, slug, lang)
+    if cached is None:
+        landing = await get_active_landing_by_slug(db, slug)
+        if landing is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Landing page not found',
+            )
+        config = await _build_landing_config(db, landing, lang)
+        cached = await landing_config_cache.set(
+            cache_version, slug, lang, config.model_dump_json(), landing_expires_at(landing)
         )
 
+    headers = {'ETag': cached.etag, 'Cache-Control': f'public, max-age={cached.max_age()}'}
+    if_none_match = raw_request.headers.get('if-none-match')
+    if if_none_match and cached.etag in {tag.strip() for tag in if_none_match.split(',')}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type='application/json', headers=headers)
+
+
+async def _build_landing_config(db: AsyncSession, landing: LandingPage, lang: str) -> LandingConfigResponse:
+    """Render the public config of an active landing for one language."""
     discount = _get_active_discount(landing, lang)
     tariffs = await _load_landing_tariffs(db, landing, discount)
 
@@ -2,20 +2,21 @@
 
 import hashlib
 import hmac
-import mimetypes
 import re
 import time
 
 import structlog
 from aiogram.types import BufferedInputFile
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
+from starlette.types import Receive, Scope, Send
 
-from app.bot_factory import create_bot
 from app.config import settings
 from app.database.models import User
 
 from ..dependencies import get_current_cabinet_user
+from ..services.media_proxy import CachedMedia, MediaNotFoundError, telegram_media_proxy
 
 
 logger = structlog.get_logger(__name__)
@@ -36,6 +37,24 @@ _FILE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{16,256}$')
 _MEDIA_TOKEN_TTL_SECONDS = 24 * 60 * 60
 
 
+class _CachedMediaResponse(FileResponse):
+    """FileResponse, снимающий пин файла в кэше при любом исходе ответа.
+
+    Фоновые задачи Starlette не запускаются при ответах 400/416 на Range и при
+    обрыве соединения — пин остался бы навсегда, и кэш рос бы сверх лимита.
+    """
+
+    def __init__(self, entry: CachedMedia, **kwargs) -> None:
+        super().__init__(entry.path, **kwargs)
+        self._entry = entry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            telegram_media_proxy.release(self._entry)
+
+
 def _media_signature(file_id: str, exp: int) -> str:
     secret = (settings.get_cabinet_jwt_secret() or '').encode()
     return hmac.new(secret, f'{file_id}.{exp}'.encode(), hashlib.sha256).hexdigest()
@@ -136,7 +155,7 @@ async def upload_media(
     target_chat_id = _resolve_target_chat_id()
     upload = BufferedInputFile(file_bytes, filename=file.filename or 'upload')
 
-    bot = create_bot()
+    bot = telegram_media_proxy.bot
 
     try:
         # Send with disable_notification to avoid pinging admins — this is just staging
@@ -191,18 +210,20 @@ async def upload_media(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail='Failed to upload media',
         ) from error
-    finally:
-        await bot.session.close()
 
 
 @router.get('/{file_id}', name='cabinet_download_media')
 async def download_media(
     file_id: str,
     token: str = Query('', description='Signed access token from the ticket response'),
+    if_none_match: str | None = Header(None),
 ) -> Response:
     """
     Download media file by file_id.
     Used to display images/documents in ticket messages.
+
+    Files are served from the local disk cache (Range requests supported);
+    Telegram is contacted only on the first request for a file.
     """
     # Validate the id shape, then require a valid, unexpired signed token. The
     # token is minted only inside an authenticated, owner-scoped ticket response,
@@ -213,42 +234,34 @@ async def download_media(
             detail='Media file not found',
         )
 
-    bot = create_bot()
-
     try:
-        file = await bot.get_file(file_id)
-        if not file.file_path:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Media file not found',
-            )
-
-        buffer = await bot.download_file(file.file_path)
-
-        if hasattr(buffer, 'seek'):
-            buffer.seek(0)
-
-        content = buffer.read() if hasattr(buffer, 'read') else bytes(buffer)
-        filename = file.file_path.split('/')[-1]
-
-        media_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-
-        return Response(
-            content=content,
-            media_type=media_type,
-            headers={
-                'Content-Disposition': f'inline; filename={filename}',
-                # Private attachments must never be cached by shared proxies/CDNs.
-                'Cache-Control': 'private, no-store',
-            },
+        entry = await telegram_media_proxy.get(file_id)
+    except MediaNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Media file not found',
         )
-    except HTTPException:
-        raise
     except Exception as error:
         logger.error('Failed to download media', file_id=file_id, error=error)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail='Failed to download media',
         ) from error
-    finally:
-        await bot.session.close()
+
+    headers = {
+        'ETag': entry.etag,
+        # Private attachments must never be cached by shared proxies/CDNs.
+        'Cache-Control': f'private, max-age={settings.CABINET_MEDIA_CACHE_MAX_AGE_SECONDS}',
+    }
+
+    if if_none_match and entry.etag in {tag.strip() for tag in if_none_match.split(',')}:
+        telegram_media_proxy.release(entry)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return _CachedMediaResponse(
+        entry,
+        media_type=entry.media_type,
+        headers=headers,
+        content_disposition_type='inline',
+        filename=entry.filename,
+    )
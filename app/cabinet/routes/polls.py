@@ -17,7 +17,8 @@ from app.database.crud.poll import (
 from app.database.models import Poll, PollQuestion, PollResponse, User
 from app.services.poll_service import get_next_question, get_question_option, reward_user_for_poll
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user
+from ..principal_cache import CabinetPrincipal
 
 
 logger = structlog.get_logger(__name__)
@@ -117,7 +118,7 @@ class PollsCountResponse(BaseModel):
 
 @router.get('/count', response_model=PollsCountResponse)
 async def get_polls_count(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get count of polls available for the user."""
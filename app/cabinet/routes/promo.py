@@ -19,7 +19,7 @@ from app.database.crud.transaction import get_user_total_spent_kopeks
 from app.database.models import DiscountOffer, User
 from app.services.promo_offer_service import promo_offer_service
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 
 
 logger = structlog.get_logger(__name__)
@@ -108,7 +108,7 @@ class LoyaltyTiersResponse(BaseModel):
 
 @router.get('/offers', response_model=list[PromoOfferInfo])
 async def get_promo_offers(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get list of available promo offers for the user."""
@@ -144,7 +144,7 @@ async def get_promo_offers(
 
 @router.get('/active-discount', response_model=ActiveDiscountInfo)
 async def get_active_discount(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
 ):
     """Get user's currently active discount."""
     discount_percent = user.promo_offer_discount_percent or 0
@@ -164,7 +164,7 @@ async def get_active_discount(
 
 @router.get('/group-discounts', response_model=PromoGroupDiscounts)
 async def get_promo_group_discounts(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get user's promo group discounts."""
@@ -196,7 +196,7 @@ async def get_promo_group_discounts(
 
 @router.get('/loyalty-tiers', response_model=LoyaltyTiersResponse)
 async def get_loyalty_tiers(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get all loyalty tiers (promo groups with auto-assign thresholds) and user's progress."""
@@ -277,7 +277,7 @@ async def get_loyalty_tiers(
 @router.post('/claim', response_model=ClaimOfferResponse)
 async def claim_promo_offer(
     request: ClaimOfferRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Claim a promo offer."""
@@ -406,7 +406,7 @@ async def claim_promo_offer(
 
 @router.delete('/active-discount')
 async def clear_active_discount(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Clear user's active discount."""
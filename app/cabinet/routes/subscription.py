@@ -11,7 +11,7 @@ so all existing API paths remain unchanged.
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ..schemas.subscription import SubscriptionStatusResponse
 from .subscription_modules import (
     autopay_router,
@@ -34,7 +34,7 @@ router = APIRouter(prefix='/subscription', tags=['Cabinet Subscription'])
 # Root endpoint: GET /subscription (empty path — must be on this router directly)
 @router.get('', response_model=SubscriptionStatusResponse)
 async def get_subscription(
-    user=Depends(get_current_cabinet_user),
+    user=Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
 ):
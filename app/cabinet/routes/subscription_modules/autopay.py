@@ -11,7 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ...schemas.subscription import AutopayUpdateRequest
 
 
@@ -23,7 +23,7 @@ router = APIRouter()
 @router.patch('/autopay')
 async def update_autopay(
     request: AutopayUpdateRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
 ):
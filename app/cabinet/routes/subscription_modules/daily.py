@@ -18,7 +18,7 @@ from app.database.models import User
 from app.services.subscription_service import SubscriptionService
 from app.utils.price_display import catalog_price_in_toman, user_can_afford
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from .helpers import resolve_subscription
 
 
@@ -29,7 +29,7 @@ router = APIRouter()
 
 @router.post('/pause')
 async def toggle_subscription_pause(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ) -> dict[str, Any]:
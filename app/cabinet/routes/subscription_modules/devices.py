@@ -38,7 +38,7 @@ from app.utils.price_display import catalog_price_in_toman, user_can_afford
 from app.services.subscription_service import SubscriptionService
 from app.services.user_cart_service import user_cart_service
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ...schemas.subscription import DevicePurchaseRequest
 from .helpers import _apply_addon_discount, resolve_subscription
 
@@ -93,7 +93,7 @@ def _resolve_panel_uuid(subscription: Subscription | None, user: User) -> str |
 async def purchase_devices_legacy(
     request: DevicePurchaseRequest,
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Purchase additional device slots (legacy endpoint).
@@ -375,7 +375,7 @@ async def purchase_devices_legacy(
 async def purchase_devices(
     request: DevicePurchaseRequest,
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Purchase additional device slots for subscription."""
@@ -710,7 +710,7 @@ async def purchase_devices(
 async def save_devices_cart(
     request: DevicePurchaseRequest,
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, bool]:
     """Save cart for device purchase (for insufficient balance flow)."""
@@ -824,7 +824,7 @@ async def save_devices_cart(
 async def get_device_price(
     devices: int = 1,
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get price for additional devices."""
@@ -963,7 +963,7 @@ async def get_device_price(
 @router.get('/devices')
 async def get_devices(
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Get list of connected devices."""
@@ -1063,7 +1063,7 @@ async def rename_device(
     hwid: str,
     request: DeviceRenameRequest,
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Set/clear a local alias for the user's HWID device.
@@ -1113,7 +1113,7 @@ async def rename_device(
 async def delete_device(
     hwid: str,
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Delete a specific device by HWID."""
@@ -1157,7 +1157,7 @@ async def delete_device(
 @router.delete('/devices')
 async def delete_all_devices(
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Delete all connected devices."""
@@ -1235,7 +1235,7 @@ async def delete_all_devices(
 @router.get('/devices/reduction-info')
 async def get_device_reduction_info(
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Get info about device limit reduction availability."""
@@ -1313,7 +1313,7 @@ async def get_device_reduction_info(
 async def reduce_devices(
     request: dict[str, int],
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Reduce device limit (no refund)."""
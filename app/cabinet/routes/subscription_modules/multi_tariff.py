@@ -20,7 +20,8 @@ from app.database.crud.subscription import (
 )
 from app.database.models import SubscriptionStatus, User
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user_with_relations
+from ...principal_cache import CabinetPrincipal
 
 
 logger = structlog.get_logger(__name__)
@@ -81,7 +82,7 @@ def _subscription_to_list_item(sub) -> SubscriptionListItem:
 
 @router.get('', response_model=SubscriptionsListResponse)
 async def list_subscriptions(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> SubscriptionsListResponse:
     """List all user subscriptions. Returns all subscriptions regardless of multi-tariff mode."""
@@ -96,7 +97,7 @@ async def list_subscriptions(
 @router.get('/{subscription_id}', response_model=SubscriptionListItem)
 async def get_subscription_detail(
     subscription_id: int,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> SubscriptionListItem:
     """Get specific subscription details with ownership check."""
@@ -112,7 +113,7 @@ async def get_subscription_detail(
 @router.delete('/{subscription_id}')
 async def delete_subscription(
     subscription_id: int,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict:
     """Delete an expired/disabled subscription. Active subscriptions cannot be deleted."""
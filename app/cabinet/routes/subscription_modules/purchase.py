@@ -50,7 +50,7 @@ from app.services.subscription_service import SubscriptionService
 from app.services.user_cart_service import user_cart_service
 from app.utils.pricing_utils import format_period_description
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ...schemas.subscription import (
     PurchasePreviewRequest,
     SubscriptionResponse,
@@ -305,7 +305,7 @@ async def _build_tariff_response(
 
 @router.get('/purchase-options')
 async def get_purchase_options(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = None,
 ) -> dict[str, Any]:
@@ -397,7 +397,7 @@ async def get_purchase_options(
 @router.post('/purchase-preview')
 async def preview_purchase(
     request: PurchasePreviewRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Calculate and preview the total price for selected options (classic mode only)."""
@@ -442,7 +442,7 @@ async def preview_purchase(
 @router.post('/purchase')
 async def submit_purchase(
     request: PurchasePreviewRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Submit subscription purchase (deduct from balance, classic mode only)."""
@@ -609,7 +609,7 @@ async def submit_purchase(
 @router.post('/purchase-tariff')
 async def purchase_tariff(
     request: TariffPurchaseRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict[str, Any]:
     """Purchase a tariff (for tariffs mode)."""
@@ -1180,7 +1180,7 @@ async def purchase_tariff(
 
 @router.get('/trial', response_model=TrialInfoResponse)
 async def get_trial_info(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get trial subscription info and availability."""
@@ -1284,7 +1284,7 @@ async def get_trial_info(
 @router.post('/trial', response_model=SubscriptionResponse)
 async def activate_trial(
     request: TrialActivateRequest | None = None,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Activate trial subscription."""
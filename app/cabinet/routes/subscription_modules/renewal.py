@@ -24,7 +24,7 @@ from app.services.subscription_renewal_service import (
 from app.services.user_cart_service import user_cart_service
 from app.utils.price_display import catalog_price_in_toman, user_can_afford
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ...schemas.subscription import (
     RenewalOptionResponse,
     RenewalRequest,
@@ -60,7 +60,7 @@ def _renewal_ledger_desc(user: User, days: int, name: str | None = None) -> str:
 
 @router.get('/renewal-options', response_model=list[RenewalOptionResponse])
 async def get_renewal_options(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
 ):
@@ -122,7 +122,7 @@ async def get_renewal_options(
 @router.post('/renew')
 async def renew_subscription(
     request: RenewalRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
 ):
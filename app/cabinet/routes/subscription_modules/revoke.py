@@ -15,7 +15,7 @@ from app.config import settings
 from app.database.models import User
 from app.services.subscription_service import SubscriptionService
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from .helpers import resolve_subscription
 
 
@@ -27,7 +27,7 @@ router = APIRouter()
 @router.post('/revoke')
 async def revoke_subscription(
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
 ) -> dict:
     """Revoke and reissue subscription (generate new connection link)."""
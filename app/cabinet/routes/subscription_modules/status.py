@@ -24,7 +24,8 @@ from app.database.models import ServerSquad, User
 from app.services.remnawave_service import RemnaWaveService
 from app.services.system_settings_service import bot_configuration_service
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user_with_relations
+from ...principal_cache import CabinetPrincipal
 from ...schemas.subscription import (
     ServerInfo,
     SubscriptionStatusResponse,
@@ -39,13 +40,13 @@ router = APIRouter()
 
 @router.get('/info', response_model=SubscriptionStatusResponse)
 async def get_subscription(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
 ):
     """Get current user's subscription details."""
     # Reload user from current session to get fresh data
-    # (user object is from different session in get_current_cabinet_user)
+    # (user object is from different session in get_current_cabinet_user_with_relations)
     from app.database.crud.user import get_user_by_id
 
     fresh_user = await get_user_by_id(db, user.id)
@@ -122,7 +123,7 @@ async def get_subscription(
 
 @router.get('/connection-link')
 async def get_connection_link(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
 ) -> dict[str, Any]:
@@ -180,7 +181,7 @@ async def get_connection_link(
 
 @router.get('/happ-downloads')
 async def get_happ_downloads(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
 ) -> dict[str, Any]:
     """Get hApp download links for different platforms."""
     platforms = {
@@ -401,7 +402,7 @@ def _resolve_button_url(
 
 @router.get('/app-config')
 async def get_app_config(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = Query(None, description='Subscription ID for multi-tariff'),
 ) -> dict[str, Any]:
@@ -25,7 +25,7 @@ from app.services.remnawave_service import RemnaWaveService
 from app.services.subscription_service import SubscriptionService
 from app.utils.price_display import catalog_price_in_toman, user_can_afford
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ...schemas.subscription import TariffPurchaseRequest
 from .helpers import _subscription_to_response, resolve_subscription
 
@@ -43,7 +43,7 @@ def _t(user: User, key: str, fallback: str, **fmt) -> str:
 @router.post('/tariff/switch/preview')
 async def preview_tariff_switch(
     request: TariffPurchaseRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ) -> dict[str, Any]:
@@ -192,7 +192,7 @@ async def preview_tariff_switch(
 @router.post('/tariff/switch')
 async def switch_tariff(
     request: TariffPurchaseRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ) -> dict[str, Any]:
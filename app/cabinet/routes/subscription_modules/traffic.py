@@ -30,7 +30,7 @@ from app.services.subscription_service import SubscriptionService
 from app.services.user_cart_service import user_cart_service
 from app.utils.cache import RateLimitCache, cache, cache_key
 
-from ...dependencies import get_cabinet_db, get_current_cabinet_user
+from ...dependencies import get_cabinet_db, get_current_cabinet_user_with_relations
 from ...schemas.subscription import (
     TrafficPackageResponse,
     TrafficPurchaseRequest,
@@ -50,7 +50,7 @@ def _t(user: User, key: str, fallback: str, **fmt) -> str:
 
 @router.get('/traffic-packages', response_model=list[TrafficPackageResponse])
 async def get_traffic_packages(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ):
@@ -148,7 +148,7 @@ async def get_traffic_packages(
 @router.post('/traffic')
 async def purchase_traffic(
     request: TrafficPurchaseRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ):
@@ -490,7 +490,7 @@ async def purchase_traffic(
 @router.post('/traffic/save-cart')
 async def save_traffic_cart(
     request: TrafficPurchaseRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ) -> dict[str, bool]:
@@ -613,7 +613,7 @@ async def save_traffic_cart(
 @router.put('/traffic')
 async def switch_traffic_package(
     request: TrafficPurchaseRequest,
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ) -> dict[str, Any]:
@@ -804,7 +804,7 @@ TRAFFIC_CACHE_TTL = 60  # Cache traffic data for 60 seconds
 
 @router.post('/refresh-traffic')
 async def refresh_traffic(
-    user: User = Depends(get_current_cabinet_user),
+    user: User = Depends(get_current_cabinet_user_with_relations),
     db: AsyncSession = Depends(get_cabinet_db),
     subscription_id: int | None = QueryParam(None, description='Subscription ID for multi-tariff'),
 ):
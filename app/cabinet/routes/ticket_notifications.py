@@ -10,7 +10,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.crud.ticket_notification import TicketNotificationCRUD
 from app.database.models import User
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user, require_permission
+from ..dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user, require_permission
+from ..principal_cache import CabinetPrincipal
 
 
 logger = structlog.get_logger(__name__)
@@ -54,7 +55,7 @@ async def get_user_notifications(
     unread_only: bool = Query(False, description='Only return unread notifications'),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get ticket notifications for current user."""
@@ -71,7 +72,7 @@ async def get_user_notifications(
 
 @router.get('/unread-count', response_model=UnreadCountResponse)
 async def get_user_unread_count(
-    user: User = Depends(get_current_cabinet_user),
+    user: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get unread notifications count for current user."""
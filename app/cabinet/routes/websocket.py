@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import asyncio
 import json
+import uuid
+from contextlib import suppress
 
 import structlog
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
@@ -12,7 +14,9 @@ from app.cabinet.auth.jwt_handler import get_token_payload
 from app.config import settings
 from app.database.crud.user import get_user_by_id
 from app.database.database import AsyncSessionLocal
+from app.utils.cache import cache
 from app.utils.price_display import display_amount_from_kopeks, display_balance_from_storage
+from app.utils.redis_registry import PUBSUB_POOL, redis_registry
 
 
 logger = structlog.get_logger(__name__)
@@ -20,27 +24,119 @@ logger = structlog.get_logger(__name__)
 router = APIRouter()
 
 
+# Канал Redis pub/sub, через который реплики обмениваются уведомлениями
+_FANOUT_CHANNEL = 'cabinet:ws:fanout'
+_FANOUT_RESUBSCRIBE_DELAY_SECONDS = 2.0
+# 1013 Try Again Later — клиент переподключится и перечитает состояние
+_SLOW_CONSUMER_CLOSE_CODE = 1013
+_CLOSE_TIMEOUT_SECONDS = 2.0
+_PONG = json.dumps({'type': 'pong'})
+
+
+def _encode(message: dict) -> str:
+    return json.dumps(message, default=str, ensure_ascii=False)
+
+
+class CabinetConnection:
+    """Подключение с ограниченной очередью исходящих сообщений и своим writer-таском.
+
+    Отправка в сокет идёт только из writer-таска, поэтому медленный клиент не
+    блокирует рассылку остальным. При переполнении очереди или зависшей отправке
+    соединение закрывается с кодом 1013.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int, is_admin: bool) -> None:
+        self.websocket = websocket
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.closed = False
+        self._send_timeout = settings.CABINET_WS_SEND_TIMEOUT_SECONDS
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max(1, settings.CABINET_WS_SEND_QUEUE_SIZE))
+        self._writer: asyncio.Task | None = None
+        self._closer: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._write_loop(), name=f'cabinet-ws-writer-{self.user_id}')
+
+    def enqueue(self, data: str) -> bool:
+        """Поставить уже сериализованное сообщение в очередь, не дожидаясь отправки."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(data)
+        except asyncio.QueueFull:
+            logger.warning(
+                'Cabinet WS: send queue overflow, closing slow consumer',
+                user_id=self.user_id,
+                queue_size=self._queue.maxsize,
+            )
+            self._abort('Send queue overflow')
+            return False
+        return True
+
+    async def _write_loop(self) -> None:
+        while True:
+            data = await self._queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(data), timeout=self._send_timeout)
+            except TimeoutError:
+                logger.warning('Cabinet WS: send timed out, closing slow consumer', user_id=self.user_id)
+                self._abort('Send timeout')
+                return
+            except Exception as e:
+                logger.warning('Failed to send to user', user_id=self.user_id, e=e)
+                self.closed = True
+                return
+
+    def _abort(self, reason: str) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._closer = asyncio.create_task(self._close(reason), name=f'cabinet-ws-close-{self.user_id}')
+
+    async def _close(self, reason: str) -> None:
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(code=_SLOW_CONSUMER_CLOSE_CODE, reason=reason),
+                timeout=_CLOSE_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            logger.debug('Cabinet WS: close failed', user_id=self.user_id, e=e)
+
+    async def stop(self) -> None:
+        self.closed = True
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._writer
+
+
 class CabinetConnectionManager:
-    """Менеджер WebSocket подключений для кабинета."""
+    """Менеджер WebSocket подключений для кабинета.
+
+    Уведомления сериализуются один раз, доставляются в локальные сокеты и
+    публикуются в Redis pub/sub — остальные реплики доставляют их своим
+    подключениям. Без Redis менеджер работает в пределах процесса.
+    """
 
     def __init__(self):
-        # user_id -> set of websocket connections
-        self._user_connections: dict[int, set[WebSocket]] = {}
-        # admin user_ids -> set of websocket connections
-        self._admin_connections: dict[int, set[WebSocket]] = {}
-        self._lock = asyncio.Lock()
-
-    async def connect(self, websocket: WebSocket, user_id: int, is_admin: bool) -> None:
-        """Зарегистрировать подключение."""
-        async with self._lock:
-            if user_id not in self._user_connections:
-                self._user_connections[user_id] = set()
-            self._user_connections[user_id].add(websocket)
-
-            if is_admin:
-                if user_id not in self._admin_connections:
-                    self._admin_connections[user_id] = set()
-                self._admin_connections[user_id].add(websocket)
+        # user_id -> set of connections
+        self._user_connections: dict[int, set[CabinetConnection]] = {}
+        # admin user_ids -> set of connections
+        self._admin_connections: dict[int, set[CabinetConnection]] = {}
+        self._instance_id = uuid.uuid4().hex
+        self._listener_task: asyncio.Task | None = None
+
+    async def connect(self, websocket: WebSocket, user_id: int, is_admin: bool) -> CabinetConnection:
+        """Зарегистрировать подключение и запустить его writer."""
+        connection = CabinetConnection(websocket, user_id, is_admin)
+        connection.start()
+
+        self._user_connections.setdefault(user_id, set()).add(connection)
+        if is_admin:
+            self._admin_connections.setdefault(user_id, set()).add(connection)
 
         logger.debug(
             'Cabinet WS connected: user_id is_admin total_users',
@@ -48,75 +144,100 @@ class CabinetConnectionManager:
             is_admin=is_admin,
             user_connections_count=len(self._user_connections),
         )
+        return connection
 
-    async def disconnect(self, websocket: WebSocket, user_id: int) -> None:
+    async def disconnect(self, connection: CabinetConnection) -> None:
         """Отменить регистрацию подключения."""
-        async with self._lock:
-            if user_id in self._user_connections:
-                self._user_connections[user_id].discard(websocket)
-                if not self._user_connections[user_id]:
-                    del self._user_connections[user_id]
+        for registry in (self._user_connections, self._admin_connections):
+            connections = registry.get(connection.user_id)
+            if connections is not None:
+                connections.discard(connection)
+                if not connections:
+                    del registry[connection.user_id]
 
-            if user_id in self._admin_connections:
-                self._admin_connections[user_id].discard(websocket)
-                if not self._admin_connections[user_id]:
-                    del self._admin_connections[user_id]
-
-        logger.debug('Cabinet WS disconnected: user_id', user_id=user_id)
+        await connection.stop()
+        logger.debug('Cabinet WS disconnected: user_id', user_id=connection.user_id)
 
     async def send_to_user(self, user_id: int, message: dict) -> None:
-        """Отправить сообщение конкретному пользователю."""
-        # Snapshot connections under the lock to avoid mutation during iteration
-        async with self._lock:
-            connections = list(self._user_connections.get(user_id, set()))
+        """Отправить сообщение конкретному пользователю (на всех репликах)."""
+        data = _encode(message)
+        self._deliver_to_user(user_id, data)
+        await self._publish({'target': 'user', 'user_id': user_id, 'data': data})
 
-        if not connections:
-            return
+    async def send_to_admins(self, message: dict) -> None:
+        """Отправить сообщение всем админам (на всех репликах)."""
+        data = _encode(message)
+        self._deliver_to_admins(data)
+        await self._publish({'target': 'admins', 'data': data})
 
-        disconnected = set()
-        data = json.dumps(message, default=str, ensure_ascii=False)
+    def _deliver_to_user(self, user_id: int, data: str) -> None:
+        for connection in tuple(self._user_connections.get(user_id, ())):
+            connection.enqueue(data)
 
-        for ws in connections:
-            try:
-                await ws.send_text(data)
-            except Exception as e:
-                logger.warning('Failed to send to user', user_id=user_id, e=e)
-                disconnected.add(ws)
+    def _deliver_to_admins(self, data: str) -> None:
+        for connections in tuple(self._admin_connections.values()):
+            for connection in tuple(connections):
+                connection.enqueue(data)
 
-        # Cleanup disconnected
-        if disconnected:
-            async with self._lock:
-                for ws in disconnected:
-                    self._user_connections.get(user_id, set()).discard(ws)
+    # --- Fan-out между репликами ---
 
-    async def send_to_admins(self, message: dict) -> None:
-        """Отправить сообщение всем админам."""
-        # Snapshot connections under the lock to avoid mutation during iteration
-        async with self._lock:
-            if not self._admin_connections:
-                return
-            # Create a snapshot: list of (user_id, list of websockets)
-            admin_snapshot = [(user_id, list(connections)) for user_id, connections in self._admin_connections.items()]
-
-        data = json.dumps(message, default=str, ensure_ascii=False)
-        disconnected_by_user: dict[int, set[WebSocket]] = {}
-
-        for user_id, connections in admin_snapshot:
-            for ws in connections:
-                try:
-                    await ws.send_text(data)
-                except Exception as e:
-                    logger.warning('Failed to send to admin', user_id=user_id, e=e)
-                    if user_id not in disconnected_by_user:
-                        disconnected_by_user[user_id] = set()
-                    disconnected_by_user[user_id].add(ws)
-
-        # Cleanup disconnected
-        if disconnected_by_user:
-            async with self._lock:
-                for user_id, ws_set in disconnected_by_user.items():
-                    for ws in ws_set:
-                        self._admin_connections.get(user_id, set()).discard(ws)
+    async def _publish(self, envelope: dict) -> None:
+        if not cache._connected:
+            return
+        try:
+            await cache.redis_client.publish(_FANOUT_CHANNEL, _encode({**envelope, 'origin': self._instance_id}))
+        except Exception as e:
+            logger.warning('Cabinet WS: fan-out publish failed', e=e)
+
+    def _handle_fanout_message(self, raw: bytes | str) -> None:
+        try:
+            envelope = json.loads(raw)
+            if envelope.get('origin') == self._instance_id:
+                return  # Своё сообщение уже доставлено локально
+            data = envelope['data']
+            if envelope.get('target') == 'admins':
+                self._deliver_to_admins(data)
+            elif envelope.get('target') == 'user':
+                self._deliver_to_user(int(envelope['user_id']), data)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.warning('Cabinet WS: malformed fan-out message', e=e)
+
+    async def start(self) -> None:
+        """Подписаться на уведомления других реплик."""
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen(), name='cabinet-ws-fanout')
+
+    async def stop(self) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener_task
+            self._listener_task = None
+
+        connections = {connection for group in self._user_connections.values() for connection in group}
+        for connection in connections:
+            await connection.stop()
+
+    async def _listen(self) -> None:
+        while True:
+            if not cache._connected:
+                await asyncio.sleep(_FANOUT_RESUBSCRIBE_DELAY_SECONDS)
+                continue
+
+            pubsub = redis_registry.client('cabinet_ws_fanout', pool=PUBSUB_POOL).pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(_FANOUT_CHANNEL)
+                async for message in pubsub.listen():
+                    if message and message.get('type') == 'message':
+                        self._handle_fanout_message(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Cabinet WS: fan-out subscription lost, resubscribing', e=e)
+                await asyncio.sleep(_FANOUT_RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                with suppress(Exception):
+                    await pubsub.aclose()
 
 
 # Глобальный менеджер подключений
@@ -191,16 +312,18 @@ async def cabinet_websocket_endpoint(websocket: WebSocket):
         return
 
     # Регистрируем подключение
-    await cabinet_ws_manager.connect(websocket, user_id, is_admin)
+    connection = await cabinet_ws_manager.connect(websocket, user_id, is_admin)
 
     try:
-        # Приветственное сообщение
-        await websocket.send_json(
-            {
-                'type': 'connected',
-                'user_id': user_id,
-                'is_admin': is_admin,
-            }
+        # Приветственное сообщение (все записи в сокет идут через очередь подключения)
+        connection.enqueue(
+            _encode(
+                {
+                    'type': 'connected',
+                    'user_id': user_id,
+                    'is_admin': is_admin,
+                }
+            )
         )
 
         # Обрабатываем входящие сообщения
@@ -211,7 +334,7 @@ async def cabinet_websocket_endpoint(websocket: WebSocket):
 
                 # Ping/pong для keepalive
                 if message.get('type') == 'ping':
-                    await websocket.send_json({'type': 'pong'})
+                    connection.enqueue(_PONG)
 
             except json.JSONDecodeError:
                 logger.warning('Cabinet WS: Invalid JSON from user', user_id=user_id)
@@ -226,7 +349,7 @@ async def cabinet_websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.exception('Cabinet WS error', e=e)
     finally:
-        await cabinet_ws_manager.disconnect(websocket, user_id)
+        await cabinet_ws_manager.disconnect(connection)
 
 
 # Функции для отправки уведомлений (используются из других модулей)
@@ -1,8 +1,9 @@
 """Schemas for admin bulk actions."""
 
+from datetime import datetime
 from enum import StrEnum
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 class BulkActionType(StrEnum):
@@ -81,3 +82,58 @@ class BulkExecuteResponse(BaseModel):
     skipped_count: int
     dry_run: bool
     results: list[BulkUserResult]
+
+
+class BulkJobCreateRequest(BaseModel):
+    """Background bulk action: no dry run, much larger target lists than /execute."""
+
+    action: BulkActionType
+    user_ids: list[int] | None = Field(None, min_length=1, max_length=100_000)
+    subscription_ids: list[int] | None = Field(None, min_length=1, max_length=100_000)
+    params: BulkActionParams = Field(default_factory=BulkActionParams)
+
+    @model_validator(mode='after')
+    def _exactly_one_target(self):
+        has_users = self.user_ids is not None
+        has_subs = self.subscription_ids is not None
+        if has_users == has_subs:
+            raise ValueError('Exactly one of user_ids or subscription_ids must be provided')
+        return self
+
+
+class BulkJobError(BaseModel):
+    target_id: int
+    message: str
+
+
+class BulkJobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    action: str
+    target_type: str
+    status: str
+    total: int
+    processed: int = Field(description='Targets applied in the database')
+    synced: int = Field(description='Targets pushed to the panel')
+    success_count: int
+    error_count: int
+    skipped_count: int
+    panel_error_count: int
+    errors: list[BulkJobError] = Field(default_factory=list)
+    last_error: str | None = None
+    admin_id: int | None = None
+    created_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    updated_at: datetime | None = None
+
+    @field_validator('errors', mode='before')
+    @classmethod
+    def _none_as_empty(cls, value):
+        return value or []
+
+
+class BulkJobListResponse(BaseModel):
+    items: list[BulkJobResponse]
+    total: int
@@ -0,0 +1,137 @@
+"""Cache of rendered public landing configs.
+
+Rendered ``GET /landing/{slug}`` bodies are stored in Redis (shared between
+replicas) and in a small per-process LRU. Keys carry a global version that
+admin landing/tariff mutations bump, so invalidation is a single INCR instead
+of a key scan. Entries also expire at the next discount window boundary, so a
+discount starting or ending is picked up without an admin action.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import structlog
+
+from app.config import settings
+from app.database.models import LandingPage
+from app.utils.cache import cache
+
+
+logger = structlog.get_logger(__name__)
+
+_VERSION_KEY = 'landing_config:version'
+_LOCAL_MAX_SIZE = 512
+
+
+@dataclass(frozen=True, slots=True)
+class CachedLandingConfig:
+    """Serialized response body with its strong ETag."""
+
+    body: str
+    etag: str
+    expires_at: float
+
+    def max_age(self, now: float | None = None) -> int:
+        remaining = int(self.expires_at - (now if now is not None else time.time()))
+        return max(0, min(settings.LANDING_CONFIG_MAX_AGE_SECONDS, remaining))
+
+
+def landing_expires_at(landing: LandingPage, now: datetime | None = None) -> float:
+    """Cache deadline: the TTL, capped by the next discount start/end."""
+    now = now or datetime.now(UTC)
+    deadline = now.timestamp() + settings.LANDING_CONFIG_CACHE_TTL_SECONDS
+    for boundary in (landing.discount_starts_at, landing.discount_ends_at):
+        if boundary is not None and boundary > now:
+            deadline = min(deadline, boundary.timestamp())
+    return deadline
+
+
+class LandingConfigCache:
+    """Two-level (local LRU + Redis) cache keyed by (version, slug, lang)."""
+
+    def __init__(self, max_size: int = _LOCAL_MAX_SIZE) -> None:
+        self._max_size = max_size
+        self._local: OrderedDict[tuple[int, str, str], CachedLandingConfig] = OrderedDict()
+        # Используется, когда Redis недоступен (одна реплика)
+        self._local_version = 0
+
+    async def version(self) -> int:
+        if cache._connected:
+            try:
+                raw = await cache.redis_client.get(_VERSION_KEY)
+                return int(raw or 0)
+            except Exception as error:
+                logger.warning('Failed to read landing config cache version', error=error)
+        return self._local_version
+
+    @staticmethod
+    def _redis_key(version: int, slug: str, lang: str) -> str:
+        return f'landing_config:{version}:{slug}:{lang}'
+
+    async def get(self, version: int, slug: str, lang: str) -> CachedLandingConfig | None:
+        now = time.time()
+        local_key = (version, slug, lang)
+        entry = self._local.get(local_key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._local.move_to_end(local_key)
+                return entry
+            del self._local[local_key]
+
+        raw = await cache.get(self._redis_key(version, slug, lang))
+        if not isinstance(raw, dict):
+            return None
+        try:
+            entry = CachedLandingConfig(body=raw['body'], etag=raw['etag'], expires_at=float(raw['expires_at']))
+        except (KeyError, TypeError, ValueError):
+            return None
+        if entry.expires_at <= now:
+            return None
+        self._remember(local_key, entry)
+        return entry
+
+    async def set(self, version: int, slug: str, lang: str, body: str, expires_at: float) -> CachedLandingConfig:
+        entry = CachedLandingConfig(
+            body=body,
+            etag=f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"',
+            expires_at=expires_at,
+        )
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return entry
+
+        self._remember((version, slug, lang), entry)
+        await cache.set(
+            self._redis_key(version, slug, lang),
+            {'body': entry.body, 'etag': entry.etag, 'expires_at': entry.expires_at},
+            expire=ttl,
+        )
+        return entry
+
+    def _remember(self, key: tuple[int, str, str], entry: CachedLandingConfig) -> None:
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self._max_size:
+            self._local.popitem(last=False)
+
+    async def invalidate(self) -> None:
+        """Drop every cached landing config (all slugs and languages)."""
+        self._local_version += 1
+        self._local.clear()
+        # Старые ключи в Redis не удаляем — они недостижимы и истекут по TTL
+        await cache.increment(_VERSION_KEY)
+
+
+landing_config_cache = LandingConfigCache()
+
+
+async def invalidate_landing_config_cache() -> None:
+    try:
+        await landing_config_cache.invalidate()
+    except Exception as error:
+        logger.warning('Failed to invalidate landing config cache', error=error)
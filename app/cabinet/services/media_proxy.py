@@ -0,0 +1,220 @@
+"""Disk-cached proxy for Telegram media served to the cabinet.
+
+Files are downloaded from Telegram once, streamed straight to disk and served
+from there. The cache is content-addressed by ``file_unique_id`` (stable across
+bots and file_ids), bounded by total size with LRU eviction, and concurrent
+requests for the same file share a single upstream download.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import mimetypes
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import structlog
+from aiogram import Bot
+
+from app.bot_factory import create_bot
+from app.config import settings
+
+
+logger = structlog.get_logger(__name__)
+
+_PART_SUFFIX = '.part'
+_SAFE_SUFFIX_RE = re.compile(r'^\.[A-Za-z0-9]{1,10}$')
+# file_id → file_unique_id is stable, so resolved ids are kept to skip get_file
+_FILE_ID_INDEX_MAX = 10_000
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+_DOWNLOAD_TIMEOUT_SECONDS = 60
+
+
+class MediaNotFoundError(Exception):
+    """Telegram has no downloadable file for the requested file_id."""
+
+
+@dataclass(slots=True)
+class CachedMedia:
+    """A file stored in the disk cache."""
+
+    key: str
+    path: Path
+    size: int
+    media_type: str
+    filename: str
+    in_use: int = 0
+
+    @property
+    def etag(self) -> str:
+        # Контент по file_unique_id неизменен — ключ годится как strong ETag
+        return f'"{self.key}"'
+
+
+class TelegramMediaProxy:
+    """Shared Bot session + bounded LRU disk cache for Telegram files."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int) -> None:
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._bot: Bot | None = None
+        self._entries: OrderedDict[str, CachedMedia] = OrderedDict()
+        self._total_bytes = 0
+        self._file_ids: OrderedDict[str, str] = OrderedDict()
+        self._downloads: dict[str, asyncio.Future[CachedMedia]] = {}
+        self._loaded = False
+
+    @property
+    def bot(self) -> Bot:
+        """Bot instance reused by all media requests (one aiohttp session)."""
+        if self._bot is None:
+            self._bot = create_bot()
+        return self._bot
+
+    async def close(self) -> None:
+        if self._bot is not None:
+            await self._bot.session.close()
+            self._bot = None
+
+    @staticmethod
+    def cache_key(file_unique_id: str) -> str:
+        return hashlib.sha256(file_unique_id.encode()).hexdigest()[:40]
+
+    # --- Disk index ---
+
+    def _load_index(self) -> None:
+        """Rebuild the in-memory LRU from files left by a previous process."""
+        self._loaded = True
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            files = [path for path in self._cache_dir.iterdir() if path.is_file()]
+        except OSError as error:
+            logger.warning('Media cache directory unavailable', cache_dir=str(self._cache_dir), error=error)
+            return
+
+        entries: list[tuple[float, CachedMedia]] = []
+        for path in files:
+            if path.name.endswith(_PART_SUFFIX):
+                path.unlink(missing_ok=True)
+                continue
+            stat_result = path.stat()
+            entries.append((stat_result.st_atime, self._make_entry(path.stem, path, stat_result.st_size)))
+
+        for _, entry in sorted(entries, key=lambda item: item[0]):
+            self._entries[entry.key] = entry
+            self._total_bytes += entry.size
+        self._evict()
+
+    @staticmethod
+    def _make_entry(key: str, path: Path, size: int) -> CachedMedia:
+        filename = f'{key[:16]}{path.suffix}'
+        media_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return CachedMedia(key=key, path=path, size=size, media_type=media_type, filename=filename)
+
+    def _evict(self) -> None:
+        for key in list(self._entries):
+            if self._total_bytes <= self._max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.in_use:
+                continue
+            del self._entries[key]
+            self._total_bytes -= entry.size
+            entry.path.unlink(missing_ok=True)
+            logger.debug('Evicted media from cache', key=key, size=entry.size)
+
+    def _remember_file_id(self, file_id: str, key: str) -> None:
+        self._file_ids[file_id] = key
+        self._file_ids.move_to_end(file_id)
+        if len(self._file_ids) > _FILE_ID_INDEX_MAX:
+            self._file_ids.popitem(last=False)
+
+    # --- Public API ---
+
+    async def get(self, file_id: str) -> CachedMedia:
+        """Return a cached file for ``file_id``, downloading it once if needed.
+
+        The returned entry is pinned against eviction until ``release`` is called.
+        """
+        if not self._loaded:
+            self._load_index()
+
+        key = self._file_ids.get(file_id)
+        entry = self._entries.get(key) if key else None
+        while entry is None or self._entries.get(entry.key) is not entry:
+            file = await self.bot.get_file(file_id)
+            if not file.file_path:
+                raise MediaNotFoundError(file_id)
+            key = self.cache_key(file.file_unique_id)
+            self._remember_file_id(file_id, key)
+            entry = self._entries.get(key)
+            if entry is None:
+                # Файл мог быть вытеснен, пока ожидающий запрос ждал общую загрузку — тогда повторяем
+                entry = await self._download_once(key, file.file_path)
+
+        self._entries.move_to_end(entry.key)
+        entry.in_use += 1
+        self._evict()
+        return entry
+
+    def release(self, entry: CachedMedia) -> None:
+        entry.in_use = max(0, entry.in_use - 1)
+        if not entry.in_use:
+            self._evict()
+
+    async def _download_once(self, key: str, file_path: str) -> CachedMedia:
+        """Coalesce concurrent misses for one file into a single upstream download."""
+        pending = self._downloads.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future[CachedMedia] = asyncio.get_running_loop().create_future()
+        self._downloads[key] = future
+        try:
+            entry = await self._download(key, file_path)
+        except BaseException as error:
+            future.set_exception(error)
+            # Ожидающих может не быть — помечаем исключение полученным
+            future.exception()
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            self._downloads.pop(key, None)
+
+    async def _download(self, key: str, file_path: str) -> CachedMedia:
+        suffix = Path(file_path).suffix.lower()
+        if not _SAFE_SUFFIX_RE.match(suffix):
+            suffix = ''
+        target = self._cache_dir / f'{key}{suffix}'
+        part = self._cache_dir / f'{key}{suffix}{_PART_SUFFIX}'
+
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            # aiogram пишет в файл по чанкам — файл целиком в памяти не держится
+            await self.bot.download_file(
+                file_path,
+                destination=part,
+                timeout=_DOWNLOAD_TIMEOUT_SECONDS,
+                chunk_size=_DOWNLOAD_CHUNK_SIZE,
+            )
+            part.replace(target)
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+
+        entry = self._make_entry(key, target, target.stat().st_size)
+        self._entries[key] = entry
+        self._total_bytes += entry.size
+        logger.info('Media cached from Telegram', key=key, size=entry.size)
+        return entry
+
+
+telegram_media_proxy = TelegramMediaProxy(
+    cache_dir=Path(settings.CABINET_MEDIA_CACHE_DIR),
+    max_bytes=max(1, settings.CABINET_MEDIA_CACHE_MAX_MB) * 1024 * 1024,
+)
@@ -81,6 +81,9 @@ class Settings(BaseSettings):
     NALOGO_QUEUE_CHECK_INTERVAL: int = 600  # Интервал проверки очереди (секунды, 10 мин)
     NALOGO_QUEUE_RECEIPT_DELAY: int = 3  # Задержка между отправкой чеков (секунды)
     NALOGO_QUEUE_MAX_ATTEMPTS: int = 72  # Максимум попыток отправки чека (72 × 10мин = 12 часов)
+    NALOGO_QUEUE_CONCURRENCY: int = 2  # Одновременных отправок (старты всё равно разнесены на RECEIPT_DELAY)
+    NALOGO_QUEUE_VISIBILITY_TIMEOUT: int = 300  # Через сколько секунд неподтверждённый чек вернётся в очередь
+    NALOGO_INCOME_INDEX_REFRESH_SECONDS: int = 300  # Как часто дочитывать доходы за день для поиска дублей
 
     ADMIN_REPORTS_ENABLED: bool = False
     ADMIN_REPORTS_CHAT_ID: str | None = None
@@ -99,6 +102,15 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = 'remnawave_user'
     POSTGRES_PASSWORD: str = 'secure_password_123'
 
+    # Read-реплика для статистики, отчетов и списков (пусто — все запросы на основную БД)
+    DATABASE_READ_REPLICA_URL: str | None = None
+    # Допустимое отставание реплики; при большем чтения уходят на основную БД
+    DATABASE_READ_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    # Как часто перепроверять доступность и отставание реплики
+    DATABASE_READ_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0
+    # Сколько секунд после своей записи пользователь читает с основной БД (read-your-writes)
+    DATABASE_READ_REPLICA_PIN_SECONDS: float = 10.0
+
     SQLITE_PATH: str = './data/bot.db'
     LOCALES_PATH: str = './locales'
 
@@ -118,6 +130,22 @@ class Settings(BaseSettings):
     DATABASE_MODE: str = 'auto'
 
     REDIS_URL: str = 'redis://localhost:6379/0'
+    # Общий пул соединений Redis (кеш, FSM, корзина, рефералы, Apple IAP); подписки pub/sub — в отдельном пуле
+    REDIS_MAX_CONNECTIONS: int = 50
+    # Сколько ждать свободного соединения, когда пул исчерпан; 0 — без ограничения
+    REDIS_POOL_TIMEOUT_SECONDS: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: int = 30
+    # Ошибок соединения подряд, после которых команды Redis временно отклоняются сразу, без ожидания таймаутов
+    REDIS_CIRCUIT_THRESHOLD: int = 5
+    REDIS_CIRCUIT_OPEN_SECONDS: float = 10.0
+    # Как часто сверять версии кешей настроек с Redis (страховка от потерянных pub/sub сообщений)
+    CACHE_INVALIDATION_CHECK_INTERVAL_SECONDS: float = 30.0
+    # Выше этого числа ключей в Redis команда KEYS запрещена — используется инкрементальный SCAN
+    CACHE_KEYS_COMMAND_MAX_KEYSPACE: int = 10000
+    # Снимок каталога цен (тарифы, серверы, промогруппы) в памяти; страховочный TTL на случай внешних правок БД
+    PRICING_CATALOG_TTL_SECONDS: int = 300
     CART_TTL_SECONDS: int = 3600  # Время жизни корзины пользователя в Redis (1 час)
     # «Свежее намерение» пополнить ради сохранённой корзины. Тихая авто-покупка из
     # корзины после пополнения срабатывает ТОЛЬКО если в течение этого окна юзер
@@ -135,6 +163,12 @@ class Settings(BaseSettings):
     # таймауты логируются как WARNING, чтобы не спамить админ-чат ошибками.
     REMNAWAVE_API_CONNECT_TIMEOUT: int = 30
     REMNAWAVE_API_TOTAL_TIMEOUT: int = 60
+    # Склейка одинаковых изменений пользователей (включение/отключение) в bulk-запросы к панели.
+    # Изменения, пришедшие в пределах окна, уходят одним POST /api/users/bulk/update.
+    REMNAWAVE_WRITE_COALESCE_ENABLED: bool = False
+    REMNAWAVE_WRITE_COALESCE_WINDOW_MS: int = 50
+    REMNAWAVE_WRITE_COALESCE_MAX_BATCH: int = 500  # Пачка уходит сразу, не дожидаясь окна
+    REMNAWAVE_WRITE_FALLBACK_CONCURRENCY: int = 5  # Параллельных PATCH при поштучном повторе пачки
 
     REMNAWAVE_USERNAME: str | None = None
     REMNAWAVE_PASSWORD: str | None = None
@@ -158,6 +192,13 @@ class Settings(BaseSettings):
     # mem-DoS при компрометации webhook-секрета). См. RemnaWaveWebhookService.
     REMNAWAVE_WEBHOOK_NODE_COALESCE_WINDOW_SECONDS: float = 10.0
     REMNAWAVE_WEBHOOK_NODE_BUFFER_MAX: int = 500
+    # Coalescing для user.* событий: за окно повторные события одного типа по
+    # одному пользователю схлопываются (побеждает последнее), весь буфер
+    # резолвится одним запросом. 0 — обрабатывать каждое событие сразу.
+    REMNAWAVE_WEBHOOK_USER_COALESCE_WINDOW_SECONDS: float = 2.0
+    REMNAWAVE_WEBHOOK_USER_BUFFER_MAX: int = 5000
+    # Лимит отправки пользовательских уведомлений из webhook'ов (сообщений/сек).
+    REMNAWAVE_WEBHOOK_USER_NOTIFY_RATE_PER_SECOND: float = 20.0
 
     # Webhook user notification toggles (what Telegram messages users receive from webhook events)
     WEBHOOK_NOTIFY_USER_ENABLED: bool = True
@@ -174,6 +215,14 @@ class Settings(BaseSettings):
     WEBHOOK_NOTIFY_DEVICES: bool = True
     WEBHOOK_NOTIFY_TORRENT_DETECTED: bool = True
 
+    # Исходящие webhooks (Web API): очередь доставки с повторами
+    WEBHOOK_DELIVERY_WORKERS: int = 8  # Одновременных HTTP доставок на процесс
+    WEBHOOK_DELIVERY_PER_ENDPOINT_CONCURRENCY: int = 2
+    WEBHOOK_DELIVERY_MAX_ATTEMPTS: int = 8
+    WEBHOOK_DELIVERY_RETRY_BASE_SECONDS: float = 10.0  # Задержка удваивается с каждой попыткой (до 1 часа)
+    WEBHOOK_DELIVERY_CIRCUIT_THRESHOLD: int = 5  # Ошибок подряд до временного отключения endpoint
+    WEBHOOK_DELIVERY_CIRCUIT_OPEN_SECONDS: float = 300.0
+
     TRIAL_DURATION_DAYS: int = 3
     TRIAL_TRAFFIC_LIMIT_GB: int = 10
     TRIAL_DEVICE_LIMIT: int = 2
@@ -363,6 +412,8 @@ class Settings(BaseSettings):
     # Настройки суточных подписок
     DAILY_SUBSCRIPTIONS_ENABLED: bool = True  # Включить автоматическое списание для суточных тарифов
     DAILY_SUBSCRIPTIONS_CHECK_INTERVAL_MINUTES: int = 30  # Интервал проверки в минутах
+    DAILY_SUBSCRIPTIONS_CHARGE_BATCH_SIZE: int = 200  # Подписок в одной транзакции списания
+    DAILY_SUBSCRIPTIONS_CHARGE_CONCURRENCY: int = 8  # Воркеров для панели и уведомлений после списания
 
     AUTOPAY_WARNING_DAYS: str = '3,1'
 
@@ -926,6 +977,19 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = 'INFO'
     LOG_FILE: str = 'logs/bot.log'
     LOG_COLORS: bool = True  # ANSI-цвета в консоли (false для plain-text вывода)
+    LOG_FORMAT: str = 'console'  # console | json (одна JSON-строка на запись, для сборщиков логов)
+
+    # Метрики в памяти процесса, отдаются в формате Prometheus на /metrics (WEB API, по токену)
+    METRICS_ENABLED: bool = True
+    # Профилирование обновлений бота: время хендлеров и middleware, SQL, вызовы Telegram/панели.
+    # Медленные обновления (со стеком корутин) доступны на /profiling/slow-updates (WEB API, по токену)
+    BOT_PROFILING_ENABLED: bool = False
+    BOT_PROFILING_SLOW_UPDATE_MS: int = 1000
+    BOT_PROFILING_SAMPLE_INTERVAL_MS: int = 50  # Период снятия стека, пока медленное обновление выполняется
+    BOT_PROFILING_BUFFER_SIZE: int = 100
+    # Индекс callback-обработчиков: F.data == ... в словаре, F.data.startswith(...) в trie вместо перебора
+    # сотен фильтров на каждое нажатие. Выбирается тот же обработчик, что и при обычном переборе
+    BOT_CALLBACK_INDEX_ENABLED: bool = True
 
     # === Log Rotation Settings ===
     LOG_ROTATION_ENABLED: bool = False  # По умолчанию старое поведение
@@ -1058,6 +1122,11 @@ class Settings(BaseSettings):
     VERSION_CHECK_REPO: str = 'fr1ngg/remnawave-bedolaga-telegram-bot'
     VERSION_CHECK_INTERVAL_HOURS: int = 1
 
+    # Независимые этапы запуска выполняются параллельно; false — строго по очереди, как раньше
+    STARTUP_PARALLEL_ENABLED: bool = True
+    # Таймаут этапов, зависящих от панели и фоновых сервисов; 0 — без таймаута
+    STARTUP_STAGE_TIMEOUT_SECONDS: float = 120.0
+
     BACKUP_AUTO_ENABLED: bool = True
     BACKUP_INTERVAL_HOURS: int = 24
     BACKUP_TIME: str = '03:00'
@@ -1085,6 +1154,16 @@ class Settings(BaseSettings):
     CABINET_TRUSTED_PROXIES: str = (
         ''  # Comma-separated IPs/CIDRs of trusted reverse proxies (e.g. '127.0.0.1,10.0.0.0/8')
     )
+    CABINET_MEDIA_CACHE_DIR: str = './data/media_cache'  # Disk cache for Telegram media served via /media/{file_id}
+    CABINET_MEDIA_CACHE_MAX_MB: int = 512
+    CABINET_MEDIA_CACHE_MAX_AGE_SECONDS: int = 3600  # Browser cache lifetime (private) for media responses
+    LANDING_CONFIG_CACHE_TTL_SECONDS: int = 300  # Rendered public landing config cache (invalidated by admin edits)
+    LANDING_CONFIG_MAX_AGE_SECONDS: int = 30  # Browser/CDN max-age for public landing config responses
+    CABINET_WS_SEND_QUEUE_SIZE: int = 64  # Per-connection outbound queue; overflow closes the slow client
+    CABINET_WS_SEND_TIMEOUT_SECONDS: float = 10.0
+    BULK_ACTION_CHUNK_SIZE: int = 500  # Целей на одну транзакцию фоновой массовой задачи
+    BULK_ACTION_PANEL_CONCURRENCY: int = 8  # Одновременных обновлений в панели RemnaWave
+    CABINET_PRINCIPAL_CACHE_TTL_SECONDS: int = 0  # Кэш проверенной авторизации кабинета (0 — выключен)
 
     # OAuth 2.0 provider settings for cabinet
     OAUTH_GOOGLE_CLIENT_ID: str = ''
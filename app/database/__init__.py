@@ -10,6 +10,7 @@ from .database import (
     get_pool_metrics,
     sync_postgres_sequences,
 )
+from .read_routing import get_read_db, get_user_read_db, read_session, replica_router
 
 
 __all__ = [
@@ -20,5 +21,9 @@ __all__ = [
     'get_db',
     'get_db_read_only',
     'get_pool_metrics',
+    'get_read_db',
+    'get_user_read_db',
+    'read_session',
+    'replica_router',
     'sync_postgres_sequences',
 ]
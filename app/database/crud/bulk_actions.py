@@ -0,0 +1,369 @@
+"""Set-based операции для фоновых массовых действий (BulkActionJob).
+
+Каждая функция применяет действие к пачке целей несколькими UPDATE/INSERT
+вместо загрузки и изменения строк по одной и НЕ коммитит: пачка, курсор и
+счётчики задачи фиксируются одной транзакцией вызывающего
+(app/services/bulk_action_job_service.py).
+"""
+
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+
+import structlog
+from sqlalchemy import and_, case, delete, exists, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database.crud.subscription import extend_subscription, get_subscription_by_id
+from app.database.crud.transaction import emit_transaction_side_effects
+from app.database.models import (
+    PaymentMethod,
+    SentNotification,
+    Subscription,
+    SubscriptionStatus,
+    TrafficPurchase,
+    Transaction,
+    TransactionType,
+    User,
+    UserPromoGroup,
+)
+
+
+logger = structlog.get_logger(__name__)
+
+_REACTIVATABLE_STATUSES = (
+    SubscriptionStatus.EXPIRED.value,
+    SubscriptionStatus.DISABLED.value,
+    SubscriptionStatus.LIMITED.value,
+)
+
+# Статусы, из которых extend_subscription переводит подписку в ACTIVE
+_EXTENDABLE_STATUSES = (*_REACTIVATABLE_STATUSES, SubscriptionStatus.TRIAL.value, SubscriptionStatus.ACTIVE.value)
+
+
+@dataclass(slots=True)
+class BulkApplyResult:
+    """Итог применения пачки: изменённые цели и ошибки по отдельным целям."""
+
+    applied: list[int] = field(default_factory=list)
+    errors: dict[int, str] = field(default_factory=dict)
+
+
+async def get_existing_user_ids(db: AsyncSession, user_ids: list[int]) -> set[int]:
+    if not user_ids:
+        return set()
+    result = await db.execute(select(User.id).where(User.id.in_(user_ids)))
+    return set(result.scalars().all())
+
+
+async def resolve_user_subscriptions(db: AsyncSession, user_ids: list[int]) -> dict[int, int]:
+    """Подписка каждого пользователя для действия, одним запросом.
+
+    Как ``_resolve_subscription`` в кабинете: первая активная подписка, иначе
+    самая новая. Пользователи без подписок в результат не попадают.
+    """
+    if not user_ids:
+        return {}
+
+    rows = await db.execute(
+        select(Subscription.id, Subscription.user_id, Subscription.status, Subscription.end_date)
+        .where(Subscription.user_id.in_(user_ids))
+        .order_by(Subscription.user_id, Subscription.created_at.desc())
+    )
+
+    now = datetime.now(UTC)
+    resolved: dict[int, int] = {}
+    with_active: set[int] = set()
+    for sub_id, user_id, status, end_date in rows:
+        if user_id in with_active:
+            continue
+        if status == SubscriptionStatus.ACTIVE.value and end_date is not None and end_date > now:
+            resolved[user_id] = sub_id
+            with_active.add(user_id)
+        else:
+            resolved.setdefault(user_id, sub_id)
+    return resolved
+
+
+async def get_existing_subscription_ids(db: AsyncSession, subscription_ids: list[int]) -> set[int]:
+    if not subscription_ids:
+        return set()
+    result = await db.execute(select(Subscription.id).where(Subscription.id.in_(subscription_ids)))
+    return set(result.scalars().all())
+
+
+def _extend_fast_path_filter(now: datetime):
+    """Подписки, для которых extend_subscription сводится к сдвигу даты и статуса.
+
+    Без докупок трафика и в тарифном режиме ни одна housekeeping-ветка не
+    меняет лимиты, поэтому продление можно выполнить одним UPDATE. Остальные
+    (классический режим, докупки, PENDING, сброс трафика у истёкших) идут
+    через extend_subscription построчно.
+    """
+    conditions = [
+        Subscription.tariff_id.is_not(None),
+        Subscription.end_date.is_not(None),
+        Subscription.status.in_(_EXTENDABLE_STATUSES),
+        func.coalesce(Subscription.purchased_traffic_gb, 0) == 0,
+        ~exists().where(TrafficPurchase.subscription_id == Subscription.id),
+    ]
+    if settings.RESET_TRAFFIC_ON_PAYMENT:
+        conditions.append(
+            and_(Subscription.status.not_in(_REACTIVATABLE_STATUSES), Subscription.end_date > now),
+        )
+    return and_(*conditions)
+
+
+async def bulk_extend_subscriptions(db: AsyncSession, subscription_ids: list[int], days: int) -> BulkApplyResult:
+    result = BulkApplyResult()
+    if not subscription_ids:
+        return result
+
+    now = datetime.now(UTC)
+    values = {
+        'end_date': case(
+            (Subscription.end_date > now, Subscription.end_date + timedelta(days=days)),
+            else_=literal(now + timedelta(days=days), type_=Subscription.end_date.type),
+        ),
+        'status': SubscriptionStatus.ACTIVE.value,
+        'purchased_traffic_gb': 0,
+        'traffic_reset_at': None,
+        'updated_at': now,
+    }
+    if settings.RESET_TRAFFIC_ON_PAYMENT:
+        values['traffic_used_gb'] = 0.0
+
+    rows = await db.execute(
+        update(Subscription)
+        .where(Subscription.id.in_(subscription_ids), _extend_fast_path_filter(now))
+        .values(**values)
+        .returning(Subscription.id, Subscription.user_id, Subscription.is_trial)
+        .execution_options(synchronize_session=False)
+    )
+    extended = rows.all()
+    fast_ids = [row.id for row in extended]
+
+    if fast_ids:
+        await db.execute(delete(SentNotification).where(SentNotification.subscription_id.in_(fast_ids)))
+        # Как в extend_subscription: продление платной подписки гасит триалы пользователя
+        paid_owner_ids = {row.user_id for row in extended if not row.is_trial}
+        if paid_owner_ids:
+            await db.execute(
+                update(Subscription)
+                .where(
+                    Subscription.user_id.in_(paid_owner_ids),
+                    Subscription.is_trial.is_(True),
+                    Subscription.status.in_([SubscriptionStatus.ACTIVE.value, SubscriptionStatus.TRIAL.value]),
+                    Subscription.id.not_in(subscription_ids),
+                )
+                .values(
+                    status=SubscriptionStatus.DISABLED.value,
+                    is_trial=False,
+                    autopay_enabled=False,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+    result.applied.extend(fast_ids)
+
+    fast = set(fast_ids)
+    for sub_id in subscription_ids:
+        if sub_id in fast:
+            continue
+        try:
+            async with db.begin_nested():
+                subscription = await get_subscription_by_id(db, sub_id)
+                if subscription is None:
+                    result.errors[sub_id] = 'Subscription not found'
+                    continue
+                await extend_subscription(db, subscription, days, commit=False)
+            result.applied.append(sub_id)
+        except Exception as error:
+            logger.error('Ошибка продления подписки в массовом действии', subscription_id=sub_id, error=error)
+            result.errors[sub_id] = 'Action failed: internal error'
+
+    logger.info(
+        'Массовое продление подписок',
+        days=days,
+        set_based=len(fast_ids),
+        per_row=len(subscription_ids) - len(fast_ids),
+        errors=len(result.errors),
+    )
+    return result
+
+
+async def bulk_add_subscription_traffic(
+    db: AsyncSession, subscription_ids: list[int], traffic_gb: int
+) -> BulkApplyResult:
+    """Докупка трафика пачкой: пакет на 30 дней, лимит, счётчики и реактивация.
+
+    Повторяет add_subscription_traffic + reactivate_subscription для каждой подписки.
+    """
+    result = BulkApplyResult()
+    if not subscription_ids:
+        return result
+
+    now = datetime.now(UTC)
+    await db.execute(
+        insert(TrafficPurchase).from_select(
+            ['subscription_id', 'traffic_gb', 'expires_at'],
+            select(
+                Subscription.id,
+                literal(traffic_gb),
+                literal(now + timedelta(days=30), type_=TrafficPurchase.expires_at.type),
+            ).where(Subscription.id.in_(subscription_ids)),
+        )
+    )
+
+    nearest_expiry = (
+        select(func.min(TrafficPurchase.expires_at))
+        .where(TrafficPurchase.subscription_id == Subscription.id, TrafficPurchase.expires_at > now)
+        .scalar_subquery()
+    )
+    rows = await db.execute(
+        update(Subscription)
+        .where(Subscription.id.in_(subscription_ids))
+        .values(
+            # Безлимит (0) остаётся безлимитом — как Subscription.add_traffic
+            traffic_limit_gb=case(
+                (Subscription.traffic_limit_gb == 0, 0),
+                else_=Subscription.traffic_limit_gb + traffic_gb,
+            ),
+            purchased_traffic_gb=func.coalesce(Subscription.purchased_traffic_gb, 0) + traffic_gb,
+            traffic_reset_at=nearest_expiry,
+            status=case(
+                (
+                    and_(Subscription.status.in_(_REACTIVATABLE_STATUSES), Subscription.end_date > now),
+                    SubscriptionStatus.ACTIVE.value,
+                ),
+                else_=Subscription.status,
+            ),
+            updated_at=now,
+        )
+        .returning(Subscription.id)
+        .execution_options(synchronize_session=False)
+    )
+    result.applied.extend(rows.scalars().all())
+
+    logger.info('Массовая докупка трафика', traffic_gb=traffic_gb, subscriptions=len(result.applied))
+    return result
+
+
+async def bulk_set_device_limit(db: AsyncSession, subscription_ids: list[int], device_limit: int) -> BulkApplyResult:
+    result = BulkApplyResult()
+    if not subscription_ids:
+        return result
+
+    rows = await db.execute(
+        update(Subscription)
+        .where(Subscription.id.in_(subscription_ids))
+        .values(device_limit=device_limit, updated_at=datetime.now(UTC))
+        .returning(Subscription.id)
+        .execution_options(synchronize_session=False)
+    )
+    result.applied.extend(rows.scalars().all())
+    return result
+
+
+async def bulk_assign_promo_group(db: AsyncSession, user_ids: list[int], promo_group_id: int | None) -> BulkApplyResult:
+    """Заменяет промогруппы пользователей одной группой (или снимает все).
+
+    После замены единственная группа и есть primary, поэтому
+    users.promo_group_id выставляется напрямую, без sync по одному.
+    """
+    result = BulkApplyResult()
+    if not user_ids:
+        return result
+
+    now = datetime.now(UTC)
+    await db.execute(delete(UserPromoGroup).where(UserPromoGroup.user_id.in_(user_ids)))
+    if promo_group_id is not None:
+        await db.execute(
+            insert(UserPromoGroup).from_select(
+                ['user_id', 'promo_group_id', 'assigned_at', 'assigned_by'],
+                select(
+                    User.id,
+                    literal(promo_group_id),
+                    literal(now, type_=UserPromoGroup.assigned_at.type),
+                    literal('admin'),
+                ).where(User.id.in_(user_ids)),
+            )
+        )
+
+    rows = await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(promo_group_id=promo_group_id, updated_at=now)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    result.applied.extend(rows.scalars().all())
+    return result
+
+
+async def bulk_add_user_balance(
+    db: AsyncSession,
+    user_ids: list[int],
+    amount_kopeks: int,
+    description: str,
+) -> tuple[BulkApplyResult, list[tuple[int, int]]]:
+    """Начисление баланса пачкой с транзакцией DEPOSIT/MANUAL на каждого пользователя.
+
+    Возвращает результат и пары (transaction_id, user_id); после коммита по ним
+    нужно вызвать ``emit_bulk_balance_side_effects``.
+    """
+    result = BulkApplyResult()
+    if not user_ids:
+        return result, []
+
+    now = datetime.now(UTC)
+    rows = await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(balance_kopeks=User.balance_kopeks + amount_kopeks, updated_at=now)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    credited = list(rows.scalars().all())
+    if not credited:
+        return result, []
+
+    transactions = await db.execute(
+        insert(Transaction).returning(Transaction.id, Transaction.user_id),
+        [
+            {
+                'user_id': user_id,
+                'type': TransactionType.DEPOSIT.value,
+                'amount_kopeks': amount_kopeks,
+                'description': description,
+                'payment_method': PaymentMethod.MANUAL.value,
+                'is_completed': True,
+                'completed_at': now,
+            }
+            for user_id in credited
+        ],
+    )
+    result.applied.extend(credited)
+    created = [(row.id, row.user_id) for row in transactions]
+
+    logger.info('💰 Массовое начисление баланса', users=len(credited), amount_kopeks=amount_kopeks)
+    return result, created
+
+
+async def emit_bulk_balance_side_effects(
+    db: AsyncSession,
+    transactions: list[tuple[int, int]],
+    amount_kopeks: int,
+    description: str,
+) -> None:
+    """Отложенные события и автовыдача промогрупп для транзакций из bulk_add_user_balance."""
+    for transaction_id, user_id in transactions:
+        await emit_transaction_side_effects(
+            db,
+            Transaction(id=transaction_id, user_id=user_id),
+            amount_kopeks=amount_kopeks,
+            user_id=user_id,
+            type=TransactionType.DEPOSIT,
+            payment_method=PaymentMethod.MANUAL,
+            description=description,
+        )
@@ -97,11 +97,15 @@ async def update_referral_contest(
     contest: ReferralContest,
     **fields: object,
 ) -> ReferralContest:
+    window_changed = any(key in fields and fields[key] != getattr(contest, key, None) for key in ('start_at', 'end_at'))
     for key, value in fields.items():
         if hasattr(contest, key):
             setattr(contest, key, value)
     await db.commit()
     await db.refresh(contest)
+    if window_changed:
+        # Лидерборд считается по событиям в окне конкурса — пересоберётся при чтении
+        await _drop_leaderboard(contest.id)
     return contest
 
 
@@ -171,9 +175,11 @@ async def add_contest_event(
     if existing:
         # Обновляем amount_kopeks если повторная покупка (upsert)
         if amount_kopeks and existing.amount_kopeks != amount_kopeks:
+            amount_delta = abs(amount_kopeks) - abs(existing.amount_kopeks)
             existing.amount_kopeks = amount_kopeks
             await db.commit()
             await db.refresh(existing)
+            await _record_leaderboard(contest_id, existing.referrer_id, count_delta=0, amount_delta=amount_delta)
         return None
 
     event = ReferralContestEvent(
@@ -187,9 +193,54 @@ async def add_contest_event(
     db.add(event)
     await db.commit()
     await db.refresh(event)
+    await _record_leaderboard(contest_id, referrer_id, count_delta=1, amount_delta=abs(amount_kopeks))
     return event
 
 
+async def _record_leaderboard(contest_id: int, referrer_id: int, *, count_delta: int, amount_delta: int) -> None:
+    from app.services.referral_contest_leaderboard import contest_leaderboard
+
+    await contest_leaderboard.record(contest_id, referrer_id, count_delta=count_delta, amount_delta=amount_delta)
+
+
+async def _drop_leaderboard(contest_id: int) -> None:
+    from app.services.referral_contest_leaderboard import contest_leaderboard
+
+    await contest_leaderboard.drop(contest_id)
+
+
+def _contest_window(contest: ReferralContest) -> tuple[datetime, datetime]:
+    contest_end = contest.end_at
+    if contest_end.hour == 0 and contest_end.minute == 0 and contest_end.second == 0:
+        contest_end = contest_end.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return contest.start_at, contest_end
+
+
+async def get_contest_referrer_totals(
+    db: AsyncSession,
+    contest: ReferralContest,
+) -> list[tuple[int, int, int]]:
+    """(referrer_id, referral_count, total_amount) по событиям в окне конкурса — источник истины для лидерборда."""
+    contest_start, contest_end = _contest_window(contest)
+    result = await db.execute(
+        select(
+            ReferralContestEvent.referrer_id,
+            func.count(ReferralContestEvent.id),
+            func.coalesce(func.sum(func.abs(ReferralContestEvent.amount_kopeks)), 0),
+        )
+        .join(User, User.id == ReferralContestEvent.referrer_id)
+        .where(
+            and_(
+                ReferralContestEvent.contest_id == contest.id,
+                ReferralContestEvent.occurred_at >= contest_start,
+                ReferralContestEvent.occurred_at <= contest_end,
+            )
+        )
+        .group_by(ReferralContestEvent.referrer_id)
+    )
+    return [(int(referrer_id), int(count), int(amount)) for referrer_id, count, amount in result.all()]
+
+
 async def get_contest_leaderboard(
     db: AsyncSession,
     contest_id: int,
@@ -198,17 +249,54 @@ async def get_contest_leaderboard(
 ) -> Sequence[tuple[User, int, int]]:
     """Получить лидерборд конкурса.
 
+    Читается из инкрементального лидерборда в Redis; если он недоступен —
+    считается агрегатом по событиям (``aggregate_contest_leaderboard``).
+    """
+    from app.services.referral_contest_leaderboard import contest_leaderboard
+
+    entries = await contest_leaderboard.top(db, contest_id, limit=limit)
+    if entries is None:
+        return await aggregate_contest_leaderboard(db, contest_id, limit=limit)
+    if not entries:
+        return []
+
+    users_result = await db.execute(select(User).where(User.id.in_([entry.referrer_id for entry in entries])))
+    users = {user.id: user for user in users_result.scalars().all()}
+    return [
+        (users[entry.referrer_id], entry.referral_count, entry.amount_kopeks)
+        for entry in entries
+        if entry.referrer_id in users
+    ]
+
+
+async def get_contest_participants_count(db: AsyncSession, contest_id: int) -> int:
+    """Количество рефереров в лидерборде (без виртуальных участников)."""
+    from app.services.referral_contest_leaderboard import contest_leaderboard
+
+    size = await contest_leaderboard.size(db, contest_id)
+    if size is not None:
+        return size
+    contest = await db.get(ReferralContest, contest_id)
+    if not contest:
+        return 0
+    return len(await get_contest_referrer_totals(db, contest))
+
+
+async def aggregate_contest_leaderboard(
+    db: AsyncSession,
+    contest_id: int,
+    *,
+    limit: int | None = None,
+) -> Sequence[tuple[User, int, int]]:
+    """Лидерборд конкурса агрегатом по событиям (GROUP BY).
+
     Учитывает только рефералов, зарегистрированных В ПЕРИОД конкурса.
     """
-    contest = await get_referral_contest(db, contest_id)
+    contest = await db.get(ReferralContest, contest_id)
     if not contest:
         return []
 
-    # Нормализуем границы дат
-    contest_start = contest.start_at
-    contest_end = contest.end_at
-    if contest_end.hour == 0 and contest_end.minute == 0 and contest_end.second == 0:
-        contest_end = contest_end.replace(hour=23, minute=59, second=59, microsecond=999999)
+    contest_start, contest_end = _contest_window(contest)
 
     query = (
         select(
@@ -343,8 +431,10 @@ async def delete_referral_contest(
     db: AsyncSession,
     contest: ReferralContest,
 ) -> None:
+    contest_id = contest.id
     await db.delete(contest)
     await db.commit()
+    await _drop_leaderboard(contest_id)
 
 
 async def get_contest_payment_stats(
@@ -518,9 +608,11 @@ async def upsert_contest_event(
     if existing:
         # Обновляем сумму если она изменилась
         if existing.amount_kopeks != amount_kopeks:
+            amount_delta = abs(amount_kopeks) - abs(existing.amount_kopeks)
             existing.amount_kopeks = amount_kopeks
             await db.commit()
             await db.refresh(existing)
+            await _record_leaderboard(contest_id, existing.referrer_id, count_delta=0, amount_delta=amount_delta)
         return existing, False
 
     event = ReferralContestEvent(
@@ -534,6 +626,7 @@ async def upsert_contest_event(
     db.add(event)
     await db.commit()
     await db.refresh(event)
+    await _record_leaderboard(contest_id, referrer_id, count_delta=1, amount_delta=abs(amount_kopeks))
     return event, True
 
 
@@ -848,6 +941,8 @@ async def sync_contest_events(
 
     # Сохраняем изменения
     await db.commit()
+    if stats['updated']:
+        await _drop_leaderboard(contest_id)
 
     logger.info(
         'Синхронизация конкурса завершена: обновлено , пропущено , сумма коп.',
@@ -923,6 +1018,7 @@ async def cleanup_invalid_contest_events(
         )
         deleted = delete_result.rowcount
         await db.commit()
+        await _drop_leaderboard(contest_id)
 
     # Считаем сколько осталось валидных событий
     remaining_result = await db.execute(
@@ -1023,7 +1119,8 @@ async def get_contest_leaderboard_with_virtual(
 
     Возвращает список кортежей (display_name, referral_count, total_amount, is_virtual).
     """
-    real = await get_contest_leaderboard(db, contest_id)
+    # Топ-N объединения входит в объединение топ-N реальных и виртуальных участников
+    real = await get_contest_leaderboard(db, contest_id, limit=limit)
     virtual = await list_virtual_participants(db, contest_id)
 
     merged: list[tuple[str, int, int, bool]] = []
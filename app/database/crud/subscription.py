@@ -4,7 +4,7 @@ from collections.abc import Iterable
 from datetime import UTC, datetime, timedelta
 
 import structlog
-from sqlalchemy import and_, case, delete, func, select
+from sqlalchemy import and_, case, delete, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import StaleDataError
@@ -2222,6 +2222,22 @@ async def activate_pending_trial_subscription(
 # ==================== СУТОЧНЫЕ ПОДПИСКИ ====================
 
 
+def _daily_charge_conditions(now: datetime):
+    from app.database.models import Tariff
+
+    one_day_ago = now - timedelta(hours=24)
+    return and_(
+        Tariff.is_daily.is_(True),
+        Tariff.is_active.is_(True),
+        Subscription.status == SubscriptionStatus.ACTIVE.value,
+        User.status == UserStatus.ACTIVE.value,
+        Subscription.is_daily_paused.is_(False),
+        Subscription.is_trial.is_(False),  # Не списываем с триальных подписок
+        # Списания ещё не было ИЛИ прошло более 24 часов
+        ((Subscription.last_daily_charge_at.is_(None)) | (Subscription.last_daily_charge_at < one_day_ago)),
+    )
+
+
 async def get_daily_subscriptions_for_charge(db: AsyncSession) -> list[Subscription]:
     """
     Получает все суточные подписки, которые нужно обработать для списания.
@@ -2234,9 +2250,6 @@ async def get_daily_subscriptions_for_charge(db: AsyncSession) -> list[Subscript
     """
     from app.database.models import Tariff
 
-    now = datetime.now(UTC)
-    one_day_ago = now - timedelta(hours=24)
-
     query = (
         select(Subscription)
         .join(Tariff, Subscription.tariff_id == Tariff.id)
@@ -2245,18 +2258,7 @@ async def get_daily_subscriptions_for_charge(db: AsyncSession) -> list[Subscript
             selectinload(Subscription.user),
             selectinload(Subscription.tariff),
         )
-        .where(
-            and_(
-                Tariff.is_daily.is_(True),
-                Tariff.is_active.is_(True),
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                User.status == UserStatus.ACTIVE.value,
-                Subscription.is_daily_paused.is_(False),
-                Subscription.is_trial.is_(False),  # Не списываем с триальных подписок
-                # Списания ещё не было ИЛИ прошло более 24 часов
-                ((Subscription.last_daily_charge_at.is_(None)) | (Subscription.last_daily_charge_at < one_day_ago)),
-            )
-        )
+        .where(_daily_charge_conditions(datetime.now(UTC)))
     )
 
     result = await db.execute(query)
@@ -2267,6 +2269,34 @@ async def get_daily_subscriptions_for_charge(db: AsyncSession) -> list[Subscript
     return list(subscriptions)
 
 
+async def claim_daily_subscriptions_for_charge(
+    db: AsyncSession,
+    *,
+    after_id: int = 0,
+    limit: int = 200,
+) -> list[Subscription]:
+    """
+    Следующая пачка суточных подписок к списанию (критерии как в get_daily_subscriptions_for_charge).
+
+    Keyset по id: пачка начинается после after_id. Строки подписок блокируются
+    FOR UPDATE SKIP LOCKED до commit сессии — параллельный процесс их пропустит,
+    а после commit они уже не подходят под критерии.
+    """
+    from app.database.models import Tariff
+
+    result = await db.execute(
+        select(Subscription)
+        .join(Tariff, Subscription.tariff_id == Tariff.id)
+        .join(User, Subscription.user_id == User.id)
+        .options(selectinload(Subscription.tariff))
+        .where(_daily_charge_conditions(datetime.now(UTC)), Subscription.id > after_id)
+        .order_by(Subscription.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=Subscription)
+    )
+    return list(result.scalars().all())
+
+
 async def get_disabled_daily_subscriptions_for_resume(
     db: AsyncSession,
 ) -> list[Subscription]:
@@ -2467,6 +2497,46 @@ async def suspend_daily_subscription_insufficient_balance(
     return subscription
 
 
+async def extend_daily_subscriptions(
+    db: AsyncSession,
+    subscription_ids: Iterable[int],
+    charge_time: datetime,
+) -> None:
+    """update_daily_charge_time для пачки подписок одним UPDATE, без commit."""
+    subscription_ids = list(subscription_ids)
+    if not subscription_ids:
+        return
+    new_end_date = charge_time + timedelta(days=1)
+    await db.execute(
+        update(Subscription)
+        .where(Subscription.id.in_(subscription_ids))
+        .values(
+            last_daily_charge_at=charge_time,
+            end_date=case(
+                (or_(Subscription.end_date.is_(None), Subscription.end_date < new_end_date), new_end_date),
+                else_=Subscription.end_date,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def suspend_daily_subscriptions_insufficient_balance(
+    db: AsyncSession,
+    subscription_ids: Iterable[int],
+) -> None:
+    """suspend_daily_subscription_insufficient_balance для пачки подписок одним UPDATE, без commit."""
+    subscription_ids = list(subscription_ids)
+    if not subscription_ids:
+        return
+    await db.execute(
+        update(Subscription)
+        .where(Subscription.id.in_(subscription_ids))
+        .values(status=SubscriptionStatus.DISABLED.value)
+        .execution_options(synchronize_session=False)
+    )
+
+
 async def get_subscription_with_tariff(
     db: AsyncSession,
     user_id: int,
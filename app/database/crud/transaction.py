@@ -162,6 +162,34 @@ async def create_transaction(
     return transaction
 
 
+async def create_subscription_payments(
+    db: AsyncSession,
+    payments: list[tuple[int, int, str]],
+) -> list[Transaction]:
+    """
+    Пачка SUBSCRIPTION_PAYMENT с баланса — как create_transaction(commit=False) для каждой.
+
+    payments — [(user_id, amount_kopeks, description)]. Один flush на всю пачку,
+    без commit и без side effects.
+    """
+    now = datetime.now(UTC)
+    transactions = [
+        Transaction(
+            user_id=user_id,
+            type=TransactionType.SUBSCRIPTION_PAYMENT.value,
+            amount_kopeks=-amount_kopeks if amount_kopeks > 0 else amount_kopeks,
+            description=description,
+            payment_method=PaymentMethod.BALANCE.value,
+            is_completed=True,
+            completed_at=now,
+        )
+        for user_id, amount_kopeks, description in payments
+    ]
+    db.add_all(transactions)
+    await db.flush()
+    return transactions
+
+
 async def emit_transaction_side_effects(
     db: AsyncSession,
     transaction: Transaction,
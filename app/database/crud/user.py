@@ -1,10 +1,11 @@
 import hmac
 import secrets
 import string
+from collections.abc import Iterable
 from datetime import UTC, datetime, timedelta
 
 import structlog
-from sqlalchemy import and_, case, exists, func, nullslast, or_, select, text
+from sqlalchemy import and_, case, exists, func, nullslast, or_, select, text, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -602,6 +603,55 @@ async def lock_user_for_pricing(db: AsyncSession, user_id: int) -> User:
     return result.scalar_one()
 
 
+async def lock_users_for_pricing(db: AsyncSession, user_ids: Iterable[int]) -> dict[int, User]:
+    """lock_user_for_pricing для нескольких пользователей; строки блокируются в порядке id."""
+    result = await db.execute(
+        select(User)
+        .where(User.id.in_(set(user_ids)))
+        .order_by(User.id)
+        .options(
+            selectinload(User.user_promo_groups).selectinload(UserPromoGroup.promo_group),
+            selectinload(User.promo_group),
+        )
+        .with_for_update(of=User)
+        .execution_options(populate_existing=True)
+    )
+    return {user.id: user for user in result.scalars().all()}
+
+
+async def subtract_user_balances(
+    db: AsyncSession,
+    amounts: dict[int, int],
+    *,
+    mark_as_paid_subscription: bool = False,
+) -> dict[int, int]:
+    """
+    Списывает с нескольких пользователей одним UPDATE, без commit.
+
+    amounts — {user_id: сумма}. Пользователь, чей баланс меньше суммы, не списывается.
+    Возвращает {user_id: новый баланс} для списанных. Строки стоит заранее
+    заблокировать (lock_users_for_pricing); объекты User в сессии не обновляются.
+    """
+    if not amounts:
+        return {}
+    if any(amount < 0 for amount in amounts.values()):
+        logger.error('subtract_user_balances called with negative amount', amounts=amounts)
+        return {}
+
+    amount = case(amounts, value=User.id, else_=0)
+    values = {'balance_kopeks': User.balance_kopeks - amount, 'updated_at': datetime.now(UTC)}
+    if mark_as_paid_subscription:
+        values['has_had_paid_subscription'] = True
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(amounts), User.balance_kopeks >= amount)
+        .values(**values)
+        .returning(User.id, User.balance_kopeks)
+        .execution_options(synchronize_session=False)
+    )
+    return dict(result.all())
+
+
 async def subtract_user_balance(
     db: AsyncSession,
     user: User,
@@ -1647,6 +1697,7 @@ async def create_user_by_oauth(
                 'referral_code': user.referral_code,
             },
             db=db,
+            commit=False,
         )
     except Exception as error:
         logger.warning('Failed to emit user.created event', error=error)
@@ -13,6 +13,8 @@ from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from app.config import settings
+from app.utils.metrics import metrics, statement_fingerprint
+from app.utils.update_profiler import current_profile, record_db_query
 
 
 logger = structlog.get_logger(__name__)
@@ -189,6 +191,53 @@ if settings.DEBUG:
         else:
             logger.debug('⚡ Query executed in', total=round(total, 3))
 
+
+if settings.METRICS_ENABLED:
+    _QUERY_DURATION = metrics.histogram(
+        'db_query_duration_seconds',
+        'SQL statement latency by operation and table',
+        ('operation', 'table'),
+    )
+    _QUERY_ERRORS = metrics.counter(
+        'db_query_errors_total',
+        'SQL statements that failed',
+        ('operation', 'table', 'error'),
+    )
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def _metrics_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def _metrics_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if starts:
+            _QUERY_DURATION.labels(*statement_fingerprint(statement)).observe(time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine.sync_engine, 'handle_error')
+    def _metrics_handle_error(exception_context):
+        connection = exception_context.connection
+        starts = connection.info.get('metrics_query_start') if connection is not None else None
+        if starts:
+            starts.pop()
+        operation, table = statement_fingerprint(exception_context.statement or '')
+        _QUERY_ERRORS.labels(operation, table, type(exception_context.original_exception).__name__).inc()
+
+
+if settings.BOT_PROFILING_ENABLED:
+    # Запросы учитываются в профиле текущего обновления бота (contextvar доходит
+    # до sync-событий через greenlet SQLAlchemy)
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def _profile_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_profile() is not None:
+            conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def _profile_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profile_query_start')
+        if starts and current_profile() is not None:
+            record_db_query(time.perf_counter() - starts.pop())
+
 # ============================================================================
 # ADVANCED SESSION MANAGER WITH READ REPLICAS
 # ============================================================================
@@ -222,15 +271,18 @@ class DatabaseManager:
         replica_url = _validate_database_url(getattr(settings, 'DATABASE_READ_REPLICA_URL', None))
         if replica_url:
             try:
-                self.read_replica_engine = create_async_engine(
-                    replica_url,
-                    poolclass=poolclass,
-                    pool_size=30,  # Больше для read операций
-                    max_overflow=50,
-                    pool_pre_ping=True,
-                    pool_recycle=3600,
-                    echo=False,
+                replica_pool_kwargs = (
+                    {'poolclass': NullPool}
+                    if _is_sqlite_url(replica_url)
+                    else {
+                        'poolclass': AsyncAdaptedQueuePool,
+                        'pool_size': 30,  # Больше для read операций
+                        'max_overflow': 50,
+                        'pool_pre_ping': True,
+                        'pool_recycle': 3600,
+                    }
                 )
+                self.read_replica_engine = create_async_engine(replica_url, echo=False, **replica_pool_kwargs)
                 # Создаём sessionmaker один раз (не при каждом вызове)
                 self._read_replica_session_factory = async_sessionmaker(
                     bind=self.read_replica_engine,
@@ -246,6 +298,10 @@ class DatabaseManager:
                 logger.error('Не удалось настроить read replica', e=e)
                 self.read_replica_engine = None
 
+    @property
+    def read_replica_session_factory(self) -> async_sessionmaker | None:
+        return self._read_replica_session_factory
+
     @asynccontextmanager
     async def session(self, read_only: bool = False):
         """Контекстный менеджер для работы с сессией БД."""
@@ -606,3 +662,16 @@ async def get_pool_metrics() -> dict:
         'max_possible_connections': counters['total_connections'] + (getattr(pool, '_max_overflow', 0) or 0),
         'pool_utilization_percent': round(counters['utilization_percent'], 2),
     }
+
+
+if settings.METRICS_ENABLED:
+    _POOL_CONNECTIONS = metrics.gauge('db_pool_connections', 'Database pool connections by state', ('state',))
+
+    def _collect_pool_gauges() -> None:
+        counters = _pool_counters(engine.pool)
+        if counters is None:
+            return
+        for state in ('size', 'checked_in', 'checked_out', 'overflow'):
+            _POOL_CONNECTIONS.labels(state).set(counters[state])
+
+    metrics.register_collector('db_pool', _collect_pool_gauges)
@@ -4286,3 +4286,71 @@ class UserDeviceAlias(Base):
     alias = Column(String(64), nullable=False)
     created_at = Column(AwareDateTime(), server_default=func.now(), nullable=False)
     updated_at = Column(AwareDateTime(), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class BulkActionJobStatus(StrEnum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    PAUSED = 'paused'
+    CANCELLED = 'cancelled'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+
+class BulkActionJob(Base):
+    """Background bulk action started from the admin cabinet.
+
+    ``processed`` is the cursor into ``target_ids``: targets before it are
+    applied in the DB (the cursor moves in the same transaction as the
+    chunk). ``synced`` trails it until the chunk was pushed to the panel.
+    After a restart, jobs in ``running``/``queued`` continue from the cursor.
+    ``lease_owner`` is the executor process running the job; it renews
+    ``lease_expires_at`` and other processes take the job over only after the
+    lease expired.
+    """
+
+    __tablename__ = 'bulk_action_jobs'
+    __table_args__ = (Index('ix_bulk_action_jobs_status', 'status'),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    action = Column(String(50), nullable=False)
+    target_type = Column(String(20), nullable=False)  # 'users' or 'subscriptions'
+    target_ids = Column(JSON, nullable=False)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default=BulkActionJobStatus.QUEUED.value)
+    total = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0, server_default='0')
+    synced = Column(Integer, nullable=False, default=0, server_default='0')
+    success_count = Column(Integer, nullable=False, default=0, server_default='0')
+    error_count = Column(Integer, nullable=False, default=0, server_default='0')
+    skipped_count = Column(Integer, nullable=False, default=0, server_default='0')
+    panel_error_count = Column(Integer, nullable=False, default=0, server_default='0')
+    errors = Column(JSON, nullable=True)  # последние ошибки: [{target_id, message}]
+    last_error = Column(Text, nullable=True)
+    admin_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    lease_owner = Column(String(64), nullable=True)
+    lease_expires_at = Column(AwareDateTime(), nullable=True)
+    created_at = Column(AwareDateTime(), server_default=func.now())
+    started_at = Column(AwareDateTime(), nullable=True)
+    finished_at = Column(AwareDateTime(), nullable=True)
+    updated_at = Column(AwareDateTime(), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return (
+            f"<BulkActionJob id={self.id} action='{self.action}' status='{self.status}' {self.processed}/{self.total}>"
+        )
+
+
+class BulkActionJobAppliedTarget(Base):
+    """Target of a per-target bulk action whose change is already committed.
+
+    Written in the same transaction as the target's own change, so a chunk
+    re-run after a crash or a lost lease skips targets applied before the
+    cursor moved. The primary key also stops two executors from applying
+    the same target twice. Rows are removed once the cursor passes them.
+    """
+
+    __tablename__ = 'bulk_action_job_applied_targets'
+
+    job_id = Column(Integer, ForeignKey('bulk_action_jobs.id', ondelete='CASCADE'), primary_key=True)
+    target_id = Column(Integer, primary_key=True)
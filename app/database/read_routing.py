@@ -0,0 +1,250 @@
+"""Маршрутизация чтений на read-реплику.
+
+Тяжёлые SELECT (статистика админки, продажи, партнёрская и реферальная аналитика,
+ежедневные отчёты) открывают сессию через ``get_read_db`` (FastAPI) или
+``read_session()`` (сервисы). Сессия берётся с реплики, если она настроена
+(``DATABASE_READ_REPLICA_URL``), отвечает и отстаёт не больше
+``DATABASE_READ_REPLICA_MAX_LAG_SECONDS``; иначе — с основной БД. Состояние реплики
+перепроверяется не чаще раза в ``DATABASE_READ_REPLICA_CHECK_INTERVAL_SECONDS``.
+
+Read-your-writes: commit на основной БД закрепляет за основной БД (на
+``DATABASE_READ_REPLICA_PIN_SECONDS``) пользователей, чьи строки он изменил, и
+пользователя текущего запроса кабинета (``set_current_reader``) — реплика могла ещё
+не получить эти изменения. Закрепление проверяется для пользователя, чьи данные
+читаются: эндпоинты с ``{user_id}`` в пути берут сессию через ``get_user_read_db``,
+остальные — для пользователя текущего запроса кабинета.
+
+Закрепления хранятся в памяти процесса: при нескольких web-воркерах запись,
+прошедшая через один воркер, не закрепляет чтения на другом. Там read-your-writes
+не гарантируется — только отставание не больше ``DATABASE_READ_REPLICA_MAX_LAG_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
+
+import structlog
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.database import HEALTH_CHECK_TIMEOUT, RETRYABLE_EXCEPTIONS, AsyncSessionLocal, db_manager
+from app.database.models import User
+
+
+logger = structlog.get_logger(__name__)
+
+_MAX_PINNED_USERS = 50_000
+_SESSION_PINS_KEY = 'read_routing_pins'
+
+_POSTGRES_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+_current_reader: ContextVar[int | None] = ContextVar('read_routing_current_reader', default=None)
+
+
+def set_current_reader(user_id: int | None) -> None:
+    """Запомнить пользователя текущего запроса: его чтения и записи учитываются в read-your-writes."""
+    _current_reader.set(user_id)
+
+
+class ReplicaRouter:
+    """Выбор фабрики сессий для чтения: реплика или основная БД."""
+
+    def __init__(self, primary_factory: async_sessionmaker, replica_factory: async_sessionmaker | None) -> None:
+        self._primary_factory = primary_factory
+        self._replica_factory = replica_factory
+        self._replica_usable = False
+        self._lag: float | None = None
+        self._checked_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._pinned: dict[int, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._replica_factory is not None
+
+    @property
+    def lag(self) -> float | None:
+        """Последнее измеренное отставание реплики (секунды) или None, если реплика не ответила."""
+        return self._lag
+
+    def pin(self, user_ids: set[int]) -> None:
+        """Читать данные этих пользователей с основной БД ближайшие PIN_SECONDS."""
+        if not self.enabled or not user_ids:
+            return
+        expires_at = time.monotonic() + settings.DATABASE_READ_REPLICA_PIN_SECONDS
+        if len(self._pinned) + len(user_ids) > _MAX_PINNED_USERS:
+            now = time.monotonic()
+            self._pinned = {user_id: until for user_id, until in self._pinned.items() if until > now}
+        for user_id in user_ids:
+            self._pinned[user_id] = expires_at
+
+    def is_pinned(self, user_id: int | None) -> bool:
+        if user_id is None:
+            return False
+        until = self._pinned.get(user_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._pinned[user_id]
+            return False
+        return True
+
+    def mark_unavailable(self, reason: str) -> None:
+        """Реплика сломалась посреди запроса — до следующей проверки читаем с основной БД."""
+        if self._replica_usable:
+            logger.warning('Read-реплика недоступна, чтения переключены на основную БД', reason=reason)
+        self._replica_usable = False
+        self._lag = None
+        self._checked_at = time.monotonic()
+
+    async def replica_usable(self) -> bool:
+        if not self.enabled:
+            return False
+        if self._is_stale():
+            async with self._lock:
+                if self._is_stale():
+                    await self._refresh()
+        return self._replica_usable
+
+    async def session_factory(self, user_id: int | None = None) -> async_sessionmaker:
+        if self.is_pinned(user_id) or not await self.replica_usable():
+            return self._primary_factory
+        return self._replica_factory
+
+    def is_replica(self, factory: async_sessionmaker) -> bool:
+        return self.enabled and factory is self._replica_factory
+
+    def _is_stale(self) -> bool:
+        return (
+            self._checked_at is None
+            or time.monotonic() - self._checked_at >= settings.DATABASE_READ_REPLICA_CHECK_INTERVAL_SECONDS
+        )
+
+    async def _refresh(self) -> None:
+        was_usable = self._replica_usable
+        try:
+            async with asyncio.timeout(HEALTH_CHECK_TIMEOUT):
+                lag = await self._probe_lag()
+        except Exception as error:
+            self._lag = None
+            self._replica_usable = False
+            if was_usable or self._checked_at is None:
+                logger.warning('Read-реплика не отвечает, чтения идут на основную БД', error=str(error)[:200])
+        else:
+            self._lag = lag
+            self._replica_usable = lag <= settings.DATABASE_READ_REPLICA_MAX_LAG_SECONDS
+            if was_usable and not self._replica_usable:
+                logger.warning('Read-реплика отстает, чтения идут на основную БД', lag_seconds=round(lag, 1))
+            elif not was_usable and self._replica_usable:
+                logger.info('Чтения снова идут на read-реплику', lag_seconds=round(lag, 1))
+        self._checked_at = time.monotonic()
+
+    async def _probe_lag(self) -> float:
+        async with self._replica_factory() as session:
+            if session.bind.dialect.name == 'postgresql':
+                return float(await session.scalar(_POSTGRES_LAG_QUERY) or 0)
+            await session.execute(text('SELECT 1'))
+            return 0.0
+
+
+replica_router = ReplicaRouter(AsyncSessionLocal, db_manager.read_replica_session_factory)
+
+
+@asynccontextmanager
+async def read_session(user_id: int | None = None) -> AsyncGenerator[AsyncSession]:
+    """Сессия только для чтения: реплика, если можно, иначе основная БД.
+
+    Args:
+        user_id: Чьи данные читаются; по умолчанию пользователь текущего запроса кабинета.
+    """
+    factory = await replica_router.session_factory(user_id if user_id is not None else _current_reader.get())
+    async with factory() as session:
+        try:
+            yield session
+        except RETRYABLE_EXCEPTIONS as error:
+            if replica_router.is_replica(factory):
+                replica_router.mark_unavailable(str(error)[:200])
+            raise
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession]:
+    """Dependency для FastAPI: сессия для тяжелых SELECT без записи.
+
+    Объявлять после dependency авторизации — тогда учитывается read-your-writes пользователя.
+    """
+    async with read_session() as session:
+        yield session
+
+
+async def get_user_read_db(user_id: int) -> AsyncGenerator[AsyncSession]:
+    """Dependency для FastAPI-эндпоинтов с ``{user_id}`` в пути: read-your-writes по этому пользователю.
+
+    ``user_id`` из пути может быть как id, так и telegram_id — закрепляются оба.
+    """
+    async with read_session(user_id) as session:
+        yield session
+
+
+# --- Read-your-writes ---
+
+
+def _written_user_ids(session: Session) -> set[int]:
+    user_ids: set[int] = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, User):
+            user_id = instance.id
+            # Эндпоинты принимают в пути и telegram_id
+            if isinstance(instance.telegram_id, int):
+                user_ids.add(instance.telegram_id)
+        else:
+            user_id = getattr(instance, 'user_id', None)
+        if isinstance(user_id, int):
+            user_ids.add(user_id)
+    return user_ids
+
+
+def _add_pins(session: Session, user_ids: set[int]) -> None:
+    reader = _current_reader.get()
+    if reader is not None:
+        user_ids.add(reader)
+    if user_ids:
+        session.info.setdefault(_SESSION_PINS_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_written_users(session: Session, _flush_context: Any) -> None:
+    if replica_router.enabled:
+        _add_pins(session, _written_user_ids(session))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_writes(orm_execute_state: Any) -> None:
+    if replica_router.enabled and (orm_execute_state.is_update or orm_execute_state.is_delete):
+        _add_pins(orm_execute_state.session, set())
+
+
+@event.listens_for(Session, 'after_commit')
+def _pin_after_commit(session: Session) -> None:
+    user_ids = session.info.pop(_SESSION_PINS_KEY, None)
+    if user_ids:
+        replica_router.pin(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pins_on_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_PINS_KEY, None)
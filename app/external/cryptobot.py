@@ -7,6 +7,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -31,7 +32,7 @@ class CryptoBotService:
         headers = {'Crypto-Pay-API-Token': self.api_token, 'Content-Type': 'application/json'}
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=http_client_trace_configs('cryptobot')) as session:
                 request_kwargs: dict[str, Any] = {'headers': headers}
 
                 if method.upper() == 'GET':
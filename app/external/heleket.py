@@ -12,6 +12,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -83,7 +84,7 @@ class HeleketService:
         try:
             timeout = aiohttp.ClientTimeout(total=30)
             async with (
-                aiohttp.ClientSession(timeout=timeout) as session,
+                aiohttp.ClientSession(timeout=timeout, trace_configs=http_client_trace_configs('heleket')) as session,
                 session.post(
                     url,
                     data=body.encode('utf-8'),
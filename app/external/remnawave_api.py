@@ -2,6 +2,7 @@ import asyncio
 import base64
 import json
 import ssl
+import time
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
@@ -12,10 +13,34 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import endpoint_template, metrics
+from app.utils.update_profiler import record_panel_call
 
 
 logger = structlog.get_logger(__name__)
 
+# Сколько UUID уходит в один запрос к bulk-эндпоинтам /api/users/bulk/*
+BULK_USERS_CHUNK_SIZE = 500
+
+_REQUEST_DURATION = metrics.histogram(
+    'remnawave_request_duration_seconds',
+    'RemnaWave panel API latency per attempt by endpoint',
+    ('method', 'endpoint'),
+)
+_REQUEST_TOTAL = metrics.counter(
+    'remnawave_requests_total',
+    'RemnaWave panel API attempts by endpoint and status',
+    ('method', 'endpoint', 'status'),
+)
+
+
+def _observe_request(method: str, endpoint: str, status: str, started: float) -> None:
+    duration = time.perf_counter() - started
+    template = endpoint_template(endpoint)
+    _REQUEST_DURATION.labels(method, template).observe(duration)
+    _REQUEST_TOTAL.labels(method, template, status).inc()
+    record_panel_call(duration)
+
 
 class UserStatus(Enum):
     ACTIVE = 'ACTIVE'
@@ -377,6 +402,7 @@ class RemnaWaveAPI:
         base_delay = 1.0
 
         for attempt in range(max_retries + 1):
+            started = time.perf_counter()
             try:
                 kwargs = {'url': url, 'params': params}
 
@@ -385,6 +411,7 @@ class RemnaWaveAPI:
 
                 async with self.session.request(method, **kwargs) as response:
                     response_text = await response.text()
+                    _observe_request(method, endpoint, str(response.status), started)
 
                     try:
                         response_data = json.loads(response_text) if response_text else {}
@@ -429,6 +456,7 @@ class RemnaWaveAPI:
                     return response_data
 
             except aiohttp.ClientError as e:
+                _observe_request(method, endpoint, 'error', started)
                 if attempt < max_retries:
                     delay = base_delay * (2**attempt)
                     logger.warning(
@@ -453,6 +481,7 @@ class RemnaWaveAPI:
                 )
                 raise RemnaWaveTransientError(f'Request failed: {e!s}')
             except TimeoutError as e:
+                _observe_request(method, endpoint, 'timeout', started)
                 # Total-request timeout — the panel was slow to respond. Transient:
                 # log WARNING and wrap in a typed transient error so the admin-error
                 # forwarder skips it. No retry (avoids multi-minute user-facing hangs).
@@ -709,6 +738,68 @@ class RemnaWaveAPI:
         user = self._parse_user(response['response'])
         return await self.enrich_user_with_happ_link(user)
 
+    async def _bulk_users_request(self, endpoint: str, uuids: list[str], extra: dict | None = None) -> int:
+        """POST на bulk-эндпоинт пользователей частями по BULK_USERS_CHUNK_SIZE, возвращает сумму affectedRows."""
+        affected = 0
+        for start in range(0, len(uuids), BULK_USERS_CHUNK_SIZE):
+            data = {'uuids': uuids[start : start + BULK_USERS_CHUNK_SIZE], **(extra or {})}
+            response = await self._make_request('POST', endpoint, data)
+            affected += self._safe_int((response.get('response') or {}).get('affectedRows'))
+        return affected
+
+    async def bulk_update_users(
+        self,
+        uuids: list[str],
+        status: UserStatus | None = None,
+        traffic_limit_bytes: int | None = None,
+        traffic_limit_strategy: TrafficLimitStrategy | None = None,
+        expire_at: datetime | None = None,
+        telegram_id: int | None = None,
+        email: str | None = None,
+        hwid_device_limit: int | None = None,
+        description: str | None = None,
+        tag: str | None = None,
+    ) -> int:
+        """Одинаковые поля для всех пользователей одним запросом. Возвращает число изменённых строк."""
+        fields: dict[str, Any] = {}
+        if status:
+            fields['status'] = status.value
+        if traffic_limit_bytes is not None:
+            fields['trafficLimitBytes'] = traffic_limit_bytes
+        if traffic_limit_strategy:
+            fields['trafficLimitStrategy'] = traffic_limit_strategy.value
+        if expire_at:
+            fields['expireAt'] = expire_at.isoformat()
+        if telegram_id is not None:
+            fields['telegramId'] = telegram_id
+        if email is not None:
+            fields['email'] = email
+        if hwid_device_limit is not None:
+            fields['hwidDeviceLimit'] = hwid_device_limit
+        if description is not None:
+            fields['description'] = description
+        if tag is not None:
+            fields['tag'] = tag
+
+        return await self._bulk_users_request('/api/users/bulk/update', uuids, {'fields': fields})
+
+    async def bulk_extend_expiration(self, uuids: list[str], days: int) -> int:
+        return await self._bulk_users_request('/api/users/bulk/extend-expiration-date', uuids, {'extendDays': days})
+
+    async def bulk_update_squads(self, uuids: list[str], active_internal_squads: list[str]) -> int:
+        return await self._bulk_users_request(
+            '/api/users/bulk/update-squads', uuids, {'activeInternalSquads': active_internal_squads}
+        )
+
+    async def bulk_reset_traffic(self, uuids: list[str]) -> int:
+        return await self._bulk_users_request('/api/users/bulk/reset-traffic', uuids)
+
+    async def bulk_revoke_subscriptions(self, uuids: list[str]) -> int:
+        return await self._bulk_users_request('/api/users/bulk/revoke-subscription', uuids)
+
+    async def bulk_delete_users(self, uuids: list[str]) -> int:
+        return await self._bulk_users_request('/api/users/bulk/delete', uuids)
+
     async def get_user_accessible_nodes(self, uuid: str) -> list[RemnaWaveAccessibleNode]:
         """Получает список доступных нод для пользователя"""
         try:
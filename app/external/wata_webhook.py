@@ -16,6 +16,7 @@ from cryptography.hazmat.primitives.asymmetric import padding
 from app.config import settings
 from app.database.database import AsyncSessionLocal
 from app.services.payment_service import PaymentService
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -64,7 +65,10 @@ class WataPublicKeyProvider:
         timeout = aiohttp.ClientTimeout(total=settings.WATA_REQUEST_TIMEOUT)
 
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session, session.get(url) as response:
+            async with (
+                aiohttp.ClientSession(timeout=timeout, trace_configs=http_client_trace_configs('wata')) as session,
+                session.get(url) as response,
+            ):
                 text = await response.text()
                 if response.status >= 400:
                     logger.error('Ошибка получения публичного ключа WATA', response_status=response.status, text=text)
@@ -5,7 +5,7 @@
 import html
 
 import structlog
-from aiogram import types
+from aiogram import F, types
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 
@@ -338,9 +338,9 @@ async def process_blacklist_url(message: types.Message, db_user: User, state: FS
 
 
 def register_blacklist_handlers(dp):
-    dp.callback_query.register(show_blacklist_settings, lambda c: c.data == 'admin_blacklist_settings')
-    dp.callback_query.register(toggle_blacklist, lambda c: c.data == 'admin_blacklist_toggle')
-    dp.callback_query.register(update_blacklist, lambda c: c.data == 'admin_blacklist_update')
-    dp.callback_query.register(show_blacklist_users, lambda c: c.data == 'admin_blacklist_view')
-    dp.callback_query.register(start_set_blacklist_url, lambda c: c.data == 'admin_blacklist_set_url')
+    dp.callback_query.register(show_blacklist_settings, F.data == 'admin_blacklist_settings')
+    dp.callback_query.register(toggle_blacklist, F.data == 'admin_blacklist_toggle')
+    dp.callback_query.register(update_blacklist, F.data == 'admin_blacklist_update')
+    dp.callback_query.register(show_blacklist_users, F.data == 'admin_blacklist_view')
+    dp.callback_query.register(start_set_blacklist_url, F.data == 'admin_blacklist_set_url')
     dp.message.register(process_blacklist_url, StateFilter(BlacklistStates.waiting_for_blacklist_url))
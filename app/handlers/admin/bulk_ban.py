@@ -3,7 +3,7 @@
 """
 
 import structlog
-from aiogram import types
+from aiogram import F, types
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -172,7 +172,7 @@ def register_bulk_ban_handlers(dp):
     Регистрация обработчиков команд для массовой блокировки
     """
     # Обработчик команды начала массовой блокировки
-    dp.callback_query.register(start_bulk_ban_process, lambda c: c.data == 'admin_bulk_ban_start')
+    dp.callback_query.register(start_bulk_ban_process, F.data == 'admin_bulk_ban_start')
 
     # Обработчик текстового сообщения с ID для блокировки
     dp.message.register(process_bulk_ban_list, AdminStates.waiting_for_bulk_ban_list)
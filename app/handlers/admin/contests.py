@@ -821,6 +821,9 @@ async def sync_contest(
         )
         return
 
+    # ШАГ 3: Сверка лидерборда с событиями (пересборка при расхождении)
+    leaderboard_check = await referral_contest_service.check_leaderboard(db, contest_id, repair=True)
+
     # Формируем сообщение о результатах
     # Показываем точные даты которые использовались для фильтрации
     start_str = stats.get('contest_start', contest.start_at.isoformat())
@@ -853,6 +856,15 @@ async def sync_contest(
         f'   🛒 Покупки подписок: <b>{stats.get("subscription_total", 0) // 100} руб.</b>',
         f'   📥 Пополнения баланса: <b>{stats.get("deposit_total", 0) // 100} руб.</b>',
     ]
+    if leaderboard_check is not None:
+        drift = len(leaderboard_check.missing) + len(leaderboard_check.unexpected) + len(leaderboard_check.mismatched)
+        lines += [
+            '',
+            '🏅 <b>ЛИДЕРБОРД:</b>',
+            '   ✅ Совпадает с событиями'
+            if leaderboard_check.is_consistent
+            else f'   🔄 Пересобран из событий (расхождений: {drift})',
+        ]
 
     from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
@@ -20,7 +20,7 @@ from app.keyboards.admin import (
     get_admin_system_submenu_keyboard,
     get_admin_users_submenu_keyboard,
 )
-from app.localization.texts import clear_rules_cache, get_texts
+from app.localization.texts import clear_rules_cache, get_texts, notify_rules_changed
 from app.services.support_settings_service import SupportSettingsService
 from app.utils.decorators import admin_required, error_handler
 
@@ -281,6 +281,7 @@ async def clear_rules_command(message: types.Message, db_user: User, db: AsyncSe
 
         if success:
             clear_rules_cache()
+            await notify_rules_changed(db_user.language)
 
             await message.reply(
                 f'✅ <b>Правила успешно очищены!</b>\n\n'
@@ -307,9 +307,10 @@ async def save_rules(callback: types.CallbackQuery, db_user: User, state: FSMCon
 
         clear_rules_cache()
 
-        from app.localization.texts import refresh_rules_cache
+        from app.localization.texts import notify_rules_changed, refresh_rules_cache
 
         await refresh_rules_cache(db_user.language)
+        await notify_rules_changed(db_user.language)
 
         await callback.message.edit_text(
             texts.t(
@@ -401,9 +402,10 @@ async def confirm_clear_rules(callback: types.CallbackQuery, db_user: User, db:
     try:
         await clear_all_rules(db, db_user.language)
 
-        from app.localization.texts import clear_rules_cache
+        from app.localization.texts import clear_rules_cache, notify_rules_changed
 
         clear_rules_cache()
+        await notify_rules_changed(db_user.language)
 
         await callback.message.edit_text(
             texts.t(
@@ -22,7 +22,7 @@ from app.database.models import User
 from app.localization.texts import get_texts
 from app.services.remnawave_service import RemnaWaveService
 from app.states import AdminStates
-from app.utils.cache import cache
+from app.utils.cache import AVAILABLE_COUNTRIES_CACHE_TAG, cache
 from app.utils.decorators import admin_required, error_handler
 
 
@@ -241,7 +241,7 @@ async def sync_servers_with_remnawave(callback: types.CallbackQuery, db_user: Us
 
         created, updated, removed = await sync_with_remnawave(db, squads)
 
-        await cache.delete_pattern('available_countries*')
+        await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
         text = f"""
 ✅ <b>Синхронизация завершена</b>
@@ -451,7 +451,7 @@ async def toggle_server_availability(callback: types.CallbackQuery, db_user: Use
     new_status = not server.is_available
     await update_server_squad(db, server_id, is_available=new_status)
 
-    await cache.delete_pattern('available_countries*')
+    await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
     status_text = 'включен' if new_status else 'отключен'
     await callback.answer(f'✅ Сервер {status_text}!')
@@ -542,7 +542,7 @@ async def process_server_price_edit(message: types.Message, state: FSMContext, d
         if server:
             await state.clear()
 
-            await cache.delete_pattern('available_countries*')
+            await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
             price_text = f'{int(price_rubles)} ₽' if price_kopeks > 0 else texts.t('ADMIN_SERVER_FREE', 'Бесплатно')
             await message.answer(
@@ -615,7 +615,7 @@ async def process_server_name_edit(message: types.Message, state: FSMContext, db
     if server:
         await state.clear()
 
-        await cache.delete_pattern('available_countries*')
+        await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
         await message.answer(
             f'✅ Название сервера изменено на: <b>{new_name}</b>',
@@ -680,7 +680,7 @@ async def delete_server_execute(callback: types.CallbackQuery, db_user: User, db
     success = await delete_server_squad(db, server_id)
 
     if success:
-        await cache.delete_pattern('available_countries*')
+        await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
         await callback.message.edit_text(
             f'✅ Сервер <b>{html.escape(server.display_name)}</b> успешно удален!',
@@ -799,7 +799,7 @@ async def process_server_country_edit(message: types.Message, state: FSMContext,
     if server:
         await state.clear()
 
-        await cache.delete_pattern('available_countries*')
+        await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
         country_text = new_country or 'Удален'
         await message.answer(
@@ -944,7 +944,7 @@ async def process_server_description_edit(message: types.Message, state: FSMCont
         await state.clear()
 
         desc_text = new_description or 'Удалено'
-        await cache.delete_pattern('available_countries*')
+        await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
         await message.answer(
             f'✅ Описание сервера изменено:\n\n<i>{desc_text}</i>',
             reply_markup=types.InlineKeyboardMarkup(
@@ -1084,7 +1084,7 @@ async def save_server_promo_groups(
         await callback.answer('❌ Сервер не найден', show_alert=True)
         return
 
-    await cache.delete_pattern('available_countries*')
+    await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
     await state.clear()
 
     text, keyboard = _build_server_edit_view(server, get_texts(db_user.language))
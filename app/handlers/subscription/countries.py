@@ -606,7 +606,7 @@ async def countries_continue(callback: types.CallbackQuery, state: FSMContext, d
 async def _get_available_countries(promo_group_id: int | None = None):
     from app.database.crud.server_squad import get_available_server_squads
     from app.database.database import AsyncSessionLocal
-    from app.utils.cache import cache, cache_key
+    from app.utils.cache import AVAILABLE_COUNTRIES_CACHE_TAG, cache, cache_key
 
     cache_key_value = cache_key('available_countries', promo_group_id or 'all')
     cached_countries = await cache.get(cache_key_value)
@@ -621,7 +621,7 @@ async def _get_available_countries(promo_group_id: int | None = None):
             logger.info(
                 'Промогруппа не имеет доступных серверов, возврат пустого списка', promo_group_id=promo_group_id
             )
-            await cache.set(cache_key_value, [], 60)
+            await cache.set(cache_key_value, [], 60, tags=[AVAILABLE_COUNTRIES_CACHE_TAG])
             return []
 
         countries = []
@@ -670,7 +670,7 @@ async def _get_available_countries(promo_group_id: int | None = None):
                     }
                 )
 
-        await cache.set(cache_key_value, countries, 300)
+        await cache.set(cache_key_value, countries, 300, tags=[AVAILABLE_COUNTRIES_CACHE_TAG])
         return countries
 
     except Exception as e:
@@ -26,6 +26,7 @@ from app.database.database import AsyncSessionLocal
 from app.database.models import Tariff, Transaction, TransactionType, User
 from app.localization.texts import get_texts
 from app.services.admin_notification_service import AdminNotificationService
+from app.services.pricing_catalog import pricing_catalog
 from app.services.subscription_service import SubscriptionService
 from app.services.user_cart_service import user_cart_service
 from app.utils.decorators import error_handler
@@ -788,8 +789,8 @@ async def show_tariffs_list(
     texts = get_texts(db_user.language)
     await state.clear()
 
-    # Получаем доступные тарифы
-    tariffs = await get_tariffs_for_user(db, user=db_user)
+    # Получаем доступные тарифы (из снимка каталога, без запроса к БД)
+    tariffs = (await pricing_catalog.get()).tariffs_for_user(db_user)
 
     if not tariffs:
         await callback.message.edit_text(
@@ -103,11 +103,12 @@ async def get_main_menu_keyboard_async(
             if hasattr(user, 'promo_group_id'):
                 promo_group_id = user.promo_group_id
 
-        # Получаем данные о рефералах из БД (если нужно)
+        # Получаем данные о рефералах из БД, только если они нужны шаблону меню
         try:
             from app.database.crud.referral import get_user_referral_stats
 
-            if user and hasattr(user, 'id'):
+            template = await MenuLayoutService.get_template(db)
+            if template.needs_referral_stats and user and hasattr(user, 'id'):
                 referral_data = await get_user_referral_stats(db, user.id)
                 if referral_data:
                     referral_count = referral_data.get('invited_count', 0)
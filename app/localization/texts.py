@@ -11,12 +11,15 @@ from app.localization.loader import (
     clear_locale_cache,
     load_locale,
 )
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 
 _logger = structlog.get_logger(__name__)
 
 _cached_rules: dict[str, str] = {}
 
+RULES_CACHE_TOPIC = 'rules'
+
 
 _LANGUAGE_ALIASES = {
     'uk': 'ua',
@@ -325,5 +328,20 @@ def clear_rules_cache() -> None:
     _cached_rules.clear()
 
 
+async def notify_rules_changed(language: str) -> None:
+    """Сообщить другим процессам, что правила языка изменились (после commit)."""
+    await cache_invalidation_bus.publish(RULES_CACHE_TOPIC, [language])
+
+
+async def _on_rules_invalidated(languages: frozenset[str] | None) -> None:
+    # Перечитываем только изменённые языки, остальные остаются в кеше
+    targets = languages if languages is not None else frozenset(_cached_rules)
+    for language in targets:
+        await refresh_rules_cache(language)
+
+
+cache_invalidation_bus.register(RULES_CACHE_TOPIC, _on_rules_invalidated)
+
+
 def reload_locales() -> None:
     clear_locale_cache()
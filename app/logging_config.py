@@ -14,6 +14,7 @@ Usage::
 
 from __future__ import annotations
 
+import json
 import logging
 import sys
 from typing import Any
@@ -23,6 +24,12 @@ import structlog
 from app.config import settings
 
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
 def _resolve_log_level(value: object, default: int = logging.INFO) -> int:
     """Resolve a user-supplied log-level string to a numeric stdlib level.
 
@@ -132,6 +139,22 @@ def _auto_capture_exc_info(logger: Any, method_name: str, event_dict: dict[str,
     return event_dict
 
 
+def _json_dumps(event_dict: dict[str, Any], default: Any = str, **kwargs: Any) -> str:
+    """Serializer for ``JSONRenderer``: orjson when installed, stdlib json otherwise."""
+    if orjson is not None:
+        return orjson.dumps(event_dict, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(event_dict, default=default, ensure_ascii=False, separators=(',', ':'))
+
+
+def _json_processors() -> list[structlog.types.Processor]:
+    """One JSON object per line; tracebacks rendered as plain text into ``exception``."""
+    return [
+        structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+        structlog.processors.format_exc_info,
+        structlog.processors.JSONRenderer(serializer=_json_dumps),
+    ]
+
+
 def setup_logging() -> tuple[logging.Formatter, logging.Formatter, Any]:
     """Configure structlog and return formatters + notifier.
 
@@ -185,6 +208,16 @@ def setup_logging() -> tuple[logging.Formatter, logging.Formatter, Any]:
         cache_logger_on_first_use=True,
     )
 
+    _configure_noisy_loggers()
+
+    if settings.LOG_FORMAT.strip().lower() == 'json':
+        # Production: machine-readable lines for both files and stdout
+        json_formatter = structlog.stdlib.ProcessorFormatter(
+            foreign_pre_chain=shared_processors,
+            processors=_json_processors(),
+        )
+        return json_formatter, json_formatter, telegram_notifier
+
     # File formatter: no ANSI colors, plain tracebacks (safe for log files)
     file_formatter = structlog.stdlib.ProcessorFormatter(
         foreign_pre_chain=shared_processors,
@@ -228,8 +261,6 @@ def setup_logging() -> tuple[logging.Formatter, logging.Formatter, Any]:
         ],
     )
 
-    _configure_noisy_loggers()
-
     return file_formatter, console_formatter, telegram_notifier
 
 
@@ -119,6 +119,8 @@ class TelegramNotifierProcessor:
 
     def __init__(self) -> None:
         self._bot: Bot | None = None
+        # Event loop бота — для уведомлений из потоков без loop (например, asyncio.to_thread)
+        self._loop: asyncio.AbstractEventLoop | None = None
         # LRU-like cache of recent message hashes: hash -> timestamp
         self._recent_hashes: dict[str, float] = {}
         self._lock = threading.Lock()
@@ -133,6 +135,10 @@ class TelegramNotifierProcessor:
         Called from main.py after the bot is created.
         """
         self._bot = bot
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
 
     # ------------------------------------------------------------------
     # Processor interface
@@ -253,9 +259,11 @@ class TelegramNotifierProcessor:
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError:
-            # No running loop — silently skip.
-            # The structlog processor runs in sync context; if there's no loop,
-            # we can't send anything.
+            # No running loop in this thread (e.g. a worker thread):
+            # hand the send over to the bot's loop, or skip if there is none.
+            loop = self._loop
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(self._create_send_task, bot, event_dict, loop)
             return
         else:
             # We're in async context — create task directly
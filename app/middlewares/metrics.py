@@ -0,0 +1,53 @@
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.types import TelegramObject
+
+from app.utils.metrics import metrics
+
+
+HANDLER_DURATION = metrics.histogram(
+    'telegram_handler_duration_seconds',
+    'Telegram update handling latency by handler',
+    ('event', 'handler'),
+)
+HANDLER_ERRORS = metrics.counter(
+    'telegram_handler_errors_total',
+    'Telegram handlers that raised',
+    ('event', 'handler', 'error'),
+)
+
+
+def handler_name(data: dict[str, Any]) -> str:
+    handler = data.get('handler')
+    callback = getattr(handler, 'callback', None)
+    if callback is None:
+        return 'unhandled'
+    return f'{getattr(callback, "__module__", "?")}.{getattr(callback, "__qualname__", type(callback).__name__)}'
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Латентность и ошибки каждого хендлера; ставится первой, чтобы учитывать время всей цепочки."""
+
+    def __init__(self, event_type: str) -> None:
+        self.event_type = event_type
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        started = perf_counter()
+        try:
+            return await handler(event, data)
+        except SkipHandler:
+            raise
+        except Exception as e:
+            HANDLER_ERRORS.labels(self.event_type, handler_name(data), type(e).__name__).inc()
+            raise
+        finally:
+            HANDLER_DURATION.labels(self.event_type, handler_name(data)).observe(perf_counter() - started)
@@ -0,0 +1,131 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import CallbackQuery, Message, PreCheckoutQuery, TelegramObject
+
+from app.config import settings
+from app.middlewares.metrics import handler_name
+from app.utils import update_profiler
+from app.utils.update_profiler import StackSampler, UpdateProfile, slow_updates
+
+
+_SUMMARY_MAX_LENGTH = 64
+
+
+def describe_event(event: TelegramObject) -> str:
+    """Команда, callback_data или тип контента — без текста сообщений пользователей."""
+    if isinstance(event, CallbackQuery):
+        return f'callback:{(event.data or "")[:_SUMMARY_MAX_LENGTH]}'
+    if isinstance(event, Message):
+        text = event.text or ''
+        if text.startswith('/'):
+            return f'command:{text.split(maxsplit=1)[0][:_SUMMARY_MAX_LENGTH]}'
+        return f'message:{getattr(event.content_type, "value", event.content_type)}'
+    if isinstance(event, PreCheckoutQuery):
+        return f'pre_checkout:{event.invoice_payload[:_SUMMARY_MAX_LENGTH]}'
+    return type(event).__name__
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Открывает профиль обновления; ставится первой, до всех остальных middleware."""
+
+    def __init__(self, event_type: str) -> None:
+        self.event_type = event_type
+        self.threshold = settings.BOT_PROFILING_SLOW_UPDATE_MS / 1000
+        self.interval = max(settings.BOT_PROFILING_SAMPLE_INTERVAL_MS, 1) / 1000
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = getattr(event, 'from_user', None)
+        profile = UpdateProfile(self.event_type, describe_event(event), user.id if user else None)
+        token = update_profiler.activate(profile)
+        sampler = StackSampler(profile, asyncio.current_task(), self.threshold, self.interval)
+        started = perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            profile.error = type(e).__name__
+            raise
+        finally:
+            profile.duration = perf_counter() - started
+            sampler.stop()
+            update_profiler.deactivate(token)
+            profile.handler = handler_name(data)
+            slow_updates.observe(profile, self.threshold)
+
+
+class _TimedMiddleware:
+    """Собственное время middleware: от входа до выхода минус время следующих звеньев цепочки."""
+
+    __slots__ = ('inner', 'name')
+
+    def __init__(self, inner: Callable[..., Awaitable[Any]]) -> None:
+        self.inner = inner
+        self.name = getattr(inner, '__name__', None) or type(inner).__name__
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        profile = update_profiler.current_profile()
+        if profile is None:
+            return await self.inner(handler, event, data)
+
+        nested = 0.0
+
+        async def timed_handler(event: TelegramObject, data: dict[str, Any]) -> Any:
+            nonlocal nested
+            started = perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                nested += perf_counter() - started
+
+        started = perf_counter()
+        try:
+            return await self.inner(timed_handler, event, data)
+        finally:
+            elapsed = perf_counter() - started - nested
+            profile.middlewares[self.name] = profile.middlewares.get(self.name, 0.0) + elapsed
+
+
+def setup_profiling(dp: Dispatcher) -> None:
+    """Поставить ProfilingMiddleware первой и обернуть уже зарегистрированные middleware таймерами."""
+    for event_type in ('message', 'callback_query', 'pre_checkout_query'):
+        manager = getattr(dp, event_type).middleware
+        registered = list(manager)
+        for middleware in registered:
+            manager.unregister(middleware)
+        manager.register(ProfilingMiddleware(event_type))
+        for middleware in registered:
+            manager.register(_TimedMiddleware(middleware))
+
+
+class TelegramCallProfiler(BaseRequestMiddleware):
+    """Считает вызовы Bot API в профиле текущего обновления."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if update_profiler.current_profile() is None:
+            return await make_request(bot, method)
+        started = perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            update_profiler.record_telegram_call(perf_counter() - started)
@@ -11,6 +11,7 @@ from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -54,6 +55,7 @@ class AntilopayService:
         """Возвращает переиспользуемую HTTP-сессию."""
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(
+                trace_configs=http_client_trace_configs('antilopay'),
                 timeout=aiohttp.ClientTimeout(total=30),
             )
         return self._session
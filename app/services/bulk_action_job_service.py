@@ -0,0 +1,638 @@
+"""Фоновое выполнение массовых действий из админ-кабинета.
+
+Задача (BulkActionJob) хранится в БД и выполняется пачками по
+BULK_ACTION_CHUNK_SIZE целей. Для продления, докупки трафика, лимита
+устройств, промогрупп и баланса пачка применяется set-based запросами
+(app/database/crud/bulk_actions.py) и в той же транзакции сдвигает курсор
+``processed`` и счётчики задачи. Затем изменённые подписки отправляются в
+панель RemnaWave с ограничением BULK_ACTION_PANEL_CONCURRENCY, после чего
+сдвигается ``synced``. Остальные действия (отмена, смена тарифа, удаление,
+выдача подписки) идут через обработчики кабинета по одной цели, но
+параллельно и каждая в своей сессии. Первый commit обработчика записывает
+отметку цели (BulkActionJobAppliedTarget) в той же транзакции, что и её
+изменения: пачка, повторённая после падения или потери аренды до сдвига
+курсора, пропускает уже применённые цели. Отметки пачки удаляются вместе со
+сдвигом курсора.
+
+Пауза и отмена проверяются между пачками. После перезапуска задачи в статусе
+queued/running продолжаются с курсора: пачка, не дошедшая до панели,
+синхронизируется повторно (синхронизация отправляет текущее состояние из БД и
+безопасна при повторе).
+
+Задачу выполняет один процесс — владелец аренды (``lease_owner``), который
+продлевает её, пока работает. Другие процессы подхватывают задачу только после
+истечения аренды. Курсор сдвигается сравнением с ожидаемым значением: если
+задачу успел продвинуть другой исполнитель, пачка откатывается, а выполнение
+прекращается.
+"""
+
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import structlog
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.cabinet.schemas.bulk_actions import BulkActionParams, BulkActionType
+from app.config import settings
+from app.database.crud.bulk_actions import (
+    BulkApplyResult,
+    bulk_add_subscription_traffic,
+    bulk_add_user_balance,
+    bulk_assign_promo_group,
+    bulk_extend_subscriptions,
+    bulk_set_device_limit,
+    emit_bulk_balance_side_effects,
+    get_existing_subscription_ids,
+    get_existing_user_ids,
+    resolve_user_subscriptions,
+)
+from app.database.crud.subscription import get_subscription_by_id
+from app.database.crud.tariff import get_tariff_by_id
+from app.database.database import AsyncSessionLocal
+from app.database.models import BulkActionJob, BulkActionJobAppliedTarget, BulkActionJobStatus
+
+
+logger = structlog.get_logger(__name__)
+
+# Действия, которые применяются к подписке set-based и затем синхронизируются с панелью
+_SUBSCRIPTION_SET_ACTIONS = frozenset(
+    {
+        BulkActionType.EXTEND_SUBSCRIPTION,
+        BulkActionType.ADD_DAYS,
+        BulkActionType.ADD_TRAFFIC,
+        BulkActionType.SET_DEVICES,
+    }
+)
+# Действия над пользователем без изменений в панели
+_USER_SET_ACTIONS = frozenset({BulkActionType.ADD_BALANCE, BulkActionType.ASSIGN_PROMO_GROUP})
+
+_ACTIVE_STATUSES = (BulkActionJobStatus.QUEUED.value, BulkActionJobStatus.RUNNING.value)
+_MAX_STORED_ERRORS = 100
+# Аренда продлевается каждую треть срока; задачи с истёкшей арендой проверяются раз в срок
+_LEASE_SECONDS = 120
+
+_USER_NOT_FOUND = 'User not found'
+_SUBSCRIPTION_NOT_FOUND = 'Subscription not found'
+_NO_SUBSCRIPTION = 'No subscription found'
+_SKIP_MESSAGES = frozenset({_USER_NOT_FOUND, _SUBSCRIPTION_NOT_FOUND, 'User not found for subscription'})
+
+# session.info: (job_id, target_id) цели, чья отметка ещё не зафиксирована
+_APPLIED_TARGET_KEY = 'bulk_action_applied_target'
+
+
+def is_set_based(action: BulkActionType) -> bool:
+    return action in _SUBSCRIPTION_SET_ACTIONS or action in _USER_SET_ACTIONS
+
+
+@event.listens_for(Session, 'before_commit')
+def _record_applied_target(session: Session) -> None:
+    marker = session.info.get(_APPLIED_TARGET_KEY)
+    if marker is not None:
+        job_id, target_id = marker
+        session.add(BulkActionJobAppliedTarget(job_id=job_id, target_id=target_id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _applied_target_recorded(session: Session) -> None:
+    # Отметка ушла с первой транзакцией цели; после отката она запишется со следующим commit
+    session.info.pop(_APPLIED_TARGET_KEY, None)
+
+
+class _LeaseLostError(Exception):
+    """Задачу продвинул или забрал другой исполнитель."""
+
+
+@dataclass(slots=True)
+class _ChunkOutcome:
+    success: int = 0
+    errors: int = 0
+    skipped: int = 0
+    panel_errors: int = 0
+    messages: list[dict[str, Any]] = field(default_factory=list)
+
+    def error(self, target_id: int, message: str) -> None:
+        self.errors += 1
+        self.messages.append({'target_id': target_id, 'message': message})
+
+    def panel_error(self, target_id: int, message: str) -> None:
+        self.panel_errors += 1
+        self.messages.append({'target_id': target_id, 'message': f'Panel sync failed: {message}'})
+
+
+@dataclass(slots=True)
+class _JobRun:
+    """Снимок задачи в памяти исполнителя: цели, параметры и курсоры."""
+
+    id: int
+    action: BulkActionType
+    by_subscription: bool
+    target_ids: list[int]
+    params: BulkActionParams
+    admin_id: int | None
+    processed: int
+    synced: int
+    errors: list[dict[str, Any]]
+
+    @classmethod
+    def from_job(cls, job: BulkActionJob) -> '_JobRun':
+        return cls(
+            id=job.id,
+            action=BulkActionType(job.action),
+            by_subscription=job.target_type == 'subscriptions',
+            target_ids=list(job.target_ids or []),
+            params=BulkActionParams(**(job.params or {})),
+            admin_id=job.admin_id,
+            processed=job.processed or 0,
+            synced=job.synced or 0,
+            errors=list(job.errors or []),
+        )
+
+
+class BulkActionJobService:
+    """Запуск, пауза, отмена и возобновление фоновых массовых действий."""
+
+    def __init__(self) -> None:
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._owner = uuid.uuid4().hex
+        self._reclaim_task: asyncio.Task | None = None
+
+    @property
+    def _chunk_size(self) -> int:
+        return max(1, settings.BULK_ACTION_CHUNK_SIZE)
+
+    @property
+    def _concurrency(self) -> int:
+        return max(1, settings.BULK_ACTION_PANEL_CONCURRENCY)
+
+    def is_job_running(self, job_id: int) -> bool:
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+    async def start(self) -> int:
+        """Возобновляет задачи без действующей аренды и следит за брошенными. Возвращает их количество."""
+        resumed = await self._resume_unleased()
+        if self._reclaim_task is None or self._reclaim_task.done():
+            self._reclaim_task = asyncio.create_task(self._reclaim_loop(), name='bulk-action-job-reclaim')
+        return resumed
+
+    async def _resume_unleased(self) -> int:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(BulkActionJob.id)
+                .where(
+                    BulkActionJob.status.in_(_ACTIVE_STATUSES),
+                    (BulkActionJob.lease_expires_at.is_(None)) | (BulkActionJob.lease_expires_at < func.now()),
+                )
+                .order_by(BulkActionJob.id)
+            )
+            job_ids = [job_id for job_id in result.scalars().all() if not self.is_job_running(job_id)]
+
+        for job_id in job_ids:
+            self.launch(job_id)
+        if job_ids:
+            logger.info('Возобновлены фоновые массовые действия', job_ids=job_ids)
+        return len(job_ids)
+
+    async def _reclaim_loop(self) -> None:
+        """Подхватывает задачи процессов, которые упали, не освободив аренду."""
+        while True:
+            await asyncio.sleep(_LEASE_SECONDS)
+            try:
+                await self._resume_unleased()
+            except Exception as error:
+                logger.warning('Не удалось проверить брошенные массовые действия', error=error)
+
+    async def stop(self) -> None:
+        """Останавливает исполнителей; задачи остаются running и продолжатся после запуска."""
+        if self._reclaim_task is not None:
+            self._reclaim_task.cancel()
+            await asyncio.gather(self._reclaim_task, return_exceptions=True)
+            self._reclaim_task = None
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def launch(self, job_id: int) -> None:
+        if self.is_job_running(job_id):
+            return
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id), name=f'bulk-action-job-{job_id}')
+
+    async def create_job(
+        self,
+        db: AsyncSession,
+        *,
+        action: BulkActionType,
+        target_ids: list[int],
+        by_subscription: bool,
+        params: BulkActionParams,
+        admin_id: int | None,
+    ) -> BulkActionJob:
+        targets = list(dict.fromkeys(target_ids))
+        job = BulkActionJob(
+            action=action.value,
+            target_type='subscriptions' if by_subscription else 'users',
+            target_ids=targets,
+            params=params.model_dump(mode='json'),
+            status=BulkActionJobStatus.QUEUED.value,
+            total=len(targets),
+            processed=0,
+            synced=0,
+            admin_id=admin_id,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        logger.info(
+            'Создано фоновое массовое действие',
+            job_id=job.id,
+            action=action,
+            target_type=job.target_type,
+            total=job.total,
+            admin_id=admin_id,
+        )
+        return job
+
+    async def pause(self, db: AsyncSession, job_id: int) -> bool:
+        return await self._set_status(db, job_id, _ACTIVE_STATUSES, BulkActionJobStatus.PAUSED)
+
+    async def resume(self, db: AsyncSession, job_id: int) -> bool:
+        resumed = await self._set_status(db, job_id, (BulkActionJobStatus.PAUSED.value,), BulkActionJobStatus.QUEUED)
+        if resumed:
+            self.launch(job_id)
+        return resumed
+
+    async def cancel(self, db: AsyncSession, job_id: int) -> bool:
+        return await self._set_status(
+            db,
+            job_id,
+            (*_ACTIVE_STATUSES, BulkActionJobStatus.PAUSED.value),
+            BulkActionJobStatus.CANCELLED,
+            finished_at=datetime.now(UTC),
+        )
+
+    async def _set_status(
+        self,
+        db: AsyncSession,
+        job_id: int,
+        allowed_from: tuple[str, ...],
+        new_status: BulkActionJobStatus,
+        **values: Any,
+    ) -> bool:
+        result = await db.execute(
+            update(BulkActionJob)
+            .where(BulkActionJob.id == job_id, BulkActionJob.status.in_(allowed_from))
+            .values(status=new_status.value, **values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        changed = result.rowcount > 0
+        if changed:
+            logger.info('Статус фонового массового действия изменён', job_id=job_id, status=new_status)
+        return changed
+
+    # ------------------------------------------------------------------
+    # Исполнитель
+    # ------------------------------------------------------------------
+
+    async def _run(self, job_id: int) -> None:
+        heartbeat: asyncio.Task | None = None
+        try:
+            run = await self._claim(job_id)
+            if run is None:
+                return
+            heartbeat = asyncio.create_task(self._heartbeat(job_id), name=f'bulk-action-job-{job_id}-lease')
+
+            while True:
+                if run.synced < run.processed:
+                    await self._sync_pending(run)
+
+                if run.processed >= len(run.target_ids):
+                    await self._finish(run)
+                    return
+
+                # queued — задачу поставили на паузу и сразу возобновили, пока шла пачка
+                if await self._current_status(job_id) not in _ACTIVE_STATUSES:
+                    logger.info('Фоновое массовое действие остановлено', job_id=job_id, processed=run.processed)
+                    return
+
+                chunk_size = self._chunk_size if is_set_based(run.action) else self._concurrency
+                chunk = run.target_ids[run.processed : run.processed + chunk_size]
+                if is_set_based(run.action):
+                    await self._apply_set_chunk(run, chunk)
+                else:
+                    await self._apply_row_chunk(run, chunk)
+
+        except asyncio.CancelledError:
+            raise
+        except _LeaseLostError:
+            logger.warning('Фоновое массовое действие выполняет другой процесс, исполнитель остановлен', job_id=job_id)
+        except Exception as error:
+            logger.exception('Фоновое массовое действие завершилось с ошибкой', job_id=job_id, error=error)
+            await self._fail(job_id, error)
+        finally:
+            self._tasks.pop(job_id, None)
+            if heartbeat is not None:
+                heartbeat.cancel()
+                await self._release(job_id)
+
+    def _lease_until(self) -> datetime:
+        return datetime.now(UTC) + timedelta(seconds=_LEASE_SECONDS)
+
+    async def _claim(self, job_id: int) -> _JobRun | None:
+        """Взять задачу в аренду: свободную, уже свою или с истёкшей арендой."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BulkActionJob)
+                .where(
+                    BulkActionJob.id == job_id,
+                    BulkActionJob.status.in_(_ACTIVE_STATUSES),
+                    (BulkActionJob.lease_owner.is_(None))
+                    | (BulkActionJob.lease_owner == self._owner)
+                    | (BulkActionJob.lease_expires_at < func.now()),
+                )
+                .values(
+                    status=BulkActionJobStatus.RUNNING.value,
+                    started_at=func.coalesce(BulkActionJob.started_at, func.now()),
+                    lease_owner=self._owner,
+                    lease_expires_at=self._lease_until(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                await db.rollback()
+                return None
+            await db.commit()
+            job = await db.get(BulkActionJob, job_id)
+            return _JobRun.from_job(job)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(_LEASE_SECONDS / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        update(BulkActionJob)
+                        .where(BulkActionJob.id == job_id, BulkActionJob.lease_owner == self._owner)
+                        .values(lease_expires_at=self._lease_until())
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            except Exception as error:
+                logger.warning('Не удалось продлить аренду массового действия', job_id=job_id, error=error)
+                continue
+            if result.rowcount == 0:
+                # Аренду забрали — следующий сдвиг курсора остановит исполнителя
+                logger.warning('Аренда массового действия потеряна', job_id=job_id)
+                return
+
+    async def _release(self, job_id: int) -> None:
+        """Освободить аренду, чтобы задачу сразу мог продолжить другой процесс."""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(BulkActionJob)
+                    .where(BulkActionJob.id == job_id, BulkActionJob.lease_owner == self._owner)
+                    .values(lease_owner=None, lease_expires_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as error:
+            logger.warning('Не удалось освободить аренду массового действия', job_id=job_id, error=error)
+
+    async def _current_status(self, job_id: int) -> str | None:
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(BulkActionJob.status).where(BulkActionJob.id == job_id))
+
+    async def _apply_set_chunk(self, run: _JobRun, chunk: list[int]) -> None:
+        outcome = _ChunkOutcome()
+        transactions: list[tuple[int, int]] = []
+        params = run.params
+
+        async with AsyncSessionLocal() as db:
+            if run.action in _USER_SET_ACTIONS:
+                existing = await get_existing_user_ids(db, chunk)
+                user_ids = [uid for uid in chunk if uid in existing]
+                outcome.skipped += len(chunk) - len(user_ids)
+                if run.action == BulkActionType.ADD_BALANCE:
+                    result, transactions = await bulk_add_user_balance(
+                        db, user_ids, params.amount_kopeks, params.balance_description
+                    )
+                else:
+                    result = await bulk_assign_promo_group(db, user_ids, params.promo_group_id)
+                outcome.success += len(result.applied)
+            else:
+                targets = await self._resolve_targets(db, run, chunk, outcome)
+                result = await self._apply_subscription_action(db, run.action, params, list(targets.values()))
+                applied = set(result.applied)
+                for target_id, sub_id in targets.items():
+                    if sub_id in applied:
+                        outcome.success += 1
+                    else:
+                        outcome.error(target_id, result.errors.get(sub_id, _SUBSCRIPTION_NOT_FOUND))
+
+            expected = run.processed
+            run.processed += len(chunk)
+            if run.action not in _SUBSCRIPTION_SET_ACTIONS:
+                run.synced = run.processed
+            # Курсор не совпал — пачка откатывается вместе с изменениями целей
+            await self._save_progress(db, run, outcome, expected_processed=expected)
+            await db.commit()
+
+            if transactions:
+                await emit_bulk_balance_side_effects(db, transactions, params.amount_kopeks, params.balance_description)
+
+    async def _resolve_targets(
+        self, db: AsyncSession, run: _JobRun, chunk: list[int], outcome: _ChunkOutcome
+    ) -> dict[int, int]:
+        """{цель: subscription_id}; отсутствующие цели учитываются в outcome."""
+        if run.by_subscription:
+            existing = await get_existing_subscription_ids(db, chunk)
+            outcome.skipped += sum(1 for sub_id in chunk if sub_id not in existing)
+            return {sub_id: sub_id for sub_id in chunk if sub_id in existing}
+
+        existing = await get_existing_user_ids(db, chunk)
+        resolved = await resolve_user_subscriptions(db, list(existing))
+        targets: dict[int, int] = {}
+        for user_id in chunk:
+            if user_id not in existing:
+                outcome.skipped += 1
+            elif user_id not in resolved:
+                outcome.error(user_id, _NO_SUBSCRIPTION)
+            else:
+                targets[user_id] = resolved[user_id]
+        return targets
+
+    async def _apply_subscription_action(
+        self, db: AsyncSession, action: BulkActionType, params: BulkActionParams, subscription_ids: list[int]
+    ) -> BulkApplyResult:
+        if action in (BulkActionType.EXTEND_SUBSCRIPTION, BulkActionType.ADD_DAYS):
+            return await bulk_extend_subscriptions(db, subscription_ids, params.days)
+        if action == BulkActionType.ADD_TRAFFIC:
+            return await bulk_add_subscription_traffic(db, subscription_ids, params.traffic_gb)
+        return await bulk_set_device_limit(db, subscription_ids, params.device_limit)
+
+    async def _sync_pending(self, run: _JobRun) -> None:
+        """Отправляет в панель подписки целей между ``synced`` и ``processed``."""
+        targets = run.target_ids[run.synced : run.processed]
+        if run.by_subscription:
+            pairs = [(sub_id, sub_id) for sub_id in targets]
+        else:
+            async with AsyncSessionLocal() as db:
+                resolved = await resolve_user_subscriptions(db, targets)
+            pairs = [(user_id, resolved[user_id]) for user_id in targets if user_id in resolved]
+
+        outcome = _ChunkOutcome()
+        semaphore = asyncio.Semaphore(self._concurrency)
+        enable = run.action == BulkActionType.ADD_TRAFFIC
+
+        async def sync_one(target_id: int, sub_id: int) -> None:
+            async with semaphore:
+                error = await self._sync_subscription(sub_id, enable=enable)
+            if error:
+                outcome.panel_error(target_id, error)
+
+        await asyncio.gather(*(sync_one(target_id, sub_id) for target_id, sub_id in pairs))
+
+        run.synced = run.processed
+        async with AsyncSessionLocal() as db:
+            await self._save_progress(db, run, outcome, expected_processed=run.processed)
+            await db.commit()
+
+    async def _sync_subscription(self, subscription_id: int, *, enable: bool) -> str | None:
+        """Синхронизирует одну подписку в собственной сессии. Возвращает текст ошибки."""
+        from app.cabinet.routes.admin_bulk_actions import _enable_subscription_on_panel
+        from app.cabinet.routes.admin_users import _sync_subscription_to_panel
+
+        try:
+            async with AsyncSessionLocal() as db:
+                subscription = await get_subscription_by_id(db, subscription_id)
+                if subscription is None or subscription.user is None:
+                    return None
+                result = await _sync_subscription_to_panel(db, subscription.user, subscription)
+                if result.get('error'):
+                    return result['error']
+                if enable:
+                    await _enable_subscription_on_panel(subscription.user, subscription)
+        except Exception as error:
+            logger.error('Ошибка синхронизации подписки с панелью', subscription_id=subscription_id, error=error)
+            return str(error)
+        return None
+
+    async def _apply_row_chunk(self, run: _JobRun, chunk: list[int]) -> None:
+        """Действия без set-based реализации: обработчики кабинета, параллельно по целям."""
+        from app.cabinet.routes.admin_bulk_actions import _execute_for_subscription, _execute_for_user
+
+        needs_tariff = run.action in (BulkActionType.CHANGE_TARIFF, BulkActionType.GRANT_SUBSCRIPTION)
+
+        async with AsyncSessionLocal() as db:
+            applied = set(
+                await db.scalars(
+                    select(BulkActionJobAppliedTarget.target_id).where(
+                        BulkActionJobAppliedTarget.job_id == run.id, BulkActionJobAppliedTarget.target_id.in_(chunk)
+                    )
+                )
+            )
+        pending = [target_id for target_id in chunk if target_id not in applied]
+
+        async def execute(target_id: int):
+            async with AsyncSessionLocal() as db:
+                db.info[_APPLIED_TARGET_KEY] = (run.id, target_id)
+                tariff = await get_tariff_by_id(db, run.params.tariff_id) if needs_tariff else None
+                if run.by_subscription:
+                    return await _execute_for_subscription(db, target_id, run.action, run.params, tariff, False)
+                return await _execute_for_user(
+                    db, target_id, run.action, run.params, tariff, False, admin_id=run.admin_id or 0
+                )
+
+        results = await asyncio.gather(*(execute(target_id) for target_id in pending))
+
+        # Цели, применённые до падения или потери аренды, повторно не выполняются
+        outcome = _ChunkOutcome(success=len(applied))
+        for target_id, result in zip(pending, results, strict=True):
+            if result.message in _SKIP_MESSAGES:
+                outcome.skipped += 1
+            elif result.success:
+                outcome.success += 1
+            else:
+                outcome.error(target_id, result.message)
+
+        expected = run.processed
+        run.processed += len(chunk)
+        run.synced = run.processed
+        async with AsyncSessionLocal() as db:
+            await self._save_progress(db, run, outcome, expected_processed=expected)
+            await db.execute(
+                delete(BulkActionJobAppliedTarget).where(
+                    BulkActionJobAppliedTarget.job_id == run.id, BulkActionJobAppliedTarget.target_id.in_(chunk)
+                )
+            )
+            await db.commit()
+
+    async def _save_progress(
+        self, db: AsyncSession, run: _JobRun, outcome: _ChunkOutcome, *, expected_processed: int
+    ) -> None:
+        """Сдвинуть курсор и счётчики, если курсор в БД всё ещё ``expected_processed`` и аренда наша."""
+        values: dict[str, Any] = {
+            'processed': run.processed,
+            'synced': run.synced,
+            'success_count': BulkActionJob.success_count + outcome.success,
+            'error_count': BulkActionJob.error_count + outcome.errors,
+            'skipped_count': BulkActionJob.skipped_count + outcome.skipped,
+            'panel_error_count': BulkActionJob.panel_error_count + outcome.panel_errors,
+        }
+        if outcome.messages:
+            run.errors = (run.errors + outcome.messages)[-_MAX_STORED_ERRORS:]
+            values['errors'] = run.errors
+            values['last_error'] = outcome.messages[-1]['message']
+        result = await db.execute(
+            update(BulkActionJob)
+            .where(
+                BulkActionJob.id == run.id,
+                BulkActionJob.processed == expected_processed,
+                BulkActionJob.lease_owner == self._owner,
+            )
+            .values(**values, lease_expires_at=self._lease_until())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await db.rollback()
+            raise _LeaseLostError(run.id)
+
+    async def _finish(self, run: _JobRun) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(BulkActionJob)
+                .where(BulkActionJob.id == run.id, BulkActionJob.status == BulkActionJobStatus.RUNNING.value)
+                .values(status=BulkActionJobStatus.COMPLETED.value, finished_at=datetime.now(UTC))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        logger.info('Фоновое массовое действие завершено', job_id=run.id, action=run.action, total=len(run.target_ids))
+
+    async def _fail(self, job_id: int, error: Exception) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(BulkActionJob)
+                    .where(BulkActionJob.id == job_id)
+                    .values(
+                        status=BulkActionJobStatus.FAILED.value,
+                        last_error=str(error)[:1000],
+                        finished_at=datetime.now(UTC),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as save_error:
+            logger.error('Не удалось сохранить ошибку массового действия', job_id=job_id, error=save_error)
+
+
+bulk_action_job_service = BulkActionJobService()
@@ -5,6 +5,8 @@
 """
 
 import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 
 import structlog
@@ -15,27 +17,42 @@ from sqlalchemy.orm import selectinload
 
 from app.config import settings
 from app.database.crud.subscription import (
-    get_daily_subscriptions_for_charge,
+    claim_daily_subscriptions_for_charge,
+    extend_daily_subscriptions,
     get_disabled_daily_subscriptions_for_resume,
     get_expired_daily_subscriptions_for_recovery,
     suspend_daily_subscription_insufficient_balance,
+    suspend_daily_subscriptions_insufficient_balance,
     update_daily_charge_time,
 )
-from app.database.crud.transaction import create_transaction
-from app.database.crud.user import get_user_by_id, subtract_user_balance
+from app.database.crud.transaction import create_subscription_payments, create_transaction
+from app.database.crud.user import get_user_by_id, lock_users_for_pricing, subtract_user_balance, subtract_user_balances
 from app.database.database import AsyncSessionLocal
-from app.database.models import PaymentMethod, Subscription, SubscriptionStatus, TransactionType, User
+from app.database.models import PaymentMethod, Subscription, SubscriptionStatus, Transaction, TransactionType, User
 from app.localization.texts import get_texts
 from app.utils.price_display import catalog_price_in_toman, user_can_afford
 from app.services.notification_delivery_service import (
     NotificationType,
     notification_delivery_service,
 )
+from app.utils.metrics import track_loop
 
 
 logger = structlog.get_logger(__name__)
 
 
+@dataclass(slots=True)
+class _ChargeResult:
+    """Итог списания по подписке, который дорабатывают воркеры (панель и уведомления)."""
+
+    outcome: str  # 'charged' | 'suspended'
+    subscription_id: int
+    user_id: int
+    daily_price: int
+    transaction_id: int | None = None
+    old_end_date: datetime | None = None
+
+
 class DailySubscriptionService:
     """
     Сервис автоматического списания для суточных подписок.
@@ -58,10 +75,22 @@ class DailySubscriptionService:
         """Возвращает интервал проверки в минутах."""
         return getattr(settings, 'DAILY_SUBSCRIPTIONS_CHECK_INTERVAL_MINUTES', 30)
 
+    def get_charge_batch_size(self) -> int:
+        return max(1, getattr(settings, 'DAILY_SUBSCRIPTIONS_CHARGE_BATCH_SIZE', 200))
+
+    def get_charge_concurrency(self) -> int:
+        return max(1, getattr(settings, 'DAILY_SUBSCRIPTIONS_CHARGE_CONCURRENCY', 8))
+
     async def process_daily_charges(self) -> dict:
         """
         Обрабатывает суточные списания.
 
+        Конвейер: подписки забираются пачками (keyset по id, FOR UPDATE SKIP LOCKED),
+        баланс по пачке списывается одним UPDATE в одной транзакции, а синхронизация
+        с панелью и уведомления уходят воркерам со своими сессиями — медленная панель
+        не задерживает следующие списания. Пачка, упавшая целиком, переигрывается
+        поштучно через _process_single_charge.
+
         Returns:
             dict: Статистика обработки
         """
@@ -72,38 +101,223 @@ class DailySubscriptionService:
             'errors': 0,
         }
 
+        concurrency = self.get_charge_concurrency()
+        queue: asyncio.Queue[_ChargeResult | None] = asyncio.Queue(maxsize=concurrency * 4)
+        workers = [asyncio.create_task(self._after_charge_worker(queue)) for _ in range(concurrency)]
+        after_id = 0
+
         try:
-            async with AsyncSessionLocal() as db:
+            while True:
+                batch_ids: list[int] = []
                 try:
-                    subscriptions = await get_daily_subscriptions_for_charge(db)
-                    stats['checked'] = len(subscriptions)
-
-                    for subscription in subscriptions:
-                        try:
-                            result = await self._process_single_charge(db, subscription)
-                            if result == 'charged':
-                                stats['charged'] += 1
-                            elif result == 'suspended':
-                                stats['suspended'] += 1
-                            elif result == 'error':
-                                stats['errors'] += 1
-                        except Exception as e:
-                            logger.error(
-                                'Ошибка обработки суточной подписки',
-                                subscription_id=subscription.id,
-                                error=e,
-                                exc_info=True,
-                            )
-                            stats['errors'] += 1
+                    async with AsyncSessionLocal() as db:
+                        batch = await claim_daily_subscriptions_for_charge(
+                            db, after_id=after_id, limit=self.get_charge_batch_size()
+                        )
+                        if not batch:
+                            break
+                        batch_ids = [subscription.id for subscription in batch]
+                        after_id = batch_ids[-1]
+                        stats['checked'] += len(batch)
+                        results, errors = await self._charge_batch(db, batch)
                 except Exception as e:
-                    logger.error('Ошибка при обработке подписок', error=e, exc_info=True)
-                    await db.rollback()
+                    if not batch_ids:
+                        logger.error('Ошибка при получении подписок для списания', error=e, exc_info=True)
+                        break
+                    logger.error(
+                        'Ошибка пакетного списания, обрабатываем подписки по одной',
+                        first_subscription_id=batch_ids[0],
+                        batch_size=len(batch_ids),
+                        error=e,
+                        exc_info=True,
+                    )
+                    for key, value in (await self._process_serially(batch_ids)).items():
+                        stats[key] += value
+                    continue
+
+                stats['errors'] += errors
+                for result in results:
+                    stats[result.outcome] += 1
+                    await queue.put(result)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
 
-        except Exception as e:
-            logger.error('Ошибка при получении подписок для списания', error=e, exc_info=True)
+        return stats
 
+    async def _process_serially(self, subscription_ids: list[int]) -> dict:
+        """Поштучная обработка — каждая подписка в своей сессии."""
+        stats = {'charged': 0, 'suspended': 0, 'errors': 0}
+        for subscription_id in subscription_ids:
+            try:
+                async with AsyncSessionLocal() as db:
+                    subscription = await self._load_subscription(db, subscription_id)
+                    if subscription is None:
+                        continue
+                    result = await self._process_single_charge(db, subscription)
+            except Exception as e:
+                logger.error(
+                    'Ошибка обработки суточной подписки', subscription_id=subscription_id, error=e, exc_info=True
+                )
+                result = 'error'
+            if result == 'charged':
+                stats['charged'] += 1
+            elif result == 'suspended':
+                stats['suspended'] += 1
+            elif result == 'error':
+                stats['errors'] += 1
         return stats
 
+    @staticmethod
+    async def _load_subscription(db: AsyncSession, subscription_id: int) -> Subscription | None:
+        result = await db.execute(
+            select(Subscription)
+            .where(Subscription.id == subscription_id)
+            .options(selectinload(Subscription.user), selectinload(Subscription.tariff))
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def _daily_price_for(user: User, tariff) -> int:
+        """Суточная цена тарифа с групповой скидкой (как PricingEngine._calculate_switch_to_daily)."""
+        from app.services.pricing_engine import PricingEngine
+
+        raw_daily_price = tariff.daily_price_kopeks
+        promo_group = PricingEngine.resolve_promo_group(user)
+        daily_group_pct = promo_group.get_discount_percent('period', 1) if promo_group else 0
+        return (
+            PricingEngine.apply_discount(raw_daily_price, daily_group_pct) if daily_group_pct > 0 else raw_daily_price
+        )
+
+    async def _charge_batch(self, db: AsyncSession, batch: list[Subscription]) -> tuple[list[_ChargeResult], int]:
+        """
+        Списание по пачке в одной транзакции: те же решения, что у _process_single_charge.
+
+        Подписки одного пользователя разбираются по порядку id: каждая следующая
+        видит баланс после предыдущей. Возвращает (итоги для воркеров, число ошибок).
+        """
+        errors = 0
+        valid: list[Subscription] = []
+        for subscription in batch:
+            tariff = subscription.tariff
+            if not tariff:
+                logger.warning('Тариф не найден для подписки', subscription_id=subscription.id)
+                errors += 1
+            elif tariff.daily_price_kopeks <= 0:
+                logger.warning('Некорректная суточная цена для тарифа', tariff_id=tariff.id)
+                errors += 1
+            else:
+                valid.append(subscription)
+
+        users = await lock_users_for_pricing(db, {subscription.user_id for subscription in valid})
+        balances = {user_id: user.balance_kopeks for user_id, user in users.items()}
+        debits: dict[int, int] = defaultdict(int)
+        charged: list[tuple[Subscription, int]] = []
+        suspended: list[tuple[Subscription, int]] = []
+
+        for subscription in valid:
+            user = users.get(subscription.user_id)
+            if user is None:
+                logger.warning('Пользователь не найден для подписки', subscription_id=subscription.id)
+                errors += 1
+                continue
+            daily_price = self._daily_price_for(user, subscription.tariff)
+            # При 100% скидке баланс не проверяем
+            if daily_price > 0 and not user_can_afford(balances[user.id], daily_price):
+                suspended.append((subscription, daily_price))
+                continue
+            amount = catalog_price_in_toman(daily_price)
+            balances[user.id] -= amount
+            debits[user.id] += amount
+            charged.append((subscription, daily_price))
+
+        results: list[_ChargeResult] = []
+        if charged:
+            new_balances = await subtract_user_balances(db, debits, mark_as_paid_subscription=True)
+            if len(new_balances) != len(debits):
+                # Строки заблокированы — расхождение значит, что баланс меняли в обход блокировки
+                raise RuntimeError('Баланс изменился во время пакетного списания')
+
+            charge_time = datetime.now(UTC)
+            transactions = await create_subscription_payments(
+                db,
+                [
+                    (subscription.user_id, daily_price, f'Суточная оплата тарифа «{subscription.tariff.name}»')
+                    for subscription, daily_price in charged
+                ],
+            )
+            await extend_daily_subscriptions(db, [subscription.id for subscription, _ in charged], charge_time)
+            results.extend(
+                _ChargeResult(
+                    outcome='charged',
+                    subscription_id=subscription.id,
+                    user_id=subscription.user_id,
+                    daily_price=daily_price,
+                    transaction_id=transaction.id,
+                    old_end_date=subscription.end_date,
+                )
+                for (subscription, daily_price), transaction in zip(charged, transactions, strict=True)
+            )
+
+        if suspended:
+            await suspend_daily_subscriptions_insufficient_balance(
+                db, [subscription.id for subscription, _ in suspended]
+            )
+            results.extend(
+                _ChargeResult(
+                    outcome='suspended',
+                    subscription_id=subscription.id,
+                    user_id=subscription.user_id,
+                    daily_price=daily_price,
+                )
+                for subscription, daily_price in suspended
+            )
+
+        # commit и при пустом результате — снимает блокировки пачки
+        await db.commit()
+
+        for subscription, daily_price in charged:
+            logger.info(
+                '✅ Суточное списание: подписка сумма коп., пользователь',
+                subscription_id=subscription.id,
+                daily_price=daily_price,
+                user_id=subscription.user_id,
+            )
+        for subscription, daily_price in suspended:
+            logger.info(
+                'Подписка приостановлена: недостаточно средств',
+                subscription_id=subscription.id,
+                balance_kopeks=users[subscription.user_id].balance_kopeks,
+                daily_price=daily_price,
+            )
+
+        return results, errors
+
+    async def _after_charge_worker(self, queue: asyncio.Queue) -> None:
+        """Воркер конвейера: панель и уведомления после commit пачки, в своей сессии."""
+        while (result := await queue.get()) is not None:
+            try:
+                async with AsyncSessionLocal() as db:
+                    subscription = await self._load_subscription(db, result.subscription_id)
+                    if subscription is None or subscription.user is None:
+                        continue
+                    if result.outcome == 'suspended':
+                        await self._notify_suspended(subscription.user, subscription, result.daily_price)
+                        continue
+                    transaction = await db.get(Transaction, result.transaction_id)
+                    await self._restore_connected_squads(db, subscription, subscription.tariff)
+                    await self._after_charge(
+                        db, subscription.user, subscription, transaction, result.daily_price, result.old_end_date
+                    )
+            except Exception as e:
+                logger.error(
+                    'Ошибка обработки суточной подписки после списания',
+                    subscription_id=result.subscription_id,
+                    error=e,
+                    exc_info=True,
+                )
+
     async def _process_single_charge(self, db, subscription) -> str:
         """
         Обрабатывает списание для одной подписки.
@@ -135,35 +349,13 @@ class DailySubscriptionService:
         user = await lock_user_for_pricing(db, user.id)
 
         # Apply group discount to daily price (consistent with PricingEngine._calculate_switch_to_daily)
-        from app.services.pricing_engine import PricingEngine
-
-        promo_group = PricingEngine.resolve_promo_group(user)
-        daily_group_pct = promo_group.get_discount_percent('period', 1) if promo_group else 0
-        daily_price = (
-            PricingEngine.apply_discount(raw_daily_price, daily_group_pct) if daily_group_pct > 0 else raw_daily_price
-        )
+        daily_price = self._daily_price_for(user, tariff)
 
         # Проверяем баланс (при 100% скидке — пропускаем)
         if daily_price > 0 and not user_can_afford(user.balance_kopeks, daily_price):
             # Недостаточно средств - приостанавливаем подписку
             await suspend_daily_subscription_insufficient_balance(db, subscription)
-
-            # Уведомляем пользователя (rate-limit: 1 раз в 6 часов)
-            if self._bot:
-                from app.utils.cache import cache
-
-                cache_key = f'daily_insuf_notify:{subscription.id}'
-                try:
-                    already_notified = await cache.get(cache_key)
-                except Exception:
-                    already_notified = None
-
-                if not already_notified:
-                    await self._notify_insufficient_balance(user, subscription, daily_price)
-                    try:
-                        await cache.set(cache_key, '1', expire=21600)  # 6 hours
-                    except Exception:
-                        pass
+            await self._notify_suspended(user, subscription, daily_price)
 
             logger.info(
                 'Подписка приостановлена: недостаточно средств',
@@ -219,106 +411,140 @@ class DailySubscriptionService:
                 user_id_display=user_id_display,
             )
 
-            # Восстанавливаем connected_squads из тарифа, если очищены деактивацией
-            try:
-                if not subscription.connected_squads:
-                    squads = tariff.allowed_squads or []
-                    if not squads:
-                        from app.database.crud.server_squad import get_all_server_squads
-
-                        all_servers, _ = await get_all_server_squads(db, available_only=True, limit=10000)
-                        squads = [s.squad_uuid for s in all_servers if s.squad_uuid]
-                    if squads:
-                        subscription.connected_squads = squads
-                        await db.commit()
-                        await db.refresh(subscription)
-            except Exception as sq_err:
-                logger.warning('Не удалось восстановить connected_squads', error=sq_err)
-
-            # Синхронизируем с Remnawave (обновляем срок подписки)
-            try:
-                from app.services.subscription_service import SubscriptionService
+            await self._restore_connected_squads(db, subscription, tariff)
+            await self._after_charge(db, user, subscription, transaction, daily_price, old_end_date)
+
+            return 'charged'
 
-                subscription_service = SubscriptionService()
-                _has_panel_user = (
+        except Exception as e:
+            await db.rollback()
+            logger.error(
+                'Ошибка при списании средств для подписки', subscription_id=subscription.id, error=e, exc_info=True
+            )
+            return 'error'
+
+    async def _restore_connected_squads(self, db: AsyncSession, subscription: Subscription, tariff) -> None:
+        # Восстанавливаем connected_squads из тарифа, если очищены деактивацией
+        try:
+            if not subscription.connected_squads:
+                squads = tariff.allowed_squads or []
+                if not squads:
+                    from app.database.crud.server_squad import get_all_server_squads
+
+                    all_servers, _ = await get_all_server_squads(db, available_only=True, limit=10000)
+                    squads = [s.squad_uuid for s in all_servers if s.squad_uuid]
+                if squads:
+                    subscription.connected_squads = squads
+                    await db.commit()
+                    await db.refresh(subscription)
+        except Exception as sq_err:
+            logger.warning('Не удалось восстановить connected_squads', error=sq_err)
+
+    async def _after_charge(
+        self,
+        db: AsyncSession,
+        user: User,
+        subscription: Subscription,
+        transaction: Transaction | None,
+        daily_price: int,
+        old_end_date: datetime | None,
+    ) -> None:
+        """Синхронизация с панелью и уведомления после успешного списания."""
+        # Синхронизируем с Remnawave (обновляем срок подписки)
+        try:
+            from app.services.subscription_service import SubscriptionService
+
+            subscription_service = SubscriptionService()
+            _has_panel_user = (
+                getattr(subscription, 'remnawave_uuid', None)
+                if settings.is_multi_tariff_enabled()
+                else getattr(user, 'remnawave_uuid', None)
+            )
+            if _has_panel_user:
+                await subscription_service.update_remnawave_user(
+                    db,
+                    subscription,
+                    reset_traffic=False,
+                    reset_reason=None,
+                    sync_squads=True,
+                )
+            else:
+                await subscription_service.create_remnawave_user(
+                    db,
+                    subscription,
+                    reset_traffic=False,
+                    reset_reason=None,
+                )
+                # POST может игнорировать activeInternalSquads — отправляем PATCH
+                await db.refresh(user)
+                _sync_uuid = (
                     getattr(subscription, 'remnawave_uuid', None)
                     if settings.is_multi_tariff_enabled()
                     else getattr(user, 'remnawave_uuid', None)
                 )
-                if _has_panel_user:
-                    await subscription_service.update_remnawave_user(
-                        db,
-                        subscription,
-                        reset_traffic=False,
-                        reset_reason=None,
-                        sync_squads=True,
-                    )
-                else:
-                    await subscription_service.create_remnawave_user(
-                        db,
-                        subscription,
-                        reset_traffic=False,
-                        reset_reason=None,
-                    )
-                    # POST может игнорировать activeInternalSquads — отправляем PATCH
-                    await db.refresh(user)
-                    _sync_uuid = (
-                        getattr(subscription, 'remnawave_uuid', None)
-                        if settings.is_multi_tariff_enabled()
-                        else getattr(user, 'remnawave_uuid', None)
-                    )
-                    if _sync_uuid and subscription.connected_squads:
-                        try:
-                            await subscription_service.update_remnawave_user(
-                                db,
-                                subscription,
-                                reset_traffic=False,
-                                sync_squads=True,
-                            )
-                        except Exception as patch_err:
-                            logger.warning('Не удалось синхронизировать сквады после создания', error=patch_err)
-            except Exception as e:
-                logger.warning('Не удалось обновить Remnawave', error=e)
-                from app.services.remnawave_retry_queue import remnawave_retry_queue
+                if _sync_uuid and subscription.connected_squads:
+                    try:
+                        await subscription_service.update_remnawave_user(
+                            db,
+                            subscription,
+                            reset_traffic=False,
+                            sync_squads=True,
+                        )
+                    except Exception as patch_err:
+                        logger.warning('Не удалось синхронизировать сквады после создания', error=patch_err)
+        except Exception as e:
+            logger.warning('Не удалось обновить Remnawave', error=e)
+            from app.services.remnawave_retry_queue import remnawave_retry_queue
 
-                if hasattr(subscription, 'id') and hasattr(subscription, 'user_id'):
-                    remnawave_retry_queue.enqueue(
-                        subscription_id=subscription.id,
-                        user_id=subscription.user_id,
-                        action='update' if _has_panel_user else 'create',
-                    )
+            if hasattr(subscription, 'id') and hasattr(subscription, 'user_id'):
+                remnawave_retry_queue.enqueue(
+                    subscription_id=subscription.id,
+                    user_id=subscription.user_id,
+                    action='update' if _has_panel_user else 'create',
+                )
 
-            # Отправляем уведомление администраторам
-            try:
-                from app.services.subscription_renewal_service import with_admin_notification_service
-
-                await with_admin_notification_service(
-                    lambda svc: svc.send_subscription_extension_notification(
-                        db,
-                        user,
-                        subscription,
-                        transaction,
-                        1,  # 1 день для суточного тарифа
-                        old_end_date,
-                        new_end_date=subscription.end_date,
-                        balance_after=user.balance_kopeks,
-                    )
+        # Отправляем уведомление администраторам
+        try:
+            from app.services.subscription_renewal_service import with_admin_notification_service
+
+            await with_admin_notification_service(
+                lambda svc: svc.send_subscription_extension_notification(
+                    db,
+                    user,
+                    subscription,
+                    transaction,
+                    1,  # 1 день для суточного тарифа
+                    old_end_date,
+                    new_end_date=subscription.end_date,
+                    balance_after=user.balance_kopeks,
                 )
-            except Exception as exc:
-                logger.warning('Не удалось отправить админ-уведомление о суточном списании', user_id=user.id, exc=exc)
+            )
+        except Exception as exc:
+            logger.warning('Не удалось отправить админ-уведомление о суточном списании', user_id=user.id, exc=exc)
 
-            # Уведомляем пользователя
-            if self._bot:
-                await self._notify_daily_charge(user, subscription, daily_price)
+        # Уведомляем пользователя
+        if self._bot:
+            await self._notify_daily_charge(user, subscription, daily_price)
 
-            return 'charged'
+    async def _notify_suspended(self, user: User, subscription: Subscription, daily_price: int) -> None:
+        """Уведомляет о приостановке (rate-limit: 1 раз в 6 часов)."""
+        if not self._bot:
+            return
 
-        except Exception as e:
-            await db.rollback()
-            logger.error(
-                'Ошибка при списании средств для подписки', subscription_id=subscription.id, error=e, exc_info=True
-            )
-            return 'error'
+        from app.utils.cache import cache
+
+        cache_key = f'daily_insuf_notify:{subscription.id}'
+        try:
+            already_notified = await cache.get(cache_key)
+        except Exception:
+            already_notified = None
+
+        if not already_notified:
+            await self._notify_insufficient_balance(user, subscription, daily_price)
+            try:
+                await cache.set(cache_key, '1', expire=21600)  # 6 hours
+            except Exception:
+                pass
 
     async def _notify_daily_charge(self, user, subscription, amount_kopeks: int):
         """Уведомляет пользователя о суточном списании."""
@@ -840,7 +1066,8 @@ class DailySubscriptionService:
                     )
 
                 # Обработка суточных списаний
-                stats = await self.process_daily_charges()
+                with track_loop('daily_charges'):
+                    stats = await self.process_daily_charges()
 
                 if stats['charged'] > 0 or stats['suspended'] > 0:
                     logger.info(
@@ -852,7 +1079,8 @@ class DailySubscriptionService:
                     )
 
                 # Обработка сброса докупленного трафика
-                traffic_stats = await self.process_traffic_resets()
+                with track_loop('traffic_resets'):
+                    traffic_stats = await self.process_traffic_resets()
                 if traffic_stats['reset'] > 0:
                     logger.info(
                         '📊 Сброс трафика завершён',
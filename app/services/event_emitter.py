@@ -55,8 +55,15 @@ class EventEmitter:
         event_type: str,
         payload: dict[str, Any],
         db: AsyncSession | None = None,
+        *,
+        commit: bool = True,
     ) -> None:
-        """Отправить событие всем подписчикам."""
+        """Отправить событие всем подписчикам.
+
+        Webhooks не отправляются синхронно: доставки ставятся в outbox через
+        ``db`` и уходят фоновым воркером. ``commit=False`` оставляет фиксацию
+        транзакции вызывающему коду.
+        """
         event_data = {
             'type': event_type,
             'payload': payload,
@@ -77,9 +84,12 @@ class EventEmitter:
         # Отправляем через WebSocket
         await self._broadcast_to_websockets(event_data)
 
-        # Отправляем webhooks
+        # Ставим webhooks в очередь доставки
         if db:
-            await webhook_service.send_webhook(db, event_type, payload)
+            try:
+                await webhook_service.enqueue(db, event_type, payload, commit=commit)
+            except Exception as error:
+                logger.exception('Failed to enqueue webhooks', event_type=event_type, error=error)
 
     async def _broadcast_to_websockets(self, event_data: dict[str, Any]) -> None:
         """Отправить событие всем подключенным WebSocket клиентам."""
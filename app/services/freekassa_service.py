@@ -12,6 +12,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -333,7 +334,7 @@ class FreekassaService:
 
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(trace_configs=http_client_trace_configs('freekassa')) as session,
                 session.post(
                     f'{API_BASE_URL}/orders/create',
                     json=params,
@@ -399,7 +400,7 @@ class FreekassaService:
 
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(trace_configs=http_client_trace_configs('freekassa')) as session,
                 session.post(
                     f'{API_BASE_URL}/orders',
                     json=params,
@@ -424,7 +425,7 @@ class FreekassaService:
 
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(trace_configs=http_client_trace_configs('freekassa')) as session,
                 session.post(
                     f'{API_BASE_URL}/balance',
                     json=params,
@@ -447,7 +448,7 @@ class FreekassaService:
 
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(trace_configs=http_client_trace_configs('freekassa')) as session,
                 session.post(
                     f'{API_BASE_URL}/currencies',
                     json=params,
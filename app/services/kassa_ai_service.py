@@ -10,6 +10,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -55,7 +56,7 @@ async def get_public_ip() -> str:
         if _cached_public_ip:
             return _cached_public_ip
 
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=http_client_trace_configs('kassa_ai')) as session:
             for service_url in IP_SERVICES:
                 try:
                     async with session.get(service_url, timeout=aiohttp.ClientTimeout(total=5)) as response:
@@ -195,7 +196,7 @@ class KassaAiService:
 
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(trace_configs=http_client_trace_configs('kassa_ai')) as session,
                 session.post(
                     f'{API_BASE_URL}/orders/create',
                     json=params,
@@ -276,7 +277,7 @@ class KassaAiService:
 
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(trace_configs=http_client_trace_configs('kassa_ai')) as session,
                 session.post(
                     f'{API_BASE_URL}/orders',
                     json=params,
@@ -301,7 +302,7 @@ class KassaAiService:
 
         try:
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(trace_configs=http_client_trace_configs('kassa_ai')) as session,
                 session.post(
                     f'{API_BASE_URL}/balance',
                     json=params,
@@ -28,6 +28,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -73,6 +74,7 @@ class LavaService:
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(
+                trace_configs=http_client_trace_configs('lava'),
                 timeout=aiohttp.ClientTimeout(total=30),
             )
         return self._session
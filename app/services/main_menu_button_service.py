@@ -14,6 +14,7 @@ from app.database.models import (
     MainMenuButtonActionType,
     MainMenuButtonVisibility,
 )
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 
 @dataclass(frozen=True)
@@ -26,6 +27,10 @@ class _MainMenuButtonData:
     display_order: int
 
 
+# Топик межпроцессной инвалидации (см. app.utils.cache_invalidation)
+MAIN_MENU_BUTTONS_TOPIC = 'main_menu_buttons'
+
+
 class MainMenuButtonService:
     _cache: list[_MainMenuButtonData] | None = None
     _lock: asyncio.Lock = asyncio.Lock()
@@ -133,3 +138,10 @@ class MainMenuButtonService:
             )
 
         return None
+
+
+async def _on_main_menu_buttons_invalidated(_keys: frozenset[str] | None) -> None:
+    MainMenuButtonService.invalidate_cache()
+
+
+cache_invalidation_bus.register(MAIN_MENU_BUTTONS_TOPIC, _on_main_menu_buttons_invalidated)
@@ -7,6 +7,7 @@
 - history_service.py - сервис истории изменений
 - stats_service.py - сервис статистики кликов
 - service.py - основной MenuLayoutService
+- template.py - скомпилированный шаблон меню с LRU по сигнатуре контекста
 """
 
 from .constants import (
@@ -20,6 +21,7 @@ from .context import MenuContext
 from .history_service import MenuLayoutHistoryService
 from .service import MenuLayoutService
 from .stats_service import MenuLayoutStatsService
+from .template import CompiledMenuTemplate
 
 
 __all__ = [
@@ -30,6 +32,7 @@ __all__ = [
     # Константы
     'MENU_LAYOUT_CONFIG_KEY',
     # Классы
+    'CompiledMenuTemplate',
     'MenuContext',
     'MenuLayoutHistoryService',
     'MenuLayoutService',
@@ -18,6 +18,7 @@ from app.config import settings
 from app.database.crud.system_setting import upsert_system_setting
 from app.database.models import SystemSetting
 from app.localization.texts import get_texts
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 from .constants import (
     AVAILABLE_CALLBACKS,
@@ -29,25 +30,42 @@ from .constants import (
 from .context import MenuContext
 from .history_service import MenuLayoutHistoryService
 from .stats_service import MenuLayoutStatsService
+from .template import CompiledMenuTemplate
 
 
 logger = structlog.get_logger(__name__)
 
 
+# Топик межпроцессной инвалидации (см. app.utils.cache_invalidation); 'menu_layout' занят меню кабинета
+BOT_MENU_LAYOUT_TOPIC = 'bot_menu_layout'
+
+
 class MenuLayoutService:
     """Сервис для управления конфигурацией меню."""
 
     _cache: dict[str, Any] | None = None
     _cache_updated_at: datetime | None = None
+    _template: CompiledMenuTemplate | None = None
     _lock: asyncio.Lock = asyncio.Lock()
 
     # --- Управление кешем ---
 
     @classmethod
     def invalidate_cache(cls) -> None:
-        """Инвалидировать кеш конфигурации."""
+        """Инвалидировать кеш конфигурации и скомпилированный шаблон меню."""
         cls._cache = None
         cls._cache_updated_at = None
+        cls._template = None
+
+    @classmethod
+    async def get_template(cls, db: AsyncSession) -> CompiledMenuTemplate:
+        """Получить шаблон меню, скомпилированный для текущей версии конфигурации."""
+        config = await cls.get_config(db)
+        template = cls._template
+        if template is None or template.config is not config:
+            template = CompiledMenuTemplate(config, cls)
+            cls._template = template
+        return template
 
     # --- Получение констант и информации ---
 
@@ -258,6 +276,7 @@ class MenuLayoutService:
         )
         await db.commit()
         cls.invalidate_cache()
+        await cache_invalidation_bus.publish(BOT_MENU_LAYOUT_TOPIC)
 
     @classmethod
     async def reset_to_default(cls, db: AsyncSession) -> dict[str, Any]:
@@ -704,11 +723,7 @@ class MenuLayoutService:
     @classmethod
     def _should_skip_simple_subscription_button(cls, context: MenuContext) -> bool:
         show_buy = not (context.has_active_subscription and context.subscription_is_active)
-        return (
-            show_buy
-            and settings.is_multi_tariff_enabled()
-            and settings.SIMPLE_SUBSCRIPTION_ENABLED
-        )
+        return show_buy and settings.is_multi_tariff_enabled() and settings.SIMPLE_SUBSCRIPTION_ENABLED
 
     @classmethod
     def _evaluate_conditions(
@@ -1116,57 +1131,14 @@ class MenuLayoutService:
         db: AsyncSession,
         context: MenuContext,
     ) -> InlineKeyboardMarkup:
-        """Построить клавиатуру меню на основе конфигурации."""
-        config = await cls.get_config(db)
-        texts = get_texts(context.language)
-
-        keyboard_rows: list[list[InlineKeyboardButton]] = []
-        rows_config = config.get('rows', [])
-        buttons_config = config.get('buttons', {})
-
-        for row_config in rows_config:
-            # Проверяем условия строки
-            row_conditions = row_config.get('conditions')
-            if not cls._evaluate_conditions(row_conditions, context):
-                continue
-
-            row_buttons: list[InlineKeyboardButton] = []
-            max_per_row = row_config.get('max_per_row', 2)
-
-            for button_id in row_config.get('buttons', []):
-                if button_id not in buttons_config:
-                    continue
-
-                button_cfg = buttons_config[button_id]
+        """Построить клавиатуру меню на основе конфигурации.
 
-                # Проверяем включена ли кнопка
-                if not button_cfg.get('enabled', True):
-                    continue
-
-                # Проверяем видимость
-                visibility = button_cfg.get('visibility', 'all')
-                if not cls._check_visibility(visibility, context):
-                    continue
-
-                # Проверяем условия кнопки
-                button_conditions = button_cfg.get('conditions')
-                if not cls._evaluate_conditions(button_conditions, context):
-                    continue
-
-                if button_id == 'simple_subscription' and cls._should_skip_simple_subscription_button(context):
-                    continue
-
-                # Строим кнопку (передаём button_id для кастомных кнопок)
-                button = cls._build_button(button_cfg, context, texts, button_id=button_id)
-                if button:
-                    row_buttons.append(button)
-
-            # Добавляем кнопки с учетом max_per_row
-            if row_buttons:
-                for i in range(0, len(row_buttons), max_per_row):
-                    keyboard_rows.append(row_buttons[i : i + max_per_row])
-
-        return InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
+        Раскладка берётся из скомпилированного шаблона: условия и статические
+        кнопки вычисляются один раз на сигнатуру контекста, для пользователя
+        заполняются только динамические кнопки.
+        """
+        template = await cls.get_template(db)
+        return template.render(context)
 
     @classmethod
     async def preview_keyboard(
@@ -1395,3 +1367,10 @@ class MenuLayoutService:
     ) -> list[dict[str, Any]]:
         """Получить последовательности кликов пользователя."""
         return await MenuLayoutStatsService.get_click_sequences(db, user_id, limit)
+
+
+async def _on_menu_layout_invalidated(_keys: frozenset[str] | None) -> None:
+    MenuLayoutService.invalidate_cache()
+
+
+cache_invalidation_bus.register(BOT_MENU_LAYOUT_TOPIC, _on_menu_layout_invalidated)
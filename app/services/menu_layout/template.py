@@ -0,0 +1,267 @@
+"""Скомпилированный шаблон главного меню.
+
+Конфигурация конструктора компилируется один раз на версию: условия строк и
+кнопок раскладываются на атомарные предикаты, статические кнопки рендерятся
+один раз на язык, а итоговая раскладка кешируется в ограниченном LRU по
+компактной сигнатуре контекста (язык + значения предикатов). На каждого
+пользователя заново собираются только кнопки с динамическими плейсхолдерами
+и кнопка connect в режиме direct (её URL зависит от подписки).
+"""
+
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.config import settings
+from app.localization.texts import get_texts
+
+from .context import MenuContext
+
+
+if TYPE_CHECKING:
+    from .service import MenuLayoutService
+
+
+TEMPLATE_CACHE_MAX_SIZE = 256
+
+# Условия и плейсхолдеры, для которых нужна статистика рефералов из БД
+_REFERRAL_CONDITIONS = frozenset({'min_referrals', 'has_referrals'})
+_REFERRAL_PLACEHOLDERS = ('{referral_count}', '{referral_earnings}')
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledButton:
+    """Кнопка, прошедшая статические проверки (enabled, наличие в конфиге)."""
+
+    button_id: str
+    config: dict[str, Any]
+    atoms: tuple[int, ...]
+    is_dynamic: bool
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRow:
+    """Строка меню с индексами предикатов её условий."""
+
+    atoms: tuple[int, ...]
+    max_per_row: int
+    buttons: tuple[CompiledButton, ...]
+
+
+# Слот раскладки: готовая кнопка или кнопка, которую нужно собрать для пользователя
+_Slot = InlineKeyboardButton | CompiledButton
+_Layout = tuple[tuple[int, tuple[_Slot, ...]], ...]
+
+
+class CompiledMenuTemplate:
+    """Шаблон меню для одной версии конфигурации."""
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        service: type[MenuLayoutService],
+        max_size: int = TEMPLATE_CACHE_MAX_SIZE,
+    ) -> None:
+        self.config = config
+        self._service = service
+        self._max_size = max_size
+        self._atoms: list[Callable[[MenuContext], bool]] = []
+        self._atom_index: dict[tuple[str, str], int] = {}
+        self._static_buttons: dict[tuple[str, str, bool], InlineKeyboardButton | None] = {}
+        self._layouts: OrderedDict[tuple[Any, ...], _Layout] = OrderedDict()
+        self.needs_referral_stats = False
+        self.hits = 0
+        self.misses = 0
+        self.rows = self._compile_rows()
+
+    # --- Компиляция ---
+
+    def _add_atom(self, key: tuple[str, str], predicate: Callable[[MenuContext], bool]) -> int:
+        index = self._atom_index.get(key)
+        if index is None:
+            index = len(self._atoms)
+            self._atoms.append(predicate)
+            self._atom_index[key] = index
+        return index
+
+    def _compile_conditions(self, conditions: dict[str, Any] | None) -> list[int]:
+        """Разложить условия на независимые предикаты.
+
+        ``_evaluate_conditions`` — конъюнкция проверок, каждая из которых читает
+        только свой ключ, поэтому вычисление по одному ключу эквивалентно исходному.
+        """
+        if not conditions:
+            return []
+
+        evaluate = self._service._evaluate_conditions
+        atoms: list[int] = []
+        for name, value in conditions.items():
+            if value is None or value is False or value == []:
+                continue
+            if name in _REFERRAL_CONDITIONS:
+                self.needs_referral_stats = True
+            single = {name: value}
+            key = ('condition', json.dumps(single, sort_keys=True, default=str))
+            atoms.append(self._add_atom(key, lambda context, single=single: evaluate(single, context)))
+        return atoms
+
+    def _compile_rows(self) -> tuple[CompiledRow, ...]:
+        service = self._service
+        buttons_config = self.config.get('buttons', {})
+        rows: list[CompiledRow] = []
+
+        for row_config in self.config.get('rows', []):
+            row_atoms = self._compile_conditions(row_config.get('conditions'))
+            compiled_buttons: list[CompiledButton] = []
+
+            for button_id in row_config.get('buttons', []):
+                button_cfg = buttons_config.get(button_id)
+                if button_cfg is None or not button_cfg.get('enabled', True):
+                    continue
+
+                atoms: list[int] = []
+                visibility = button_cfg.get('visibility', 'all')
+                if visibility != 'all':
+                    atoms.append(
+                        self._add_atom(
+                            ('visibility', visibility),
+                            lambda context, visibility=visibility: service._check_visibility(visibility, context),
+                        )
+                    )
+                atoms.extend(self._compile_conditions(button_cfg.get('conditions')))
+                if button_id == 'simple_subscription':
+                    atoms.append(
+                        self._add_atom(
+                            ('skip_simple_subscription', ''),
+                            lambda context: not service._should_skip_simple_subscription_button(context),
+                        )
+                    )
+
+                compiled_buttons.append(
+                    CompiledButton(
+                        button_id=button_id,
+                        config=button_cfg,
+                        atoms=tuple(atoms),
+                        is_dynamic=self._is_dynamic_button(button_id, button_cfg),
+                    )
+                )
+
+            if compiled_buttons:
+                rows.append(
+                    CompiledRow(
+                        atoms=tuple(row_atoms),
+                        max_per_row=row_config.get('max_per_row', 2),
+                        buttons=tuple(compiled_buttons),
+                    )
+                )
+
+        return tuple(rows)
+
+    def _is_dynamic_button(self, button_id: str, button_cfg: dict[str, Any]) -> bool:
+        """Определить, зависит ли кнопка от данных конкретного пользователя."""
+        text_config = button_cfg.get('text', {})
+        if button_cfg.get('dynamic_text') and self._service._text_has_placeholders(text_config):
+            if any(
+                placeholder in text
+                for text in text_config.values()
+                if isinstance(text, str)
+                for placeholder in _REFERRAL_PLACEHOLDERS
+            ):
+                self.needs_referral_stats = True
+            return True
+
+        # Кнопка connect в режиме direct берёт URL из подписки пользователя
+        if button_cfg.get('type', 'builtin') == 'builtin' and button_cfg.get('open_mode') == 'direct':
+            action = str(button_cfg.get('action', ''))
+            return 'connect' in str(button_id).lower() or 'connect' in action.lower()
+
+        return False
+
+    # --- Рендеринг ---
+
+    def signature(self, context: MenuContext) -> tuple[Any, ...]:
+        """Компактная сигнатура контекста: язык, режим тарифов и значения предикатов."""
+        return (
+            context.language,
+            settings.is_multi_tariff_enabled(),
+            *(predicate(context) for predicate in self._atoms),
+        )
+
+    def _static_button(
+        self,
+        button: CompiledButton,
+        context: MenuContext,
+        multi_tariff: bool,
+    ) -> InlineKeyboardButton | None:
+        key = (button.button_id, context.language, multi_tariff)
+        if key not in self._static_buttons:
+            # Статическим кнопкам тексты не нужны: плейсхолдеров в них нет
+            self._static_buttons[key] = self._service._build_button(
+                button.config, context, None, button_id=button.button_id
+            )
+        return self._static_buttons[key]
+
+    def _build_layout(self, signature: tuple[Any, ...], context: MenuContext) -> _Layout:
+        flags = signature[2:]
+        multi_tariff = signature[1]
+        layout: list[tuple[int, tuple[_Slot, ...]]] = []
+
+        for row in self.rows:
+            if not all(flags[index] for index in row.atoms):
+                continue
+
+            slots: list[_Slot] = []
+            for button in row.buttons:
+                if not all(flags[index] for index in button.atoms):
+                    continue
+                if button.is_dynamic:
+                    slots.append(button)
+                    continue
+                static = self._static_button(button, context, multi_tariff)
+                if static is not None:
+                    slots.append(static)
+
+            if slots:
+                layout.append((row.max_per_row, tuple(slots)))
+
+        return tuple(layout)
+
+    def render(self, context: MenuContext) -> InlineKeyboardMarkup:
+        """Собрать клавиатуру для пользователя."""
+        signature = self.signature(context)
+        layout = self._layouts.get(signature)
+        if layout is None:
+            self.misses += 1
+            layout = self._build_layout(signature, context)
+            self._layouts[signature] = layout
+            if len(self._layouts) > self._max_size:
+                self._layouts.popitem(last=False)
+        else:
+            self.hits += 1
+            self._layouts.move_to_end(signature)
+
+        texts = None
+        keyboard_rows: list[list[InlineKeyboardButton]] = []
+        for max_per_row, slots in layout:
+            row_buttons: list[InlineKeyboardButton] = []
+            for slot in slots:
+                if isinstance(slot, CompiledButton):
+                    if texts is None:
+                        texts = get_texts(context.language)
+                    built = self._service._build_button(slot.config, context, texts, button_id=slot.button_id)
+                    if built is None:
+                        continue
+                    row_buttons.append(built)
+                else:
+                    row_buttons.append(slot)
+
+            for i in range(0, len(row_buttons), max_per_row):
+                keyboard_rows.append(row_buttons[i : i + max_per_row])
+
+        return InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
@@ -61,6 +61,7 @@ from app.services.promo_offer_service import promo_offer_service
 from app.services.subscription_service import SubscriptionService, get_traffic_reset_strategy
 from app.utils.cache import cache
 from app.utils.message_patch import caption_exceeds_telegram_limit
+from app.utils.metrics import track_loop
 from app.utils.miniapp_buttons import build_miniapp_or_callback_button
 from app.utils.promo_offer import get_user_active_promo_discount_percent
 from app.utils.subscription_utils import (
@@ -225,7 +226,8 @@ class MonitoringService:
 
         while self.is_running:
             try:
-                await self._monitoring_cycle()
+                with track_loop('monitoring'):
+                    await self._monitoring_cycle()
                 await asyncio.sleep(settings.MONITORING_INTERVAL * 60)
 
             except Exception as e:
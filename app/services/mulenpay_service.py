@@ -7,6 +7,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -52,7 +53,9 @@ class MulenPayService:
         for attempt in range(1, self._max_retries + 1):
             try:
                 async with (
-                    aiohttp.ClientSession(timeout=self._timeout) as session,
+                    aiohttp.ClientSession(
+                        timeout=self._timeout, trace_configs=http_client_trace_configs('mulenpay')
+                    ) as session,
                     session.request(
                         method,
                         url,
@@ -1,10 +1,13 @@
 """Фоновый сервис для обработки очереди чеков NaloGO.
 
 При временной недоступности сервиса nalog.ru (503), чеки сохраняются в Redis
-и отправляются позже этим сервисом.
+и отправляются позже этим сервисом. Взятый в отправку чек остаётся в Redis до
+подтверждения: после падения процесса он вернётся в очередь и перед повторной
+отправкой будет проверен по доходам за день.
 """
 
 import asyncio
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 
 import structlog
@@ -12,13 +15,39 @@ from aiogram import Bot
 from dateutil.parser import isoparse
 
 from app.config import settings
-from app.services.nalogo_service import NaloGoService
+from app.services.nalogo_service import NaloGoService, ReceiptMaybeCreatedError
 from app.utils.cache import cache
+from app.utils.metrics import QUEUE_DEPTH, metrics, track_loop
 
 
 logger = structlog.get_logger(__name__)
 
 
+@dataclass(slots=True)
+class _QueueRun:
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    processed_amount: float = 0.0
+    service_unavailable: bool = False
+
+
+class _SubmissionPacer:
+    """Разносит начала отправок минимум на ``delay`` секунд — лимит запросов nalog.ru."""
+
+    def __init__(self, delay: float) -> None:
+        self._delay = delay
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    async def wait(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            if self._next_at > loop.time():
+                await asyncio.sleep(self._next_at - loop.time())
+            self._next_at = loop.time() + self._delay
+
+
 class NalogoQueueService:
     """Сервис фоновой обработки очереди чеков NaloGO."""
 
@@ -53,6 +82,16 @@ class NalogoQueueService:
         """Задержка между отправкой чеков в секундах."""
         return getattr(settings, 'NALOGO_QUEUE_RECEIPT_DELAY', 3)
 
+    @property
+    def _concurrency(self) -> int:
+        """Сколько чеков отправляется одновременно."""
+        return max(1, getattr(settings, 'NALOGO_QUEUE_CONCURRENCY', 2))
+
+    @property
+    def _visibility_timeout(self) -> int:
+        """Через сколько секунд неподтверждённый чек возвращается в очередь."""
+        return getattr(settings, 'NALOGO_QUEUE_VISIBILITY_TIMEOUT', 300)
+
     @property
     def _max_attempts(self) -> int:
         """Максимальное количество попыток отправки чека."""
@@ -70,10 +109,12 @@ class NalogoQueueService:
 
         self._running = True
         self._task = asyncio.create_task(self._process_queue_loop())
+        metrics.register_collector('nalogo_queue', self._collect_queue_depth)
         logger.info(
             'Сервис очереди чеков NaloGO запущен',
             _check_interval=self._check_interval,
             _receipt_delay=self._receipt_delay,
+            concurrency=self._concurrency,
         )
 
     async def stop(self) -> None:
@@ -123,17 +164,24 @@ class NalogoQueueService:
         """Основной цикл обработки очереди."""
         while self._running:
             try:
-                await self._process_pending_receipts()
+                with track_loop('nalogo_receipts'):
+                    await self._process_pending_receipts()
             except Exception as error:
                 logger.error('Ошибка в цикле обработки очереди чеков', error=error)
 
             await asyncio.sleep(self._check_interval)
 
+    async def _collect_queue_depth(self) -> None:
+        if self._nalogo_service:
+            QUEUE_DEPTH.labels('nalogo_receipts').set(await self._nalogo_service.get_queue_length())
+
     async def _process_pending_receipts(self) -> None:
         """Обработать все ожидающие чеки в очереди."""
         if not self._nalogo_service:
             return
 
+        await self._nalogo_service.reclaim_expired_receipts(self._visibility_timeout)
+
         queue_length = await self._nalogo_service.get_queue_length()
         if queue_length == 0:
             return
@@ -141,131 +189,24 @@ class NalogoQueueService:
         logger.info('Начинаем обработку очереди чеков: шт.', queue_length=queue_length)
         self._had_pending_receipts = True
 
-        processed = 0
-        failed = 0
-        skipped = 0
-        total_processed_amount = 0.0
-        service_unavailable = False
-
-        while True:
-            receipt_data = await self._nalogo_service.pop_receipt_from_queue()
-            if not receipt_data:
-                break
-
-            attempts = receipt_data.get('attempts', 0)
-            payment_id = receipt_data.get('payment_id', 'unknown')
-            amount = receipt_data.get('amount', 0)
-
-            # Проверяем лимит попыток
-            if attempts >= self._max_attempts:
-                logger.error(
-                    'Чек превысил максимальное количество попыток, удалён из очереди',
-                    payment_id=payment_id,
-                    attempts=attempts,
-                    max_attempts=self._max_attempts,
-                )
-                # Удаляем метку "в очереди" — чек больше не будет обрабатываться
-                if payment_id and payment_id != 'unknown':
-                    queued_key = f'nalogo:queued:{payment_id}'
-                    await cache.delete(queued_key)
-                failed += 1
-                continue
-
-            # Пытаемся отправить чек
-            try:
-                # Восстанавливаем описание из сохранённых данных
-                telegram_user_id = receipt_data.get('telegram_user_id')
-                amount_kopeks = receipt_data.get('amount_kopeks')
-
-                # Извлекаем время оплаты из очереди (чтобы чек был с правильным временем)
-                operation_time = None
-                created_at_str = receipt_data.get('created_at')
-                if created_at_str:
-                    try:
-                        operation_time = isoparse(created_at_str)
-                        if operation_time.tzinfo is None:
-                            operation_time = operation_time.replace(tzinfo=UTC)
-                    except (ValueError, TypeError) as parse_error:
-                        logger.warning(
-                            'Не удалось распарсить created_at', created_at_str=created_at_str, parse_error=parse_error
-                        )
-
-                # Формируем описание заново из настроек (если есть данные)
-                if amount_kopeks is not None:
-                    receipt_name = settings.get_balance_payment_description(
-                        amount_kopeks, telegram_user_id=telegram_user_id
-                    )
-                else:
-                    # Fallback на сохранённое имя
-                    receipt_name = receipt_data.get(
-                        'name',
-                        settings.get_balance_payment_description(int(amount * 100), telegram_user_id=telegram_user_id),
-                    )
-
-                receipt_uuid = await self._nalogo_service.create_receipt(
-                    name=receipt_name,
-                    amount=amount,
-                    quantity=receipt_data.get('quantity', 1),
-                    client_info=receipt_data.get('client_info'),
-                    payment_id=payment_id,
-                    queue_on_failure=False,  # Не добавлять в очередь повторно автоматически
-                    telegram_user_id=telegram_user_id,
-                    amount_kopeks=amount_kopeks,
-                    operation_time=operation_time,  # Время оплаты, а не отправки
-                )
-
-                if receipt_uuid:
-                    processed += 1
-                    total_processed_amount += amount
-
-                    # Удаляем метку "в очереди" (чек создан успешно)
-                    if payment_id:
-                        queued_key = f'nalogo:queued:{payment_id}'
-                        await cache.delete(queued_key)
-
-                    logger.info(
-                        'Чек из очереди успешно создан',
-                        receipt_uuid=receipt_uuid,
-                        payment_id=payment_id,
-                        attempts=attempts + 1,
-                    )
-                else:
-                    # Вернуть в очередь с увеличенным счетчиком попыток
-                    await self._nalogo_service.requeue_receipt(receipt_data)
-                    failed += 1
-                    service_unavailable = True
-                    logger.warning(
-                        'Не удалось создать чек из очереди, возвращён в очередь',
-                        payment_id=payment_id,
-                        attempts=attempts + 1,
-                        _max_attempts=self._max_attempts,
-                    )
-                    # Если сервис недоступен, прекращаем попытки до следующего цикла
-                    break
-
-            except Exception as error:
-                await self._nalogo_service.requeue_receipt(receipt_data)
-                failed += 1
-                logger.error('Ошибка при создании чека из очереди', payment_id=payment_id, error=error)
-                # Прекращаем попытки при ошибке
-                break
-
-            # Задержка между чеками чтобы не долбить API
-            await asyncio.sleep(self._receipt_delay)
+        run = _QueueRun()
+        pacer = _SubmissionPacer(self._receipt_delay)
+        workers = min(self._concurrency, queue_length)
+        await asyncio.gather(*(self._receipt_worker(run, pacer) for _ in range(workers)))
 
-        if processed > 0 or failed > 0 or skipped > 0:
+        if run.processed > 0 or run.failed > 0 or run.skipped > 0:
             logger.info(
                 'Обработка очереди завершена',
-                processed=processed,
-                failed=failed,
-                skipped=skipped,
+                processed=run.processed,
+                failed=run.failed,
+                skipped=run.skipped,
             )
 
         # Проверяем остаток в очереди
         remaining = await self._nalogo_service.get_queue_length()
 
         # Отправляем уведомление если есть проблемы
-        if service_unavailable or failed > 0:
+        if run.service_unavailable or run.failed > 0:
             if remaining > 0:
                 queued = await self._nalogo_service.get_queued_receipts()
                 total_queued_amount = sum(r.get('amount', 0) for r in queued)
@@ -280,16 +221,152 @@ class NalogoQueueService:
                 await self._send_admin_notification(message)
 
         # Уведомление об успешной разгрузке очереди
-        elif remaining == 0 and self._had_pending_receipts and processed > 0:
+        elif remaining == 0 and self._had_pending_receipts and run.processed > 0:
             self._had_pending_receipts = False
             message = (
                 f'<b>✅ Очередь чеков NaloGO разгружена</b>\n\n'
                 f'Все отложенные чеки успешно отправлены!\n\n'
-                f'📋 <b>Отправлено:</b> {processed} чек(ов)\n'
-                f'💰 <b>На сумму:</b> {total_processed_amount:,.2f} ₽'
+                f'📋 <b>Отправлено:</b> {run.processed} чек(ов)\n'
+                f'💰 <b>На сумму:</b> {run.processed_amount:,.2f} ₽'
             )
             await self._send_admin_notification(message, skip_cooldown=True)
 
+    async def _receipt_worker(self, run: _QueueRun, pacer: _SubmissionPacer) -> None:
+        """Брать чеки из очереди, пока она не опустеет или сервис не станет недоступен."""
+        while not run.service_unavailable:
+            await pacer.wait()
+            if run.service_unavailable:
+                return
+            claimed = await self._nalogo_service.claim_receipt(self._visibility_timeout)
+            if claimed is None:
+                return
+            claim, receipt_data = claimed
+            await self._process_receipt(claim, receipt_data, run)
+
+    async def _forget_queued(self, payment_id: str | None) -> None:
+        # Удаляем метку "в очереди" — чек больше не будет обрабатываться
+        if payment_id and payment_id != 'unknown':
+            await cache.delete(f'nalogo:queued:{payment_id}')
+
+    async def _process_receipt(self, claim: str, receipt_data: dict, run: _QueueRun) -> None:
+        """Отправить один взятый чек; из очереди он удаляется только после подтверждения."""
+        attempts = receipt_data.get('attempts', 0)
+        payment_id = receipt_data.get('payment_id', 'unknown')
+        amount = receipt_data.get('amount', 0)
+
+        # Проверяем лимит попыток
+        if attempts >= self._max_attempts:
+            logger.error(
+                'Чек превысил максимальное количество попыток, удалён из очереди',
+                payment_id=payment_id,
+                attempts=attempts,
+                max_attempts=self._max_attempts,
+            )
+            await self._forget_queued(payment_id)
+            await self._nalogo_service.ack_receipt(claim)
+            run.failed += 1
+            return
+
+        # Пытаемся отправить чек
+        try:
+            # Восстанавливаем описание из сохранённых данных
+            telegram_user_id = receipt_data.get('telegram_user_id')
+            amount_kopeks = receipt_data.get('amount_kopeks')
+
+            # Извлекаем время оплаты из очереди (чтобы чек был с правильным временем)
+            operation_time = None
+            created_at_str = receipt_data.get('created_at')
+            if created_at_str:
+                try:
+                    operation_time = isoparse(created_at_str)
+                    if operation_time.tzinfo is None:
+                        operation_time = operation_time.replace(tzinfo=UTC)
+                except (ValueError, TypeError) as parse_error:
+                    logger.warning(
+                        'Не удалось распарсить created_at', created_at_str=created_at_str, parse_error=parse_error
+                    )
+
+            # Повторная попытка после сбоя: чек мог быть создан, хотя ответ не получен
+            if receipt_data.get('check_duplicate') and operation_time is not None:
+                duplicate_uuid = await self._nalogo_service.find_duplicate_receipt(amount, operation_time)
+                if duplicate_uuid:
+                    await self._nalogo_service.bind_receipt(payment_id, duplicate_uuid)
+                    await self._forget_queued(payment_id)
+                    await self._nalogo_service.ack_receipt(claim)
+                    run.skipped += 1
+                    logger.info(
+                        'Чек из очереди уже создан в налоговой, повторно не отправляется',
+                        receipt_uuid=duplicate_uuid,
+                        payment_id=payment_id,
+                    )
+                    return
+
+            # Формируем описание заново из настроек (если есть данные)
+            if amount_kopeks is not None:
+                receipt_name = settings.get_balance_payment_description(
+                    amount_kopeks, telegram_user_id=telegram_user_id
+                )
+            else:
+                # Fallback на сохранённое имя
+                receipt_name = receipt_data.get(
+                    'name',
+                    settings.get_balance_payment_description(int(amount * 100), telegram_user_id=telegram_user_id),
+                )
+
+            receipt_uuid = await self._nalogo_service.create_receipt(
+                name=receipt_name,
+                amount=amount,
+                quantity=receipt_data.get('quantity', 1),
+                client_info=receipt_data.get('client_info'),
+                payment_id=payment_id,
+                queue_on_failure=False,  # Не добавлять в очередь повторно автоматически
+                telegram_user_id=telegram_user_id,
+                amount_kopeks=amount_kopeks,
+                operation_time=operation_time,  # Время оплаты, а не отправки
+                raise_if_uncertain=True,
+            )
+
+            if receipt_uuid:
+                run.processed += 1
+                run.processed_amount += amount
+
+                # Удаляем метку "в очереди" (чек создан успешно)
+                await self._forget_queued(payment_id)
+                await self._nalogo_service.ack_receipt(claim)
+
+                logger.info(
+                    'Чек из очереди успешно создан',
+                    receipt_uuid=receipt_uuid,
+                    payment_id=payment_id,
+                    attempts=attempts + 1,
+                )
+            else:
+                # Вернуть в очередь с увеличенным счетчиком попыток
+                await self._nalogo_service.requeue_receipt(receipt_data, claim)
+                run.failed += 1
+                # Если сервис недоступен, прекращаем попытки до следующего цикла
+                run.service_unavailable = True
+                logger.warning(
+                    'Не удалось создать чек из очереди, возвращён в очередь',
+                    payment_id=payment_id,
+                    attempts=attempts + 1,
+                    _max_attempts=self._max_attempts,
+                )
+
+        except ReceiptMaybeCreatedError as error:
+            # Ответ не получен — следующая попытка сначала поищет созданный чек
+            await self._nalogo_service.requeue_receipt(receipt_data, claim, check_duplicate=True)
+            run.failed += 1
+            run.service_unavailable = True
+            logger.warning('Таймаут создания чека из очереди, чек мог быть создан', payment_id=payment_id, error=error)
+
+        except Exception as error:
+            await self._nalogo_service.requeue_receipt(receipt_data, claim)
+            run.failed += 1
+            # Прекращаем попытки при ошибке
+            run.service_unavailable = True
+            logger.error('Ошибка при создании чека из очереди', payment_id=payment_id, error=error)
+
     async def force_process(self) -> dict:
         """Принудительно обработать очередь (для ручного запуска)."""
         if not self._nalogo_service:
@@ -334,6 +411,7 @@ class NalogoQueueService:
             'running': self.is_running(),
             'check_interval_seconds': self._check_interval,
             'receipt_delay_seconds': self._receipt_delay,
+            'concurrency': self._concurrency,
             'queue_length': queue_length,
             'total_amount': total_amount,
             'max_attempts': self._max_attempts,
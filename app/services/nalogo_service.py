@@ -1,8 +1,13 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
 from datetime import UTC, date, datetime, timedelta
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from typing import Any
 
 import structlog
+from dateutil.parser import isoparse
 
 from app.config import settings
 
@@ -16,7 +21,131 @@ from app.utils.proxy import mask_proxy_url, sanitize_proxy_error
 logger = structlog.get_logger(__name__)
 
 NALOGO_QUEUE_KEY = 'nalogo:receipt_queue'
+# Чеки, взятые в отправку: удаляются только после подтверждения (at-least-once)
+NALOGO_PROCESSING_KEY = 'nalogo:receipt_processing'
+# Срок обработки каждого взятого чека (ZSET: запись → unix-время истечения)
+NALOGO_LEASES_KEY = 'nalogo:receipt_leases'
 NALOGO_PENDING_VERIFICATION_KEY = 'nalogo:pending_verification'
+# Чек → платёж, за которым он закреплён: такой чек не считается дублем другого платежа
+NALOGO_RECEIPT_PAYMENT_KEY = 'nalogo:receipt_payment:{receipt_uuid}'
+_CREATED_TTL_SECONDS = 30 * 24 * 3600
+
+_INCOME_PAGE_SIZE = 100
+_INCOME_INDEX_DAYS = 7
+
+
+def _income_uuid(income: dict[str, Any]) -> str | None:
+    return income.get('approvedReceiptUuid', income.get('receiptUuid'))
+
+
+class ReceiptMaybeCreatedError(Exception):
+    """Запрос на создание чека ушёл, но ответа нет: чек мог быть создан."""
+
+
+@dataclass(slots=True)
+class _IndexedDay:
+    receipts: dict[tuple[int, int], list[tuple[str, float]]] = field(default_factory=dict)
+    uuids: set[str] = field(default_factory=set)
+    refreshed_at: float = 0.0
+    # С какого времени операции данные свежие на refreshed_at; None — весь день
+    covered_from: datetime | None = None
+
+
+class IncomeIndex:
+    """Локальный индекс доходов NaloGO по дням: (сумма в копейках, минута операции) → чеки.
+
+    День загружается целиком один раз, дальше дочитывается только начало списка
+    (новые операции) — не чаще раза в ``refresh_interval`` секунд. Чеки, уже
+    сопоставленные с платежом (claimed), повторно дубликатом не считаются.
+    """
+
+    def __init__(self, refresh_interval: float, keep_days: int = _INCOME_INDEX_DAYS) -> None:
+        self.refresh_interval = refresh_interval
+        self.keep_days = keep_days
+        self._days: dict[date, _IndexedDay] = {}
+        # Сопоставленные чеки → день операции; хранятся и для дней, ещё не загруженных в индекс
+        self._claimed: dict[str, date] = {}
+
+    def has_day(self, day: date) -> bool:
+        return day in self._days
+
+    def needs_refresh(self, day: date, covered_from: datetime) -> bool:
+        indexed = self._days.get(day)
+        if indexed is None or time.monotonic() - indexed.refreshed_at >= self.refresh_interval:
+            return True
+        return indexed.covered_from is not None and covered_from < indexed.covered_from
+
+    def mark_refreshed(self, day: date, covered_from: datetime | None) -> None:
+        indexed = self._day(day)
+        indexed.refreshed_at = time.monotonic()
+        indexed.covered_from = covered_from
+
+    def add_incomes(self, day: date, incomes: list[dict[str, Any]]) -> datetime | None:
+        """Добавить страницу доходов; возвращает самое раннее время операции на странице."""
+        indexed = self._day(day)
+        oldest = None
+        for income in incomes:
+            try:
+                operation_time = isoparse(income['operationTime'])
+                amount = Decimal(str(income.get('totalAmount', income.get('amount', 0))))
+            except (KeyError, TypeError, ValueError, InvalidOperation):
+                continue
+            if operation_time.tzinfo is None:
+                operation_time = operation_time.replace(tzinfo=UTC)
+            if oldest is None or operation_time < oldest:
+                oldest = operation_time
+            receipt_uuid = _income_uuid(income)
+            if receipt_uuid:
+                self._add(indexed, receipt_uuid, int(amount * 100), operation_time)
+        return oldest
+
+    def add(self, receipt_uuid: str, amount_kopeks: int, operation_time: datetime) -> None:
+        """Учесть чек, созданный этим процессом (день без индекса подтянется при загрузке)."""
+        indexed = self._days.get(operation_time.date())
+        if indexed is not None:
+            self._add(indexed, receipt_uuid, amount_kopeks, operation_time)
+        self.claim(receipt_uuid, operation_time.date())
+
+    def claim(self, receipt_uuid: str, day: date | None = None) -> None:
+        if day is None:
+            day = next((d for d, indexed in self._days.items() if receipt_uuid in indexed.uuids), date.today())
+        self._claimed[receipt_uuid] = day
+
+    def find(self, amount_kopeks: int, at: datetime, window: timedelta) -> str | None:
+        """Ближайший по времени несопоставленный чек с такой суммой в окне ±window."""
+        return next(iter(self.candidates(amount_kopeks, at, window)), None)
+
+    def candidates(self, amount_kopeks: int, at: datetime, window: timedelta) -> list[str]:
+        """Несопоставленные чеки с такой суммой в окне ±window, ближайшие по времени первыми."""
+        target = at.timestamp()
+        first_minute = int((target - window.total_seconds()) // 60)
+        last_minute = int((target + window.total_seconds()) // 60)
+        found: list[tuple[float, str]] = []
+        for indexed in self._days.values():
+            for minute in range(first_minute, last_minute + 1):
+                for receipt_uuid, timestamp in indexed.receipts.get((amount_kopeks, minute), ()):
+                    distance = abs(timestamp - target)
+                    if receipt_uuid not in self._claimed and distance <= window.total_seconds():
+                        found.append((distance, receipt_uuid))
+        return [receipt_uuid for _, receipt_uuid in sorted(found)]
+
+    def _day(self, day: date) -> _IndexedDay:
+        indexed = self._days.get(day)
+        if indexed is None:
+            indexed = self._days[day] = _IndexedDay()
+            for stale in sorted(self._days)[: -self.keep_days]:
+                del self._days[stale]
+            oldest = min(self._days)
+            self._claimed = {uuid: claimed_day for uuid, claimed_day in self._claimed.items() if claimed_day >= oldest}
+        return indexed
+
+    @staticmethod
+    def _add(indexed: _IndexedDay, receipt_uuid: str, amount_kopeks: int, operation_time: datetime) -> None:
+        if receipt_uuid in indexed.uuids:
+            return
+        indexed.uuids.add(receipt_uuid)
+        timestamp = operation_time.timestamp()
+        indexed.receipts.setdefault((amount_kopeks, int(timestamp // 60)), []).append((receipt_uuid, timestamp))
 
 
 class NaloGoService:
@@ -35,6 +164,8 @@ class NaloGoService:
         storage_path = storage_path or getattr(settings, 'NALOGO_STORAGE_PATH', './nalogo_tokens.json')
 
         self.configured = False
+        self._auth_lock = asyncio.Lock()
+        self._income_index = IncomeIndex(refresh_interval=getattr(settings, 'NALOGO_INCOME_INDEX_REFRESH_SECONDS', 300))
 
         if not inn or not password:
             logger.warning('NaloGO INN или PASSWORD не настроены в settings. Функционал чеков будет ОТКЛЮЧЕН.')
@@ -294,6 +425,13 @@ class NaloGoService:
                 logger.error('Ошибка аутентификации в NaloGO', error=sanitize_proxy_error(error))
             return False
 
+    async def _ensure_authenticated(self) -> bool:
+        """Получить токен, если его нет; параллельные отправки ждут одну аутентификацию."""
+        async with self._auth_lock:
+            if getattr(self.client, '_access_token', None):
+                return True
+            return await self.authenticate()
+
     async def create_receipt(
         self,
         name: str,
@@ -305,6 +443,7 @@ class NaloGoService:
         telegram_user_id: int | None = None,
         amount_kopeks: int | None = None,
         operation_time: datetime | None = None,
+        raise_if_uncertain: bool = False,
     ) -> str | None:
         """Создание чека о доходе.
 
@@ -318,6 +457,8 @@ class NaloGoService:
             telegram_user_id: Telegram ID пользователя для формирования описания
             amount_kopeks: Сумма в копейках для формирования описания
             operation_time: Время операции (по умолчанию текущее)
+            raise_if_uncertain: При таймауте после аутентификации бросить
+                ``ReceiptMaybeCreatedError`` вместо записи на ручную проверку
 
         Returns:
             UUID чека или None при ошибке
@@ -341,15 +482,13 @@ class NaloGoService:
         # ЭТАП 1: Аутентификация
         # Если не прошла — чек точно не создавался, безопасно добавить в очередь
         try:
-            if not hasattr(self.client, '_access_token') or not self.client._access_token:
-                auth_success = await self.authenticate()
-                if not auth_success:
-                    # Аутентификация не прошла — чек не создавался, безопасно в очередь
-                    if queue_on_failure:
-                        await self._queue_receipt(
-                            name, amount, quantity, client_info, payment_id, telegram_user_id, amount_kopeks
-                        )
-                    return None
+            if not await self._ensure_authenticated():
+                # Аутентификация не прошла — чек не создавался, безопасно в очередь
+                if queue_on_failure:
+                    await self._queue_receipt(
+                        name, amount, quantity, client_info, payment_id, telegram_user_id, amount_kopeks
+                    )
+                return None
         except Exception as auth_error:
             # Ошибка аутентификации — чек не создавался, безопасно в очередь
             if self._is_service_unavailable(auth_error):
@@ -395,10 +534,12 @@ class NaloGoService:
             if receipt_uuid:
                 logger.info('Чек создан успешно', receipt_uuid=receipt_uuid, amount=amount)
 
+                self._income_index.add(
+                    receipt_uuid, round(amount * quantity * 100), operation_time or datetime.now(UTC)
+                )
+
                 # Сохраняем в Redis чтобы предотвратить дубли (TTL 30 дней)
-                if payment_id:
-                    created_key = f'nalogo:created:{payment_id}'
-                    await cache.set(created_key, receipt_uuid, expire=30 * 24 * 3600)
+                await self.bind_receipt(payment_id, receipt_uuid)
 
                 return receipt_uuid
             logger.error('Ошибка создания чека', result=result)
@@ -408,6 +549,9 @@ class NaloGoService:
             # ВАЖНО: Аутентификация была успешной, запрос на создание чека УШЁЛ
             # При таймауте чек МОГ быть создан на сервере — НЕ добавляем в очередь!
             if self._is_service_unavailable(error):
+                if raise_if_uncertain:
+                    # Вызывающий сам повторит отправку с поиском уже созданного чека
+                    raise ReceiptMaybeCreatedError(sanitize_proxy_error(error)[:200]) from error
                 error_msg = sanitize_proxy_error(error)[:200]
                 logger.error(
                     'ТАЙМАУТ после успешной аутентификации! Чек МОГ быть создан!',
@@ -429,22 +573,152 @@ class NaloGoService:
                 logger.error('Ошибка создания чека в NaloGO', error=sanitize_proxy_error(error))
             return None
 
+    @staticmethod
+    def _queue_redis():
+        if not cache._connected or cache.redis_client is None:
+            return None
+        return cache.redis_client
+
     async def get_queue_length(self) -> int:
-        """Получить количество чеков в очереди."""
-        return await cache.llen(NALOGO_QUEUE_KEY)
+        """Получить количество неподтверждённых чеков: ожидающих и отправляемых."""
+        redis_client = self._queue_redis()
+        if redis_client is None:
+            return 0
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.llen(NALOGO_QUEUE_KEY)
+                pipe.llen(NALOGO_PROCESSING_KEY)
+                pending, processing = await pipe.execute()
+            return int(pending) + int(processing)
+        except Exception as error:
+            logger.error('Ошибка получения длины очереди чеков', error=error)
+            return 0
 
     async def get_queued_receipts(self) -> list:
-        """Получить список чеков в очереди (без удаления)."""
-        return await cache.lrange(NALOGO_QUEUE_KEY)
+        """Получить список чеков в очереди (без удаления), отправляемые — первыми."""
+        return await cache.lrange(NALOGO_PROCESSING_KEY) + await cache.lrange(NALOGO_QUEUE_KEY)
+
+    async def claim_receipt(self, visibility_timeout: int) -> tuple[str, dict[str, Any]] | None:
+        """Взять следующий чек в обработку.
 
-    async def pop_receipt_from_queue(self) -> dict[str, Any] | None:
-        """Извлечь следующий чек из очереди."""
-        return await cache.rpop(NALOGO_QUEUE_KEY)
+        Чек атомарно переносится в список отправляемых (LMOVE) и остаётся там,
+        пока отправка не подтверждена ``ack_receipt`` или чек не возвращён
+        ``requeue_receipt``. Если процесс упал, чек вернётся в очередь
+        ``reclaim_expired_receipts`` по истечении ``visibility_timeout``.
 
-    async def requeue_receipt(self, receipt_data: dict[str, Any]) -> bool:
-        """Вернуть чек обратно в очередь (при неудачной отправке)."""
+        Returns:
+            (claim, данные чека): claim — исходная запись, нужна для ack/requeue
+        """
+        redis_client = self._queue_redis()
+        if redis_client is None:
+            return None
+        try:
+            raw = await redis_client.lmove(NALOGO_QUEUE_KEY, NALOGO_PROCESSING_KEY, 'RIGHT', 'LEFT')
+            if raw is None:
+                return None
+            claim = raw.decode() if isinstance(raw, bytes) else raw
+            await redis_client.zadd(NALOGO_LEASES_KEY, {claim: time.time() + visibility_timeout})
+        except Exception as error:
+            logger.error('Ошибка извлечения чека из очереди', error=error)
+            return None
+        try:
+            return claim, json.loads(claim)
+        except ValueError:
+            logger.error('Повреждённая запись в очереди чеков, удалена', claim=claim[:200])
+            await self.ack_receipt(claim)
+            return None
+
+    async def ack_receipt(self, claim: str) -> bool:
+        """Подтвердить отправку: чек окончательно удаляется из очереди."""
+        redis_client = self._queue_redis()
+        if redis_client is None:
+            return False
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.lrem(NALOGO_PROCESSING_KEY, 1, claim)
+                pipe.zrem(NALOGO_LEASES_KEY, claim)
+                await pipe.execute()
+            return True
+        except Exception as error:
+            logger.error('Ошибка подтверждения чека в очереди', error=error)
+            return False
+
+    async def requeue_receipt(
+        self, receipt_data: dict[str, Any], claim: str | None = None, *, check_duplicate: bool = False
+    ) -> bool:
+        """Вернуть чек обратно в очередь (при неудачной отправке).
+
+        ``check_duplicate`` — запрос на создание мог дойти до сервера без ответа
+        (таймаут): повторная попытка сначала ищет чек в доходах за день. После
+        отказа аутентификации или 503 чек точно не создан, поиск не нужен.
+        Флаг не снимается: чек от прошлой неудачной попытки мог появиться позже.
+        """
+        redis_client = self._queue_redis()
+        if redis_client is None:
+            return False
         receipt_data['attempts'] = receipt_data.get('attempts', 0) + 1
-        return await cache.lpush(NALOGO_QUEUE_KEY, receipt_data)
+        receipt_data['check_duplicate'] = bool(receipt_data.get('check_duplicate')) or check_duplicate
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                if claim is not None:
+                    pipe.lrem(NALOGO_PROCESSING_KEY, 1, claim)
+                    pipe.zrem(NALOGO_LEASES_KEY, claim)
+                pipe.lpush(NALOGO_QUEUE_KEY, json.dumps(receipt_data, default=str))
+                await pipe.execute()
+            return True
+        except Exception as error:
+            logger.error('Ошибка возврата чека в очередь', payment_id=receipt_data.get('payment_id'), error=error)
+            return False
+
+    async def reclaim_expired_receipts(self, visibility_timeout: int) -> int:
+        """Вернуть в начало очереди чеки, чья обработка не подтверждена вовремя (падение процесса)."""
+        redis_client = self._queue_redis()
+        if redis_client is None:
+            return 0
+        try:
+            in_flight = await redis_client.lrange(NALOGO_PROCESSING_KEY, 0, -1)
+            if not in_flight:
+                return 0
+            leases = dict(await redis_client.zrange(NALOGO_LEASES_KEY, 0, -1, withscores=True))
+            now = time.time()
+            reclaimed = 0
+            for raw in in_flight:
+                deadline = leases.get(raw)
+                claim = raw.decode() if isinstance(raw, bytes) else raw
+                if deadline is None:
+                    # Упали между LMOVE и ZADD — отсчитываем таймаут с текущего момента
+                    await redis_client.zadd(NALOGO_LEASES_KEY, {claim: now + visibility_timeout}, nx=True)
+                    continue
+                if deadline > now:
+                    continue
+                try:
+                    receipt_data = json.loads(claim)
+                except ValueError:
+                    await self.ack_receipt(claim)
+                    continue
+                # Чек мог быть создан до падения — перед повторной отправкой ищем его в доходах
+                receipt_data['check_duplicate'] = True
+                async with redis_client.pipeline(transaction=True) as pipe:
+                    pipe.lrem(NALOGO_PROCESSING_KEY, 1, claim)
+                    pipe.zrem(NALOGO_LEASES_KEY, claim)
+                    pipe.rpush(NALOGO_QUEUE_KEY, json.dumps(receipt_data, default=str))
+                    await pipe.execute()
+                reclaimed += 1
+            if reclaimed:
+                logger.warning('Чеки с истёкшей обработкой возвращены в очередь', reclaimed=reclaimed)
+            return reclaimed
+        except Exception as error:
+            logger.error('Ошибка возврата зависших чеков в очередь', error=error)
+            return 0
+
+    async def bind_receipt(self, payment_id: str | None, receipt_uuid: str) -> None:
+        """Закрепить чек за платежом: повторно он не создаётся и дублем другого платежа не считается."""
+        if not payment_id or payment_id == 'unknown':
+            return
+        await cache.set(f'nalogo:created:{payment_id}', receipt_uuid, expire=_CREATED_TTL_SECONDS)
+        await cache.set(
+            NALOGO_RECEIPT_PAYMENT_KEY.format(receipt_uuid=receipt_uuid), payment_id, expire=_CREATED_TTL_SECONDS
+        )
 
     async def find_duplicate_receipt(
         self,
@@ -455,7 +729,10 @@ class NaloGoService:
         """Проверяет, не был ли уже создан чек с такой суммой в заданном временном окне.
 
         Используется для защиты от дублей при таймаутах — когда сервер создал чек,
-        но ответ не вернулся.
+        но ответ не вернулся. Доходы за день загружаются один раз в локальный
+        индекс (сумма, минута) и дочитываются только до начала окна поиска.
+        Чеки, уже закреплённые за другим платежом (в том числе другим
+        процессом), пропускаются.
 
         Args:
             amount: Сумма чека в рублях
@@ -468,65 +745,66 @@ class NaloGoService:
         if not self.configured:
             return None
 
-        try:
-            # Запрашиваем чеки за день когда был создан запрос
-            from_date = created_at.date()
-            to_date = from_date + timedelta(days=1)
-
-            incomes = await self.get_incomes(
-                from_date=from_date,
-                to_date=to_date,
-                limit=50,
-            )
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=UTC)
+        window = timedelta(minutes=time_window_minutes)
+        amount_kopeks = round(amount * 100)
 
-            if not incomes:
-                return None
-
-            # Ищем чек с такой же суммой в пределах временного окна
-            for income in incomes:
-                income_amount = float(income.get('totalAmount', income.get('amount', 0)))
+        try:
+            days = {(created_at - window).date(), (created_at + window).date()}
+            for day in sorted(days):
+                if not await self._refresh_income_day(day, covered_from=created_at - window):
+                    return None
 
-                # Проверяем сумму (с погрешностью 0.01)
-                if abs(income_amount - amount) > 0.01:
+            for receipt_uuid in self._income_index.candidates(amount_kopeks, created_at, window):
+                self._income_index.claim(receipt_uuid)
+                if await cache.exists(NALOGO_RECEIPT_PAYMENT_KEY.format(receipt_uuid=receipt_uuid)):
                     continue
-
-                # Проверяем время
-                operation_time_str = income.get('operationTime')
-                if operation_time_str:
-                    try:
-                        from dateutil.parser import isoparse
-
-                        operation_time = isoparse(operation_time_str)
-                        if operation_time.tzinfo is None:
-                            operation_time = operation_time.replace(tzinfo=UTC)
-
-                        time_diff = abs((operation_time - created_at).total_seconds())
-                        if time_diff <= time_window_minutes * 60:
-                            receipt_uuid = income.get('approvedReceiptUuid', income.get('receiptUuid'))
-                            if receipt_uuid:
-                                logger.info(
-                                    'Найден дубликат чека',
-                                    receipt_uuid=receipt_uuid,
-                                    income_amount=income_amount,
-                                    operation_time=operation_time,
-                                    time_diff=round(time_diff, 0),
-                                )
-                                return receipt_uuid
-                    except Exception as parse_error:
-                        logger.debug('Ошибка парсинга времени чека', parse_error=parse_error)
-                        continue
-
+                logger.info(
+                    'Найден дубликат чека',
+                    receipt_uuid=receipt_uuid,
+                    amount=amount,
+                    created_at=created_at,
+                )
+                return receipt_uuid
             return None
 
         except Exception as error:
             logger.warning('Ошибка проверки дубликата чека', error=sanitize_proxy_error(error))
             return None
 
+    async def _refresh_income_day(self, day: date, covered_from: datetime) -> bool:
+        """Дочитать доходы за день в индекс; False — налоговая не ответила."""
+        if not self._income_index.needs_refresh(day, covered_from):
+            return True
+
+        # Доходы отсортированы по времени операции (новые первыми): читаем страницы,
+        # пока не дойдём до начала окна поиска. Первая загрузка дня читает его целиком.
+        stop_before = covered_from if self._income_index.has_day(day) else None
+        offset = 0
+        while True:
+            page = await self.get_incomes(
+                from_date=day,
+                to_date=day + timedelta(days=1),
+                limit=_INCOME_PAGE_SIZE,
+                offset=offset,
+            )
+            if page is None:
+                return False
+            oldest = self._income_index.add_incomes(day, page)
+            offset += len(page)
+            if len(page) < _INCOME_PAGE_SIZE or (stop_before and oldest and oldest < stop_before):
+                break
+
+        self._income_index.mark_refreshed(day, stop_before)
+        return True
+
     async def get_incomes(
         self,
         from_date: date | None = None,
         to_date: date | None = None,
         limit: int = 100,
+        offset: int = 0,
     ) -> list[dict[str, Any]] | None:
         """Получить список доходов (чеков) за период.
 
@@ -534,6 +812,7 @@ class NaloGoService:
             from_date: Начало периода (по умолчанию 30 дней назад)
             to_date: Конец периода (по умолчанию сегодня)
             limit: Максимальное количество записей
+            offset: Смещение для постраничного чтения
 
         Returns:
             Список чеков с информацией, или None при ошибке
@@ -554,6 +833,7 @@ class NaloGoService:
                 from_date=from_date,
                 to_date=to_date,
                 limit=limit,
+                offset=offset,
             )
 
             # API возвращает структуру с полем content или items
@@ -10,6 +10,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -50,6 +51,7 @@ class PayPearService:
         """Возвращает переиспользуемую HTTP-сессию."""
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(
+                trace_configs=http_client_trace_configs('paypear'),
                 timeout=aiohttp.ClientTimeout(total=30),
             )
         return self._session
@@ -0,0 +1,235 @@
+"""In-memory, versioned snapshot of the pricing catalog.
+
+Listings (mini app, bot tariff list) price many tariffs × periods per request.
+Instead of re-reading tariffs, server squads and promo groups for every item,
+they read one immutable :class:`CatalogSnapshot` shared by all requests.
+
+The snapshot is rebuilt lazily after an invalidation:
+
+* any committed ORM change to ``Tariff``/``ServerSquad``/``PromoGroup``
+  (including bulk ``update()``/``delete()`` statements) bumps the version;
+* other processes are notified through the cache invalidation bus;
+* ``PRICING_CATALOG_TTL_SECONDS`` bounds staleness for anything else
+  (e.g. raw SQL migrations).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+import structlog
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.config import settings
+from app.database.crud.tariff import resolve_user_promo_group_id
+from app.database.database import AsyncSessionLocal
+from app.database.models import PromoGroup, ServerSquad, Tariff
+from app.utils.cache_invalidation import cache_invalidation_bus
+
+
+logger = structlog.get_logger(__name__)
+
+PRICING_CATALOG_TOPIC = 'pricing_catalog'
+
+_CATALOG_MODELS = (Tariff, ServerSquad, PromoGroup)
+# Счётчики заполненности серверов меняются постоянно и на цены не влияют
+_SERVER_PRICING_FIELDS = frozenset(
+    {'squad_uuid', 'display_name', 'country_code', 'is_available', 'price_kopeks', 'allowed_promo_groups'}
+)
+_SESSION_DIRTY_KEY = 'pricing_catalog_dirty'
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogServer:
+    id: int
+    squad_uuid: str
+    display_name: str
+    country_code: str | None
+    price_kopeks: int
+    is_available: bool
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Неизменяемый снимок каталога.
+
+    ORM-объекты тарифов и промогрупп отсоединены от сессии и используются
+    только для чтения — не добавляйте их в сессию и не изменяйте.
+    """
+
+    version: int
+    loaded_at: float
+    tariffs: tuple[Tariff, ...]
+    servers: Mapping[str, CatalogServer]
+    promo_groups: Mapping[int, PromoGroup]
+
+    def tariff(self, tariff_id: int | None) -> Tariff | None:
+        if tariff_id is None:
+            return None
+        return next((tariff for tariff in self.tariffs if tariff.id == tariff_id), None)
+
+    def server(self, squad_uuid: str) -> CatalogServer | None:
+        return self.servers.get(squad_uuid)
+
+    def tariffs_for_promo_group(self, promo_group_id: int | None) -> list[Tariff]:
+        """То же, что ``get_tariffs_for_user``, но без обращения к БД."""
+        return [tariff for tariff in self.tariffs if tariff.is_available_for_promo_group(promo_group_id)]
+
+    def tariffs_for_user(self, user: Any) -> list[Tariff]:
+        return self.tariffs_for_promo_group(resolve_user_promo_group_id(user))
+
+
+class PricingCatalog:
+    def __init__(self) -> None:
+        self._snapshot: CatalogSnapshot | None = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _is_fresh(self, snapshot: CatalogSnapshot | None) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - snapshot.loaded_at < settings.PRICING_CATALOG_TTL_SECONDS
+        )
+
+    async def get(self) -> CatalogSnapshot:
+        """Текущий снимок; перестраивается после инвалидации или по TTL."""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        async with self._lock:
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+
+            version = self._version
+            started = time.perf_counter()
+            snapshot = await self._load(version)
+            # Если каталог изменился во время загрузки — отдаём результат, но не кешируем
+            if version == self._version:
+                self._snapshot = snapshot
+            logger.debug(
+                'Pricing catalog snapshot loaded',
+                version=version,
+                tariffs=len(snapshot.tariffs),
+                servers=len(snapshot.servers),
+                duration_ms=round((time.perf_counter() - started) * 1000, 2),
+            )
+            return snapshot
+
+    def invalidate(self) -> None:
+        self._version += 1
+
+    @staticmethod
+    async def _load(version: int) -> CatalogSnapshot:
+        async with AsyncSessionLocal() as db:
+            tariffs_result = await db.execute(
+                select(Tariff)
+                .options(selectinload(Tariff.allowed_promo_groups))
+                .where(Tariff.is_active.is_(True))
+                .order_by(Tariff.display_order, Tariff.id)
+            )
+            servers_result = await db.execute(select(ServerSquad))
+            promo_groups_result = await db.execute(select(PromoGroup))
+
+            tariffs = tuple(tariffs_result.scalars().all())
+            servers = {
+                server.squad_uuid: CatalogServer(
+                    id=server.id,
+                    squad_uuid=server.squad_uuid,
+                    display_name=server.display_name,
+                    country_code=server.country_code,
+                    price_kopeks=server.price_kopeks or 0,
+                    is_available=bool(server.is_available),
+                )
+                for server in servers_result.scalars().all()
+            }
+            promo_groups = {group.id: group for group in promo_groups_result.scalars().all()}
+
+        return CatalogSnapshot(
+            version=version,
+            loaded_at=time.monotonic(),
+            tariffs=tariffs,
+            servers=MappingProxyType(servers),
+            promo_groups=MappingProxyType(promo_groups),
+        )
+
+
+pricing_catalog = PricingCatalog()
+
+
+# --- Автоматическая инвалидация ---
+
+
+def _touches_catalog(instance: Any, *, is_dirty: bool) -> bool:
+    if not isinstance(instance, _CATALOG_MODELS):
+        return False
+    if is_dirty and isinstance(instance, ServerSquad):
+        state = inspect(instance)
+        return any(state.attrs[name].history.has_changes() for name in _SERVER_PRICING_FIELDS)
+    return True
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_catalog_changes(session: Session, _flush_context: Any) -> None:
+    if session.info.get(_SESSION_DIRTY_KEY):
+        return
+    if (
+        any(_touches_catalog(instance, is_dirty=False) for instance in session.new)
+        or any(_touches_catalog(instance, is_dirty=False) for instance in session.deleted)
+        or any(_touches_catalog(instance, is_dirty=True) for instance in session.dirty)
+    ):
+        session.info[_SESSION_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_catalog_changes(orm_execute_state: Any) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in _CATALOG_MODELS:
+        return
+    if orm_execute_state.is_update and mapper.class_ is ServerSquad:
+        updated = set(orm_execute_state.statement.compile().params)
+        if not updated & _SERVER_PRICING_FIELDS:
+            return
+    orm_execute_state.session.info[_SESSION_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session: Session) -> None:
+    if not session.info.pop(_SESSION_DIRTY_KEY, False):
+        return
+    pricing_catalog.invalidate()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(cache_invalidation_bus.publish(PRICING_CATALOG_TOPIC))
+    _pending_publishes.add(task)
+    task.add_done_callback(_pending_publishes.discard)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_DIRTY_KEY, None)
+
+
+_pending_publishes: set[asyncio.Task] = set()
+
+
+async def _on_catalog_invalidated(_keys: frozenset[str] | None) -> None:
+    pricing_catalog.invalidate()
+
+
+cache_invalidation_bus.register(PRICING_CATALOG_TOPIC, _on_catalog_invalidated)
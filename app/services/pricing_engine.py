@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import dataclasses
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any
 
@@ -15,7 +16,7 @@ from app.utils.promo_offer import get_user_active_promo_discount_percent
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
-    from app.database.models import Subscription, Tariff, User
+    from app.database.models import PromoGroup, Subscription, Tariff, User
 
 
 logger = structlog.get_logger(__name__)
@@ -98,6 +99,27 @@ class TariffSwitchResult:
         return round(self.discount_value * 100 / self.raw_cost)
 
 
+@dataclass(frozen=True)
+class PricingContext:
+    """Per-user pricing inputs, resolved once for a batch of quotes."""
+
+    user: User | None
+    promo_group: PromoGroup | None
+    offer_pct: int
+
+    @classmethod
+    def for_user(cls, user: User | None) -> PricingContext:
+        return cls(
+            user=user,
+            promo_group=PricingEngine.resolve_promo_group(user),
+            offer_pct=get_user_active_promo_discount_percent(user) if user else 0,
+        )
+
+
+# (tariff_id, period_days, device_limit)
+TariffQuoteKey = tuple[int, int, int]
+
+
 class PricingEngine:
     """Unified pricing engine for all subscription renewal calculations."""
 
@@ -578,6 +600,25 @@ class PricingEngine:
         Promo-offer discount applied on the discounted subtotal.
         Device cost is monthly × months_in_period.
         """
+        return self._price_tariff(
+            tariff,
+            period_days,
+            device_limit,
+            PricingContext.for_user(user),
+            custom_traffic_gb=custom_traffic_gb,
+        )
+
+    def _price_tariff(
+        self,
+        tariff: Tariff,
+        period_days: int,
+        device_limit: int,
+        context: PricingContext,
+        *,
+        custom_traffic_gb: int | None = None,
+    ) -> RenewalPricing:
+        """Pure tariff pricing against an already resolved context (no I/O)."""
+        user = context.user
         months = calculate_months_from_days(period_days)
         use_custom_traffic = (
             custom_traffic_gb is not None
@@ -621,7 +662,7 @@ class PricingEngine:
         # --- Per-category group discounts ---
         period_pct = 0
         devices_pct = 0
-        promo_group = self.resolve_promo_group(user)
+        promo_group = context.promo_group
         # Only apply promo group discount if the tariff is available for this group
         if promo_group is not None and not tariff.is_available_for_promo_group(promo_group.id):
             promo_group = None
@@ -629,7 +670,7 @@ class PricingEngine:
             period_pct = promo_group.get_discount_percent('period', period_days)
             devices_pct = promo_group.get_discount_percent('devices', period_days)
 
-        offer_pct = get_user_active_promo_discount_percent(user) if user else 0
+        offer_pct = context.offer_pct
 
         discounted_base = self.apply_discount(base_price, period_pct)
         discounted_devices = self.apply_discount(devices_price, devices_pct)
@@ -705,6 +746,44 @@ class PricingEngine:
             user=user,
         )
 
+    @staticmethod
+    def quotable_periods(tariff: Tariff) -> list[int]:
+        """Periods a tariff is sold for: configured period prices plus 1 day for daily tariffs."""
+        periods = set()
+        for period in (tariff.period_prices or {}).keys():
+            try:
+                periods.add(int(period))
+            except (TypeError, ValueError):
+                continue
+        if getattr(tariff, 'is_daily', False):
+            periods.add(1)
+        return sorted(period for period in periods if period > 0)
+
+    def quote_tariffs(
+        self,
+        context: PricingContext,
+        tariffs: Iterable[Tariff],
+        *,
+        device_limits: Iterable[int] | None = None,
+    ) -> dict[TariffQuoteKey, RenewalPricing]:
+        """Price every tariff × period × device option in one pass.
+
+        Results are identical to ``calculate_tariff_purchase_price`` for the
+        same inputs; the user context is resolved once instead of per item.
+        If ``device_limits`` is None, each tariff is quoted with its included
+        device limit only.
+        """
+        requested_limits = sorted(set(device_limits)) if device_limits is not None else None
+        quotes: dict[TariffQuoteKey, RenewalPricing] = {}
+        for tariff in tariffs:
+            limits = requested_limits if requested_limits is not None else [tariff.device_limit or 0]
+            for period_days in self.quotable_periods(tariff):
+                for device_limit in limits:
+                    quotes[(tariff.id, period_days, device_limit)] = self._price_tariff(
+                        tariff, period_days, device_limit, context
+                    )
+        return quotes
+
     # ------------------------------------------------------------------
     # Classic mode
     # ------------------------------------------------------------------
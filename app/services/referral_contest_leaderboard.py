@@ -0,0 +1,380 @@
+"""Incrementally maintained referral-contest leaderboards in Redis.
+
+The SQL leaderboard groups every contest event on each call. Instead, every
+contest keeps three keys (one hash slot per contest):
+
+* ``…:totals`` — hash with exact ``<referrer>:c`` (referrals) and
+  ``<referrer>:a`` (amount) counters, bumped atomically when an event is written;
+* ``…:scores`` — sorted set scored ``count * 2**32 + amount`` (amount capped),
+  so top-N and rank queries are O(log n); equal scores are ordered by the
+  exact totals and referrer id;
+* ``…:ready`` — set once the keys were built from events.
+
+Without the ready marker (first read, Redis restart, contest window edited,
+events re-synced) readers rebuild the leaderboard from events; while Redis is
+unavailable callers fall back to the SQL aggregate. Events recorded while the
+leaderboard is not ready or is being rebuilt set ``…:dirty``: a rebuild whose
+snapshot may have missed them discards its result at the swap and takes a
+fresh snapshot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from itertools import batched
+from typing import Any
+
+import structlog
+from redis.exceptions import NoScriptError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.crud.referral_contest import get_contest_referrer_totals
+from app.database.models import ReferralContest
+from app.utils.cache import cache
+
+
+logger = structlog.get_logger(__name__)
+
+_SCORE_SHIFT = 1 << 32
+_AMOUNT_CAP = _SCORE_SHIFT - 1
+_REBUILD_LOCK_SECONDS = 120
+_MIN_TTL_SECONDS = 24 * 3600
+_TTL_AFTER_CONTEST_END = timedelta(days=7)
+_WRITE_CHUNK = 1000
+_REBUILD_ATTEMPTS = 3
+
+# KEYS: ready, scores, totals, dirty, rebuilding; ARGV: referrer, count_delta, amount_delta, shift, cap, dirty_ttl.
+# Счётчики меняются только у построенного лидерборда — иначе его пересоберут из событий.
+# Идущая пересборка (в том числе поверх построенного лидерборда) по флагу dirty узнает,
+# что её снимок мог не включить это событие.
+_RECORD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('EXISTS', KEYS[5]) == 1 then
+    redis.call('SET', KEYS[4], 1, 'EX', ARGV[6])
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local count = redis.call('HINCRBY', KEYS[3], ARGV[1] .. ':c', ARGV[2])
+local amount = redis.call('HINCRBY', KEYS[3], ARGV[1] .. ':a', ARGV[3])
+if count <= 0 then
+    redis.call('HDEL', KEYS[3], ARGV[1] .. ':c', ARGV[1] .. ':a')
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    return 0
+end
+local capped = math.min(math.max(amount, 0), tonumber(ARGV[5]))
+redis.call('ZADD', KEYS[2], string.format('%.0f', count * tonumber(ARGV[4]) + capped), ARGV[1])
+return count
+"""
+
+# KEYS: ready, scores, totals, dirty, tmp_scores, tmp_totals; ARGV: ttl, built_at.
+# Атомарно с записью событий: если во время пересборки пришли события, снимок
+# отбрасывается (0), иначе временные ключи становятся лидербордом (1).
+_SWAP_SCRIPT = """
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    redis.call('DEL', KEYS[4], KEYS[5], KEYS[6])
+    return 0
+end
+if redis.call('EXISTS', KEYS[5]) == 1 then
+    redis.call('RENAME', KEYS[5], KEYS[2])
+    redis.call('RENAME', KEYS[6], KEYS[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+    redis.call('EXPIRE', KEYS[3], ARGV[1])
+else
+    redis.call('DEL', KEYS[2], KEYS[3])
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+return 1
+"""
+
+
+def leaderboard_score(referral_count: int, amount_kopeks: int) -> int:
+    """Score in the sorted set: referrals first, amount as tiebreak (exact below 2**53)."""
+    return referral_count * _SCORE_SHIFT + min(max(amount_kopeks, 0), _AMOUNT_CAP)
+
+
+@dataclass(frozen=True, slots=True)
+class LeaderboardEntry:
+    referrer_id: int
+    referral_count: int
+    amount_kopeks: int
+
+    @property
+    def sort_key(self) -> tuple[int, int, int]:
+        return -self.referral_count, -self.amount_kopeks, self.referrer_id
+
+
+@dataclass(frozen=True, slots=True)
+class LeaderboardCheck:
+    """Result of comparing the Redis leaderboard with the SQL aggregate."""
+
+    contest_id: int
+    ready: bool
+    expected_referrers: int
+    missing: tuple[int, ...] = ()
+    unexpected: tuple[int, ...] = ()
+    mismatched: tuple[int, ...] = ()
+
+    @property
+    def is_consistent(self) -> bool:
+        return self.ready and not (self.missing or self.unexpected or self.mismatched)
+
+
+class ContestLeaderboardStore:
+    def __init__(self) -> None:
+        self._record_sha: str | None = None
+        self._rebuild_locks: dict[int, asyncio.Lock] = {}
+
+    @staticmethod
+    def _keys(contest_id: int) -> tuple[str, str, str]:
+        prefix = f'contest_leaderboard:{{{contest_id}}}'
+        return f'{prefix}:ready', f'{prefix}:scores', f'{prefix}:totals'
+
+    @staticmethod
+    def _dirty_key(contest_id: int) -> str:
+        return f'contest_leaderboard:{{{contest_id}}}:dirty'
+
+    @staticmethod
+    def _rebuild_lock_key(contest_id: int) -> str:
+        return f'contest_leaderboard:{{{contest_id}}}:ready:rebuilding'
+
+    @staticmethod
+    def _client() -> Any | None:
+        if not cache._connected or cache.redis_client is None:
+            return None
+        return cache.redis_client
+
+    # --- Запись ---
+
+    async def record(self, contest_id: int, referrer_id: int, *, count_delta: int = 0, amount_delta: int = 0) -> None:
+        """Применить изменение события к лидерборду (вызывать после commit)."""
+        if not count_delta and not amount_delta:
+            return
+        client = self._client()
+        if client is None:
+            return
+
+        keys = (*self._keys(contest_id), self._dirty_key(contest_id), self._rebuild_lock_key(contest_id))
+        args = (referrer_id, count_delta, amount_delta, _SCORE_SHIFT, _AMOUNT_CAP, _REBUILD_LOCK_SECONDS)
+        try:
+            if self._record_sha is None:
+                self._record_sha = await client.script_load(_RECORD_SCRIPT)
+            try:
+                await client.evalsha(self._record_sha, len(keys), *keys, *args)
+            except NoScriptError:
+                self._record_sha = await client.script_load(_RECORD_SCRIPT)
+                await client.evalsha(self._record_sha, len(keys), *keys, *args)
+        except Exception as e:
+            logger.warning('Не удалось обновить лидерборд конкурса', contest_id=contest_id, e=e)
+            # Без пропущенного изменения лидерборд неверен — пусть пересоберётся
+            await self.drop(contest_id)
+
+    async def drop(self, contest_id: int) -> None:
+        """Сбросить лидерборд; он будет пересобран из событий при следующем чтении."""
+        client = self._client()
+        if client is None:
+            return
+        try:
+            await client.delete(*self._keys(contest_id))
+        except Exception as e:
+            logger.warning('Не удалось сбросить лидерборд конкурса', contest_id=contest_id, e=e)
+
+    # --- Чтение ---
+
+    async def top(
+        self, db: AsyncSession, contest_id: int, *, limit: int | None = None
+    ) -> list[LeaderboardEntry] | None:
+        """Топ рефереров конкурса; ``None`` — Redis недоступен, считайте агрегатом."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            if not await self._ensure_ready(db, client, contest_id):
+                return None
+            return await self._read_top(client, contest_id, limit)
+        except Exception as e:
+            logger.warning('Не удалось прочитать лидерборд конкурса', contest_id=contest_id, e=e)
+            return None
+
+    async def rank(self, db: AsyncSession, contest_id: int, referrer_id: int) -> int | None:
+        """Место реферера (1-based, 0 — нет в лидерборде); ``None`` — Redis недоступен."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            if not await self._ensure_ready(db, client, contest_id):
+                return None
+            _, scores_key, totals_key = self._keys(contest_id)
+            score = await client.zscore(scores_key, str(referrer_id))
+            if score is None:
+                return 0
+            higher = await client.zcount(scores_key, f'({score}', '+inf')
+            ties = await self._load_entries(client, totals_key, await client.zrangebyscore(scores_key, score, score))
+            own = next(entry for entry in ties if entry.referrer_id == referrer_id)
+            return higher + sum(1 for entry in ties if entry.sort_key < own.sort_key) + 1
+        except Exception as e:
+            logger.warning('Не удалось получить место в лидерборде', contest_id=contest_id, e=e)
+            return None
+
+    async def size(self, db: AsyncSession, contest_id: int) -> int | None:
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            if not await self._ensure_ready(db, client, contest_id):
+                return None
+            return int(await client.zcard(self._keys(contest_id)[1]))
+        except Exception as e:
+            logger.warning('Не удалось получить размер лидерборда', contest_id=contest_id, e=e)
+            return None
+
+    async def _read_top(self, client: Any, contest_id: int, limit: int | None) -> list[LeaderboardEntry]:
+        _, scores_key, totals_key = self._keys(contest_id)
+        if not limit:
+            members = await client.zrevrange(scores_key, 0, -1)
+        else:
+            head = await client.zrevrange(scores_key, 0, limit - 1, withscores=True)
+            if not head:
+                return []
+            # Участники с тем же счётом, что у последнего, могут стоять выше по точным суммам и id
+            boundary = head[-1][1]
+            members = [member for member, score in head if score > boundary]
+            members.extend(await client.zrangebyscore(scores_key, boundary, boundary))
+
+        entries = sorted(await self._load_entries(client, totals_key, members), key=lambda entry: entry.sort_key)
+        return entries[:limit] if limit else entries
+
+    @staticmethod
+    async def _load_entries(client: Any, totals_key: str, members: list[Any]) -> list[LeaderboardEntry]:
+        entries: list[LeaderboardEntry] = []
+        for chunk in batched(dict.fromkeys(int(member) for member in members), _WRITE_CHUNK, strict=False):
+            fields = [field for referrer_id in chunk for field in (f'{referrer_id}:c', f'{referrer_id}:a')]
+            values = await client.hmget(totals_key, fields)
+            for index, referrer_id in enumerate(chunk):
+                count, amount = values[2 * index], values[2 * index + 1]
+                entries.append(LeaderboardEntry(referrer_id, int(count or 0), int(amount or 0)))
+        return entries
+
+    # --- Пересборка и проверка ---
+
+    async def _ensure_ready(self, db: AsyncSession, client: Any, contest_id: int) -> bool:
+        ready_key = self._keys(contest_id)[0]
+        if await client.exists(ready_key):
+            return True
+        async with self._rebuild_locks.setdefault(contest_id, asyncio.Lock()):
+            if await client.exists(ready_key):
+                return True
+            return await self.rebuild(db, contest_id) is not None
+
+    async def rebuild(self, db: AsyncSession, contest_id: int) -> int | None:
+        """Пересобрать лидерборд из событий. Возвращает число рефереров или ``None``."""
+        client = self._client()
+        if client is None:
+            return None
+        ready_key, scores_key, totals_key = self._keys(contest_id)
+        lock_key = self._rebuild_lock_key(contest_id)
+        if not await client.set(lock_key, '1', nx=True, ex=_REBUILD_LOCK_SECONDS):
+            # Пересобирает другой процесс — пока читаем агрегатом
+            return None
+
+        try:
+            contest = await db.get(ReferralContest, contest_id)
+            if contest is None:
+                return None
+
+            started = time.perf_counter()
+            contest_end = contest.end_at if contest.end_at.tzinfo else contest.end_at.replace(tzinfo=UTC)
+            ttl = max(
+                _MIN_TTL_SECONDS,
+                int((contest_end + _TTL_AFTER_CONTEST_END - datetime.now(UTC)).total_seconds()),
+            )
+            # События, записанные до этой точки, уже закоммичены и попадут в снимок
+            await client.delete(self._dirty_key(contest_id))
+
+            for attempt in range(1, _REBUILD_ATTEMPTS + 1):
+                entries = [LeaderboardEntry(*row) for row in await get_contest_referrer_totals(db, contest)]
+                if await self._swap_in(client, contest_id, entries, ttl):
+                    logger.info(
+                        'Лидерборд конкурса пересобран из событий',
+                        contest_id=contest_id,
+                        referrers=len(entries),
+                        attempts=attempt,
+                        duration_ms=round((time.perf_counter() - started) * 1000, 2),
+                    )
+                    return len(entries)
+
+            # События идут непрерывно — пока читаем агрегатом, следующее чтение попробует снова
+            logger.warning(
+                'Лидерборд конкурса не пересобран: события приходят во время пересборки',
+                contest_id=contest_id,
+                attempts=_REBUILD_ATTEMPTS,
+            )
+            return None
+        finally:
+            await client.delete(lock_key)
+
+    async def _swap_in(self, client: Any, contest_id: int, entries: list[LeaderboardEntry], ttl: int) -> bool:
+        """Записать снимок во временные ключи и подменить лидерборд, если за это время не было событий."""
+        ready_key, scores_key, totals_key = self._keys(contest_id)
+        tmp_scores, tmp_totals = f'{scores_key}:tmp', f'{totals_key}:tmp'
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.delete(tmp_scores, tmp_totals)
+            for chunk in batched(entries, _WRITE_CHUNK, strict=False):
+                pipe.zadd(
+                    tmp_scores,
+                    {str(e.referrer_id): leaderboard_score(e.referral_count, e.amount_kopeks) for e in chunk},
+                )
+                pipe.hset(
+                    tmp_totals,
+                    mapping={
+                        field: value
+                        for e in chunk
+                        for field, value in (
+                            (f'{e.referrer_id}:c', e.referral_count),
+                            (f'{e.referrer_id}:a', e.amount_kopeks),
+                        )
+                    },
+                )
+            await pipe.execute()
+
+        keys = (ready_key, scores_key, totals_key, self._dirty_key(contest_id), tmp_scores, tmp_totals)
+        return bool(await client.eval(_SWAP_SCRIPT, len(keys), *keys, ttl, int(time.time())))
+
+    async def verify(self, db: AsyncSession, contest_id: int) -> LeaderboardCheck | None:
+        """Сравнить лидерборд в Redis с агрегатом по событиям."""
+        client = self._client()
+        contest = await db.get(ReferralContest, contest_id)
+        if client is None or contest is None:
+            return None
+
+        expected = {
+            referrer_id: (count, amount)
+            for referrer_id, count, amount in await get_contest_referrer_totals(db, contest)
+        }
+        ready_key, scores_key, totals_key = self._keys(contest_id)
+        if not await client.exists(ready_key):
+            return LeaderboardCheck(contest_id=contest_id, ready=False, expected_referrers=len(expected))
+
+        actual = {
+            entry.referrer_id: (entry.referral_count, entry.amount_kopeks)
+            for entry in await self._load_entries(client, totals_key, await client.zrange(scores_key, 0, -1))
+        }
+        return LeaderboardCheck(
+            contest_id=contest_id,
+            ready=True,
+            expected_referrers=len(expected),
+            missing=tuple(sorted(expected.keys() - actual.keys())),
+            unexpected=tuple(sorted(actual.keys() - expected.keys())),
+            mismatched=tuple(
+                sorted(
+                    referrer_id
+                    for referrer_id in expected.keys() & actual.keys()
+                    if expected[referrer_id] != actual[referrer_id]
+                )
+            ),
+        )
+
+
+contest_leaderboard = ContestLeaderboardStore()
@@ -14,6 +14,7 @@ from app.database.crud.referral_contest import (
     add_contest_event,
     get_contest_events_count,
     get_contest_leaderboard_with_virtual,
+    get_contest_participants_count,
     get_contests_for_events,
     get_contests_for_summaries,
     get_referrer_score,
@@ -24,6 +25,8 @@ from app.database.crud.referral_contest import (
 from app.database.crud.user import get_user_by_id
 from app.database.database import AsyncSessionLocal
 from app.database.models import ReferralContest, User
+from app.services.referral_contest_leaderboard import LeaderboardCheck, contest_leaderboard
+from app.utils.metrics import track_loop
 
 
 logger = structlog.get_logger(__name__)
@@ -68,7 +71,8 @@ class ReferralContestService:
         try:
             while True:
                 try:
-                    await self._process_summaries()
+                    with track_loop('referral_contest_summaries'):
+                        await self._process_summaries()
                 except asyncio.CancelledError:
                     raise
                 except Exception as exc:
@@ -170,9 +174,16 @@ class ReferralContestService:
         day_start_utc = day_start_local.astimezone(UTC)
         day_end_utc = day_end_local.astimezone(UTC)
 
-        leaderboard = await get_contest_leaderboard_with_virtual(db, contest.id)
+        if is_final:
+            # Итоги публикуются один раз — сверяем лидерборд с событиями и чиним расхождение до чтения.
+            # Ежедневные сводки читают лидерборд как есть: полная сверка — GROUP BY по всем событиям
+            # конкурса, её запускают синхронизация в админке и tools/rebuild_contest_leaderboards.py
+            await self.check_leaderboard(db, contest.id, repair=True)
+        # В сводки попадает только топ-5 — полный лидерборд не нужен
+        leaderboard = await get_contest_leaderboard_with_virtual(db, contest.id, limit=5)
         virtual_participants = await list_virtual_participants(db, contest.id)
         virtual_count = sum(vp.referral_count for vp in virtual_participants)
+        participants_count = await get_contest_participants_count(db, contest.id) + len(virtual_participants)
         total_events = await get_contest_events_count(db, contest.id) + virtual_count
         today_events = await get_contest_events_count(
             db,
@@ -193,6 +204,7 @@ class ReferralContestService:
         await self._notify_public_channel(
             contest=contest,
             leaderboard=leaderboard,
+            participants_count=participants_count,
             total_events=total_events,
             today_events=today_events,
             is_final=is_final,
@@ -320,6 +332,7 @@ class ReferralContestService:
         *,
         contest: ReferralContest,
         leaderboard: Sequence[tuple[str, int, int, bool]],
+        participants_count: int,
         total_events: int,
         today_events: int,
         is_final: bool,
@@ -338,7 +351,7 @@ class ReferralContestService:
             f'🏆 {html.escape(contest.title)}',
             '🏁 Итоги конкурса' if is_final else '📊 Промежуточные итоги',
             f'Время зоны: {tz.key}',
-            f'Всего участников: <b>{len(leaderboard)}</b>',
+            f'Всего участников: <b>{participants_count}</b>',
             '',
             'Топ участников:',
         ]
@@ -658,6 +671,38 @@ class ReferralContestService:
             logger.error('Ошибка синхронизации конкурса', contest_id=contest_id, exc=exc)
             return {'error': str(exc)}
 
+    async def rebuild_leaderboard(
+        self,
+        db: AsyncSession,
+        contest_id: int,
+    ) -> int | None:
+        """Пересобрать лидерборд конкурса из событий (восстановление после сбоев)."""
+        return await contest_leaderboard.rebuild(db, contest_id)
+
+    async def check_leaderboard(
+        self,
+        db: AsyncSession,
+        contest_id: int,
+        *,
+        repair: bool = False,
+    ) -> LeaderboardCheck | None:
+        """Сверить лидерборд с агрегатом по событиям; при ``repair`` пересобрать расходящийся."""
+        check = await contest_leaderboard.verify(db, contest_id)
+        if check is None or check.is_consistent:
+            return check
+
+        logger.warning(
+            'Лидерборд конкурса расходится с событиями',
+            contest_id=contest_id,
+            ready=check.ready,
+            missing=len(check.missing),
+            unexpected=len(check.unexpected),
+            mismatched=len(check.mismatched),
+        )
+        if repair:
+            await contest_leaderboard.rebuild(db, contest_id)
+        return check
+
     async def cleanup_contest(
         self,
         db: AsyncSession,
@@ -15,6 +15,7 @@ from app.services.notification_delivery_service import (
     notification_delivery_service,
 )
 from app.utils.price_display import catalog_price_in_toman
+from app.utils.redis_registry import redis_registry
 from app.utils.user_utils import get_effective_referral_commission_percent
 
 
@@ -25,24 +26,14 @@ logger = structlog.get_logger(__name__)
 # ---------------------------------------------------------------------------
 _PENDING_REFERRAL_TTL = 7 * 24 * 3600  # 7 days
 
-_redis_client: aioredis.Redis | None = None
-_redis_initialized: bool = False
-
 
 def _get_redis() -> aioredis.Redis | None:
-    """Lazy async Redis client for pending referral storage."""
-    global _redis_client, _redis_initialized
-    if _redis_initialized:
-        return _redis_client
+    """Async Redis client for pending referral storage (shared pool)."""
     try:
-        _redis_client = aioredis.from_url(settings.REDIS_URL)
-        _redis_initialized = True
-        logger.debug('Redis client for pending referrals initialized')
+        return redis_registry.client('referrals')
     except Exception as exc:
         logger.warning('Failed to initialize Redis for pending referrals', error=exc)
-        _redis_client = None
-        _redis_initialized = True
-    return _redis_client
+        return None
 
 
 async def save_pending_referral(telegram_id: int, referral_code: str, referrer_id: int) -> bool:
@@ -16,6 +16,7 @@ from typing import Literal
 import structlog
 
 from app.database.database import AsyncSessionLocal
+from app.utils.metrics import QUEUE_DEPTH, metrics, track_loop
 
 
 logger = structlog.get_logger(__name__)
@@ -154,10 +155,15 @@ class RemnaWaveRetryQueue:
         try:
             while True:
                 await asyncio.sleep(self._interval)
-                await self.process_pending()
+                with track_loop('remnawave_retry_queue'):
+                    await self.process_pending()
         except asyncio.CancelledError:
             raise
 
 
 # Global instance
 remnawave_retry_queue = RemnaWaveRetryQueue()
+metrics.register_collector(
+    'remnawave_retry_queue',
+    lambda: QUEUE_DEPTH.labels('remnawave_retry').set(remnawave_retry_queue.pending_count),
+)
@@ -31,6 +31,7 @@ from app.database.models import (
 from app.external.remnawave_api import (
     RemnaWaveAPI,
     RemnaWaveAPIError,
+    RemnaWaveTransientError,
     UserStatus,
 )
 from app.services.subscription_service import get_traffic_reset_strategy
@@ -159,6 +160,176 @@ class RemnaWaveConfigurationError(Exception):
     """Raised when RemnaWave API configuration is missing."""
 
 
+def _freeze_fields(fields: dict[str, Any]) -> tuple:
+    return tuple(sorted((key, tuple(value) if isinstance(value, list) else value) for key, value in fields.items()))
+
+
+class PanelWriteCoalescer:
+    """Склеивает одинаковые изменения пользователей панели, пришедшие в пределах окна, в один bulk-запрос.
+
+    Пачка определяется операцией и набором полей: отключение тысячи пользователей уходит
+    одним POST /api/users/bulk/update вместо тысячи PATCH. Панель отвечает только числом
+    изменённых строк, поэтому при расхождении или ошибке пачка повторяется поштучно и каждый
+    вызывающий получает свой результат или исключение. Изменения одного UUID применяются
+    в порядке поступления: новое ждёт, пока уйдёт предыдущее.
+    """
+
+    def __init__(self, api_client_factory, *, window: float, max_batch: int, fallback_concurrency: int):
+        self._api_client_factory = api_client_factory
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.fallback_concurrency = max(1, fallback_concurrency)
+        self.bulk_supported = True
+        self._pending: dict[tuple, tuple[dict[str, Any], dict[str, asyncio.Future]]] = {}
+        self._timers: dict[tuple, asyncio.TimerHandle] = {}
+        self._latest: dict[str, tuple[tuple, asyncio.Future]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def update_user(self, uuid: str, **fields: Any) -> None:
+        """Поля как у RemnaWaveAPI.bulk_update_users (status, expire_at, traffic_limit_bytes, ...)."""
+        await self._submit('update', uuid, fields)
+
+    async def update_user_squads(self, uuid: str, active_internal_squads: list[str]) -> None:
+        await self._submit('squads', uuid, {'active_internal_squads': list(active_internal_squads)})
+
+    async def flush(self) -> None:
+        """Отправляет все накопленные пачки и дожидается их записи (для остановки бота)."""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _submit(self, op: str, uuid: str, fields: dict[str, Any]) -> None:
+        key = (op, _freeze_fields(fields))
+
+        previous = self._latest.get(uuid)
+        if previous and previous[0] != key and not previous[1].done():
+            # Другое изменение того же UUID ещё не записано — сначала оно
+            self._flush(previous[0])
+            await asyncio.wait([previous[1]])
+
+        _, batch = self._pending.setdefault(key, (fields, {}))
+        future = batch.get(uuid)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(lambda done: self._forget(uuid, done))
+            batch[uuid] = future
+            self._latest[uuid] = (key, future)
+
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+
+        await asyncio.shield(future)
+
+    def _forget(self, uuid: str, future: asyncio.Future) -> None:
+        latest = self._latest.get(uuid)
+        if latest and latest[1] is future:
+            del self._latest[uuid]
+
+    def _flush(self, key: tuple) -> None:
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        pending = self._pending.pop(key, None)
+        if not pending:
+            return
+        task = asyncio.create_task(self._write(key[0], *pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, op: str, fields: dict[str, Any], batch: dict[str, asyncio.Future]) -> None:
+        uuids = list(batch)
+        try:
+            async with self._api_client_factory() as api:
+                if self.bulk_supported and len(uuids) > 1:
+                    affected = await self._write_bulk(api, op, uuids, fields)
+                    if affected == len(uuids):
+                        for future in batch.values():
+                            if not future.done():
+                                future.set_result(None)
+                        return
+                    if affected is not None:
+                        logger.warning(
+                            'Bulk-запись в панель затронула не всех пользователей, повторяем поштучно',
+                            op=op,
+                            batch_size=len(uuids),
+                            affected=affected,
+                        )
+                await self._write_each(api, op, fields, batch)
+        except Exception as error:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _write_bulk(self, api: RemnaWaveAPI, op: str, uuids: list[str], fields: dict[str, Any]) -> int | None:
+        try:
+            if op == 'squads':
+                return await api.bulk_update_squads(uuids, fields['active_internal_squads'])
+            return await api.bulk_update_users(uuids, **fields)
+        except RemnaWaveTransientError:
+            raise
+        except RemnaWaveAPIError as error:
+            if error.status_code == 404:
+                # Старая панель без /api/users/bulk/* — дальше пишем только поштучно
+                self.bulk_supported = False
+                logger.warning('Панель не поддерживает bulk-эндпоинты пользователей, отключаем склейку записей')
+            else:
+                logger.warning('Ошибка bulk-записи в панель, повторяем поштучно', op=op, error=error)
+            return None
+
+    async def _write_each(
+        self, api: RemnaWaveAPI, op: str, fields: dict[str, Any], batch: dict[str, asyncio.Future]
+    ) -> None:
+        semaphore = asyncio.Semaphore(self.fallback_concurrency)
+
+        async def write_one(uuid: str, future: asyncio.Future) -> None:
+            async with semaphore:
+                try:
+                    await self._write_one(api, op, uuid, fields)
+                except Exception as error:
+                    if not future.done():
+                        future.set_exception(error)
+                else:
+                    if not future.done():
+                        future.set_result(None)
+
+        await asyncio.gather(*(write_one(uuid, future) for uuid, future in batch.items()))
+
+    @staticmethod
+    async def _write_one(api: RemnaWaveAPI, op: str, uuid: str, fields: dict[str, Any]) -> None:
+        # Поштучное включение/отключение идёт через /actions/* панели, как и без склейки, а не через PATCH статуса
+        action = None
+        if op == 'update' and fields.keys() == {'status'}:
+            action = {UserStatus.DISABLED: api.disable_user, UserStatus.ACTIVE: api.enable_user}.get(fields['status'])
+        if action is None:
+            await api.update_user(uuid, **fields)
+            return
+        try:
+            await action(uuid)
+        except RemnaWaveAPIError as error:
+            # Повтор после частично применённого bulk: пользователь уже в нужном статусе
+            if 'already disabled' not in str(error).lower() and 'already enabled' not in str(error).lower():
+                raise
+
+
+_panel_write_coalescer: PanelWriteCoalescer | None = None
+
+
+def get_panel_write_coalescer() -> PanelWriteCoalescer:
+    """Общий на процесс коалесер: RemnaWaveService создаётся на каждый вызов, а окно склейки должно быть одно."""
+    global _panel_write_coalescer
+    if _panel_write_coalescer is None:
+        _panel_write_coalescer = PanelWriteCoalescer(
+            RemnaWaveService().get_api_client,
+            window=settings.REMNAWAVE_WRITE_COALESCE_WINDOW_MS / 1000,
+            max_batch=settings.REMNAWAVE_WRITE_COALESCE_MAX_BATCH,
+            fallback_concurrency=settings.REMNAWAVE_WRITE_FALLBACK_CONCURRENCY,
+        )
+    return _panel_write_coalescer
+
+
 class RemnaWaveService:
     def __init__(self):
         auth_params = settings.get_remnawave_auth_params()
@@ -258,6 +429,14 @@ class RemnaWaveService:
         async with api:
             yield api
 
+    async def queue_user_update(self, uuid: str, **fields: Any) -> None:
+        """Изменение пользователя панели через общий коалесер: одинаковые изменения склеиваются в bulk-запрос.
+
+        Ошибка конкретного UUID (например, 404) пробрасывается только его вызывающему.
+        """
+        self._ensure_configured()
+        await get_panel_write_coalescer().update_user(uuid, **fields)
+
     def _now_utc(self) -> datetime:
         """Возвращает текущее время в UTC без привязки к часовому поясу."""
         return datetime.now(self._utc_timezone)
@@ -10,20 +10,28 @@ from __future__ import annotations
 
 import asyncio
 import html
+import json
 import re
+import time
+import uuid
+from collections.abc import AsyncIterator, Collection
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from typing import Any
 
 import structlog
 from aiogram import Bot
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from sqlalchemy import delete, inspect as sa_inspect
+from sqlalchemy import delete, inspect as sa_inspect, or_, select
 from sqlalchemy.exc import PendingRollbackError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import StaleDataError
 
 from app.config import settings
 from app.database.crud.subscription import (
+    check_and_update_subscription_status,
     deactivate_subscription,
     decrement_subscription_server_counts,
     expire_subscription,
@@ -33,10 +41,12 @@ from app.database.crud.subscription import (
     update_subscription_usage,
 )
 from app.database.crud.user import get_user_by_id, get_user_by_remnawave_uuid, get_user_by_telegram_id
-from app.database.models import Subscription, SubscriptionServer, SubscriptionStatus, User
+from app.database.database import AsyncSessionLocal
+from app.database.models import Subscription, SubscriptionServer, SubscriptionStatus, User, UserPromoGroup
 from app.localization.texts import get_texts
 from app.services.admin_notification_service import AdminNotificationService
 from app.services.notification_delivery_service import NotificationType, notification_delivery_service
+from app.utils.cache import cache
 from app.utils.miniapp_buttons import build_miniapp_or_callback_button
 
 
@@ -124,6 +134,73 @@ _ADMIN_TORRENT_BLOCKER_EVENTS: dict[str, str] = {
 
 _ADMIN_NODE_CONNECTION_EVENTS = frozenset({'node.connection_lost', 'node.connection_restored'})
 
+# User events that describe the current state of a panel user. Within the
+# coalesce window repeated events of the same type for the same user collapse
+# into the latest one. user.deleted / user.created / device and torrent events
+# carry one-off facts and are processed immediately.
+_COALESCED_USER_EVENTS = frozenset(
+    {
+        'user.modified',
+        'user.expired',
+        'user.disabled',
+        'user.enabled',
+        'user.limited',
+        'user.traffic_reset',
+        'user.revoked',
+        'user.expires_in_72_hours',
+        'user.expires_in_48_hours',
+        'user.expires_in_24_hours',
+        'user.expired_24_hours_ago',
+        'user.first_connected',
+        'user.bandwidth_usage_threshold_reached',
+        'user.not_connected',
+    }
+)
+
+# Redis hashes that journal buffered user events until they are processed, so a
+# restart inside the coalesce window doesn't lose them. Each process writes its
+# own hash and keeps an owner key alive; a journal whose owner key expired is
+# claimed by a live process (at start and on every lease renewal).
+_USER_EVENT_JOURNAL_KEY_PREFIX = 'remnawave_webhook:user_events:'
+_USER_EVENT_JOURNAL_OWNER_PREFIX = 'remnawave_webhook:user_events_owner:'
+_USER_EVENT_JOURNALS_KEY = 'remnawave_webhook:user_event_journals'
+
+
+@dataclass(slots=True)
+class _UserEventLock:
+    """Per-user lock shared by the flush and the direct event path; dropped when nobody holds it."""
+
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    holders: int = 0
+
+
+class _NotificationRateLimiter:
+    """Token bucket shared by all webhook user notifications.
+
+    A panel sweep can produce thousands of notifications within seconds;
+    spreading them keeps the bot under Telegram's global flood limits.
+    """
+
+    def __init__(self, rate_per_second: float) -> None:
+        self._rate = rate_per_second
+        self._capacity = max(1.0, rate_per_second)
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self._rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
 
 class RemnaWaveWebhookService:
     """Processes incoming webhooks from RemnaWave backend."""
@@ -154,6 +231,16 @@ class RemnaWaveWebhookService:
     # на сообщение, длинные списки нод выбивают TelegramBadRequest и теряются.
     _NODE_EVENT_SUMMARY_MAX_LINES: int = 40
 
+    # Coalescing для user.* событий (см. _COALESCED_USER_EVENTS). Окно короче,
+    # чем у нод: пользователь должен увидеть уведомление почти сразу, а bulk
+    # action панели укладывается в пару секунд.
+    _USER_EVENT_COALESCE_WINDOW_SECONDS: float = 2.0
+    # При переполнении буфер сбрасывается досрочно, не дожидаясь окна.
+    _USER_EVENT_BUFFER_MAX: int = 5000
+    # Сколько живёт owner-ключ журнала без продления; после этого журнал
+    # считается брошенным и его забирает следующий стартующий процесс.
+    _USER_EVENT_JOURNAL_LEASE_SECONDS: int = 30
+
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
         self._admin_service = AdminNotificationService(bot)
@@ -168,6 +255,17 @@ class RemnaWaveWebhookService:
         self._NODE_EVENT_BUFFER_MAX = int(
             getattr(settings, 'REMNAWAVE_WEBHOOK_NODE_BUFFER_MAX', self._NODE_EVENT_BUFFER_MAX)
         )
+        self._USER_EVENT_COALESCE_WINDOW_SECONDS = float(
+            getattr(
+                settings, 'REMNAWAVE_WEBHOOK_USER_COALESCE_WINDOW_SECONDS', self._USER_EVENT_COALESCE_WINDOW_SECONDS
+            )
+        )
+        self._USER_EVENT_BUFFER_MAX = int(
+            getattr(settings, 'REMNAWAVE_WEBHOOK_USER_BUFFER_MAX', self._USER_EVENT_BUFFER_MAX)
+        )
+        self._notify_rate_limiter = _NotificationRateLimiter(
+            float(getattr(settings, 'REMNAWAVE_WEBHOOK_USER_NOTIFY_RATE_PER_SECOND', 20.0))
+        )
 
         # Per-instance coalescing state for node.connection_* events.
         # `_node_event_flush_task` — текущая «спящая» в окне coalescing задача.
@@ -186,6 +284,22 @@ class RemnaWaveWebhookService:
         # tasks that the event loop will cancel mid-flight anyway.
         self._stopped: bool = False
 
+        # Per-instance coalescing state for user.* events. Ключ буфера —
+        # (identity, event_name), значение — (seq, data) последнего события:
+        # при flush'е события обрабатываются в порядке seq, так что итоговое
+        # состояние соответствует последнему пришедшему событию.
+        self._user_event_buffer: dict[tuple[str, str], tuple[int, dict]] = {}
+        self._user_event_seq: int = 0
+        self._user_event_flush_task: asyncio.Task[None] | None = None
+        self._user_event_pending_tasks: set[asyncio.Task[None]] = set()
+        self._user_event_lock = asyncio.Lock()
+        # Одновременно обрабатывается только один flush; события одного
+        # пользователя (flush и прямой путь) сериализуются per-user локом.
+        self._user_event_flush_lock = asyncio.Lock()
+        self._user_event_user_locks: dict[str, _UserEventLock] = {}
+        self._journal_instance_id = uuid.uuid4().hex
+        self._journal_heartbeat_task: asyncio.Task[None] | None = None
+
         # User-scoped handlers: require user resolution
         self._user_handlers: dict[str, Any] = {
             'user.expired': self._handle_user_expired,
@@ -226,6 +340,15 @@ class RemnaWaveWebhookService:
         """Check if the event requires a DB session (user handler or dual event)."""
         return event_name in self._user_handlers
 
+    def is_coalesced_event(self, event_name: str) -> bool:
+        """Check if the event is buffered and processed later on its own DB session."""
+        return (
+            self._USER_EVENT_COALESCE_WINDOW_SECONDS > 0
+            and event_name in _COALESCED_USER_EVENTS
+            and event_name in self._user_handlers
+            and event_name not in self._admin_handlers
+        )
+
     @classmethod
     def _prune_intentional_panel_deletions(cls) -> None:
         if not cls._intentional_panel_deletions_by_uuid and not cls._intentional_panel_deletions_by_telegram_id:
@@ -326,19 +449,50 @@ class RemnaWaveWebhookService:
         if event_name in self._admin_handlers:
             return await self._process_admin_event(event_name, data)
 
+        # Coalesced user events are resolved in batches on the flush session
+        if user_handler and self.is_coalesced_event(event_name):
+            identity = self._user_event_identity(data)
+            if identity is not None and await self._enqueue_user_event(identity, event_name, data):
+                return True
+            if db is None:
+                # Не удалось буферизовать (нет идентификатора или сервис остановлен)
+                async with AsyncSessionLocal() as own_db:
+                    processed = await self._process_user_event(own_db, event_name, data, user_handler)
+                    await own_db.commit()
+                    return processed
+
         # Check user-scoped handlers (require DB session)
         if user_handler:
             if db is None:
                 logger.error('RemnaWave webhook: DB session required for user event', event_name=event_name)
                 return False
-            return await self._process_user_event(db, event_name, data, user_handler)
+            # Buffered state events of this user must land before the one-off event
+            identity = self._user_event_identity(data)
+            if identity is None:
+                return await self._process_user_event(db, event_name, data, user_handler)
+            async with self._serialize_user_events((identity,)):
+                await self._process_buffered_user_events(db, await self._take_user_events((identity,)))
+                return await self._process_user_event(db, event_name, data, user_handler)
 
         logger.debug('Unhandled RemnaWave webhook event', event_name=event_name)
         return False
 
-    async def _process_user_event(self, db: AsyncSession, event_name: str, data: dict, handler: Any) -> bool:
+    async def _process_user_event(
+        self,
+        db: AsyncSession,
+        event_name: str,
+        data: dict,
+        handler: Any,
+        *,
+        prefetched: dict[str, User] | None = None,
+    ) -> bool:
         """Resolve user and execute user-scoped handler."""
-        user, subscription = await self._resolve_user_and_subscription(db, data)
+        resolved = None
+        if prefetched is not None:
+            resolved = await self._resolve_prefetched_user_and_subscription(db, data, prefetched)
+        if resolved is None:
+            resolved = await self._resolve_user_and_subscription(db, data)
+        user, subscription = resolved
         if not user:
             logger.warning(
                 'RemnaWave webhook: user not found for event , data telegramId= uuid',
@@ -609,13 +763,386 @@ class RemnaWaveWebhookService:
         # _flush_node_events_after_delay уже ловит любые сюрпризы.
         await self._admin_service.send_webhook_notification(text)
 
+    # ------------------------------------------------------------------
+    # User event coalescing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _user_event_identity(data: dict) -> str | None:
+        """Stable per-panel-user key: Remnawave UUID, falling back to telegramId."""
+        remnawave_uuid = data.get('uuid') or data.get('userUuid')
+        telegram_id = data.get('telegramId')
+        nested_user = data.get('user')
+        if isinstance(nested_user, dict):
+            remnawave_uuid = remnawave_uuid or nested_user.get('uuid')
+            telegram_id = telegram_id or nested_user.get('telegramId')
+        if remnawave_uuid:
+            return f'uuid:{str(remnawave_uuid).strip()}'
+        if telegram_id:
+            return f'tg:{telegram_id}'
+        return None
+
+    @staticmethod
+    def _journal_field(identity: str, event_name: str, seq: int) -> str:
+        return f'{event_name}|{identity}|{seq}'
+
+    async def _enqueue_user_event(self, identity: str, event_name: str, data: dict) -> bool:
+        """Buffer a user event; a newer event of the same type for the same user replaces the older one."""
+        async with self._user_event_lock:
+            if self._stopped:
+                return False
+            self._user_event_seq += 1
+            seq = self._user_event_seq
+            key = (identity, event_name)
+            previous = self._user_event_buffer.get(key)
+            self._user_event_buffer[key] = (seq, data)
+
+            overflow = len(self._user_event_buffer) >= self._USER_EVENT_BUFFER_MAX
+            if self._user_event_flush_task is None or self._user_event_flush_task.done():
+                self._schedule_user_event_flush(0 if overflow else self._USER_EVENT_COALESCE_WINDOW_SECONDS)
+            elif overflow:
+                # Окно ещё идёт, но буфер полон — сбрасываем его прямо сейчас,
+                # спящая задача найдёт пустой буфер и ничего не сделает.
+                self._schedule_user_event_flush(0)
+
+            # Под локом: flush забирает событие из буфера только после того, как
+            # оно записано в журнал, иначе его HDEL может опередить HSET
+            await self._journal_user_event(identity, event_name, seq, data, previous[0] if previous else None)
+        return True
+
+    def _schedule_user_event_flush(self, delay: float) -> None:
+        task = asyncio.create_task(self._flush_user_events_after_delay(delay))
+        self._user_event_flush_task = task
+        self._user_event_pending_tasks.add(task)
+        task.add_done_callback(self._user_event_pending_tasks.discard)
+
+    @property
+    def _journal_key(self) -> str:
+        return f'{_USER_EVENT_JOURNAL_KEY_PREFIX}{self._journal_instance_id}'
+
+    async def _journal_user_event(
+        self, identity: str, event_name: str, seq: int, data: dict, previous_seq: int | None
+    ) -> None:
+        if not cache._connected:
+            return
+        try:
+            journal_field = self._journal_field(identity, event_name, seq)
+            await cache.redis_client.hset(self._journal_key, journal_field, json.dumps(data, default=str))
+            if previous_seq is not None:
+                await cache.redis_client.hdel(
+                    self._journal_key, self._journal_field(identity, event_name, previous_seq)
+                )
+        except Exception as error:
+            logger.warning('Failed to journal buffered RemnaWave user event', event_name=event_name, error=error)
+
+    async def _forget_journaled_user_events(self, fields: list[str]) -> None:
+        if not fields or not cache._connected:
+            return
+        try:
+            await cache.redis_client.hdel(self._journal_key, *fields)
+        except Exception as error:
+            logger.warning('Failed to clear RemnaWave user event journal', count=len(fields), error=error)
+
+    async def _renew_journal_lease(self) -> None:
+        await cache.redis_client.set(
+            f'{_USER_EVENT_JOURNAL_OWNER_PREFIX}{self._journal_instance_id}',
+            '1',
+            ex=self._USER_EVENT_JOURNAL_LEASE_SECONDS,
+        )
+
+    async def _journal_heartbeat_loop(self) -> None:
+        """Keep this process's journal owned and pick up journals whose owner's lease has expired since."""
+        while True:
+            await asyncio.sleep(self._USER_EVENT_JOURNAL_LEASE_SECONDS / 3)
+            if not cache._connected:
+                continue
+            try:
+                await self._renew_journal_lease()
+            except Exception as error:
+                logger.warning('Failed to renew RemnaWave user event journal lease', error=error)
+                continue
+            # Процесс, перезапущенный быстрее, чем истекла аренда, при старте журнал
+            # предшественника не забрал — он станет ничьим позже
+            await self._claim_orphaned_journals()
+
+    async def start(self) -> None:
+        """Take ownership of a journal and re-buffer events of processes that stopped mid-window.
+
+        Only journals whose owner key has expired are claimed: RENAME moves the
+        hash to a key private to this process, so exactly one replica restores
+        each orphaned journal, and journals of live replicas are left alone.
+        A journal whose lease is still running at startup (a quick restart) is
+        claimed later by the heartbeat loop.
+        """
+        if not cache._connected:
+            return
+        try:
+            await self._renew_journal_lease()
+            await cache.redis_client.sadd(_USER_EVENT_JOURNALS_KEY, self._journal_instance_id)
+        except Exception as error:
+            logger.warning('Failed to register RemnaWave user event journal', error=error)
+            return
+        if self._journal_heartbeat_task is None or self._journal_heartbeat_task.done():
+            self._journal_heartbeat_task = asyncio.create_task(self._journal_heartbeat_loop())
+
+        await self._claim_orphaned_journals()
+
+    async def _claim_orphaned_journals(self) -> None:
+        """Claim every journal whose owner's lease has expired and schedule a flush of its events."""
+        if self._stopped:
+            return
+        try:
+            raw_instances = await cache.redis_client.smembers(_USER_EVENT_JOURNALS_KEY)
+        except Exception as error:
+            logger.warning('Failed to list RemnaWave user event journals', error=error)
+            return
+
+        restored = 0
+        for raw_instance in raw_instances:
+            instance_id = raw_instance.decode() if isinstance(raw_instance, bytes) else raw_instance
+            if instance_id != self._journal_instance_id:
+                restored += await self._claim_orphaned_journal(instance_id)
+
+        if restored:
+            async with self._user_event_lock:
+                if not self._stopped and (self._user_event_flush_task is None or self._user_event_flush_task.done()):
+                    self._schedule_user_event_flush(0)
+            logger.info('Restored buffered RemnaWave user events from journal', count=restored)
+
+    async def _claim_orphaned_journal(self, instance_id: str) -> int:
+        """Move an orphaned journal into ours and the buffer; return the number of restored events."""
+        claimed_key = f'{_USER_EVENT_JOURNAL_KEY_PREFIX}{instance_id}:claimed:{self._journal_instance_id}'
+        try:
+            if await cache.redis_client.exists(f'{_USER_EVENT_JOURNAL_OWNER_PREFIX}{instance_id}'):
+                return 0
+            try:
+                await cache.redis_client.rename(f'{_USER_EVENT_JOURNAL_KEY_PREFIX}{instance_id}', claimed_key)
+            except Exception:
+                # Журнала нет: он пуст или его уже забрал другой процесс
+                await cache.redis_client.srem(_USER_EVENT_JOURNALS_KEY, instance_id)
+                return 0
+            journal = await cache.redis_client.hgetall(claimed_key)
+        except Exception as error:
+            logger.warning('Failed to claim RemnaWave user event journal', instance_id=instance_id, error=error)
+            return 0
+
+        restored: dict[str, str] = {}
+        async with self._user_event_lock:
+            for raw_field, raw_data in journal.items():
+                journal_field = raw_field.decode() if isinstance(raw_field, bytes) else raw_field
+                try:
+                    event_name, identity, raw_seq = journal_field.split('|')
+                    seq = int(raw_seq)
+                    data = json.loads(raw_data)
+                except (ValueError, TypeError):
+                    logger.warning('Skipping malformed RemnaWave user event journal entry', field=journal_field)
+                    continue
+                key = (identity, event_name)
+                current = self._user_event_buffer.get(key)
+                if current is None or current[0] < seq:
+                    self._user_event_buffer[key] = (seq, data)
+                    restored[journal_field] = raw_data.decode() if isinstance(raw_data, bytes) else raw_data
+                self._user_event_seq = max(self._user_event_seq, seq)
+
+        try:
+            if restored:
+                await cache.redis_client.hset(self._journal_key, mapping=restored)
+            await cache.redis_client.delete(claimed_key)
+            await cache.redis_client.srem(_USER_EVENT_JOURNALS_KEY, instance_id)
+        except Exception as error:
+            logger.warning('Failed to merge claimed RemnaWave user event journal', instance_id=instance_id, error=error)
+
+        logger.info('Claimed orphaned RemnaWave user event journal', instance_id=instance_id, count=len(restored))
+        return len(restored)
+
+    async def _release_journal(self) -> None:
+        """Stop renewing the lease; undrained events become claimable by the next process right away."""
+        task = self._journal_heartbeat_task
+        self._journal_heartbeat_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if not cache._connected:
+            return
+        try:
+            await cache.redis_client.delete(f'{_USER_EVENT_JOURNAL_OWNER_PREFIX}{self._journal_instance_id}')
+            if not await cache.redis_client.exists(self._journal_key):
+                await cache.redis_client.srem(_USER_EVENT_JOURNALS_KEY, self._journal_instance_id)
+        except Exception as error:
+            logger.warning('Failed to release RemnaWave user event journal', error=error)
+
+    async def _take_user_events(self, identities: Collection[str] | None = None) -> list[tuple[str, str, int, dict]]:
+        """Atomically remove buffered events (all or of the given users) ordered by arrival."""
+        async with self._user_event_lock:
+            if identities is None:
+                taken = self._user_event_buffer
+                self._user_event_buffer = {}
+            else:
+                keys = [key for key in self._user_event_buffer if key[0] in identities]
+                taken = {key: self._user_event_buffer.pop(key) for key in keys}
+        entries = [(key[0], key[1], seq, data) for key, (seq, data) in taken.items()]
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    @asynccontextmanager
+    async def _serialize_user_events(self, identities: Collection[str]) -> AsyncIterator[None]:
+        """Hold the per-user locks of ``identities``; acquired in sorted order so holders never deadlock."""
+        ordered = sorted(set(identities))
+        user_locks = []
+        for identity in ordered:
+            user_lock = self._user_event_user_locks.get(identity)
+            if user_lock is None:
+                user_lock = self._user_event_user_locks[identity] = _UserEventLock()
+            user_lock.holders += 1
+            user_locks.append(user_lock)
+
+        acquired: list[_UserEventLock] = []
+        try:
+            for user_lock in user_locks:
+                await user_lock.lock.acquire()
+                acquired.append(user_lock)
+            yield
+        finally:
+            for user_lock in acquired:
+                user_lock.lock.release()
+            for identity, user_lock in zip(ordered, user_locks, strict=True):
+                user_lock.holders -= 1
+                if user_lock.holders == 0:
+                    self._user_event_user_locks.pop(identity, None)
+
+    async def _flush_user_events(self) -> None:
+        """Process the buffer on one DB session while holding the locks of every buffered user."""
+        async with self._user_event_flush_lock:
+            async with self._user_event_lock:
+                identities = {identity for identity, _ in self._user_event_buffer}
+            if not identities:
+                return
+            # События пользователей, пришедших после снимка, останутся в
+            # буфере до следующего flush'а
+            async with self._serialize_user_events(identities):
+                entries = await self._take_user_events(identities)
+                if not entries:
+                    return
+                async with AsyncSessionLocal() as db:
+                    await self._process_buffered_user_events(db, entries)
+
+    async def _flush_user_events_after_delay(self, delay: float) -> None:
+        """Sleep for the coalesce window, then flush; only one flush runs at a time."""
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+
+        try:
+            await self._flush_user_events()
+        except Exception:
+            # Необработанные события остаются в журнале и будут подняты start()
+            logger.exception('Failed to flush buffered RemnaWave user events')
+        finally:
+            # Пока flush шёл, задача оставалась текущей и новые события новую
+            # не планировали — забираем их следующим окном
+            async with self._user_event_lock:
+                if self._user_event_flush_task is asyncio.current_task():
+                    self._user_event_flush_task = None
+                    if self._user_event_buffer and not self._stopped:
+                        self._schedule_user_event_flush(self._USER_EVENT_COALESCE_WINDOW_SECONDS)
+
+    async def _process_buffered_user_events(self, db: AsyncSession, entries: list[tuple[str, str, int, dict]]) -> None:
+        """Resolve all buffered users with one query and run handlers in arrival order.
+
+        A failing event doesn't stop the batch; each journal entry is removed
+        only once its event has been applied, so failed ones are retried after
+        a restart.
+        """
+        if not entries:
+            return
+
+        prefetched = await self._prefetch_webhook_users(db, [data for _, _, _, data in entries])
+        failed = 0
+        for identity, event_name, seq, data in entries:
+            handler = self._user_handlers.get(event_name)
+            if handler is not None:
+                try:
+                    await self._process_user_event(db, event_name, data, handler, prefetched=prefetched)
+                    await db.commit()
+                except Exception:
+                    failed += 1
+                    logger.exception('Failed to apply buffered RemnaWave user event', event_name=event_name)
+                    try:
+                        await db.rollback()
+                    except Exception:
+                        logger.debug('Rollback after buffered webhook event error also failed')
+                    continue
+            await self._forget_journaled_user_events([self._journal_field(identity, event_name, seq)])
+
+        logger.info('Processed coalesced RemnaWave user events', count=len(entries), failed=failed)
+
+    async def _prefetch_webhook_users(self, db: AsyncSession, payloads: list[dict]) -> dict[str, User]:
+        """Load every user referenced by the payloads in a single query.
+
+        Returns an index by ``tg:<telegram_id>``, ``uuid:<user uuid>`` and, for
+        multi-tariff, ``sub:<subscription uuid>`` with the same eager loads as
+        ``get_user_by_telegram_id``.
+        """
+        telegram_ids: set[int] = set()
+        uuids: set[str] = set()
+        for data in payloads:
+            nested_user = data.get('user') if isinstance(data.get('user'), dict) else {}
+            for raw_tid in (data.get('telegramId'), nested_user.get('telegramId')):
+                if raw_tid:
+                    try:
+                        telegram_ids.add(int(raw_tid))
+                    except (TypeError, ValueError):
+                        pass
+            for raw_uuid in (data.get('uuid'), data.get('userUuid'), nested_user.get('uuid')):
+                if raw_uuid:
+                    uuids.add(str(raw_uuid))
+
+        conditions = []
+        if telegram_ids:
+            conditions.append(User.telegram_id.in_(telegram_ids))
+        if uuids:
+            conditions.append(User.remnawave_uuid.in_(uuids))
+            if settings.is_multi_tariff_enabled():
+                conditions.append(
+                    User.id.in_(select(Subscription.user_id).where(Subscription.remnawave_uuid.in_(uuids)))
+                )
+        if not conditions:
+            return {}
+
+        result = await db.execute(
+            select(User)
+            .options(
+                selectinload(User.subscriptions).selectinload(Subscription.tariff),
+                selectinload(User.user_promo_groups).selectinload(UserPromoGroup.promo_group),
+                selectinload(User.referrer),
+                selectinload(User.promo_group),
+            )
+            .where(or_(*conditions))
+        )
+
+        index: dict[str, User] = {}
+        for user in result.scalars().all():
+            if user.telegram_id is not None:
+                index[f'tg:{user.telegram_id}'] = user
+            if user.remnawave_uuid:
+                index[f'uuid:{user.remnawave_uuid}'] = user
+            for subscription in user.subscriptions:
+                if subscription.remnawave_uuid:
+                    index[f'sub:{subscription.remnawave_uuid}'] = user
+        return index
+
     # Жёсткий cap на общую длительность stop() — выше container'овского
     # terminationGracePeriodSeconds выходить нельзя, иначе SIGKILL.
     _STOP_DRAIN_TIMEOUT_SECONDS: float = 15.0
     _STOP_CANCEL_TIMEOUT_SECONDS: float = 2.0
 
     async def stop(self) -> None:
-        """Drain buffered node events before shutdown.
+        """Drain buffered user and node events before shutdown.
 
         Cancels the in-flight «sleep + flush» task (если она ещё в окне
         coalescing'а), потом вручную свопает буфер и шлёт по одному сводному
@@ -639,6 +1166,8 @@ class RemnaWaveWebhookService:
         async with self._node_event_lock:
             self._stopped = True
 
+        await self._drain_user_events_on_stop()
+
         task = self._node_event_flush_task
         if task is not None and not task.done():
             task.cancel()
@@ -677,6 +1206,37 @@ class RemnaWaveWebhookService:
                 total_events=sum(len(payloads) for payloads in buffer.values()),
             )
 
+    async def _drain_user_events_on_stop(self) -> None:
+        """Process buffered user events before shutdown.
+
+        Всё, что не успело обработаться за таймаут, остаётся в Redis-журнале
+        и будет поднято start()'ом следующего процесса.
+        """
+        async with self._user_event_lock:
+            task = self._user_event_flush_task
+            self._user_event_flush_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await asyncio.wait_for(task, timeout=self._STOP_CANCEL_TIMEOUT_SECONDS)
+            except (TimeoutError, asyncio.CancelledError):
+                pass
+            except Exception:
+                logger.warning('User event flush task raised during stop()', exc_info=True)
+
+        if self._user_event_buffer:
+            try:
+                await asyncio.wait_for(self._flush_user_events(), timeout=self._STOP_DRAIN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                logger.warning(
+                    'User-event drain timed out on stop(), rest stays journaled',
+                    total_events=len(self._user_event_buffer),
+                )
+            except Exception:
+                logger.warning('User-event drain failed on stop(), events stay journaled', exc_info=True)
+
+        await self._release_journal()
+
     async def _drain_buffered_events(
         self,
         buffer: dict[str, list[dict]],
@@ -830,6 +1390,77 @@ class RemnaWaveWebhookService:
         subscription = await get_subscription_by_user_id(db, user.id)
         return user, subscription
 
+    async def _resolve_prefetched_user_and_subscription(
+        self, db: AsyncSession, data: dict, prefetched: dict[str, User]
+    ) -> tuple[User | None, Subscription | None] | None:
+        """Resolve a payload against the batch prefetched by ``_prefetch_webhook_users``.
+
+        Mirrors the lookup order of ``_resolve_user_and_subscription``. Returns
+        None when the fast path can't decide (ambiguous multi-tariff fallbacks,
+        or the session was rolled back and prefetched objects expired) — the
+        caller then falls back to the per-event lookup.
+        """
+        remnawave_uuid = data.get('uuid') or data.get('userUuid')
+        nested_user = data.get('user') if isinstance(data.get('user'), dict) else {}
+        if not remnawave_uuid:
+            remnawave_uuid = nested_user.get('uuid')
+
+        candidates: list[str] = []
+        top_level_uuid = data.get('uuid') or data.get('userUuid')
+        for prefix, value in (
+            ('tg', data.get('telegramId')),
+            ('uuid', top_level_uuid),
+            ('tg', nested_user.get('telegramId')),
+            ('uuid', nested_user.get('uuid')),
+        ):
+            if value:
+                candidates.append(f'{prefix}:{value}')
+
+        user = next((prefetched[key] for key in candidates if key in prefetched), None)
+        multi_tariff = settings.is_multi_tariff_enabled()
+
+        if user is None and remnawave_uuid and multi_tariff:
+            user = prefetched.get(f'sub:{remnawave_uuid}')
+            if user is not None and not sa_inspect(user).expired_attributes:
+                subscription = next(
+                    (sub for sub in user.subscriptions if sub.remnawave_uuid == remnawave_uuid),
+                    None,
+                )
+                if subscription is not None:
+                    return user, subscription
+
+        if user is None:
+            # Запрос покрыл все telegramId/uuid пакета — пользователя нет в БД
+            return None, None
+        if sa_inspect(user).expired_attributes:
+            return None
+
+        if multi_tariff:
+            if not remnawave_uuid:
+                return user, None
+            subscription = next(
+                (sub for sub in user.subscriptions if sub.remnawave_uuid == remnawave_uuid),
+                None,
+            )
+            return (user, subscription) if subscription is not None else None
+
+        if not user.subscriptions:
+            return user, None
+
+        # Та же сортировка, что в get_subscription_by_user_id
+        status_rank = {SubscriptionStatus.ACTIVE.value: 0, SubscriptionStatus.TRIAL.value: 1}
+        primary = min(
+            user.subscriptions,
+            key=lambda sub: (
+                status_rank.get(sub.status, 2),
+                sub.end_date is None,
+                -sub.end_date.timestamp() if sub.end_date else 0,
+                -sub.created_at.timestamp() if sub.created_at else 0,
+            ),
+        )
+        subscription = await check_and_update_subscription_status(db, primary)
+        return user, subscription
+
     # ------------------------------------------------------------------
     # Notification helpers
     # ------------------------------------------------------------------
@@ -960,6 +1591,7 @@ class RemnaWaveWebhookService:
         context = {'text_key': text_key, **(format_kwargs or {})}
 
         try:
+            await self._notify_rate_limiter.acquire()
             await notification_delivery_service.send_notification(
                 user=user,
                 notification_type=notification_type,
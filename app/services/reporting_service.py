@@ -15,7 +15,6 @@ from sqlalchemy.sql import false, true
 from app.config import settings
 from app.database.crud.subscription import get_subscriptions_statistics
 from app.database.crud.transaction import REAL_PAYMENT_METHODS
-from app.database.database import AsyncSessionLocal
 from app.database.models import (
     Subscription,
     SubscriptionConversion,
@@ -26,6 +25,7 @@ from app.database.models import (
     TransactionType,
     User,
 )
+from app.database.read_routing import read_session
 
 
 logger = structlog.get_logger(__name__)
@@ -235,7 +235,7 @@ class ReportingService:
         start_utc = period_range.start_msk.astimezone(UTC)
         end_utc = period_range.end_msk.astimezone(UTC)
 
-        async with AsyncSessionLocal() as session:
+        async with read_session() as session:
             totals = await self._collect_current_totals(session)
             stats = await self._collect_period_stats(session, start_utc, end_utc)
             top_referrers = await self._get_top_referrers(session, start_utc, end_utc, limit=5)
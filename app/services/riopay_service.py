@@ -8,6 +8,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -53,6 +54,7 @@ class RioPayService:
         """Возвращает переиспользуемую HTTP-сессию."""
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(
+                trace_configs=http_client_trace_configs('riopay'),
                 timeout=aiohttp.ClientTimeout(total=30),
             )
         return self._session
@@ -574,10 +574,16 @@ class SubscriptionService:
 
     async def disable_remnawave_user(self, user_uuid: str) -> bool:
         try:
-            async with self.get_api_client() as api:
-                await api.disable_user(user_uuid)
-                logger.info('✅ Отключен RemnaWave пользователь', user_uuid=user_uuid)
-                return True
+            if settings.REMNAWAVE_WRITE_COALESCE_ENABLED:
+                # Массовые отключения (истечение подписок, бан) уходят в панель одним bulk-запросом
+                from app.services.remnawave_service import RemnaWaveService
+
+                await RemnaWaveService().queue_user_update(user_uuid, status=UserStatus.DISABLED)
+            else:
+                async with self.get_api_client() as api:
+                    await api.disable_user(user_uuid)
+            logger.info('✅ Отключен RemnaWave пользователь', user_uuid=user_uuid)
+            return True
 
         except Exception as e:
             error_msg = str(e).lower()
@@ -607,10 +613,16 @@ class SubscriptionService:
     async def enable_remnawave_user(self, user_uuid: str) -> bool:
         """Включить пользователя в RemnaWave (реактивация)."""
         try:
-            async with self.get_api_client() as api:
-                await api.enable_user(user_uuid)
-                logger.info('✅ Включен RemnaWave пользователь', user_uuid=user_uuid)
-                return True
+            if settings.REMNAWAVE_WRITE_COALESCE_ENABLED:
+                # Массовые включения (разбан, восстановление) уходят в панель одним bulk-запросом
+                from app.services.remnawave_service import RemnaWaveService
+
+                await RemnaWaveService().queue_user_update(user_uuid, status=UserStatus.ACTIVE)
+            else:
+                async with self.get_api_client() as api:
+                    await api.enable_user(user_uuid)
+            logger.info('✅ Включен RemnaWave пользователь', user_uuid=user_uuid)
+            return True
 
         except Exception as e:
             error_msg = str(e).lower()
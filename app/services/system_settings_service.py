@@ -23,10 +23,13 @@ from app.database.crud.system_setting import (
 from app.database.database import AsyncSessionLocal
 from app.database.models import SystemSetting
 from app.services.web_api_token_service import ensure_default_web_api_token
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 
 logger = structlog.get_logger(__name__)
 
+SYSTEM_SETTINGS_TOPIC = 'system_settings'
+
 
 def _title_from_key(key: str) -> str:
     parts = key.split('_')
@@ -1606,6 +1609,56 @@ class BotConfigurationService:
         cls._overrides_raw.clear()
         await cls.initialize()
 
+    @classmethod
+    async def apply_remote_changes(cls, keys: frozenset[str] | None) -> None:
+        """Применить изменения, сделанные другим процессом.
+
+        ``keys`` — изменённые ключи; ``None`` означает сверку всех overrides с БД.
+        """
+        query = select(SystemSetting)
+        if keys is not None:
+            query = query.where(SystemSetting.key.in_(keys))
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query)
+            stored = {row.key: row.value for row in result.scalars().all() if row.key in cls._definitions}
+
+            candidates = set(stored) | (set(cls._overrides_raw) if keys is None else keys & cls._definitions.keys())
+            changed: list[str] = []
+            for key in candidates:
+                if cls._is_env_override(key):
+                    continue
+                if key in stored:
+                    raw_value = stored[key]
+                    if cls._overrides_raw.get(key, object()) == raw_value:
+                        continue
+                    try:
+                        value = cls.deserialize_value(key, raw_value)
+                    except Exception as error:
+                        logger.error('Не удалось применить настройку', key=key, error=error)
+                        continue
+                    cls._overrides_raw[key] = raw_value
+                elif key in cls._overrides_raw:
+                    cls._overrides_raw.pop(key)
+                    value = cls.get_original_value(key)
+                else:
+                    continue
+                cls._apply_to_settings(key, value)
+                changed.append(key)
+
+            if not changed:
+                return
+
+            if {'WEB_API_DEFAULT_TOKEN', 'WEB_API_DEFAULT_TOKEN_NAME'} & set(changed):
+                await cls._sync_default_web_api_token()
+
+            if 'SALES_MODE' in changed and settings.is_tariffs_mode():
+                from app.database.crud.tariff import load_period_prices_from_db
+
+                await load_period_prices_from_db(session)
+
+        logger.info('Применены изменения настроек из другого процесса', keys=sorted(changed))
+
     @classmethod
     def deserialize_value(cls, key: str, raw_value: str | None) -> Any:
         if raw_value is None:
@@ -1710,6 +1763,8 @@ class BotConfigurationService:
             cls._overrides_raw[key] = raw_value
             cls._apply_to_settings(key, value)
 
+        await cache_invalidation_bus.publish_after_commit(db, SYSTEM_SETTINGS_TOPIC, [key])
+
         if key in {'WEB_API_DEFAULT_TOKEN', 'WEB_API_DEFAULT_TOKEN_NAME'}:
             await cls._sync_default_web_api_token()
 
@@ -1737,6 +1792,8 @@ class BotConfigurationService:
             original = cls.get_original_value(key)
             cls._apply_to_settings(key, original)
 
+        await cache_invalidation_bus.publish_after_commit(db, SYSTEM_SETTINGS_TOPIC, [key])
+
         if key in {'WEB_API_DEFAULT_TOKEN', 'WEB_API_DEFAULT_TOKEN_NAME'}:
             await cls._sync_default_web_api_token()
 
@@ -1860,3 +1917,5 @@ class BotConfigurationService:
 
 
 bot_configuration_service = BotConfigurationService
+
+cache_invalidation_bus.register(SYSTEM_SETTINGS_TOPIC, bot_configuration_service.apply_remote_changes)
@@ -5,6 +5,7 @@ import redis.asyncio as redis
 import structlog
 
 from app.config import settings
+from app.utils.redis_registry import redis_registry
 
 
 logger = structlog.get_logger(__name__)
@@ -23,12 +24,12 @@ class UserCartService:
         self._initialized: bool = False
 
     def _get_redis_client(self) -> redis.Redis | None:
-        """Ленивая инициализация Redis клиента."""
+        """Ленивая инициализация Redis клиента над общим пулом."""
         if self._initialized:
             return self._redis_client
 
         try:
-            self._redis_client = redis.from_url(settings.REDIS_URL)
+            self._redis_client = redis_registry.client('cart')
             self._initialized = True
             logger.debug('Redis клиент для корзины инициализирован')
         except Exception as e:
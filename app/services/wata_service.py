@@ -11,6 +11,7 @@ import aiohttp
 import structlog
 
 from app.config import settings
+from app.utils.metrics import http_client_trace_configs
 
 
 logger = structlog.get_logger(__name__)
@@ -93,7 +94,7 @@ class WataService:
         for attempt in range(1 + self._MAX_RETRIES):
             try:
                 async with (
-                    aiohttp.ClientSession(timeout=timeout) as session,
+                    aiohttp.ClientSession(timeout=timeout, trace_configs=http_client_trace_configs('wata')) as session,
                     session.request(
                         method,
                         url,
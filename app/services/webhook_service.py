@@ -4,22 +4,48 @@ import asyncio
 import hashlib
 import hmac
 import json
+import math
+import random
+import time
+from collections import defaultdict
+from contextlib import suppress
 from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 import aiohttp
 import structlog
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.crud.webhook import (
-    get_active_webhooks_for_event,
-    record_webhook_delivery,
-    update_webhook_stats,
-)
+from app.config import settings
+from app.database.crud.webhook import get_active_webhooks_for_event
+from app.database.database import AsyncSessionLocal
+from app.database.models import Webhook, WebhookDelivery
+from app.utils.metrics import http_client_trace_configs, track_loop
 
 
 logger = structlog.get_logger(__name__)
 
+# Пока доставка в работе, строка «арендована» воркером: после падения процесса
+# она снова станет due по истечении аренды (at-least-once). Аренда считается от
+# размера пачки (см. _delivery_lease_seconds), запас покрывает запись результатов.
+_DELIVERY_LEASE_MARGIN_SECONDS = 60
+_DELIVERY_REQUEST_TIMEOUT_SECONDS = 10
+_DELIVERY_BATCH_SIZE = 100
+_POLL_INTERVAL_SECONDS = 5.0
+_TARGETS_CACHE_TTL_SECONDS = 60.0
+_RETRY_MAX_DELAY_SECONDS = 3600
+
+
+@dataclass(frozen=True, slots=True)
+class WebhookTarget:
+    """Снимок активного webhook, достаточный для доставки."""
+
+    id: int
+    url: str
+    secret: str | None
+
 
 @dataclass
 class DeliveryResult:
@@ -34,17 +60,46 @@ class DeliveryResult:
     error_message: str | None = None
 
 
+@dataclass(slots=True)
+class _DeliveryJob:
+    delivery_id: int
+    target: WebhookTarget
+    event_type: str
+    payload: dict[str, Any]
+    attempt_number: int
+
+
+@dataclass(slots=True)
+class _CircuitState:
+    failures: int = 0
+    open_until: float = 0.0
+
+
 class WebhookService:
-    """Сервис для отправки webhooks."""
+    """Сервис для отправки webhooks.
+
+    ``enqueue`` пишет доставки в outbox (``webhook_deliveries`` со статусом
+    ``pending``) в сессии вызывающего кода. Фоновый воркер забирает due-доставки
+    пачками, отправляет их с ограничением параллельности на endpoint, повторяет
+    неудачные с экспоненциальной задержкой, временно отключает «мёртвые»
+    endpoint'ы (circuit breaker) и записывает результаты одной транзакцией.
+    """
 
     def __init__(self) -> None:
         self._session: aiohttp.ClientSession | None = None
+        self._targets_cache: dict[str, tuple[float, tuple[WebhookTarget, ...]]] = {}
+        self._endpoint_limits: dict[int, asyncio.Semaphore] = {}
+        self._circuits: dict[int, _CircuitState] = defaultdict(_CircuitState)
+        self._worker_limit: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._running = False
+        self._wakeup = asyncio.Event()
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Получить или создать HTTP сессию."""
         if self._session is None or self._session.closed:
-            timeout = aiohttp.ClientTimeout(total=10, connect=5)
-            self._session = aiohttp.ClientSession(timeout=timeout)
+            timeout = aiohttp.ClientTimeout(total=_DELIVERY_REQUEST_TIMEOUT_SECONDS, connect=5)
+            self._session = aiohttp.ClientSession(timeout=timeout, trace_configs=http_client_trace_configs('webhooks'))
         return self._session
 
     async def close(self) -> None:
@@ -60,30 +115,289 @@ class WebhookService:
             hashlib.sha256,
         ).hexdigest()
 
-    async def send_webhook(
+    # --- Настройки ---
+
+    @property
+    def _max_attempts(self) -> int:
+        return max(1, settings.WEBHOOK_DELIVERY_MAX_ATTEMPTS)
+
+    @property
+    def _retry_base_delay(self) -> float:
+        return max(1.0, settings.WEBHOOK_DELIVERY_RETRY_BASE_SECONDS)
+
+    @property
+    def _circuit_threshold(self) -> int:
+        return max(1, settings.WEBHOOK_DELIVERY_CIRCUIT_THRESHOLD)
+
+    @property
+    def _circuit_open_seconds(self) -> float:
+        return max(1.0, settings.WEBHOOK_DELIVERY_CIRCUIT_OPEN_SECONDS)
+
+    # --- Подписки по типам событий ---
+
+    async def get_targets(self, db: AsyncSession, event_type: str) -> tuple[WebhookTarget, ...]:
+        """Активные webhooks для события (кешируются на процесс)."""
+        cached = self._targets_cache.get(event_type)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        webhooks = await get_active_webhooks_for_event(db, event_type)
+        targets = tuple(WebhookTarget(id=webhook.id, url=webhook.url, secret=webhook.secret) for webhook in webhooks)
+        self._targets_cache[event_type] = (now + _TARGETS_CACHE_TTL_SECONDS, targets)
+        return targets
+
+    def invalidate_targets(self) -> None:
+        """Сбросить кеш подписок (после создания/изменения/удаления webhook)."""
+        self._targets_cache.clear()
+
+    # --- Outbox ---
+
+    async def enqueue(
         self,
         db: AsyncSession,
         event_type: str,
         payload: dict[str, Any],
-    ) -> None:
-        """Отправить webhook для события."""
-        webhooks = await get_active_webhooks_for_event(db, event_type)
+        *,
+        commit: bool = True,
+    ) -> int:
+        """Поставить доставки события в outbox в транзакции вызывающего кода.
 
-        if not webhooks:
+        При ``commit=False`` строки только сбрасываются (flush) и фиксируются
+        вместе с остальными изменениями вызывающего кода.
+        """
+        targets = await self.get_targets(db, event_type)
+        if not targets:
             logger.debug('No active webhooks for event type', event_type=event_type)
+            return 0
+
+        # Нормализуем payload так же, как он уйдёт по HTTP
+        normalized = json.loads(json.dumps(payload, default=str, ensure_ascii=False))
+        now = datetime.now(UTC)
+        db.add_all(
+            [
+                WebhookDelivery(
+                    webhook_id=target.id,
+                    event_type=event_type,
+                    payload=normalized,
+                    status='pending',
+                    attempt_number=0,
+                    next_retry_at=now,
+                )
+                for target in targets
+            ]
+        )
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
+
+        self._wakeup.set()
+        return len(targets)
+
+    # --- Воркер ---
+
+    def is_running(self) -> bool:
+        return self._running and self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Запустить фоновую доставку webhooks."""
+        if self.is_running():
             return
+        self._running = True
+        self._worker_limit = asyncio.Semaphore(max(1, settings.WEBHOOK_DELIVERY_WORKERS))
+        self._task = asyncio.create_task(self._run(), name='webhook-delivery')
+        logger.info('Webhook delivery worker started', workers=settings.WEBHOOK_DELIVERY_WORKERS)
+
+    async def stop(self) -> None:
+        """Остановить воркер; недоставленные строки подхватятся после перезапуска."""
+        self._running = False
+        self._wakeup.set()
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.close()
 
-        # Выполняем HTTP запросы параллельно (без операций с БД)
-        tasks = [self._deliver_webhook_http(webhook, event_type, payload) for webhook in webhooks]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    async def _run(self) -> None:
+        while self._running:
+            self._wakeup.clear()
+            try:
+                with track_loop('webhook_delivery'):
+                    processed = await self.process_due_deliveries()
+            except Exception as error:
+                logger.exception('Webhook delivery iteration failed', error=error)
+                processed = 0
 
-        # Записываем результаты в БД последовательно (избегаем concurrent session access)
-        for result in results:
-            if isinstance(result, Exception):
-                logger.exception('Unexpected error during webhook delivery', result=result)
+            if processed >= _DELIVERY_BATCH_SIZE:
                 continue
-            if isinstance(result, DeliveryResult):
-                await self._record_result(db, result)
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=_POLL_INTERVAL_SECONDS)
+
+    async def process_due_deliveries(self) -> int:
+        """Забрать пачку due-доставок, отправить их и записать результаты."""
+        jobs = await self._claim_due_deliveries()
+        if not jobs:
+            return 0
+
+        outcomes = await asyncio.gather(*(self._attempt(job) for job in jobs))
+        await self._record_outcomes(outcomes)
+        return len(jobs)
+
+    async def _claim_due_deliveries(self) -> list[_DeliveryJob]:
+        now = datetime.now(UTC)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(WebhookDelivery, Webhook.url, Webhook.secret, Webhook.is_active)
+                .join(Webhook, Webhook.id == WebhookDelivery.webhook_id)
+                .where(WebhookDelivery.status == 'pending', WebhookDelivery.next_retry_at <= now)
+                .order_by(WebhookDelivery.next_retry_at, WebhookDelivery.id)
+                .limit(_DELIVERY_BATCH_SIZE)
+                .with_for_update(skip_locked=True, of=WebhookDelivery)
+            )
+            rows = result.all()
+            if not rows:
+                return []
+
+            active_count = sum(1 for *_, is_active in rows if is_active)
+            lease_until = now + timedelta(seconds=self._delivery_lease_seconds(active_count))
+            jobs: list[_DeliveryJob] = []
+            for delivery, url, secret, is_active in rows:
+                if not is_active:
+                    delivery.status = 'failed'
+                    delivery.error_message = 'Webhook disabled'
+                    delivery.next_retry_at = None
+                    continue
+                delivery.next_retry_at = lease_until
+                jobs.append(
+                    _DeliveryJob(
+                        delivery_id=delivery.id,
+                        target=WebhookTarget(id=delivery.webhook_id, url=url, secret=secret),
+                        event_type=delivery.event_type,
+                        payload=delivery.payload,
+                        attempt_number=delivery.attempt_number or 0,
+                    )
+                )
+            await db.commit()
+        return jobs
+
+    @staticmethod
+    def _delivery_lease_seconds(job_count: int) -> int:
+        """Аренда на худший случай: вся пачка идёт в один endpoint и каждый запрос ждёт полный таймаут."""
+        concurrency = max(1, min(settings.WEBHOOK_DELIVERY_WORKERS, settings.WEBHOOK_DELIVERY_PER_ENDPOINT_CONCURRENCY))
+        rounds = math.ceil(job_count / concurrency)
+        return rounds * _DELIVERY_REQUEST_TIMEOUT_SECONDS + _DELIVERY_LEASE_MARGIN_SECONDS
+
+    def _retry_delay(self, attempt_number: int) -> float:
+        delay = min(_RETRY_MAX_DELAY_SECONDS, self._retry_base_delay * 2 ** (attempt_number - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _attempt(self, job: _DeliveryJob) -> dict[str, Any]:
+        """Одна попытка доставки; возвращает значения для обновления строки outbox."""
+        circuit = self._circuits[job.target.id]
+        now = time.time()
+        if circuit.open_until > now:
+            # Endpoint отключён breaker'ом — переносим без траты попытки
+            return {
+                'id': job.delivery_id,
+                'deferred_until': datetime.fromtimestamp(circuit.open_until, UTC),
+            }
+
+        endpoint_limit = self._endpoint_limits.setdefault(
+            job.target.id, asyncio.Semaphore(max(1, settings.WEBHOOK_DELIVERY_PER_ENDPOINT_CONCURRENCY))
+        )
+        async with self._worker_limit or asyncio.Semaphore(1), endpoint_limit:
+            result = await self._deliver_webhook_http(job.target, job.event_type, job.payload)
+
+        attempt_number = job.attempt_number + 1
+        succeeded = result.status == 'success'
+        self._update_circuit(job.target, succeeded)
+
+        if succeeded:
+            status, next_retry_at = 'success', None
+            logger.info('Webhook delivered successfully', id=job.target.id, url=job.target.url)
+        elif attempt_number >= self._max_attempts:
+            status, next_retry_at = 'failed', None
+            logger.warning(
+                'Webhook delivery failed permanently',
+                id=job.target.id,
+                attempt_number=attempt_number,
+                error_message=result.error_message,
+            )
+        else:
+            status = 'pending'
+            next_retry_at = datetime.now(UTC) + timedelta(seconds=self._retry_delay(attempt_number))
+            logger.warning(
+                'Webhook delivery failed, will retry',
+                id=job.target.id,
+                attempt_number=attempt_number,
+                error_message=result.error_message,
+            )
+
+        return {
+            'id': job.delivery_id,
+            'webhook_id': job.target.id,
+            'status': status,
+            'attempt_number': attempt_number,
+            'next_retry_at': next_retry_at,
+            'response_status': result.response_status,
+            'response_body': result.response_body,
+            'error_message': result.error_message,
+            'delivered_at': datetime.now(UTC) if succeeded else None,
+        }
+
+    def _update_circuit(self, target: WebhookTarget, succeeded: bool) -> None:
+        circuit = self._circuits[target.id]
+        if succeeded:
+            circuit.failures = 0
+            circuit.open_until = 0.0
+            return
+
+        circuit.failures += 1
+        if circuit.failures >= self._circuit_threshold:
+            circuit.open_until = time.time() + self._circuit_open_seconds
+            logger.warning(
+                'Webhook endpoint circuit opened',
+                id=target.id,
+                url=target.url,
+                failures=circuit.failures,
+                open_seconds=self._circuit_open_seconds,
+            )
+
+    async def _record_outcomes(self, outcomes: list[dict[str, Any]]) -> None:
+        """Записать результаты пачки одной транзакцией."""
+        attempted = [outcome for outcome in outcomes if 'status' in outcome]
+        deferred = [
+            {'id': outcome['id'], 'next_retry_at': outcome['deferred_until']}
+            for outcome in outcomes
+            if 'deferred_until' in outcome
+        ]
+
+        stats: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+        for outcome in attempted:
+            stats[outcome['webhook_id']][0 if outcome['status'] == 'success' else 1] += 1
+
+        now = datetime.now(UTC)
+        async with AsyncSessionLocal() as db:
+            if attempted:
+                await db.execute(
+                    update(WebhookDelivery),
+                    [{key: value for key, value in outcome.items() if key != 'webhook_id'} for outcome in attempted],
+                )
+            if deferred:
+                await db.execute(update(WebhookDelivery), deferred)
+            for webhook_id, (successes, failures) in stats.items():
+                await db.execute(
+                    update(Webhook)
+                    .where(Webhook.id == webhook_id)
+                    .values(
+                        success_count=Webhook.success_count + successes,
+                        failure_count=Webhook.failure_count + failures,
+                        last_triggered_at=now,
+                    )
+                )
+            await db.commit()
 
     async def _deliver_webhook_http(
         self,
@@ -149,29 +463,6 @@ class WebhookService:
                 error_message=str(error),
             )
 
-    async def _record_result(self, db: AsyncSession, result: DeliveryResult) -> None:
-        """Записать результат доставки в БД (последовательно)."""
-        try:
-            await record_webhook_delivery(
-                db,
-                webhook_id=result.webhook.id,
-                event_type=result.event_type,
-                payload=result.payload,
-                status=result.status,
-                response_status=result.response_status,
-                response_body=result.response_body,
-                error_message=result.error_message,
-            )
-
-            await update_webhook_stats(db, result.webhook, result.status == 'success')
-
-            if result.status == 'success':
-                logger.info('Webhook delivered successfully', id=result.webhook.id, url=result.webhook.url)
-            else:
-                logger.warning('Webhook delivery failed', id=result.webhook.id, error_message=result.error_message)
-        except Exception as error:
-            logger.exception('Failed to record webhook delivery result', id=result.webhook.id, error=error)
-
 
 # Глобальный экземпляр сервиса
 webhook_service = WebhookService()
@@ -9,6 +9,7 @@ import json
 import structlog
 
 from app.database.database import AsyncSessionLocal
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 
 logger = structlog.get_logger(__name__)
@@ -55,6 +56,9 @@ CALLBACK_TO_SECTION: dict[str, str] = {
 # DB key used for storage.
 BUTTON_STYLES_KEY = 'CABINET_BUTTON_STYLES'
 
+# Cross-process invalidation topic (see app.utils.cache_invalidation).
+BUTTON_STYLES_TOPIC = 'button_styles'
+
 # Valid Telegram Bot API style values.
 VALID_STYLES = frozenset({'primary', 'success', 'danger'})
 
@@ -120,3 +124,10 @@ async def load_button_styles_cache() -> dict[str, dict]:
     _cached_styles = merged
     logger.info('Button styles cache loaded', list=list(merged.keys()))
     return merged
+
+
+async def _on_button_styles_invalidated(_keys: frozenset[str] | None) -> None:
+    await load_button_styles_cache()
+
+
+cache_invalidation_bus.register(BUTTON_STYLES_TOPIC, _on_button_styles_invalidated)
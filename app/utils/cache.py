@@ -1,5 +1,7 @@
 import functools
 import json
+import time
+from collections.abc import AsyncIterator, Iterable
 from datetime import timedelta
 from typing import Any
 
@@ -8,10 +10,19 @@ import structlog
 from redis.exceptions import NoScriptError
 
 from app.config import settings
+from app.utils.redis_registry import redis_registry
 
 
 logger = structlog.get_logger(__name__)
 
+# Ключи, помеченные тегом, хранятся в Redis-множестве cache_tag:{tag}
+_TAG_KEY_PREFIX = 'cache_tag:'
+_UNLINK_BATCH_SIZE = 500
+_SCAN_COUNT = 1000
+
+# Списки стран/серверов для покупки (ключи available_countries:{promo_group})
+AVAILABLE_COUNTRIES_CACHE_TAG = 'available_countries'
+
 
 class CacheService:
     def __init__(self):
@@ -20,7 +31,7 @@ class CacheService:
 
     async def connect(self):
         try:
-            self.redis_client = redis.from_url(settings.REDIS_URL)
+            self.redis_client = redis_registry.client('cache')
             await self.redis_client.ping()
             self._connected = True
             # Invalidate cached Lua script SHA (new connection = new script cache)
@@ -31,9 +42,9 @@ class CacheService:
             self._connected = False
 
     async def disconnect(self):
-        if self.redis_client:
-            await self.redis_client.close()
-            self._connected = False
+        # Пул общий для всех потребителей и закрывается в redis_registry.close()
+        self.redis_client = None
+        self._connected = False
 
     async def get(self, key: str) -> Any | None:
         if not self._connected:
@@ -48,7 +59,15 @@ class CacheService:
             logger.error('Ошибка получения из кеша', key=key, error=e)
             return None
 
-    async def set(self, key: str, value: Any, expire: int | timedelta = None) -> bool:
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        expire: int | timedelta = None,
+        *,
+        tags: Iterable[str] | None = None,
+    ) -> bool:
+        """Записать значение; ``tags`` позволяют потом удалить ключ через ``invalidate_tags``."""
         if not self._connected:
             return False
 
@@ -58,7 +77,22 @@ class CacheService:
             if isinstance(expire, timedelta):
                 expire = int(expire.total_seconds())
 
-            await self.redis_client.set(key, serialized_value, ex=expire)
+            if not tags:
+                await self.redis_client.set(key, serialized_value, ex=expire)
+                return True
+
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, serialized_value, ex=expire)
+                for tag in tags:
+                    tag_key = f'{_TAG_KEY_PREFIX}{tag}'
+                    pipe.sadd(tag_key, key)
+                    if expire:
+                        # Множество тега живёт не меньше самого долгоживущего ключа
+                        pipe.expire(tag_key, expire, nx=True)
+                        pipe.expire(tag_key, expire, gt=True)
+                    else:
+                        pipe.persist(tag_key)
+                await pipe.execute()
             return True
         except Exception as e:
             logger.error('Ошибка записи в кеш', key=key, error=e)
@@ -114,21 +148,95 @@ class CacheService:
             logger.error('Ошибка удаления из кеша', key=key, error=e)
             return False
 
+    async def _unlink_batched(self, keys: AsyncIterator[Any] | Iterable[Any]) -> int:
+        """Удалить ключи пачками UNLINK (освобождение памяти — в фоне у Redis)."""
+        deleted = 0
+        batch: list[Any] = []
+
+        async def flush() -> None:
+            nonlocal deleted
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for start in range(0, len(batch), _UNLINK_BATCH_SIZE):
+                    pipe.unlink(*batch[start : start + _UNLINK_BATCH_SIZE])
+                deleted += sum(int(count) for count in await pipe.execute())
+            batch.clear()
+
+        if isinstance(keys, AsyncIterator):
+            async for key in keys:
+                batch.append(key)
+                if len(batch) >= _UNLINK_BATCH_SIZE:
+                    await flush()
+        else:
+            batch.extend(keys)
+        if batch:
+            await flush()
+        return deleted
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Удалить все ключи, записанные с любым из тегов."""
+        if not self._connected or not tags:
+            return 0
+
+        total = 0
+        for tag in tags:
+            tag_key = f'{_TAG_KEY_PREFIX}{tag}'
+            started = time.perf_counter()
+            try:
+                # Забираем множество атомарно: ключи, записанные во время удаления, попадут в новое
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    pipe.smembers(tag_key)
+                    pipe.unlink(tag_key)
+                    members, _ = await pipe.execute()
+                deleted = await self._unlink_batched(members)
+            except Exception as e:
+                logger.error('Ошибка инвалидации тега кеша', tag=tag, error=e)
+                continue
+
+            total += deleted
+            logger.info(
+                'Cache tag invalidated',
+                tag=tag,
+                tagged_keys=len(members),
+                deleted=deleted,
+                duration_ms=round((time.perf_counter() - started) * 1000, 2),
+            )
+        return total
+
+    async def _keys_command_allowed(self) -> bool:
+        """KEYS блокирует Redis на время обхода — разрешаем его только на маленькой базе."""
+        try:
+            return await self.redis_client.dbsize() <= settings.CACHE_KEYS_COMMAND_MAX_KEYSPACE
+        except Exception:
+            return False
+
+    async def _iter_keys(self, pattern: str) -> AsyncIterator[Any]:
+        if await self._keys_command_allowed():
+            for key in await self.redis_client.keys(pattern):
+                yield key
+            return
+        async for key in self.redis_client.scan_iter(match=pattern, count=_SCAN_COUNT):
+            yield key
+
     async def delete_pattern(self, pattern: str) -> int:
+        """Удалить ключи по шаблону (legacy; для новых кешей используйте теги)."""
         if not self._connected:
             return 0
 
+        started = time.perf_counter()
         try:
-            keys = await self.redis_client.keys(pattern)
-            if not keys:
-                return 0
-
-            deleted = await self.redis_client.delete(*keys)
-            return int(deleted)
+            deleted = await self._unlink_batched(self._iter_keys(pattern))
         except Exception as e:
             logger.error('Ошибка удаления ключей по шаблону', pattern=pattern, error=e)
             return 0
 
+        logger.info(
+            'Cache keys deleted by pattern',
+            pattern=pattern,
+            deleted=deleted,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return deleted
+
     async def exists(self, key: str) -> bool:
         if not self._connected:
             return False
@@ -154,8 +262,7 @@ class CacheService:
             return []
 
         try:
-            keys = await self.redis_client.keys(pattern)
-            return [key.decode() if isinstance(key, bytes) else key for key in keys]
+            return [key.decode() if isinstance(key, bytes) else key async for key in self._iter_keys(pattern)]
         except Exception as e:
             logger.error('Ошибка получения ключей по паттерну', pattern=pattern, error=e)
             return []
@@ -0,0 +1,213 @@
+"""Cross-process invalidation bus for in-process caches.
+
+Each cache registers a *topic* and an async handler. After an admin change is
+committed, the writer bumps a monotonic Redis version key for the topic and
+publishes the changed keys on a shared channel. Other processes apply the
+change through the handler:
+
+* the next expected version -> handler receives only the changed keys;
+* a version gap (missed message) -> handler receives ``None`` (full reload).
+
+A periodic version check covers messages lost while a subscriber was
+disconnected, so readers never have to fall back to database reads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import suppress
+from typing import Any
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.utils.cache import cache
+from app.utils.redis_registry import PUBSUB_POOL, redis_registry
+
+
+logger = structlog.get_logger(__name__)
+
+InvalidationHandler = Callable[[frozenset[str] | None], Awaitable[None]]
+
+_CHANNEL = 'cache:invalidation'
+_VERSION_KEY_PREFIX = 'cache:invalidation:version:'
+_RESUBSCRIBE_DELAY_SECONDS = 5.0
+_SESSION_INFO_KEY = 'cache_invalidation_pending'
+
+
+class CacheInvalidationBus:
+    def __init__(self) -> None:
+        self._handlers: dict[str, InvalidationHandler] = {}
+        self._seen_versions: dict[str, int] = {}
+        self._instance_id = uuid.uuid4().hex
+        self._lock = asyncio.Lock()
+        self._listener_task: asyncio.Task | None = None
+        self._check_task: asyncio.Task | None = None
+        self._pending_publishes: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _version_key(topic: str) -> str:
+        return f'{_VERSION_KEY_PREFIX}{topic}'
+
+    def register(self, topic: str, handler: InvalidationHandler) -> None:
+        """Зарегистрировать обработчик изменений для топика."""
+        self._handlers[topic] = handler
+
+    # --- Публикация ---
+
+    async def publish(self, topic: str, keys: Iterable[str] | None = None) -> None:
+        """Сообщить другим процессам об изменении (вызывать после commit)."""
+        if not cache._connected:
+            return
+        payload_keys = sorted(set(keys)) if keys is not None else None
+        try:
+            version = await cache.redis_client.incr(self._version_key(topic))
+            await cache.redis_client.publish(
+                _CHANNEL,
+                json.dumps(
+                    {'topic': topic, 'version': version, 'keys': payload_keys, 'origin': self._instance_id},
+                    ensure_ascii=False,
+                ),
+            )
+        except Exception as e:
+            logger.warning('Cache invalidation publish failed', topic=topic, e=e)
+            return
+
+        # Своё изменение уже применено локально; при пропуске чужих версий
+        # догонит периодическая проверка
+        if self._seen_versions.get(topic) == version - 1:
+            self._seen_versions[topic] = version
+
+    async def publish_after_commit(self, db: Any, topic: str, keys: Iterable[str] | None = None) -> None:
+        """Опубликовать изменение, когда транзакция ``db`` будет зафиксирована.
+
+        Иначе другие процессы могли бы перечитать из БД ещё старое значение.
+        """
+        if not isinstance(db, AsyncSession) or not db.in_transaction():
+            await self.publish(topic, keys)
+            return
+
+        pending: dict[str, set[str] | None] | None = db.info.get(_SESSION_INFO_KEY)
+        if pending is None:
+            pending = db.info[_SESSION_INFO_KEY] = {}
+            event.listen(db.sync_session, 'after_commit', self._on_commit, once=True)
+
+        if keys is None or (topic in pending and pending[topic] is None):
+            pending[topic] = None
+        else:
+            pending.setdefault(topic, set()).update(keys)
+
+    def _on_commit(self, sync_session: Any) -> None:
+        pending = sync_session.info.pop(_SESSION_INFO_KEY, None) or {}
+        for topic, keys in pending.items():
+            task = asyncio.get_running_loop().create_task(self.publish(topic, keys))
+            self._pending_publishes.add(task)
+            task.add_done_callback(self._pending_publishes.discard)
+
+    # --- Получение ---
+
+    async def handle_message(self, raw: bytes | str) -> None:
+        try:
+            message = json.loads(raw)
+            topic = message['topic']
+            version = int(message['version'])
+            keys = message.get('keys')
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning('Malformed cache invalidation message', e=e)
+            return
+
+        if message.get('origin') == self._instance_id or topic not in self._handlers:
+            return
+
+        async with self._lock:
+            seen = self._seen_versions.get(topic)
+            if seen is not None and version <= seen:
+                return
+            changed = frozenset(keys) if keys is not None and (seen is None or version == seen + 1) else None
+            await self._apply(topic, changed, version)
+
+    async def check_versions(self) -> None:
+        """Сверить версии топиков с Redis и перезагрузить отставшие кеши."""
+        topics = list(self._handlers)
+        if not topics or not cache._connected:
+            return
+        try:
+            values = await cache.redis_client.mget([self._version_key(topic) for topic in topics])
+        except Exception as e:
+            logger.warning('Cache invalidation version check failed', e=e)
+            return
+
+        async with self._lock:
+            for topic, value in zip(topics, values, strict=True):
+                remote = int(value) if value is not None else 0
+                seen = self._seen_versions.get(topic)
+                if seen is None:
+                    # Кеш только что загружен из БД — берём текущую версию за точку отсчёта
+                    self._seen_versions[topic] = remote
+                elif remote > seen:
+                    logger.info('Cache is behind, reloading', topic=topic, seen=seen, remote=remote)
+                    await self._apply(topic, None, remote)
+
+    async def _apply(self, topic: str, keys: frozenset[str] | None, version: int) -> None:
+        try:
+            await self._handlers[topic](keys)
+        except Exception as e:
+            # Версию не сдвигаем — следующая проверка повторит полную перезагрузку
+            logger.error('Cache invalidation handler failed', topic=topic, e=e)
+            return
+        self._seen_versions[topic] = version
+
+    # --- Жизненный цикл ---
+
+    async def start(self) -> None:
+        await self.check_versions()
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen(), name='cache-invalidation-listener')
+        if self._check_task is None or self._check_task.done():
+            self._check_task = asyncio.create_task(self._check_loop(), name='cache-invalidation-check')
+
+    async def stop(self) -> None:
+        for task in (self._listener_task, self._check_task):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._listener_task = None
+        self._check_task = None
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, settings.CACHE_INVALIDATION_CHECK_INTERVAL_SECONDS))
+            await self.check_versions()
+
+    async def _listen(self) -> None:
+        while True:
+            if not cache._connected:
+                await asyncio.sleep(_RESUBSCRIBE_DELAY_SECONDS)
+                continue
+
+            subscriber = redis_registry.client('cache_invalidation', pool=PUBSUB_POOL)
+            pubsub = subscriber.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(_CHANNEL)
+                # Сообщения могли потеряться, пока не было подписки
+                await self.check_versions()
+                async for message in pubsub.listen():
+                    if message and message.get('type') == 'message':
+                        await self.handle_message(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Cache invalidation subscription lost, resubscribing', e=e)
+                await asyncio.sleep(_RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                with suppress(Exception):
+                    await pubsub.aclose()
+
+
+cache_invalidation_bus = CacheInvalidationBus()
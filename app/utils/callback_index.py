@@ -0,0 +1,212 @@
+"""Индекс обработчиков callback_query по callback_data.
+
+aiogram перебирает обработчики observer'а по порядку и проверяет фильтры каждого, пока
+какой-то не подойдёт, — на каждое нажатие кнопки уходят сотни проверок ``F.data == ...``
+и ``F.data.startswith(...)``. Индекс раскладывает обработчики по условию на callback_data:
+точные значения — в словарь, префиксы — в trie. Для нажатия берутся только обработчики,
+чьё условие совпало, плюс все, которые разобрать не удалось (лямбды, regexp, ``|``); их
+фильтры проверяются полностью и в исходном порядке, поэтому выбирается тот же обработчик,
+что и при обычном переборе. Условие на data необходимое: если оно не выполнено, обработчик
+не подошёл бы и без индекса.
+"""
+
+from __future__ import annotations
+
+import operator
+from typing import Any
+
+import structlog
+from aiogram import Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.types import TelegramObject
+from magic_filter.operations import (
+    CallOperation,
+    CombinationOperation,
+    ComparatorOperation,
+    FunctionOperation,
+    GetAttributeOperation,
+)
+from magic_filter.util import and_op, in_op
+
+
+logger = structlog.get_logger(__name__)
+
+_CANDIDATE_CACHE_SIZE = 4096
+_AND_COMBINATORS = (and_op, operator.and_)
+
+
+def _strings(value: Any) -> tuple[str, ...] | None:
+    if isinstance(value, str):
+        return (value,)
+    if isinstance(value, (set, frozenset, list, tuple)) and value and all(isinstance(item, str) for item in value):
+        return tuple(value)
+    return None
+
+
+def classify_filter(filter_object: FilterObject) -> tuple[str, tuple[str, ...]] | None:
+    """('exact', значения) или ('prefix', префиксы), если фильтр — необходимое условие на callback_data.
+
+    Понимает ``F.data == x``, ``F.data.in_({...})`` и ``F.data.startswith(x | (x, y))``, в том числе
+    с ``& ...`` в конце. Всё остальное (лямбды, ``|``, ``~``, regexp) — None.
+    """
+    magic = filter_object.magic
+    if magic is None:
+        return None
+    operations = magic._operations
+    if not operations or not isinstance(operations[0], GetAttributeOperation) or operations[0].name != 'data':
+        return None
+
+    head, tail = operations[1:], ()
+    if len(head) >= 2 and isinstance(head[0], GetAttributeOperation) and head[0].name == 'startswith':
+        head, tail = head[:2], head[2:]
+    else:
+        head, tail = head[:1], head[1:]
+
+    # После условия на data допустимы только «& другой фильтр»: он не ослабляет условие
+    if any(type(op) is not CombinationOperation or op.combinator not in _AND_COMBINATORS for op in tail):
+        return None
+
+    if len(head) == 2:
+        call = head[1]
+        if not isinstance(call, CallOperation) or call.kwargs or len(call.args) != 1:
+            return None
+        prefixes = _strings(call.args[0])
+        return ('prefix', prefixes) if prefixes else None
+
+    op = head[0] if head else None
+    if isinstance(op, ComparatorOperation) and op.comparator is operator.eq and isinstance(op.right, str):
+        return 'exact', (op.right,)
+    if isinstance(op, FunctionOperation) and op.function is in_op and len(op.args) == 1 and not op.kwargs:
+        values = _strings(op.args[0])
+        return ('exact', values) if values else None
+    return None
+
+
+class _PrefixTrie:
+    def __init__(self) -> None:
+        self._root: dict[str, Any] = {}
+
+    def add(self, prefix: str, position: int) -> None:
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault('', []).append(position)
+
+    def match(self, data: str) -> list[int]:
+        """Позиции всех обработчиков, чей префикс является началом data."""
+        found: list[int] = []
+        node = self._root
+        found.extend(node.get('', ()))
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            found.extend(node.get('', ()))
+        return found
+
+
+class CallbackDispatchIndex:
+    """Индекс над handlers одного observer; перестраивается, если список обработчиков изменился."""
+
+    def __init__(self, observer: TelegramEventObserver) -> None:
+        self.observer = observer
+        self.exact: dict[str, list[int]] = {}
+        self.prefixes = _PrefixTrie()
+        self.unindexed: list[int] = []
+        self._snapshot: list[HandlerObject] = []
+        self._cache: dict[str | None, list[HandlerObject]] = {}
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.exact, self.prefixes, self.unindexed = {}, _PrefixTrie(), []
+        self._cache = {}
+        self._snapshot = list(self.observer.handlers)
+
+        for position, handler in enumerate(self._snapshot):
+            condition = next(filter(None, map(classify_filter, handler.filters or ())), None)
+            if condition is None:
+                self.unindexed.append(position)
+                continue
+            kind, values = condition
+            for value in values:
+                if kind == 'exact':
+                    self.exact.setdefault(value, []).append(position)
+                else:
+                    self.prefixes.add(value, position)
+
+    @property
+    def indexed_count(self) -> int:
+        return len(self._snapshot) - len(self.unindexed)
+
+    def candidates(self, data: str | None) -> list[HandlerObject]:
+        """Обработчики, которые могут подойти для callback_data, в порядке регистрации."""
+        handlers = self.observer.handlers
+        if len(handlers) != len(self._snapshot) or (handlers and handlers[-1] is not self._snapshot[-1]):
+            self.rebuild()
+
+        cached = self._cache.get(data)
+        if cached is not None:
+            return cached
+
+        if data is None:
+            positions = self.unindexed
+        else:
+            positions = sorted({*self.exact.get(data, ()), *self.prefixes.match(data), *self.unindexed})
+        result = [self._snapshot[position] for position in positions]
+
+        if len(self._cache) >= _CANDIDATE_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[data] = result
+        return result
+
+    async def trigger(self, event: TelegramObject, **kwargs: Any) -> Any:
+        """TelegramEventObserver.trigger, но только по кандидатам из индекса."""
+        observer = self.observer
+        for handler in self.candidates(getattr(event, 'data', None)):
+            kwargs['handler'] = handler
+            result, data = await handler.check(event, **kwargs)
+            if result:
+                kwargs.update(data)
+                try:
+                    wrapped_inner = observer.outer_middleware.wrap_middlewares(
+                        observer._resolve_middlewares(),
+                        handler.call,
+                    )
+                    return await wrapped_inner(event, kwargs)
+                except SkipHandler:
+                    continue
+
+        return UNHANDLED
+
+
+async def first_matching_handler(
+    handlers: list[HandlerObject], event: TelegramObject, **kwargs: Any
+) -> HandlerObject | None:
+    """Первый обработчик, чьи фильтры пропускают событие, — без вызова (для сверки и бенчмарка)."""
+    for handler in handlers:
+        result, _ = await handler.check(event, handler=handler, **kwargs)
+        if result:
+            return handler
+    return None
+
+
+def setup_callback_index(dp: Dispatcher) -> list[CallbackDispatchIndex]:
+    """Подключает индекс к callback_query каждого роутера; вызывать после регистрации обработчиков."""
+    indexes = []
+    for router in dp.chain_tail:
+        observer = router.callback_query
+        if not observer.handlers:
+            continue
+        index = CallbackDispatchIndex(observer)
+        observer.trigger = index.trigger
+        indexes.append(index)
+        logger.info(
+            '🗂️ Индекс callback-обработчиков построен',
+            router=router.name,
+            handlers=len(observer.handlers),
+            exact=len(index.exact),
+            unindexed=len(index.unindexed),
+        )
+    return indexes
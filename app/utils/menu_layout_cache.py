@@ -9,6 +9,7 @@ import json
 import structlog
 
 from app.database.database import AsyncSessionLocal
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 
 logger = structlog.get_logger(__name__)
@@ -17,6 +18,9 @@ logger = structlog.get_logger(__name__)
 
 MENU_LAYOUT_KEY = 'CABINET_MENU_LAYOUT'
 
+# Cross-process invalidation topic (see app.utils.cache_invalidation).
+MENU_LAYOUT_TOPIC = 'menu_layout'
+
 BUILTIN_SECTIONS: tuple[str, ...] = (
     'home',
     'subscription',
@@ -189,3 +193,10 @@ async def load_menu_layout_cache() -> dict[str, object]:
     _cached_layout = merged
     logger.info('Menu layout cache loaded', rows=len([k for k in merged if k.startswith('row_')]))
     return merged
+
+
+async def _on_menu_layout_invalidated(_keys: frozenset[str] | None) -> None:
+    await load_menu_layout_cache()
+
+
+cache_invalidation_bus.register(MENU_LAYOUT_TOPIC, _on_menu_layout_invalidated)
@@ -0,0 +1,356 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and fixed-bucket histograms keyed by label values. A label
+set is resolved once into a child object; after that an update is a dict
+lookup plus an addition on the event-loop thread (no locks, no I/O), so the
+instrumentation stays on in production. Values that are cheaper to read on
+demand (queue depths, pool stats) are filled in by collectors right before a
+scrape. ``/metrics`` renders the registry in the Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import re
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from contextlib import contextmanager
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, ClassVar
+
+import aiohttp
+import structlog
+
+from app.config import settings
+
+
+logger = structlog.get_logger(__name__)
+
+METRIC_PREFIX = 'remnabot_'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOOP_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+_COLLECTOR_TIMEOUT_SECONDS = 2.0
+
+Collector = Callable[[], Awaitable[None] | None]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)) + '}'
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'count', 'counts', 'sum')
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class _Metric:
+    type_name: ClassVar[str]
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: object) -> Any:
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}, got {key}')
+            child = self._children[key] = self._new_child()
+        return child
+
+    def clear(self) -> None:
+        self._children.clear()
+
+    def _render_samples(self) -> Iterator[str]:
+        for key, child in list(self._children.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}'
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {_escape(self.documentation)}'
+        yield f'# TYPE {self.name} {self.type_name}'
+        yield from self._render_samples()
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_samples(self) -> Iterator[str]:
+        bucket_names = (*self.labelnames, 'le')
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), child.counts, strict=True):
+                cumulative += count
+                labels = _format_labels(bucket_names, (*key, _format_value(bound)))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(child.sum)}'
+            yield f'{self.name}_count{labels} {child.count}'
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, Collector] = {}
+
+    def _get_or_create(self, cls: type[_Metric], name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        full_name = f'{METRIC_PREFIX}{name}'
+        metric = self._metrics.get(full_name)
+        if metric is None:
+            metric = self._metrics[full_name] = cls(full_name, documentation, labelnames, **kwargs)
+        elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f'Metric {full_name} already registered with a different type or labels')
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Колбэк, обновляющий метрики перед каждым сбором (глубина очередей и т.п.)."""
+        self._collectors[name] = collector
+
+    async def collect(self) -> None:
+        for name, collector in list(self._collectors.items()):
+            try:
+                result = collector()
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, timeout=_COLLECTOR_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.warning('Metrics collector failed', collector=name, e=e)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    async def expose(self) -> str:
+        await self.collect()
+        return self.render()
+
+
+metrics = MetricsRegistry()
+
+
+# --- Общие метрики ---
+
+LOOP_DURATION = metrics.histogram(
+    'background_loop_duration_seconds',
+    'Duration of one iteration of a background loop',
+    ('loop',),
+    buckets=LOOP_BUCKETS,
+)
+LOOP_ERRORS = metrics.counter('background_loop_errors_total', 'Background loop iterations that raised', ('loop',))
+QUEUE_DEPTH = metrics.gauge('queue_depth', 'Items waiting in an internal queue', ('queue',))
+
+HTTP_CLIENT_DURATION = metrics.histogram(
+    'http_client_request_duration_seconds',
+    'Outbound HTTP request latency by client',
+    ('client', 'method'),
+)
+HTTP_CLIENT_REQUESTS = metrics.counter(
+    'http_client_requests_total',
+    'Outbound HTTP requests by client and response status',
+    ('client', 'method', 'status'),
+)
+
+
+@contextmanager
+def track_loop(name: str) -> Iterator[None]:
+    """Измерить одну итерацию фонового цикла (исключение пробрасывается дальше)."""
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        if not isinstance(e, asyncio.CancelledError):
+            LOOP_ERRORS.labels(name).inc()
+        raise
+    finally:
+        LOOP_DURATION.labels(name).observe(time.perf_counter() - started)
+
+
+_UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+_NUMBER_SEGMENT_RE = re.compile(r'/\d+(?=/|$)')
+_LONG_TOKEN_SEGMENT_RE = re.compile(r'/[A-Za-z0-9_\-]{24,}(?=/|$)')
+
+
+@lru_cache(maxsize=1024)
+def endpoint_template(path: str) -> str:
+    """Свести путь к шаблону для меток: ``/api/users/<uuid>`` вместо конкретного id."""
+    path = path.split('?', 1)[0]
+    path = _UUID_RE.sub(':uuid', path)
+    path = _NUMBER_SEGMENT_RE.sub('/:id', path)
+    return _LONG_TOKEN_SEGMENT_RE.sub('/:token', path)
+
+
+async def _on_request_start(_session: Any, context: SimpleNamespace, _params: Any) -> None:
+    context.metrics_started = time.perf_counter()
+
+
+async def _on_request_end(_session: Any, context: SimpleNamespace, params: aiohttp.TraceRequestEndParams) -> None:
+    _observe_http(context, params.method, str(params.response.status))
+
+
+async def _on_request_exception(
+    _session: Any, context: SimpleNamespace, params: aiohttp.TraceRequestExceptionParams
+) -> None:
+    _observe_http(context, params.method, 'error')
+
+
+def _observe_http(context: SimpleNamespace, method: str, status: str) -> None:
+    started = getattr(context, 'metrics_started', None)
+    client = context.trace_request_ctx or 'unknown'
+    if started is not None:
+        HTTP_CLIENT_DURATION.labels(client, method).observe(time.perf_counter() - started)
+    HTTP_CLIENT_REQUESTS.labels(client, method, status).inc()
+
+
+@lru_cache(maxsize=64)
+def _trace_config(client: str) -> aiohttp.TraceConfig:
+    def context_factory(trace_request_ctx: Any = None) -> SimpleNamespace:
+        return SimpleNamespace(trace_request_ctx=client)
+
+    trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=context_factory)
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+def http_client_trace_configs(client: str) -> list[aiohttp.TraceConfig]:
+    """``trace_configs`` для ``aiohttp.ClientSession``: латентность и статусы запросов клиента."""
+    if not settings.METRICS_ENABLED:
+        return []
+    return [_trace_config(client)]
+
+
+_SQL_COMMENT_RE = re.compile(r'/\*.*?\*/|--[^\n]*', re.DOTALL)
+_SQL_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+((?:"?\w+"?\.)*"?\w+"?)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def statement_fingerprint(statement: str) -> tuple[str, str]:
+    """Операция и первая таблица SQL-запроса — метки без параметров и с ограниченной кардинальностью."""
+    sql = _SQL_COMMENT_RE.sub(' ', statement).strip()
+    if not sql:
+        return 'OTHER', ''
+    operation = sql.split(None, 1)[0].upper()
+    if operation == 'WITH':
+        match = re.search(r'\)\s*(SELECT|INSERT|UPDATE|DELETE)\b', sql, re.IGNORECASE)
+        operation = match.group(1).upper() if match else 'SELECT'
+    if operation not in {'SELECT', 'INSERT', 'UPDATE', 'DELETE'}:
+        return operation if operation.isalpha() and len(operation) <= 16 else 'OTHER', ''
+    match = _SQL_TABLE_RE.search(sql)
+    table = match.group(1).rsplit('.', 1)[-1].strip('"').lower() if match else ''
+    return operation, table
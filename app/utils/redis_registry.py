@@ -0,0 +1,258 @@
+"""Общие подключения к Redis: именованные клиенты поверх общих пулов.
+
+Все потребители (кеш, FSM, корзина, отложенные рефералы, Apple IAP, pub/sub)
+берут клиента через ``redis_registry.client(name)`` вместо собственного
+``redis.from_url``: соединения ограничены ``REDIS_MAX_CONNECTIONS`` на пул, а
+сбои Redis обрабатываются одинаково. После ``REDIS_CIRCUIT_THRESHOLD`` ошибок
+соединения подряд размыкатель открывается, и на ``REDIS_CIRCUIT_OPEN_SECONDS``
+команды сразу падают с ``RedisCircuitOpenError`` вместо ожидания таймаутов;
+первая успешная команда после паузы снова замыкает его.
+
+Подписки pub/sub держат соединение и ждут сообщений бесконечно, поэтому живут
+в отдельном пуле ``pubsub`` без таймаута чтения и не занимают общий пул.
+
+Пулы закрывает только ``redis_registry.close()``: ``aclose()`` клиента
+реестра (например, из ``RedisStorage.close()`` FSM при остановке диспетчера)
+отпускает лишь его собственное состояние.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import redis.asyncio as redis
+import structlog
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError, TimeoutError as RedisTimeoutError
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_POOL = 'default'
+PUBSUB_POOL = 'pubsub'
+
+# Ошибки, означающие недоступность Redis; ошибки команд (WRONGTYPE, NOSCRIPT) размыкатель не трогают
+_UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError, TimeoutError)
+
+
+class RedisCircuitOpenError(RedisError):
+    """Redis недавно был недоступен; команда отклонена без обращения к серверу."""
+
+
+@dataclass(slots=True)
+class _CircuitState:
+    failures: int = 0
+    open_until: float = 0.0
+
+
+if settings.METRICS_ENABLED:
+    _COMMAND_DURATION = metrics.histogram(
+        'redis_command_duration_seconds', 'Redis command and pipeline latency by client', ('client',)
+    )
+    _COMMAND_ERRORS = metrics.counter(
+        'redis_command_errors_total', 'Failed Redis commands by client and reason', ('client', 'reason')
+    )
+    _POOL_CONNECTIONS = metrics.gauge('redis_pool_connections', 'Redis pool connections by state', ('pool', 'state'))
+    _CIRCUIT_OPEN = metrics.gauge('redis_circuit_open', 'Whether the Redis circuit breaker is open')
+
+
+class RedisRegistry:
+    """Именованные клиенты Redis над общими пулами соединений с общим размыкателем."""
+
+    def __init__(self) -> None:
+        self._pools: dict[str, Any] = {}
+        self._clients: dict[str, redis.Redis] = {}
+        self._circuit = _CircuitState()
+
+    # --- Настройки ---
+
+    @property
+    def _circuit_threshold(self) -> int:
+        return max(1, settings.REDIS_CIRCUIT_THRESHOLD)
+
+    @property
+    def _circuit_open_seconds(self) -> float:
+        return max(1.0, settings.REDIS_CIRCUIT_OPEN_SECONDS)
+
+    @staticmethod
+    def _timeout(value: float) -> float | None:
+        return value if value > 0 else None
+
+    # --- Клиенты ---
+
+    def client(self, name: str, *, pool: str = DEFAULT_POOL) -> redis.Redis:
+        """Клиент ``name`` над пулом ``pool``; повторный вызов возвращает тот же объект."""
+        client = self._clients.get(name)
+        if client is None:
+            client = redis.Redis(connection_pool=self._get_pool(pool))
+            self._instrument(client, name)
+            self._clients[name] = client
+        return client
+
+    def _get_pool(self, pool: str) -> Any:
+        connection_pool = self._pools.get(pool)
+        if connection_pool is None:
+            connection_pool = redis.BlockingConnectionPool.from_url(
+                settings.REDIS_URL,
+                max_connections=max(1, settings.REDIS_MAX_CONNECTIONS),
+                # Сколько ждать свободного соединения, когда пул исчерпан
+                timeout=self._timeout(settings.REDIS_POOL_TIMEOUT_SECONDS),
+                socket_connect_timeout=self._timeout(settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS),
+                # Подписка молчит сколько угодно долго — таймаут чтения оборвал бы её
+                socket_timeout=None if pool == PUBSUB_POOL else self._timeout(settings.REDIS_SOCKET_TIMEOUT_SECONDS),
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+            )
+            self._pools[pool] = connection_pool
+        return connection_pool
+
+    def _instrument(self, client: Any, name: str) -> None:
+        """Пропустить команды и пайплайны клиента через размыкатель и метрики."""
+        execute_command = client.execute_command
+        pipeline = client.pipeline
+
+        async def tracked_execute_command(*args: Any, **options: Any) -> Any:
+            return await self._call(name, execute_command, *args, **options)
+
+        def tracked_pipeline(*args: Any, **kwargs: Any) -> Any:
+            pipe = pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def tracked_execute(*exec_args: Any, **exec_kwargs: Any) -> Any:
+                return await self._call(name, execute, *exec_args, **exec_kwargs)
+
+            pipe.execute = tracked_execute
+            return pipe
+
+        client.execute_command = tracked_execute_command
+        client.pipeline = tracked_pipeline
+        self._keep_pool_open(client)
+
+    @staticmethod
+    def _keep_pool_open(client: Any) -> None:
+        """Закрытие клиента не трогает общий пул: его закрывает только ``close()`` реестра.
+
+        Потребители закрывают своего клиента при остановке (aiogram ``RedisStorage.close()``
+        вызывает ``aclose(close_connection_pool=True)``) и оборвали бы соединения остальных.
+        """
+        aclose = client.aclose
+
+        async def shared_aclose(close_connection_pool: bool | None = None) -> None:
+            await aclose(close_connection_pool=False)
+
+        client.aclose = shared_aclose
+
+    # --- Размыкатель ---
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._circuit.open_until > time.monotonic()
+
+    async def _call(self, name: str, func: Any, *args: Any, **kwargs: Any) -> Any:
+        if self.circuit_open:
+            if settings.METRICS_ENABLED:
+                _COMMAND_ERRORS.labels(name, 'circuit_open').inc()
+            raise RedisCircuitOpenError(
+                f'Redis недоступен, повтор через {self._circuit.open_until - time.monotonic():.0f}с'
+            )
+
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            unavailable = isinstance(error, _UNAVAILABLE_ERRORS)
+            if settings.METRICS_ENABLED:
+                _COMMAND_ERRORS.labels(name, 'unavailable' if unavailable else 'error').inc()
+            if unavailable:
+                self._record_failure(name, error)
+            raise
+        finally:
+            if settings.METRICS_ENABLED:
+                _COMMAND_DURATION.labels(name).observe(time.perf_counter() - started)
+
+        self._record_success()
+        return result
+
+    def _record_success(self) -> None:
+        if self._circuit.failures:
+            if self._circuit.failures >= self._circuit_threshold:
+                logger.info('Redis снова доступен, размыкатель закрыт')
+            self._circuit.failures = 0
+            self._circuit.open_until = 0.0
+
+    def _record_failure(self, name: str, error: Exception) -> None:
+        self._circuit.failures += 1
+        if self._circuit.failures >= self._circuit_threshold:
+            self._circuit.open_until = time.monotonic() + self._circuit_open_seconds
+            logger.warning(
+                'Redis недоступен, размыкатель открыт',
+                client=name,
+                failures=self._circuit.failures,
+                open_seconds=self._circuit_open_seconds,
+                error=error,
+            )
+
+    # --- Состояние ---
+
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        """Занятые, свободные и максимально возможные соединения каждого пула."""
+        stats = {}
+        for pool_name, connection_pool in self._pools.items():
+            # Публичного API у пула redis-py для этого нет; соединения создаются лениво
+            in_use = len(getattr(connection_pool, '_in_use_connections', ()))
+            idle = len(getattr(connection_pool, '_available_connections', ()))
+            stats[pool_name] = {
+                'in_use': in_use,
+                'idle': idle,
+                'max': connection_pool.max_connections,
+            }
+        return stats
+
+    async def health(self) -> dict[str, Any]:
+        """PING через общий пул: доступность, задержка, состояние размыкателя и пулов."""
+        latency_ms = None
+        error = None
+        try:
+            started = time.perf_counter()
+            await self.client('health').ping()
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        except Exception as e:
+            error = str(e)
+        return {
+            'status': 'ok' if error is None else 'unavailable',
+            'latency_ms': latency_ms,
+            'error': error,
+            'circuit_open': self.circuit_open,
+            'consecutive_failures': self._circuit.failures,
+            'clients': sorted(self._clients),
+            'pools': self.pool_stats(),
+        }
+
+    def _collect_metrics(self) -> None:
+        _CIRCUIT_OPEN.set(1 if self.circuit_open else 0)
+        for pool_name, stats in self.pool_stats().items():
+            for state, value in stats.items():
+                _POOL_CONNECTIONS.labels(pool_name, state).set(value)
+
+    async def close(self) -> None:
+        """Закрыть все пулы при остановке; клиенты после этого создаются заново."""
+        pools = list(self._pools.items())
+        self._pools.clear()
+        self._clients.clear()
+        for pool_name, connection_pool in pools:
+            try:
+                await connection_pool.aclose()
+            except Exception as e:
+                logger.warning('Ошибка закрытия пула Redis', pool=pool_name, error=e)
+
+
+redis_registry = RedisRegistry()
+
+if settings.METRICS_ENABLED:
+    metrics.register_collector('redis_pool', redis_registry._collect_metrics)
@@ -0,0 +1,218 @@
+"""Запуск бота по графу зависимостей этапов.
+
+Этап объявляет, от каких этапов зависит; независимые этапы выполняются
+параллельно, каждый под своим таймаутом. Фоновые этапы (``background=True``)
+не задерживают старт: ``run()`` возвращает управление, как только готовы все
+обязательные этапы, а фоновые доделываются, пока бот уже принимает обновления.
+
+Таймаут не считается ошибкой запуска: этап прерывается, помечается предупреждением, и
+зависящие от него этапы продолжают работу, как после любого другого
+предупреждения. Исключение в обязательном этапе останавливает запуск; в фоновом —
+логируется, а зависящие от него фоновые этапы пропускаются.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+
+import structlog
+
+from app.utils.startup_timeline import StageHandle, StartupTimeline
+
+
+logger = structlog.get_logger(__name__)
+
+StageFunc = Callable[[StageHandle], Awaitable[None]]
+
+
+@dataclass(frozen=True, slots=True)
+class StartupStage:
+    key: str
+    title: str
+    icon: str
+    func: StageFunc
+    depends_on: tuple[str, ...] = ()
+    timeout: float | None = None
+    # Таймаут — ошибка запуска, а не предупреждение: без результата этапа зависимые работать не могут
+    fail_on_timeout: bool = False
+    background: bool = False
+    success_message: str | None = 'Готово'
+
+
+class StartupOrchestrator:
+    """Этапы запуска с зависимостями; объявляются в порядке, совместимом с зависимостями."""
+
+    def __init__(self, timeline: StartupTimeline, *, parallel: bool = True) -> None:
+        self._timeline = timeline
+        self._parallel = parallel
+        self._stages: dict[str, StartupStage] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._spans: dict[str, tuple[float, float]] = {}
+        self._failed: set[str] = set()
+        self._background_waiter: asyncio.Task | None = None
+
+    def stage(
+        self,
+        key: str,
+        title: str,
+        icon: str = '⚙️',
+        *,
+        depends_on: Iterable[str] = (),
+        timeout: float | None = None,
+        fail_on_timeout: bool = False,
+        background: bool = False,
+        success_message: str | None = 'Готово',
+    ) -> Callable[[StageFunc], StageFunc]:
+        """Декоратор: зарегистрировать корутину ``func(stage_handle)`` как этап."""
+
+        def decorator(func: StageFunc) -> StageFunc:
+            self.add(
+                StartupStage(
+                    key=key,
+                    title=title,
+                    icon=icon,
+                    func=func,
+                    depends_on=tuple(depends_on),
+                    timeout=timeout,
+                    fail_on_timeout=fail_on_timeout,
+                    background=background,
+                    success_message=success_message,
+                )
+            )
+            return func
+
+        return decorator
+
+    def add(self, stage: StartupStage) -> None:
+        if stage.key in self._stages:
+            raise ValueError(f'Этап {stage.key!r} уже объявлен')
+        for dependency in stage.depends_on:
+            # Зависимости объявляются раньше зависимых — так граф не может содержать циклов
+            if dependency not in self._stages:
+                raise ValueError(f'Этап {stage.key!r} зависит от необъявленного этапа {dependency!r}')
+            if self._stages[dependency].background and not stage.background:
+                raise ValueError(f'Обязательный этап {stage.key!r} не может ждать фоновый {dependency!r}')
+        self._stages[stage.key] = stage
+
+    @property
+    def stage_keys(self) -> list[str]:
+        return list(self._stages)
+
+    def has_stage(self, key: str) -> bool:
+        return key in self._stages
+
+    async def run(self) -> None:
+        """Выполнить этапы; возвращает управление, когда готовы все обязательные этапы."""
+        if not self._parallel:
+            # Последовательный режим: как раньше, строго в порядке объявления, включая фоновые
+            for stage in self._stages.values():
+                await self._run_when_ready(stage)
+            self._timeline.set_critical_path(
+                [stage.title for stage in self._stages.values() if stage.key in self._spans]
+            )
+            return
+
+        for stage in self._stages.values():
+            self._tasks[stage.key] = asyncio.create_task(self._run_when_ready(stage), name=f'startup:{stage.key}')
+
+        foreground = [self._tasks[key] for key, stage in self._stages.items() if not stage.background]
+        try:
+            await asyncio.gather(*foreground)
+        except BaseException:
+            await self.cancel()
+            raise
+
+        self._timeline.set_critical_path(self._critical_path())
+
+        background = [self._tasks[key] for key, stage in self._stages.items() if stage.background]
+        if background:
+            self._background_waiter = asyncio.create_task(self._report_background(background))
+
+    async def wait_background(self) -> None:
+        """Дождаться фоновых этапов (и их итоговой сводки)."""
+        if self._background_waiter is not None:
+            await self._background_waiter
+
+    async def cancel(self) -> None:
+        """Прервать незавершённые этапы — при ошибке запуска или остановке до окончания фоновых."""
+        pending = [task for task in self._tasks.values() if not task.done()]
+        if self._background_waiter is not None and not self._background_waiter.done():
+            pending.append(self._background_waiter)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run_when_ready(self, stage: StartupStage) -> None:
+        if stage.depends_on and self._parallel:
+            await asyncio.wait([self._tasks[dependency] for dependency in stage.depends_on])
+
+        failed = [dependency for dependency in stage.depends_on if dependency in self._failed]
+        if failed:
+            self._failed.add(stage.key)
+            titles = ', '.join(self._stages[dependency].title for dependency in failed)
+            self._timeline.add_manual_step(stage.title, '⏭️', 'Пропущено', f'Не выполнены этапы: {titles}')
+            return
+
+        deadline = asyncio.timeout(stage.timeout)
+        started_at = time.perf_counter()
+        try:
+            # Таймаут снаружи timeline.stage: отмена проходит мимо его обработки ошибок,
+            # и этап записывается с предупреждением, а не как упавший
+            async with (
+                deadline,
+                self._timeline.stage(stage.title, stage.icon, success_message=stage.success_message) as handle,
+            ):
+                try:
+                    await stage.func(handle)
+                except asyncio.CancelledError:
+                    if deadline.expired():
+                        message = f'Прервано по таймауту {stage.timeout:g}с'
+                        if stage.fail_on_timeout:
+                            handle.failure(message)
+                        else:
+                            handle.warning(message)
+                    raise
+        except Exception as error:
+            if isinstance(error, TimeoutError) and deadline.expired():
+                if not stage.fail_on_timeout:
+                    logger.warning('Этап запуска прерван по таймауту', stage=stage.key, timeout=stage.timeout)
+                    return
+                logger.error('Обязательный этап запуска прерван по таймауту', stage=stage.key, timeout=stage.timeout)
+            self._failed.add(stage.key)
+            if not stage.background:
+                raise
+            # Ошибку фонового этапа уже залогировал timeline; бот к этому моменту может уже работать
+        finally:
+            self._spans[stage.key] = (started_at, time.perf_counter())
+
+    def _critical_path(self) -> list[str]:
+        """Цепочка обязательных этапов, определившая время запуска.
+
+        От последнего завершившегося этапа — назад через зависимость, завершившуюся
+        позже остальных: именно её ждал этап перед стартом.
+        """
+        foreground = [key for key, stage in self._stages.items() if not stage.background and key in self._spans]
+        if not foreground:
+            return []
+        key = max(foreground, key=lambda item: self._spans[item][1])
+        path = [key]
+        while dependencies := [dep for dep in self._stages[key].depends_on if dep in self._spans]:
+            key = max(dependencies, key=lambda item: self._spans[item][1])
+            path.append(key)
+        return [self._stages[key].title for key in reversed(path)]
+
+    async def _report_background(self, tasks: list[asyncio.Task]) -> None:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        lines = []
+        for key, stage in self._stages.items():
+            if not stage.background or key not in self._spans:
+                continue
+            started_at, finished_at = self._spans[key]
+            status = 'ошибка' if key in self._failed else 'готово'
+            lines.append(f'{stage.title} — {status} [{finished_at - started_at:.2f}s]')
+        if lines:
+            self._timeline.log_section('Фоновые этапы запуска завершены', lines, icon='🧵')
@@ -60,6 +60,7 @@ class StepRecord:
     status_label: str
     message: str
     duration: float
+    start: float = 0.0  # Секунд от начала запуска
 
 
 class StageHandle:
@@ -104,7 +105,8 @@ class StageHandle:
         self._explicit_status = True
 
     def log(self, message: str, icon: str = '•') -> None:
-        self.timeline.logger.info('┃', icon=icon, message=message)
+        # title — этапы могут выполняться параллельно, и их строки перемешиваются
+        self.timeline.logger.info('┃', icon=icon, title=self.title, message=message)
 
 
 class StartupTimeline:
@@ -112,8 +114,12 @@ class StartupTimeline:
         self.logger = logger
         self.app_name = app_name
         self.steps: list[StepRecord] = []
+        self.critical_path: list[str] = []
+        self._started_at = time.perf_counter()
 
-    def _record_step(self, title: str, icon: str, status_label: str, message: str, duration: float) -> None:
+    def _record_step(
+        self, title: str, icon: str, status_label: str, message: str, duration: float, start: float | None = None
+    ) -> None:
         self.steps.append(
             StepRecord(
                 title=title,
@@ -121,9 +127,14 @@ class StartupTimeline:
                 status_label=status_label,
                 message=message,
                 duration=duration,
+                start=time.perf_counter() - self._started_at if start is None else start,
             )
         )
 
+    def set_critical_path(self, titles: Sequence[str]) -> None:
+        """Этапы, определившие время запуска; выводятся в сводке."""
+        self.critical_path = list(titles)
+
     def log_banner(self, metadata: Sequence[tuple[str, Any]] | None = None) -> None:
         title_text = f'🚀 {self.app_name}'
         subtitle_parts = [f'Python {platform.python_version()}']
@@ -203,6 +214,7 @@ class StartupTimeline:
                 status_label=handle.status_label,
                 message=handle.message,
                 duration=duration,
+                start=start_time - self._started_at,
             )
 
     def log_summary(self) -> None:
@@ -211,12 +223,22 @@ class StartupTimeline:
 
         lines = []
         for step in self.steps:
-            base = f'{step.icon} {step.title} — {step.status_label} [{step.duration:.2f}s]'
+            base = f'{step.icon} {step.title} — {step.status_label} [+{step.start:.2f}s, {step.duration:.2f}s]'
             if step.message:
                 base += f' :: {step.message}'
             lines.append(base)
 
-        width = max(_display_width(line) for line in lines)
+        path_lines = []
+        by_title = {step.title: step for step in self.steps}
+        path = [by_title[title] for title in self.critical_path if title in by_title]
+        if path:
+            # Время до готовности к приёму обновлений против времени последовательного запуска
+            ready_at = path[-1].start + path[-1].duration
+            total = sum(step.duration for step in self.steps)
+            path_lines.append(f'Критический путь: {ready_at:.2f}s (сумма этапов {total:.2f}s)')
+            path_lines.extend(f'  → {step.title} [{step.duration:.2f}s]' for step in path)
+
+        width = max(_display_width(line) for line in lines + path_lines)
         border_top = '┏' + '━' * (width + 2) + '┓'
         border_mid = '┣' + '━' * (width + 2) + '┫'
         border_bottom = '┗' + '━' * (width + 2) + '┛'
@@ -227,4 +249,8 @@ class StartupTimeline:
         self.logger.info(border_mid)
         for line in lines:
             self.logger.info('┃ ' + _ljust(line, width) + ' ┃')
+        if path_lines:
+            self.logger.info(border_mid)
+            for line in path_lines:
+                self.logger.info('┃ ' + _ljust(line, width) + ' ┃')
         self.logger.info(border_bottom)
@@ -0,0 +1,173 @@
+"""Per-update profiling state for the aiogram dispatcher.
+
+``ProfilingMiddleware`` (app/middlewares/profiling.py) opens an ``UpdateProfile``
+in a contextvar for every handled update. Middleware timings, SQL statements
+(engine events), Telegram Bot API and RemnaWave panel calls are added to the
+profile of the current update, so they are attributed correctly even with
+concurrent updates. Updates slower than BOT_PROFILING_SLOW_UPDATE_MS are kept
+in a ring buffer together with a sampled coroutine stack profile and exposed
+on ``/profiling/slow-updates``.
+
+When no update is active every ``record_*`` helper is a single contextvar
+lookup, and stack sampling only starts once an update crosses the threshold.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from app.config import settings
+
+
+_current_profile: ContextVar[UpdateProfile | None] = ContextVar('update_profile', default=None)
+
+_MAX_STACK_DEPTH = 40
+_MAX_DISTINCT_STACKS = 50
+
+
+@dataclass(slots=True)
+class UpdateProfile:
+    event_type: str
+    summary: str
+    user_id: int | None = None
+    started_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    handler: str = ''
+    duration: float = 0.0
+    error: str | None = None
+    middlewares: dict[str, float] = field(default_factory=dict)
+    db_queries: int = 0
+    db_time: float = 0.0
+    telegram_calls: int = 0
+    telegram_time: float = 0.0
+    panel_calls: int = 0
+    panel_time: float = 0.0
+    stacks: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def handler_time(self) -> float:
+        """Время хендлера и его вызовов: всё, что не ушло на собственную работу middleware."""
+        return max(0.0, self.duration - sum(self.middlewares.values()))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'event_type': self.event_type,
+            'summary': self.summary,
+            'user_id': self.user_id,
+            'started_at': self.started_at,
+            'handler': self.handler,
+            'error': self.error,
+            'duration_ms': round(self.duration * 1000, 2),
+            'handler_ms': round(self.handler_time * 1000, 2),
+            'middlewares_ms': {name: round(value * 1000, 3) for name, value in self.middlewares.items()},
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'telegram_calls': self.telegram_calls,
+            'telegram_ms': round(self.telegram_time * 1000, 2),
+            'panel_calls': self.panel_calls,
+            'panel_ms': round(self.panel_time * 1000, 2),
+            'stack_samples': [{'stack': stack, 'samples': count} for stack, count in self.stacks.most_common()],
+        }
+
+
+def current_profile() -> UpdateProfile | None:
+    return _current_profile.get()
+
+
+def activate(profile: UpdateProfile) -> Any:
+    return _current_profile.set(profile)
+
+
+def deactivate(token: Any) -> None:
+    _current_profile.reset(token)
+
+
+def record_db_query(duration: float) -> None:
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.db_queries += 1
+        profile.db_time += duration
+
+
+def record_telegram_call(duration: float) -> None:
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.telegram_calls += 1
+        profile.telegram_time += duration
+
+
+def record_panel_call(duration: float) -> None:
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.panel_calls += 1
+        profile.panel_time += duration
+
+
+def _coroutine_stack(task: asyncio.Task) -> str:
+    """Цепочка ожидающих корутин задачи от внешней к внутренней: ``a;b;c``."""
+    frames: list[str] = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None and len(frames) < _MAX_STACK_DEPTH:
+        frame = getattr(awaitable, 'cr_frame', None) or getattr(awaitable, 'gi_frame', None)
+        if frame is not None:
+            module = frame.f_globals.get('__name__', '?')
+            frames.append(f'{module}.{frame.f_code.co_qualname}:{frame.f_lineno}')
+        awaitable = getattr(awaitable, 'cr_await', None) or getattr(awaitable, 'gi_yieldfrom', None)
+    return ';'.join(frames)
+
+
+class StackSampler:
+    """Снимает стек задачи обновления, пока она выполняется дольше порога."""
+
+    __slots__ = ('_handle', '_interval', '_loop', '_profile', '_task')
+
+    def __init__(self, profile: UpdateProfile, task: asyncio.Task, delay: float, interval: float) -> None:
+        self._profile = profile
+        self._task = task
+        self._interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._handle: asyncio.TimerHandle | None = self._loop.call_later(delay, self._sample)
+
+    def _sample(self) -> None:
+        if self._task.done():
+            self._handle = None
+            return
+        stacks = self._profile.stacks
+        stack = _coroutine_stack(self._task)
+        if stack in stacks or len(stacks) < _MAX_DISTINCT_STACKS:
+            stacks[stack] += 1
+        self._handle = self._loop.call_later(self._interval, self._sample)
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+
+class SlowUpdateLog:
+    """Кольцевой буфер медленных обновлений и счётчики по всем профилированным."""
+
+    def __init__(self, size: int) -> None:
+        self._items: deque[UpdateProfile] = deque(maxlen=max(1, size))
+        self.profiled_total = 0
+        self.slow_total = 0
+
+    def observe(self, profile: UpdateProfile, threshold: float) -> None:
+        self.profiled_total += 1
+        if profile.duration >= threshold:
+            self.slow_total += 1
+            self._items.append(profile)
+
+    def snapshot(self, limit: int | None = None) -> list[UpdateProfile]:
+        items = list(reversed(self._items))
+        return items[:limit] if limit is not None else items
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+slow_updates = SlowUpdateLog(settings.BOT_PROFILING_BUFFER_SIZE)
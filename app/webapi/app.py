@@ -27,6 +27,7 @@ from .routes import (
     partners,
     pinned_messages,
     polls,
+    profiling,
     promo_groups,
     promo_offers,
     promocodes,
@@ -105,6 +106,10 @@ OPENAPI_TAGS = [
         'name': 'logs',
         'description': ('Журналы мониторинга бота, действий модераторов поддержки и системный лог-файл.'),
     },
+    {
+        'name': 'profiling',
+        'description': 'Медленные обновления бота с разбивкой времени по middleware, БД и внешним вызовам.',
+    },
     {
         'name': 'auth',
         'description': 'Управление токенами доступа к административному API.',
@@ -261,6 +266,7 @@ def create_web_api_app(lifespan: Any = None) -> FastAPI:
     app.include_router(partners.router, prefix='/partners', tags=['partners'])
     app.include_router(polls.router, prefix='/polls', tags=['polls'])
     app.include_router(logs.router, prefix='/logs', tags=['logs'])
+    app.include_router(profiling.router, prefix='/profiling', tags=['profiling'])
     app.include_router(
         pinned_messages.router,
         prefix='/pinned-messages',
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Security
+from fastapi import APIRouter, HTTPException, Security, status
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
 from app.database import db_manager, get_pool_metrics
 from app.services.version_service import version_service
+from app.utils.metrics import metrics
+from app.utils.redis_registry import redis_registry
 
 from ..dependencies import require_api_token
 from ..schemas.health import HealthCheckResponse, HealthFeatureFlags
@@ -40,8 +43,24 @@ async def database_health(_: object = Security(require_api_token)) -> dict:
     return await db_manager.health_check()
 
 
+@router.get('/health/redis', tags=['health'])
+async def redis_health(_: object = Security(require_api_token)) -> dict:
+    """Доступность Redis, размыкатель и загрузка общих пулов соединений."""
+
+    return await redis_registry.health()
+
+
 @router.get('/metrics/pool', tags=['health'])
 async def pool_metrics(_: object = Security(require_api_token)) -> dict:
     """Метрики пула подключений к базе данных."""
 
     return await get_pool_metrics()
+
+
+@router.get('/metrics', tags=['health'], response_class=PlainTextResponse)
+async def prometheus_metrics(_: object = Security(require_api_token)) -> PlainTextResponse:
+    """Метрики процесса в текстовом формате Prometheus."""
+
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, 'Metrics are disabled')
+    return PlainTextResponse(await metrics.expose(), media_type='text/plain; version=0.0.4; charset=utf-8')
@@ -14,7 +14,8 @@ from app.database.crud.main_menu_button import (
     update_main_menu_button,
 )
 from app.database.models import MainMenuButton
-from app.services.main_menu_button_service import MainMenuButtonService
+from app.services.main_menu_button_service import MAIN_MENU_BUTTONS_TOPIC, MainMenuButtonService
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 from ..dependencies import get_db_session, require_api_token
 from ..schemas.main_menu_buttons import (
@@ -77,6 +78,7 @@ async def create_main_menu_button_endpoint(
     )
 
     MainMenuButtonService.invalidate_cache()
+    await cache_invalidation_bus.publish(MAIN_MENU_BUTTONS_TOPIC)
     return _serialize(button)
 
 
@@ -95,6 +97,7 @@ async def update_main_menu_button_endpoint(
     button = await update_main_menu_button(db, button, **update_payload)
 
     MainMenuButtonService.invalidate_cache()
+    await cache_invalidation_bus.publish(MAIN_MENU_BUTTONS_TOPIC)
     return _serialize(button)
 
 
@@ -110,4 +113,5 @@ async def delete_main_menu_button_endpoint(
 
     await delete_main_menu_button(db, button)
     MainMenuButtonService.invalidate_cache()
+    await cache_invalidation_bus.publish(MAIN_MENU_BUTTONS_TOPIC)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
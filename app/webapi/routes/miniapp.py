@@ -40,7 +40,7 @@ from app.database.crud.subscription import (
     remove_subscription_servers,
     update_subscription_autopay,
 )
-from app.database.crud.tariff import get_tariff_by_id, get_tariffs_for_user
+from app.database.crud.tariff import get_tariff_by_id
 from app.database.crud.transaction import (
     create_transaction,
     get_user_total_spent_kopeks,
@@ -59,7 +59,14 @@ from app.database.models import (
 from app.services.faq_service import FaqService
 from app.services.maintenance_service import maintenance_service
 from app.services.payment_service import PaymentService, get_wata_payment_by_link_id
-from app.services.pricing_engine import PricingEngine
+from app.services.pricing_catalog import CatalogSnapshot, pricing_catalog
+from app.services.pricing_engine import (
+    PricingContext,
+    PricingEngine,
+    RenewalPricing,
+    TariffQuoteKey,
+    pricing_engine,
+)
 from app.services.privacy_policy_service import PrivacyPolicyService
 from app.services.promo_offer_service import promo_offer_service
 from app.services.promocode_service import PromoCodeService
@@ -6309,23 +6316,28 @@ def _format_traffic_limit_label(traffic_gb: int, user: User | None = None) -> st
     return _t(user, 'SUBSCRIPTION_ORDER_TRAFFIC_GB', '{gb} ГБ', gb=traffic_gb)
 
 
-async def _build_tariff_model(
-    db: AsyncSession,
+def _build_tariff_model(
     tariff,
+    quotes: dict[TariffQuoteKey, RenewalPricing],
+    catalog: CatalogSnapshot,
     current_tariff_id: int | None = None,
-    promo_group=None,
     current_tariff=None,
     remaining_days: int = 0,
     user=None,
 ) -> MiniAppTariff:
-    """Преобразует объект тарифа в модель для API."""
+    """Преобразует объект тарифа в модель для API.
+
+    Цены берутся из пакетного расчёта ``PricingEngine.quote_tariffs``,
+    серверы — из снимка каталога (без запросов к БД).
+    """
     servers: list[MiniAppConnectedServer] = []
     servers_count = 0
+    included_devices = tariff.device_limit or 0
 
     if tariff.allowed_squads:
         servers_count = len(tariff.allowed_squads)
         for squad_uuid in tariff.allowed_squads[:5]:  # Ограничиваем для превью
-            server = await get_server_squad_by_uuid(db, squad_uuid)
+            server = catalog.server(squad_uuid)
             if server:
                 servers.append(
                     MiniAppConnectedServer(
@@ -6339,11 +6351,12 @@ async def _build_tariff_model(
         for period_str, original_price_kopeks in sorted(tariff.period_prices.items(), key=lambda x: int(x[0])):
             period_days = int(period_str)
 
-            # Применяем скидку промогруппы + promo-offer (stacked)
-            group_pct = promo_group.get_discount_percent('period', period_days) if promo_group else 0
-            offer_pct = get_user_active_promo_discount_percent(user) if user else 0
+            # Скидка промогруппы + promo-offer (stacked) — из пакетного расчёта
+            quote = quotes[(tariff.id, period_days, included_devices)]
+            group_pct = quote.breakdown['group_discount_pct']['period']
+            offer_pct = quote.breakdown['offer_discount_pct']
             if group_pct > 0 or offer_pct > 0:
-                price_kopeks, _, _ = PricingEngine.apply_stacked_discounts(original_price_kopeks, group_pct, offer_pct)
+                price_kopeks = quote.final_total
                 # Комбинированный процент для отображения
                 remaining = (100 - group_pct) * (100 - offer_pct)
                 discount_percent = 100 - remaining // 100
@@ -6388,18 +6401,9 @@ async def _build_tariff_model(
     raw_daily_price_kopeks = getattr(tariff, 'daily_price_kopeks', 0) if is_daily else 0
     daily_price_kopeks = raw_daily_price_kopeks
 
-    # Применяем скидку промогруппы + promo-offer для суточного тарифа (period_hint=1)
+    # Скидка промогруппы + promo-offer для суточного тарифа (period_hint=1)
     if is_daily and daily_price_kopeks > 0:
-        daily_group_pct = (
-            promo_group.get_discount_percent('period', 1)
-            if promo_group and hasattr(promo_group, 'get_discount_percent')
-            else 0
-        )
-        daily_offer_pct = get_user_active_promo_discount_percent(user) if user else 0
-        if daily_group_pct > 0 or daily_offer_pct > 0:
-            daily_price_kopeks, _, _ = PricingEngine.apply_stacked_discounts(
-                raw_daily_price_kopeks, daily_group_pct, daily_offer_pct
-            )
+        daily_price_kopeks = quotes[(tariff.id, 1, included_devices)].final_total
 
     daily_price_label = _format_daily_price_label(daily_price_kopeks, user) if is_daily else None
 
@@ -6490,10 +6494,12 @@ async def get_tariffs_endpoint(
         )
 
     # Получаем промогруппу пользователя (с приоритетом)
-    from app.services.pricing_engine import PricingEngine
+    promo_group = PricingEngine.resolve_promo_group(user)
 
-    # Получаем тарифы, доступные пользователю
-    tariffs = await get_tariffs_for_user(db, user=user)
+    # Тарифы, доступные пользователю, и их цены — из снимка каталога одним проходом
+    catalog = await pricing_catalog.get()
+    tariffs = catalog.tariffs_for_user(user)
+    quotes = pricing_engine.quote_tariffs(PricingContext.for_user(user), tariffs)
 
     # Текущий тариф пользователя
     subs = getattr(user, 'subscriptions', None) or []
@@ -6515,23 +6521,24 @@ async def get_tariffs_endpoint(
         remaining_days = max(0, delta.days)
 
     if current_tariff_id:
-        current_tariff = await get_tariff_by_id(db, current_tariff_id)
+        # Неактивного тарифа в снимке нет — читаем из БД
+        current_tariff = catalog.tariff(current_tariff_id) or await get_tariff_by_id(db, current_tariff_id)
         if current_tariff:
             current_tariff_model = await _build_current_tariff_model(db, current_tariff, promo_group, user=user)
 
     # Формируем список тарифов
-    tariff_models: list[MiniAppTariff] = []
-    for tariff in tariffs:
-        model = await _build_tariff_model(
-            db,
+    tariff_models = [
+        _build_tariff_model(
             tariff,
+            quotes,
+            catalog,
             current_tariff_id,
-            promo_group,
             current_tariff=current_tariff,
             remaining_days=remaining_days,
             user=user,
         )
-        tariff_models.append(model)
+        for tariff in tariffs
+    ]
 
     # Формируем модель промогруппы для ответа
     promo_group_model = None
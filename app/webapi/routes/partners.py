@@ -15,6 +15,7 @@ from app.database.crud.user import (
     update_user,
 )
 from app.database.models import User
+from app.database.read_routing import get_read_db, get_user_read_db
 from app.services.partner_stats_service import PartnerStatsService
 from app.utils.user_utils import (
     get_detailed_referral_list,
@@ -125,7 +126,7 @@ def _serialize_referral_item(referral: dict) -> PartnerReferralItem:
 @router.get('/referrers', response_model=PartnerReferrerListResponse)
 async def list_referrers(
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     search: str | None = Query(default=None),
@@ -163,7 +164,7 @@ async def list_referrers(
 async def get_referrer_detail(
     user_id: int,
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_user_read_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
 ) -> PartnerReferrerDetail:
@@ -227,7 +228,7 @@ async def update_referrer_commission(
 async def get_global_partner_stats(
     days: int = Query(30, ge=1, le=365),
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db),
 ) -> GlobalPartnerStats:
     """Глобальная статистика партнёрской программы."""
     data = await PartnerStatsService.get_global_partner_stats(db, days)
@@ -243,7 +244,7 @@ async def get_global_partner_stats(
 async def get_global_daily_stats(
     days: int = Query(30, ge=1, le=365),
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db),
 ) -> DailyStatsResponse:
     """Глобальная статистика по дням."""
     data = await PartnerStatsService.get_global_daily_stats(db, days)
@@ -260,7 +261,7 @@ async def get_top_referrers(
     limit: int = Query(10, ge=1, le=100),
     days: int | None = Query(None, ge=1, le=365),
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db),
 ) -> TopReferrersResponse:
     """Топ рефереров по заработку."""
     data = await PartnerStatsService.get_top_referrers(db, limit, days)
@@ -275,7 +276,7 @@ async def get_top_referrers(
 async def get_referrer_detailed_stats(
     user_id: int,
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_user_read_db),
 ) -> ReferrerDetailedStats:
     """Детальная статистика реферера."""
     user = await get_user_by_telegram_id(db, user_id)
@@ -300,7 +301,7 @@ async def get_referrer_daily_stats(
     user_id: int,
     days: int = Query(30, ge=1, le=365),
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_user_read_db),
 ) -> DailyStatsResponse:
     """Статистика реферера по дням."""
     user = await get_user_by_telegram_id(db, user_id)
@@ -324,7 +325,7 @@ async def get_referrer_top_referrals(
     user_id: int,
     limit: int = Query(10, ge=1, le=100),
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_user_read_db),
 ) -> TopReferralsResponse:
     """Топ рефералов реферера по принесённому доходу."""
     user = await get_user_by_telegram_id(db, user_id)
@@ -348,7 +349,7 @@ async def get_referrer_period_comparison(
     current_days: int = Query(7, ge=1, le=365),
     previous_days: int = Query(7, ge=1, le=365),
     _: Any = Security(require_api_token),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_user_read_db),
 ) -> PeriodComparisonResponse:
     """Сравнение периодов для реферера."""
     user = await get_user_by_telegram_id(db, user_id)
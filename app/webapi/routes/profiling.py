@@ -0,0 +1,37 @@
+"""Маршруты административного API для профилирования обновлений бота."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Query, Security, status
+
+from app.config import settings
+from app.utils.update_profiler import slow_updates
+
+from ..dependencies import require_api_token
+from ..schemas.profiling import SlowUpdateEntry, SlowUpdateListResponse
+
+
+router = APIRouter()
+
+
+@router.get('/slow-updates', response_model=SlowUpdateListResponse)
+async def list_slow_updates(
+    _: Any = Security(require_api_token),
+    limit: int = Query(50, ge=1, le=1000),
+) -> SlowUpdateListResponse:
+    """Последние медленные обновления, от новых к старым."""
+
+    return SlowUpdateListResponse(
+        enabled=settings.BOT_PROFILING_ENABLED,
+        threshold_ms=settings.BOT_PROFILING_SLOW_UPDATE_MS,
+        profiled_total=slow_updates.profiled_total,
+        slow_total=slow_updates.slow_total,
+        items=[SlowUpdateEntry(**profile.as_dict()) for profile in slow_updates.snapshot(limit)],
+    )
+
+
+@router.delete('/slow-updates', status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_updates(_: Any = Security(require_api_token)) -> None:
+    slow_updates.clear()
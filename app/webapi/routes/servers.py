@@ -23,7 +23,7 @@ from app.database.crud.server_squad import (
     update_server_squad_promo_groups,
 )
 from app.database.models import PromoGroup, ServerSquad, User
-from app.utils.cache import cache
+from app.utils.cache import AVAILABLE_COUNTRIES_CACHE_TAG, cache
 
 from ..dependencies import get_db_session, require_api_token
 from ..schemas.servers import (
@@ -271,7 +271,7 @@ async def create_server_endpoint(
     except ValueError as error:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, str(error)) from error
 
-    await cache.delete_pattern('available_countries*')
+    await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
     server = await get_server_squad_by_id(db, server.id)
     assert server is not None
@@ -319,7 +319,7 @@ async def update_server_endpoint(
         except ValueError as error:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, str(error)) from error
 
-    await cache.delete_pattern('available_countries*')
+    await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
     server = await get_server_squad_by_id(db, server_id)
     assert server is not None
@@ -343,7 +343,7 @@ async def delete_server_endpoint(
             'Server cannot be deleted because it has active connections',
         )
 
-    await cache.delete_pattern('available_countries*')
+    await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
     return ServerDeleteResponse(success=True, message='Server deleted')
 
@@ -390,7 +390,7 @@ async def sync_servers_with_remnawave(
     if squads:
         created, updated, removed = await sync_with_remnawave(db, squads)
 
-    await cache.delete_pattern('available_countries*')
+    await cache.invalidate_tags(AVAILABLE_COUNTRIES_CACHE_TAG)
 
     return ServerSyncResponse(
         created=created,
@@ -14,6 +14,7 @@ from app.database.crud.webhook import (
     update_webhook,
 )
 from app.database.models import Webhook, WebhookDelivery
+from app.services.webhook_service import webhook_service
 
 from ..dependencies import get_db_session, require_api_token
 from ..schemas.webhooks import (
@@ -146,6 +147,7 @@ async def create_webhook_endpoint(
         secret=payload.secret,
         description=payload.description,
     )
+    webhook_service.invalidate_targets()
     return _serialize_webhook(webhook)
 
 
@@ -170,6 +172,7 @@ async def update_webhook_endpoint(
         description=payload.description,
         is_active=payload.is_active,
     )
+    webhook_service.invalidate_targets()
     return _serialize_webhook(webhook)
 
 
@@ -185,6 +188,7 @@ async def delete_webhook_endpoint(
         raise HTTPException(status.HTTP_404_NOT_FOUND, 'Webhook not found')
 
     await delete_webhook(db, webhook)
+    webhook_service.invalidate_targets()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
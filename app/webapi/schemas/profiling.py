@@ -0,0 +1,41 @@
+"""Pydantic-схемы профилирования обновлений бота."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class StackSample(BaseModel):
+    stack: str = Field(..., description='Цепочка ожидающих корутин, от внешней к внутренней')
+    samples: int = Field(..., ge=1)
+
+
+class SlowUpdateEntry(BaseModel):
+    """Медленное обновление с разбивкой времени."""
+
+    event_type: str
+    summary: str = Field(..., description='Команда, callback_data или тип сообщения')
+    user_id: int | None = None
+    started_at: datetime
+    handler: str
+    error: str | None = None
+    duration_ms: float
+    handler_ms: float = Field(..., description='Время хендлера без собственного времени middleware')
+    middlewares_ms: dict[str, float] = Field(default_factory=dict)
+    db_queries: int
+    db_ms: float
+    telegram_calls: int
+    telegram_ms: float
+    panel_calls: int
+    panel_ms: float
+    stack_samples: list[StackSample] = Field(default_factory=list)
+
+
+class SlowUpdateListResponse(BaseModel):
+    enabled: bool
+    threshold_ms: int
+    profiled_total: int = Field(..., ge=0)
+    slow_total: int = Field(..., ge=0)
+    items: list[SlowUpdateEntry]
@@ -149,6 +149,16 @@ def create_remnawave_webhook_router(bot: Bot, webhook_service: RemnaWaveWebhookS
                 logger.exception('RemnaWave webhook processing error', event_name=event_name)
                 return JSONResponse({'status': 'ok', 'processed': False})
 
+        # Coalesced user events are buffered and resolved in batches on the
+        # flush session — no per-request DB session needed.
+        if webhook_service.is_coalesced_event(event_name):
+            try:
+                processed = await webhook_service.process_event(None, event_name, data)
+                return JSONResponse({'status': 'ok', 'processed': processed})
+            except Exception:
+                logger.exception('RemnaWave webhook processing error', event_name=event_name)
+                return JSONResponse({'status': 'ok', 'processed': False})
+
         # User events and dual events require a DB session
         try:
             async with AsyncSessionLocal() as db:
@@ -10,6 +10,7 @@ from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 
 from app.config import settings
+from app.utils.metrics import QUEUE_DEPTH, metrics
 
 
 logger = structlog.get_logger(__name__)
@@ -51,6 +52,10 @@ class TelegramWebhookProcessor:
         self._running = False
         self._stop_sentinel: object = object()
         self._lifecycle_lock = asyncio.Lock()
+        metrics.register_collector('telegram_webhook_queue', self._collect_queue_depth)
+
+    def _collect_queue_depth(self) -> None:
+        QUEUE_DEPTH.labels('telegram_webhook').set(self._queue.qsize())
 
     @property
     def is_running(self) -> bool:
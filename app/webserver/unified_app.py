@@ -193,6 +193,8 @@ def create_unified_app(
         # без которой drain не сможет послать уведомление). Поэтому добавляем
         # ПЕРВЫМ в shutdown_handlers — итерация без reverse.
         shutdown_handlers.append(remnawave_webhook_service.stop)
+        # Поднимаем user-события, оставшиеся в Redis-журнале после рестарта.
+        startup_handlers.append(remnawave_webhook_service.start)
 
     payment_providers_state = {
         'tribute': settings.TRIBUTE_ENABLED,
@@ -228,6 +230,16 @@ def create_unified_app(
     startup_handlers.append(disposable_email_service.start)
     shutdown_handlers.append(disposable_email_service.stop)
 
+    if settings.is_cabinet_enabled():
+        from app.cabinet.routes.websocket import cabinet_ws_manager
+        from app.cabinet.services.media_proxy import telegram_media_proxy
+
+        # Общая aiogram-сессия прокси медиа кабинета живёт до остановки приложения
+        shutdown_handlers.append(telegram_media_proxy.close)
+        # Подписка на WS-уведомления, опубликованные другими репликами
+        startup_handlers.append(cabinet_ws_manager.start)
+        shutdown_handlers.append(cabinet_ws_manager.stop)
+
     miniapp_mounted, miniapp_path = _mount_miniapp_static(app)
     _mount_uploads_static(app)
 
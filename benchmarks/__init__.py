@@ -0,0 +1 @@
+"""Performance benchmarks for hot paths; run with ``python benchmarks/run.py``."""
@@ -0,0 +1,224 @@
+"""Isolated environment for benchmarks: seeded SQLite, optional fakeredis, fake RemnaWave panel.
+
+Nothing leaves the machine. Modules that open their own sessions through
+``AsyncSessionLocal`` are pointed at the benchmark database, and the RemnaWave
+settings at ``tools/fake_remnawave_panel.py`` served on a free local port.
+"""
+
+from __future__ import annotations
+
+import importlib
+import random
+import tempfile
+from contextlib import AsyncExitStack
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Self
+from unittest.mock import patch
+
+from aiohttp.test_utils import TestServer
+from sqlalchemy import event, insert
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from app.config import settings
+from app.database.models import (
+    Base,
+    PromoGroup,
+    Subscription,
+    SubscriptionStatus,
+    Tariff,
+    User,
+    UserPromoGroup,
+    UserStatus,
+)
+from app.utils.cache import cache
+from tools.fake_remnawave_panel import FakeRemnaWavePanel
+
+
+try:
+    from fakeredis import FakeAsyncRedis
+except ImportError:  # не входит в зависимости проекта
+    FakeAsyncRedis = None
+
+
+# Модули, которые сами открывают сессии через AsyncSessionLocal
+_SESSION_LOCAL_MODULES = (
+    'app.middlewares.auth',
+    'app.services.remnawave_webhook_service',
+)
+
+TARIFF_COUNT = 8
+PROMO_GROUP_COUNT = 4
+LANGUAGES = ('ru', 'en', 'fa')
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_as_json(_type, _compiler, **_kw) -> str:
+    return 'JSON'
+
+
+def _fast_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=OFF')
+    cursor.close()
+
+
+class BenchEnvironment:
+    """Everything a scenario needs; use as ``async with BenchEnvironment(scale=...) as env``.
+
+    ``scale`` is the number of seeded users; each has one subscription on one of
+    the tariffs and a panel user with the same UUID. ``redis`` is ``'auto'``
+    (fakeredis when installed, otherwise no Redis), ``'fakeredis'`` or ``'off'``.
+    """
+
+    def __init__(self, *, scale: int, redis: str = 'auto', seed: int = 48) -> None:
+        if redis not in {'auto', 'fakeredis', 'off'}:
+            raise ValueError(f'Unknown redis mode: {redis}')
+        self.scale = scale
+        self.redis_mode = redis
+        self.rng = random.Random(seed)
+        self.engine: AsyncEngine | None = None
+        self.sessionmaker: async_sessionmaker | None = None
+        self.panel = FakeRemnaWavePanel()
+        self.panel_uuids: list[str] = []
+        self.telegram_ids: list[int] = []
+        self.redis_backend = 'off'
+        self._stack = AsyncExitStack()
+
+    @property
+    def description(self) -> dict[str, Any]:
+        """What the numbers depend on besides the code; stored with the baseline."""
+        return {'scale': self.scale, 'redis': self.redis_backend}
+
+    async def __aenter__(self) -> Self:
+        try:
+            await self._start()
+        except BaseException:
+            await self._stack.aclose()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self._stack.aclose()
+
+    async def _start(self) -> None:
+        tmpdir = Path(self._stack.enter_context(tempfile.TemporaryDirectory(prefix='remnabot_bench_')))
+        self.engine = create_async_engine(f'sqlite+aiosqlite:///{tmpdir / "bench.sqlite"}')
+        self._stack.push_async_callback(self.engine.dispose)
+        # Замеряем код, а не fsync диска под временной БД
+        event.listen(self.engine.sync_engine, 'connect', _fast_sqlite_pragmas)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
+        await self._seed()
+
+        for module in _SESSION_LOCAL_MODULES:
+            self._stack.enter_context(
+                patch.object(importlib.import_module(module), 'AsyncSessionLocal', self.sessionmaker)
+            )
+
+        server = TestServer(self.panel.build_app())
+        await server.start_server()
+        self._stack.push_async_callback(server.close)
+        for name, value in (
+            ('REMNAWAVE_API_URL', str(server.make_url('')).rstrip('/')),
+            ('REMNAWAVE_API_KEY', 'bench'),
+            ('REMNAWAVE_AUTH_TYPE', 'api_key'),
+            ('REMNAWAVE_SECRET_KEY', None),
+        ):
+            self._stack.enter_context(patch.object(settings, name, value))
+
+        self._configure_redis()
+
+    def _configure_redis(self) -> None:
+        client = FakeAsyncRedis() if FakeAsyncRedis is not None and self.redis_mode != 'off' else None
+        if client is None and self.redis_mode == 'fakeredis':
+            raise RuntimeError('fakeredis is not installed: pip install fakeredis, or run with --redis off')
+        self.redis_backend = 'fakeredis' if client is not None else 'off'
+        self._stack.enter_context(patch.object(cache, 'redis_client', client))
+        self._stack.enter_context(patch.object(cache, '_connected', client is not None))
+
+    async def _seed(self) -> None:
+        now = datetime.now(UTC)
+        self.panel_uuids = self.panel.add_users(self.scale)
+        self.telegram_ids = [100_000 + n for n in range(self.scale)]
+
+        promo_groups = [
+            {
+                'id': group_id,
+                'name': f'Group {group_id}',
+                'priority': group_id,
+                'is_default': group_id == 1,
+                'server_discount_percent': 5 * (group_id - 1),
+                'traffic_discount_percent': 5 * (group_id - 1),
+                'device_discount_percent': 10 * (group_id - 1),
+                'period_discounts': {'90': 5 * group_id, '180': 10 * group_id} if group_id > 1 else {},
+            }
+            for group_id in range(1, PROMO_GROUP_COUNT + 1)
+        ]
+        tariffs = [
+            {
+                'id': tariff_id,
+                'name': f'Tariff {tariff_id}',
+                'display_order': tariff_id,
+                'tier_level': tariff_id,
+                'traffic_limit_gb': 50 * tariff_id,
+                'device_limit': 1 + tariff_id % 3,
+                'device_price_kopeks': 5000,
+                'max_device_limit': 10,
+                'allowed_squads': [f'squad-{tariff_id % 3}'],
+                'period_prices': {'30': 19900 * tariff_id, '90': 54900 * tariff_id, '180': 99900 * tariff_id},
+                'is_daily': tariff_id == TARIFF_COUNT,
+                'daily_price_kopeks': 990 if tariff_id == TARIFF_COUNT else 0,
+            }
+            for tariff_id in range(1, TARIFF_COUNT + 1)
+        ]
+
+        users, subscriptions, user_promo_groups = [], [], []
+        for n, (telegram_id, panel_uuid) in enumerate(zip(self.telegram_ids, self.panel_uuids, strict=True)):
+            user_id = n + 1
+            promo_group_id = self.rng.randint(1, PROMO_GROUP_COUNT)
+            users.append(
+                {
+                    'id': user_id,
+                    'telegram_id': telegram_id,
+                    'username': f'bench_user_{telegram_id}',
+                    'first_name': f'User {n}',
+                    'language': LANGUAGES[n % len(LANGUAGES)],
+                    'status': UserStatus.ACTIVE.value,
+                    'balance_kopeks': self.rng.randrange(0, 500_000, 100),
+                    'referral_code': f'ref{telegram_id}',
+                    'remnawave_uuid': panel_uuid,
+                    'promo_group_id': promo_group_id,
+                    'has_had_paid_subscription': n % 3 != 0,
+                    'created_at': now - timedelta(days=self.rng.randint(1, 900)),
+                }
+            )
+            user_promo_groups.append({'user_id': user_id, 'promo_group_id': promo_group_id})
+            tariff_id = self.rng.randint(1, TARIFF_COUNT)
+            end_date = now + timedelta(days=self.rng.randint(-30, 180))
+            subscriptions.append(
+                {
+                    'user_id': user_id,
+                    'tariff_id': tariff_id,
+                    'status': (SubscriptionStatus.ACTIVE if end_date > now else SubscriptionStatus.EXPIRED).value,
+                    'is_trial': n % 11 == 0,
+                    'end_date': end_date,
+                    'traffic_limit_gb': 50 * tariff_id,
+                    'traffic_used_gb': round(self.rng.uniform(0, 50), 2),
+                    'device_limit': 1 + tariff_id % 3,
+                    'connected_squads': [f'squad-{tariff_id % 3}'],
+                    'remnawave_short_id': panel_uuid[:8],
+                }
+            )
+
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(PromoGroup), promo_groups)
+            await conn.execute(insert(Tariff), tariffs)
+            # SQLite ограничивает число параметров в одном запросе
+            for start in range(0, self.scale, 1000):
+                await conn.execute(insert(User), users[start : start + 1000])
+                await conn.execute(insert(UserPromoGroup), user_promo_groups[start : start + 1000])
+                await conn.execute(insert(Subscription), subscriptions[start : start + 1000])
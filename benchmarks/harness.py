@@ -0,0 +1,274 @@
+"""Benchmark registry, measurement and JSON baseline comparison."""
+
+from __future__ import annotations
+
+import fnmatch
+import gc
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from benchmarks.environment import BenchEnvironment
+
+
+Operation = Callable[[], Awaitable[Any] | Any]
+Setup = Callable[['BenchEnvironment'], AsyncIterator[Operation]]
+
+BASELINE_VERSION = 1
+
+# Ниже этих значений разница — шум (кэши, интернирование строк), а не регрессия
+_NOISE_FLOOR = {'ops_per_sec': 0.0, 'alloc_peak_kib': 4.0, 'retained_bytes_per_op': 512.0}
+# Остаток после операции колеблется тем сильнее, чем больше она выделяет: кэши, freelist'ы
+# и интернированные строки оседают неравномерно. Порог шума — доля пика аллокаций.
+_RETAINED_NOISE_SHARE_OF_PEAK = 0.01
+
+
+@dataclass(frozen=True, slots=True)
+class Benchmark:
+    name: str
+    setup: Setup
+    description: str
+
+
+_REGISTRY: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    """Register a scenario.
+
+    The decorated async generator prepares state, yields the operation to
+    measure and cleans up after the measurement, like a pytest yield fixture.
+    """
+
+    def decorator(setup: Setup) -> Setup:
+        if name in _REGISTRY:
+            raise ValueError(f'Benchmark {name!r} is already registered')
+        description = (setup.__doc__ or '').strip().splitlines()
+        _REGISTRY[name] = Benchmark(name=name, setup=setup, description=description[0] if description else '')
+        return setup
+
+    return decorator
+
+
+def registered(patterns: list[str] | None = None) -> list[Benchmark]:
+    """Registered benchmarks in name order, optionally filtered by glob patterns."""
+    benchmarks = sorted(_REGISTRY.values(), key=lambda item: item.name)
+    if not patterns:
+        return benchmarks
+    return [item for item in benchmarks if any(fnmatch.fnmatch(item.name, pattern) for pattern in patterns)]
+
+
+@dataclass(slots=True)
+class Result:
+    name: str
+    ops_per_sec: float
+    iterations: int
+    alloc_peak_kib: float
+    retained_bytes_per_op: float
+
+    def to_dict(self) -> dict[str, float | int]:
+        data = asdict(self)
+        del data['name']
+        return data
+
+
+def median_result(results: list[Result]) -> Result:
+    """Median of every metric over repeated runs of one benchmark: one disturbed run doesn't move it."""
+    return Result(
+        name=results[0].name,
+        ops_per_sec=statistics.median(result.ops_per_sec for result in results),
+        iterations=sum(result.iterations for result in results),
+        alloc_peak_kib=statistics.median(result.alloc_peak_kib for result in results),
+        retained_bytes_per_op=statistics.median(result.retained_bytes_per_op for result in results),
+    )
+
+
+async def _call(operation: Operation) -> None:
+    result = operation()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def measure(
+    name: str,
+    operation: Operation,
+    *,
+    duration: float,
+    rounds: int = 5,
+    warmup: int = 3,
+    alloc_iterations: int = 50,
+) -> Result:
+    """Median-of-rounds throughput, then a separate tracemalloc pass for allocations.
+
+    Throughput is the median round: a round disturbed by the rest of the machine
+    (or an unusually lucky one) doesn't move it. Allocations are measured
+    separately because tracemalloc slows every allocation down several times.
+    """
+    for _ in range(warmup):
+        await _call(operation)
+
+    rates = []
+    iterations = 0
+    round_duration = duration / rounds
+    for _ in range(rounds):
+        count = 0
+        started = time.perf_counter()
+        deadline = started + round_duration
+        while True:
+            await _call(operation)
+            count += 1
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+        rates.append(count / (now - started))
+        iterations += count
+
+    alloc_iterations = max(1, min(alloc_iterations, iterations))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(alloc_iterations):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await _call(operation)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        gc.collect()
+        retained = (tracemalloc.get_traced_memory()[0] - baseline_bytes) / alloc_iterations
+    finally:
+        tracemalloc.stop()
+
+    return Result(
+        name=name,
+        ops_per_sec=round(statistics.median(rates), 2),
+        iterations=iterations,
+        alloc_peak_kib=round(peak / 1024, 2),
+        retained_bytes_per_op=round(max(retained, 0.0), 1),
+    )
+
+
+# --- Baseline ---
+
+
+class BaselineMismatchError(Exception):
+    """The baseline was recorded under different conditions (scale, Redis backend)."""
+
+
+@dataclass(frozen=True, slots=True)
+class Regression:
+    name: str
+    metric: str
+    baseline: float
+    current: float
+    noise_floor: float = 0.0
+
+    @property
+    def change(self) -> float:
+        """Relative change in the bad direction: 0.25 means 25% worse."""
+        reference = max(self.baseline, self.noise_floor)
+        if self.metric == 'ops_per_sec':
+            return 1 - self.current / reference
+        return self.current / reference - 1
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.metric} {self.baseline:g} -> {self.current:g} ({self.change:+.0%} worse)'
+
+
+def load_baseline(path: Path) -> dict[str, Any] | None:
+    if not path.exists():
+        return None
+    data = json.loads(path.read_text(encoding='utf-8'))
+    if data.get('version') != BASELINE_VERSION:
+        raise BaselineMismatchError(f'{path}: unsupported baseline version {data.get("version")!r}')
+    return data
+
+
+def save_baseline(path: Path, results: list[Result], environment: dict[str, Any]) -> None:
+    """Write results to the baseline, keeping entries of benchmarks that were not run this time."""
+    existing = load_baseline(path)
+    benchmarks: dict[str, Any] = {}
+    if existing is not None and existing.get('environment') == environment:
+        benchmarks.update(existing.get('benchmarks', {}))
+    benchmarks.update({result.name: result.to_dict() for result in results})
+
+    data = {
+        'version': BASELINE_VERSION,
+        'created_at': datetime.now(UTC).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'environment': environment,
+        'benchmarks': dict(sorted(benchmarks.items())),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    tmp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    tmp_path.replace(path)
+
+
+def compare(
+    results: list[Result],
+    baseline: dict[str, Any],
+    environment: dict[str, Any],
+    *,
+    threshold: float,
+    alloc_threshold: float,
+) -> list[Regression]:
+    """Metrics that got worse than the baseline by more than the threshold.
+
+    ``threshold`` applies to ops/sec, ``alloc_threshold`` to the allocation peak
+    and to retained bytes per operation. Allocation changes below a noise floor
+    are ignored; for retained bytes the floor grows with the operation's
+    allocation peak. Benchmarks absent from the baseline are not compared.
+    """
+    if baseline.get('environment') != environment:
+        raise BaselineMismatchError(
+            f'baseline was recorded with {baseline.get("environment")}, this run uses {environment}; '
+            're-record it with --update-baseline'
+        )
+
+    regressions = []
+    recorded = baseline.get('benchmarks', {})
+    for result in results:
+        entry = recorded.get(result.name)
+        if entry is None:
+            continue
+        retained_floor = max(
+            _NOISE_FLOOR['retained_bytes_per_op'],
+            entry['alloc_peak_kib'] * 1024 * _RETAINED_NOISE_SHARE_OF_PEAK,
+        )
+        candidates = (
+            Regression(result.name, 'ops_per_sec', entry['ops_per_sec'], result.ops_per_sec),
+            Regression(
+                result.name,
+                'alloc_peak_kib',
+                entry['alloc_peak_kib'],
+                result.alloc_peak_kib,
+                _NOISE_FLOOR['alloc_peak_kib'],
+            ),
+            Regression(
+                result.name,
+                'retained_bytes_per_op',
+                entry['retained_bytes_per_op'],
+                result.retained_bytes_per_op,
+                retained_floor,
+            ),
+        )
+        for regression in candidates:
+            if max(regression.baseline, regression.noise_floor) <= 0:
+                continue
+            limit = threshold if regression.metric == 'ops_per_sec' else alloc_threshold
+            if regression.change > limit:
+                regressions.append(regression)
+    return regressions
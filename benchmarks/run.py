@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmarks for hot paths: localization, main menu, pricing, AuthMiddleware, webhooks.
+
+Every scenario runs against a throwaway SQLite database seeded with --scale
+users (with subscriptions, tariffs and promo groups), the local fake RemnaWave
+panel and, when installed, fakeredis. Each scenario is measured --repeat
+times and the median of every metric is kept, both for the baseline and for
+the comparison. Ops/sec, the per-operation allocation peak and bytes retained
+per operation are compared with the JSON baseline; the run exits with code 1
+if any metric is worse than --threshold (ops/sec) or --alloc-threshold
+(allocations). The defaults leave room for the run-to-run noise of an
+unchanged tree, so a failure means a real change; tighten them with --repeat
+raised when hunting small regressions. Record the baseline on the machine that
+will run the comparison: numbers from another machine are not comparable.
+
+Usage:
+    docker compose run --rm bot python benchmarks/run.py --update-baseline
+    docker compose run --rm bot python benchmarks/run.py
+    docker compose run --rm bot python benchmarks/run.py --only 'pricing.*' --threshold 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import sys
+from pathlib import Path
+
+import structlog
+
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks import scenarios  # noqa: F401  # регистрирует сценарии
+from benchmarks.environment import BenchEnvironment
+from benchmarks.harness import (
+    BaselineMismatchError,
+    Result,
+    compare,
+    load_baseline,
+    measure,
+    median_result,
+    registered,
+    save_baseline,
+)
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+
+async def run_benchmarks(
+    *,
+    patterns: list[str] | None,
+    scale: int,
+    duration: float,
+    redis: str,
+    repeat: int = 3,
+    **measure_options: int,
+) -> tuple[list[Result], dict]:
+    """Measure every matching scenario ``repeat`` times and report the median of each metric."""
+    benchmarks = registered(patterns)
+    if not benchmarks:
+        raise SystemExit(f'No benchmarks match {patterns}')
+
+    results = []
+    async with BenchEnvironment(scale=scale, redis=redis) as env:
+        for item in benchmarks:
+            runs = []
+            for _ in range(repeat):
+                async with contextlib.asynccontextmanager(item.setup)(env) as operation:
+                    runs.append(await measure(item.name, operation, duration=duration, **measure_options))
+            result = median_result(runs)
+            results.append(result)
+            print(
+                f'  {item.name:<34} {result.ops_per_sec:>10.1f} ops/s'
+                f'  {result.alloc_peak_kib:>9.1f} KiB peak  {result.retained_bytes_per_op:>9.1f} B retained/op'
+            )
+    return results, env.description
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', action='append', metavar='PATTERN', help='Glob по имени сценария, можно несколько')
+    parser.add_argument('--list', action='store_true', help='Показать сценарии и выйти')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        '--update-baseline', action='store_true', help='Записать результаты в baseline вместо сравнения'
+    )
+    parser.add_argument('--threshold', type=float, default=0.35, help='Допустимое падение ops/sec (0.35 = 35%%)')
+    parser.add_argument('--alloc-threshold', type=float, default=0.5, help='Допустимый рост аллокаций')
+    parser.add_argument('--duration', type=float, default=2.0, help='Секунд замера на сценарий за один прогон')
+    parser.add_argument('--repeat', type=int, default=3, help='Прогонов на сценарий; сравнивается медиана')
+    parser.add_argument('--scale', type=int, default=10_000, help='Пользователей в тестовой БД')
+    parser.add_argument('--redis', choices=('auto', 'fakeredis', 'off'), default='auto')
+    args = parser.parse_args()
+
+    if args.list:
+        for item in registered(args.only):
+            print(f'{item.name:<34} {item.description}')
+        return
+
+    # Лог на каждое событие замерял бы консоль, а не код
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR))
+    logging.getLogger().setLevel(logging.ERROR)
+
+    print(f'scale={args.scale}, duration={args.duration:g}s x {args.repeat} per benchmark')
+    results, environment = asyncio.run(
+        run_benchmarks(
+            patterns=args.only, scale=args.scale, duration=args.duration, redis=args.redis, repeat=args.repeat
+        )
+    )
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results, environment)
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    try:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f'No baseline at {args.baseline}; record one with --update-baseline')
+            return
+        regressions = compare(
+            results, baseline, environment, threshold=args.threshold, alloc_threshold=args.alloc_threshold
+        )
+    except BaselineMismatchError as error:
+        print(f'Cannot compare: {error}')
+        sys.exit(2)
+
+    if regressions:
+        print(f'{len(regressions)} regression(s) against {args.baseline}:')
+        for regression in regressions:
+            print(f'  {regression}')
+        sys.exit(1)
+    print(f'No regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
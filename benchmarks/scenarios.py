@@ -0,0 +1,237 @@
+"""Hot-path scenarios. One operation is one unit of work a real request or event does."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+from itertools import count
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Chat, Message, Update, User as TgUser
+from sqlalchemy import select
+
+from app.config import settings
+from app.database.crud.user import get_user_by_telegram_id
+from app.database.models import Tariff
+from app.localization.loader import load_locale
+from app.localization.texts import get_texts
+from app.middlewares.auth import AuthMiddleware
+from app.services.menu_layout.context import MenuContext
+from app.services.menu_layout.service import MenuLayoutService
+from app.services.pricing_engine import PricingContext, pricing_engine
+from app.services.remnawave_webhook_service import RemnaWaveWebhookService
+from app.webserver.telegram import TelegramWebhookProcessor
+from benchmarks.environment import LANGUAGES, BenchEnvironment
+from benchmarks.harness import Operation, benchmark
+
+
+# Формат проверяет aiogram; запросы к Telegram сценарии не делают
+_BOT_TOKEN = '123456789:benchmark-token'
+_EVENT_BURST = 200
+_UPDATE_BURST = 50
+_PRICED_USERS = 50
+
+
+def _message(telegram_id: int, *, first_name: str, message_id: int = 1) -> Message:
+    return Message(
+        message_id=message_id,
+        date=datetime.now(UTC),
+        chat=Chat(id=telegram_id, type='private'),
+        from_user=TgUser(id=telegram_id, is_bot=False, first_name=first_name, username=f'bench_user_{telegram_id}'),
+        text='/menu',
+    )
+
+
+def _user_messages(env: BenchEnvironment, size: int) -> list[tuple[Message, Message]]:
+    """Message from a seeded user with the stored profile, and with a changed first name."""
+    messages = []
+    for n in env.rng.sample(range(env.scale), min(size, env.scale)):
+        telegram_id = env.telegram_ids[n]
+        messages.append(
+            (_message(telegram_id, first_name=f'User {n}'), _message(telegram_id, first_name=f'User {n} (renamed)'))
+        )
+    return messages
+
+
+async def _noop_handler(_event: object, _data: dict) -> None:
+    return None
+
+
+async def _noop_message_handler(message: Message) -> None:
+    return None
+
+
+@benchmark('localization.get_texts')
+async def texts_lookup(env: BenchEnvironment) -> AsyncIterator[Operation]:
+    """get_texts() for a user's language plus 20 key lookups, as a handler rendering a screen does."""
+    keys = sorted(load_locale('ru'))
+    keys = keys[:: max(1, len(keys) // 20)][:20]
+    languages = count()
+
+    def operation() -> None:
+        texts = get_texts(LANGUAGES[next(languages) % len(LANGUAGES)])
+        for key in keys:
+            texts.t(key, '')
+
+    yield operation
+
+
+@benchmark('menu.build_keyboard')
+async def build_main_menu(env: BenchEnvironment) -> AsyncIterator[Operation]:
+    """Main menu keyboard for a stream of users with different subscription, balance and role states."""
+    contexts = [
+        MenuContext(
+            language=LANGUAGES[n % len(LANGUAGES)],
+            is_admin=n % 50 == 0,
+            is_moderator=n % 25 == 0,
+            has_active_subscription=n % 4 != 0,
+            subscription_is_active=n % 4 != 0,
+            has_had_paid_subscription=n % 3 != 0,
+            balance_kopeks=env.rng.randrange(0, 500_000, 100),
+            show_resume_checkout=n % 9 == 0,
+            has_saved_cart=n % 9 == 0,
+            username=f'bench_user_{n}',
+            subscription_days=env.rng.randint(0, 180),
+            traffic_used_gb=round(env.rng.uniform(0, 50), 2),
+            traffic_left_gb=round(env.rng.uniform(0, 50), 2),
+            referral_count=env.rng.randint(0, 20),
+            registration_days=env.rng.randint(1, 900),
+            has_autopay=n % 5 == 0,
+        )
+        for n in range(64)
+    ]
+    cursor = count()
+    async with env.sessionmaker() as db:
+
+        async def operation() -> None:
+            await MenuLayoutService.build_keyboard(db, contexts[next(cursor) % len(contexts)])
+
+        yield operation
+
+
+async def _priced_users_and_tariffs(env: BenchEnvironment, db) -> tuple[list, list[Tariff]]:
+    tariffs = list((await db.execute(select(Tariff).order_by(Tariff.display_order))).scalars())
+    users = []
+    for n in env.rng.sample(range(env.scale), min(_PRICED_USERS, env.scale)):
+        users.append(await get_user_by_telegram_id(db, env.telegram_ids[n]))
+    return users, tariffs
+
+
+@benchmark('pricing.quote_tariffs')
+async def quote_tariff_catalog(env: BenchEnvironment) -> AsyncIterator[Operation]:
+    """Whole tariff catalog × periods × 1-5 devices for one user, as the mini app tariff screen does."""
+    async with env.sessionmaker() as db:
+        users, tariffs = await _priced_users_and_tariffs(env, db)
+        cursor = count()
+
+        def operation() -> None:
+            user = users[next(cursor) % len(users)]
+            pricing_engine.quote_tariffs(PricingContext.for_user(user), tariffs, device_limits=range(1, 6))
+
+        yield operation
+
+
+@benchmark('pricing.tariff_purchase_price')
+async def tariff_purchase_prices(env: BenchEnvironment) -> AsyncIterator[Operation]:
+    """calculate_tariff_purchase_price() for every tariff and period, one call each, as the bot tariff list does."""
+    async with env.sessionmaker() as db:
+        users, tariffs = await _priced_users_and_tariffs(env, db)
+        items = [(tariff, period) for tariff in tariffs for period in pricing_engine.quotable_periods(tariff)]
+        cursor = count()
+
+        async def operation() -> None:
+            user = users[next(cursor) % len(users)]
+            for tariff, period_days in items:
+                await pricing_engine.calculate_tariff_purchase_price(tariff, period_days, user=user)
+
+        yield operation
+
+
+@benchmark('middleware.auth')
+async def auth_middleware(env: BenchEnvironment) -> AsyncIterator[Operation]:
+    """AuthMiddleware for a message from a registered user; every 10th changes its name and hits the panel."""
+    middleware = AuthMiddleware()
+    messages = _user_messages(env, 500)
+    cursor = count()
+
+    async def operation() -> None:
+        n = next(cursor)
+        stored, renamed = messages[n % len(messages)]
+        # Каждый десятый пользователь переименовывается на каждом круге — туда и обратно
+        changed = n % len(messages) % 10 == 0 and (n // len(messages)) % 2 == 0
+        await middleware(_noop_handler, renamed if changed else stored, {})
+
+    yield operation
+    # Обновления описания в панели запускаются фоновыми задачами
+    pending = [task for task in asyncio.all_tasks() if task.get_coro().__name__ == '_refresh_remnawave_description']
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+@benchmark('webhook.remnawave_user_modified')
+async def remnawave_webhook_burst(env: BenchEnvironment) -> AsyncIterator[Operation]:
+    """A burst of 200 user.modified panel webhooks: buffering, then one coalesced flush to the database."""
+    bot = Bot(_BOT_TOKEN)
+    service = RemnaWaveWebhookService(bot)
+    # Буфер сбрасывается в самой операции, а не по таймеру
+    service._USER_EVENT_COALESCE_WINDOW_SECONDS = 3600.0
+    users = env.rng.sample(range(env.scale), min(_EVENT_BURST, env.scale))
+    expire_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
+    rounds = count(1)
+
+    async def operation() -> None:
+        used_bytes = next(rounds) * 1024**2
+        for n in users:
+            await service.process_event(
+                None,
+                'user.modified',
+                {
+                    'uuid': env.panel_uuids[n],
+                    'telegramId': env.telegram_ids[n],
+                    'status': 'ACTIVE',
+                    'expireAt': expire_at,
+                    'trafficLimitBytes': 100 * 1024**3,
+                    'usedTrafficBytes': used_bytes,
+                },
+            )
+        await service._flush_user_events_after_delay(0)
+
+    try:
+        yield operation
+    finally:
+        await service.stop()
+        await bot.session.close()
+
+
+@benchmark('webhook.telegram_queue')
+async def telegram_webhook_queue(env: BenchEnvironment) -> AsyncIterator[Operation]:
+    """50 Telegram updates through the webhook queue and workers into AuthMiddleware and a no-op handler."""
+    bot = Bot(_BOT_TOKEN)
+    router = Router()
+    router.message.middleware(AuthMiddleware())
+    router.message.register(_noop_message_handler)
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    processor = TelegramWebhookProcessor(
+        bot=bot,
+        dispatcher=dispatcher,
+        queue_maxsize=settings.get_webhook_queue_maxsize(),
+        worker_count=settings.get_webhook_worker_count(),
+        enqueue_timeout=settings.get_webhook_enqueue_timeout(),
+        shutdown_timeout=settings.get_webhook_shutdown_timeout(),
+    )
+    updates = [
+        Update(update_id=n, message=stored) for n, (stored, _renamed) in enumerate(_user_messages(env, _UPDATE_BURST))
+    ]
+    await processor.start()
+
+    async def operation() -> None:
+        for update in updates:
+            await processor.enqueue(update)
+        await processor.wait_until_drained()
+
+    try:
+        yield operation
+    finally:
+        await processor.stop()
+        await bot.session.close()
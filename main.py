@@ -20,6 +20,7 @@ from app.logging_config import _resolve_log_level, setup_logging
 from app.services.backup_service import backup_service
 from app.services.ban_notification_service import ban_notification_service
 from app.services.broadcast_service import broadcast_service
+from app.services.bulk_action_job_service import bulk_action_job_service
 from app.services.contest_rotation_service import contest_rotation_service
 from app.services.daily_subscription_service import daily_subscription_service
 from app.services.log_rotation_service import log_rotation_service
@@ -35,6 +36,7 @@ from app.services.payment_verification_service import (
     method_display_name,
 )
 from app.services.referral_contest_service import referral_contest_service
+from app.services.remnawave_service import get_panel_write_coalescer
 from app.services.remnawave_sync_service import remnawave_sync_service
 from app.services.reporting_service import reporting_service
 from app.services.riopay_service import riopay_service
@@ -42,8 +44,12 @@ from app.services.system_settings_service import bot_configuration_service
 from app.services.traffic_monitoring_service import traffic_monitoring_scheduler
 from app.services.version_service import version_service
 from app.services.web_api_token_service import ensure_default_web_api_token
+from app.services.webhook_service import webhook_service
+from app.utils.cache_invalidation import cache_invalidation_bus
 from app.utils.log_handlers import ExcludePaymentFilter, LevelFilterHandler
 from app.utils.payment_logger import configure_payment_logger
+from app.utils.redis_registry import redis_registry
+from app.utils.startup_orchestrator import StartupOrchestrator
 from app.utils.startup_timeline import StartupTimeline
 from app.webapi.server import WebAPIServer
 from app.webserver.unified_app import create_unified_app
@@ -117,12 +123,6 @@ async def main():
         stream_handler.setFormatter(console_formatter)
         log_handlers.append(stream_handler)
 
-        logging.basicConfig(
-            level=_resolve_log_level(settings.LOG_LEVEL),
-            handlers=log_handlers,
-            force=True,
-        )
-
         # Регистрируем хэндлеры для управления при ротации
         log_rotation_service.register_handlers(log_handlers)
 
@@ -136,11 +136,11 @@ async def main():
         stream_handler.setFormatter(console_formatter)
         log_handlers.append(stream_handler)
 
-        logging.basicConfig(
-            level=_resolve_log_level(settings.LOG_LEVEL),
-            handlers=log_handlers,
-            force=True,
-        )
+    logging.basicConfig(
+        level=_resolve_log_level(settings.LOG_LEVEL),
+        handlers=log_handlers,
+        force=True,
+    )
 
     # NOTE: TelegramNotifierProcessor and noisy logger suppression are
     # handled inside setup_logging() / logging_config.py.
@@ -165,7 +165,10 @@ async def main():
     signal.signal(signal.SIGINT, killer.exit_gracefully)
     signal.signal(signal.SIGTERM, killer.exit_gracefully)
 
+    bot = None
+    dp = None
     web_app = None
+    payment_service = None
     monitoring_task = None
     maintenance_task = None
     version_check_task = None
@@ -176,18 +179,29 @@ async def main():
     telegram_webhook_enabled = False
     polling_enabled = True
     payment_webhooks_enabled = False
+    verification_providers: list[str] = []
+    auto_verification_active = False
 
     summary_logged = False
 
+    # Независимые этапы идут параллельно; фоновые доделываются, пока бот уже принимает обновления
+    orchestrator = StartupOrchestrator(timeline, parallel=settings.STARTUP_PARALLEL_ENABLED)
+    # Для этапов, которые ходят в сеть (панель, Telegram, Redis): зависание не держит старт бота.
+    # Если без этапа бот не может работать (get_me, webhook), таймаут останавливает запуск с ошибкой.
+    stage_timeout = settings.STARTUP_STAGE_TIMEOUT_SECONDS or None
+
     try:
         skip_migration = os.getenv('SKIP_MIGRATION', 'false').lower() == 'true'
 
         if not skip_migration:
-            async with timeline.stage(
+
+            @orchestrator.stage(
+                'migration',
                 'Миграция базы данных (Alembic)',
                 '🧬',
                 success_message='Миграция завершена успешно',
-            ) as stage:
+            )
+            async def run_migration(stage):
                 try:
                     await run_alembic_upgrade()
                     stage.success('Миграция завершена успешно')
@@ -205,11 +219,16 @@ async def main():
                 'SKIP_MIGRATION=true',
             )
 
-        async with timeline.stage(
+        migrated = ('migration',) if orchestrator.has_stage('migration') else ()
+
+        @orchestrator.stage(
+            'database',
             'Инициализация базы данных',
             '🗄️',
+            depends_on=migrated,
             success_message='База данных готова',
-        ) as stage:
+        )
+        async def init_database(stage):
             seq_ok = await sync_postgres_sequences()
             token_ok = await ensure_default_web_api_token()
             if not seq_ok:
@@ -217,11 +236,15 @@ async def main():
             if not token_ok:
                 stage.warning('Не удалось создать/проверить дефолтный веб-API токен')
 
-        async with timeline.stage(
+        # Этапы ниже пишут строки: им нужны последовательности, синхронизированные этапом базы
+        @orchestrator.stage(
+            'rbac',
             'RBAC bootstrap',
             '🔐',
+            depends_on=('database',),
             success_message='RBAC roles and superadmins ready',
-        ) as stage:
+        )
+        async def bootstrap_rbac(stage):
             try:
                 from app.database.database import AsyncSessionLocal
                 from app.services.rbac_bootstrap_service import bootstrap_superadmins
@@ -232,11 +255,14 @@ async def main():
                 stage.warning(f'RBAC bootstrap warning: {error}')
                 logger.error('RBAC bootstrap failed', error=error)
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'tariffs',
             'Синхронизация тарифов из конфига',
             '💰',
+            depends_on=('database',),
             success_message='Тарифы синхронизированы',
-        ) as stage:
+        )
+        async def sync_tariffs(stage):
             try:
                 from app.database.crud.tariff import ensure_tariffs_synced
                 from app.database.database import AsyncSessionLocal
@@ -247,26 +273,14 @@ async def main():
                 stage.warning(f'Не удалось синхронизировать тарифы: {error}')
                 logger.error('❌ Не удалось синхронизировать тарифы', error=error)
 
-        async with timeline.stage(
-            'Синхронизация серверов из RemnaWave',
-            '🖥️',
-            success_message='Серверы синхронизированы',
-        ) as stage:
-            try:
-                from app.database.crud.server_squad import ensure_servers_synced
-                from app.database.database import AsyncSessionLocal
-
-                async with AsyncSessionLocal() as db:
-                    await ensure_servers_synced(db)
-            except Exception as error:
-                stage.warning(f'Не удалось синхронизировать серверы: {error}')
-                logger.error('❌ Не удалось синхронизировать серверы', error=error)
-
-        async with timeline.stage(
+        @orchestrator.stage(
+            'payment_methods',
             'Инициализация платёжных методов',
             '💳',
+            depends_on=('database',),
             success_message='Платёжные методы инициализированы',
-        ) as stage:
+        )
+        async def init_payment_methods(stage):
             try:
                 from app.database.database import AsyncSessionLocal
                 from app.services.payment_method_config_service import ensure_payment_method_configs
@@ -277,53 +291,96 @@ async def main():
                 stage.warning(f'Не удалось инициализировать платёжные методы: {error}')
                 logger.error('❌ Не удалось инициализировать платёжные методы', error=error)
 
-        async with timeline.stage(
+        # После тарифов: конфигурация пересчитывает цены периодов с учётом SALES_MODE из БД.
+        # После базы: синхронизирует тот же дефолтный веб-API токен, что создаёт этап базы.
+        @orchestrator.stage(
+            'config',
             'Загрузка конфигурации из БД',
             '⚙️',
+            depends_on=('database', 'tariffs'),
             success_message='Конфигурация загружена',
-        ) as stage:
+        )
+        async def load_configuration(stage):
             try:
                 await bot_configuration_service.initialize()
             except Exception as error:
                 stage.warning(f'Не удалось загрузить конфигурацию: {error}')
                 logger.error('❌ Не удалось загрузить конфигурацию', error=error)
 
-        bot = None
-        dp = None
-        async with timeline.stage('Настройка бота', '🤖', success_message='Бот настроен') as stage:
+        # Серверы загружаются из панели только в пустую БД (первый запуск) — боту их ждать не нужно.
+        # После конфигурации: настройки подключения к панели могут быть переопределены в БД.
+        @orchestrator.stage(
+            'servers',
+            'Синхронизация серверов из RemnaWave',
+            '🖥️',
+            depends_on=('config',),
+            timeout=stage_timeout,
+            background=True,
+            success_message='Серверы синхронизированы',
+        )
+        async def sync_servers(stage):
+            try:
+                from app.database.crud.server_squad import ensure_servers_synced
+                from app.database.database import AsyncSessionLocal
+
+                async with AsyncSessionLocal() as db:
+                    await ensure_servers_synced(db)
+            except Exception as error:
+                stage.warning(f'Не удалось синхронизировать серверы: {error}')
+                logger.error('❌ Не удалось синхронизировать серверы', error=error)
+
+        @orchestrator.stage(
+            'bot',
+            'Настройка бота',
+            '🤖',
+            depends_on=('config', 'rbac', 'payment_methods'),
+            timeout=stage_timeout,
+            fail_on_timeout=True,
+            success_message='Бот настроен',
+        )
+        async def configure_bot(stage):
+            nonlocal bot, dp
             bot, dp = await setup_bot()
             stage.log('Кеш и FSM подготовлены')
 
-        bot_user = await bot.get_me()
-        if bot_user.username and not settings.BOT_USERNAME:
-            settings.BOT_USERNAME = bot_user.username
-            logger.info('BOT_USERNAME auto-detected', bot_username=bot_user.username)
+            try:
+                await cache_invalidation_bus.start()
+            except Exception as error:
+                logger.error('❌ Не удалось запустить шину инвалидации кешей', error=error)
 
-        monitoring_service.bot = bot
-        maintenance_service.set_bot(bot)
-        broadcast_service.set_bot(bot)
-        ban_notification_service.set_bot(bot)
-        traffic_monitoring_scheduler.set_bot(bot)
-        daily_subscription_service.set_bot(bot)
-        telegram_notifier.set_bot(bot)
+            bot_user = await bot.get_me()
+            if bot_user.username and not settings.BOT_USERNAME:
+                settings.BOT_USERNAME = bot_user.username
+                logger.info('BOT_USERNAME auto-detected', bot_username=bot_user.username)
 
-        from app.services.channel_subscription_service import channel_subscription_service
+            monitoring_service.bot = bot
+            maintenance_service.set_bot(bot)
+            broadcast_service.set_bot(bot)
+            ban_notification_service.set_bot(bot)
+            traffic_monitoring_scheduler.set_bot(bot)
+            daily_subscription_service.set_bot(bot)
+            telegram_notifier.set_bot(bot)
 
-        channel_subscription_service.bot = bot
+            from app.services.channel_subscription_service import channel_subscription_service
 
-        # Initialize email broadcast service
-        from app.cabinet.services.email_service import email_service
-        from app.services.broadcast_service import email_broadcast_service
+            channel_subscription_service.bot = bot
 
-        email_broadcast_service.set_email_service(email_service)
+            # Initialize email broadcast service
+            from app.cabinet.services.email_service import email_service
+            from app.services.broadcast_service import email_broadcast_service
 
-        from app.services.admin_notification_service import AdminNotificationService
+            email_broadcast_service.set_email_service(email_service)
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'services',
             'Интеграция сервисов',
             '🔗',
+            depends_on=('bot',),
             success_message='Сервисы подключены',
-        ) as stage:
+        )
+        async def integrate_services(stage):
+            from app.services.admin_notification_service import AdminNotificationService
+
             admin_notification_service = AdminNotificationService(bot)
             version_service.bot = bot
             version_service.set_notification_service(admin_notification_service)
@@ -332,11 +389,16 @@ async def main():
             stage.log(f'Текущая версия: {version_service.current_version}')
             stage.success('Мониторинг, уведомления и рассылки подключены')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'backup',
             'Сервис бекапов',
             '🗄️',
+            depends_on=('bot',),
+            timeout=stage_timeout,
+            background=True,
             success_message='Сервис бекапов инициализирован',
-        ) as stage:
+        )
+        async def start_backups(stage):
             try:
                 backup_service.bot = bot
                 settings_obj = await backup_service.get_backup_settings()
@@ -353,11 +415,16 @@ async def main():
                 stage.warning(f'Ошибка инициализации сервиса бекапов: {e}')
                 logger.error('❌ Ошибка инициализации сервиса бекапов', error=e)
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'reporting',
             'Сервис отчетов',
             '📊',
+            depends_on=('bot',),
+            timeout=stage_timeout,
+            background=True,
             success_message='Сервис отчетов готов',
-        ) as stage:
+        )
+        async def start_reporting(stage):
             try:
                 reporting_service.set_bot(bot)
                 await reporting_service.start()
@@ -365,11 +432,16 @@ async def main():
                 stage.warning(f'Ошибка запуска сервиса отчетов: {e}')
                 logger.error('❌ Ошибка запуска сервиса отчетов', error=e)
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'contests',
             'Реферальные конкурсы',
             '🏆',
+            depends_on=('services',),
+            timeout=stage_timeout,
+            background=True,
             success_message='Сервис конкурсов готов',
-        ) as stage:
+        )
+        async def start_contests(stage):
             try:
                 await referral_contest_service.start()
                 if referral_contest_service.is_running():
@@ -380,11 +452,16 @@ async def main():
                 stage.warning(f'Ошибка запуска сервиса конкурсов: {e}')
                 logger.error('❌ Ошибка запуска сервиса конкурсов', error=e)
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'games',
             'Ротация игр',
             '🎲',
+            depends_on=('bot',),
+            timeout=stage_timeout,
+            background=True,
             success_message='Мини-игры готовы',
-        ) as stage:
+        )
+        async def start_game_rotation(stage):
             try:
                 contest_rotation_service.set_bot(bot)
                 await contest_rotation_service.start()
@@ -397,11 +474,17 @@ async def main():
                 logger.error('❌ Ошибка запуска ротации игр', error=e)
 
         if settings.is_log_rotation_enabled():
-            async with timeline.stage(
+
+            @orchestrator.stage(
+                'log_rotation',
                 'Ротация логов',
                 '📋',
+                depends_on=('bot',),
+                timeout=stage_timeout,
+                background=True,
                 success_message='Сервис ротации логов готов',
-            ) as stage:
+            )
+            async def start_log_rotation(stage):
                 try:
                     log_rotation_service.set_bot(bot)
                     await log_rotation_service.start()
@@ -419,11 +502,16 @@ async def main():
                     stage.warning(f'Ошибка запуска сервиса ротации логов: {e}')
                     logger.error('❌ Ошибка запуска сервиса ротации логов', error=e)
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'remnawave_sync',
             'Автосинхронизация RemnaWave',
             '🔄',
+            depends_on=('config',),
+            timeout=stage_timeout,
+            background=True,
             success_message='Сервис автосинхронизации готов',
-        ) as stage:
+        )
+        async def start_remnawave_sync(stage):
             try:
                 await remnawave_sync_service.initialize()
                 status = remnawave_sync_service.get_status()
@@ -440,31 +528,23 @@ async def main():
                 stage.warning(f'Ошибка запуска автосинхронизации: {e}')
                 logger.error('❌ Ошибка запуска автосинхронизации RemnaWave', error=e)
 
-        # Разовая фоновая чистка накопившихся дублей тарифных подписок (multi-tariff):
-        # лишние истёкшие дубли удаляются из БД и панели вместе, как штатное удаление.
-        # Идемпотентно — после первой чистки no-op; панель легла — повторит на след. старте.
-        try:
-            from app.services.subscription_dedup_service import dedupe_expired_tariff_subscriptions
-
-            asyncio.create_task(dedupe_expired_tariff_subscriptions())
-        except Exception as e:
-            logger.warning('Не удалось запустить чистку дублей подписок', error=e)
-
-        payment_service = PaymentService(bot)
-        auto_payment_verification_service.set_payment_service(payment_service)
-
-        # Настройка сервиса очереди чеков NaloGO
-        if payment_service.nalogo_service:
-            nalogo_queue_service.set_nalogo_service(payment_service.nalogo_service)
-            nalogo_queue_service.set_bot(bot)
-
-        verification_providers: list[str] = []
-        auto_verification_active = False
-        async with timeline.stage(
+        @orchestrator.stage(
+            'payments',
             'Сервис проверки пополнений',
             '💳',
+            depends_on=('bot',),
             success_message='Ручная проверка активна',
-        ) as stage:
+        )
+        async def start_payment_verification(stage):
+            nonlocal payment_service, auto_verification_active
+            payment_service = PaymentService(bot)
+            auto_payment_verification_service.set_payment_service(payment_service)
+
+            # Настройка сервиса очереди чеков NaloGO
+            if payment_service.nalogo_service:
+                nalogo_queue_service.set_nalogo_service(payment_service.nalogo_service)
+                nalogo_queue_service.set_bot(bot)
+
             for method in SUPPORTED_MANUAL_CHECK_METHODS:
                 if method == PaymentMethod.YOOKASSA and settings.is_yookassa_enabled():
                     verification_providers.append('YooKassa')
@@ -503,11 +583,15 @@ async def main():
             if auto_verification_active:
                 stage.log('Фоновая автопроверка запущена')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'nalogo',
             'Очередь чеков NaloGO',
             '🧾',
+            depends_on=('payments',),
+            timeout=stage_timeout,
             success_message='Сервис очереди чеков запущен',
-        ) as stage:
+        )
+        async def start_nalogo_queue(stage):
             if settings.is_nalogo_enabled():
                 try:
                     await nalogo_queue_service.start()
@@ -524,28 +608,65 @@ async def main():
             else:
                 stage.skip('NaloGO отключен настройками')
 
-        bot_run_mode = settings.get_bot_run_mode()
-        polling_enabled = bot_run_mode == 'polling'
-        telegram_webhook_enabled = bot_run_mode == 'webhook'
-
-        payment_webhooks_enabled = any(
-            [
-                settings.TRIBUTE_ENABLED,
-                settings.is_cryptobot_enabled(),
-                settings.is_mulenpay_enabled(),
-                settings.is_yookassa_enabled(),
-                settings.is_pal24_enabled(),
-                settings.is_wata_enabled(),
-                settings.is_heleket_enabled(),
-                settings.is_apple_iap_enabled(),
-            ]
+        @orchestrator.stage(
+            'webhooks',
+            'Доставка webhooks',
+            '📤',
+            depends_on=('config',),
+            success_message='Очередь доставки webhooks запущена',
         )
+        async def start_webhook_delivery(stage):
+            try:
+                await webhook_service.start()
+            except Exception as e:
+                stage.warning(f'Ошибка запуска доставки webhooks: {e}')
+                logger.error('❌ Ошибка запуска доставки webhooks', error=e)
+
+        @orchestrator.stage(
+            'bulk_actions',
+            'Фоновые массовые действия',
+            '📦',
+            depends_on=('bot',),
+            success_message='Исполнитель массовых действий готов',
+        )
+        async def resume_bulk_actions(stage):
+            try:
+                resumed_jobs = await bulk_action_job_service.start()
+                if resumed_jobs:
+                    stage.log(f'Возобновлено задач: {resumed_jobs}')
+            except Exception as e:
+                stage.warning(f'Ошибка возобновления массовых действий: {e}')
+                logger.error('❌ Ошибка возобновления массовых действий', error=e)
+
+        # Всё, без чего бот не должен принимать обновления и HTTP-запросы
+        services_ready = ('services', 'payments', 'nalogo', 'webhooks', 'bulk_actions')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'web_server',
             'Единый веб-сервер',
             '🌐',
+            depends_on=services_ready,
             success_message='Веб-сервер запущен',
-        ) as stage:
+        )
+        async def start_web_server(stage):
+            nonlocal web_app, web_api_server, polling_enabled, telegram_webhook_enabled, payment_webhooks_enabled
+            bot_run_mode = settings.get_bot_run_mode()
+            polling_enabled = bot_run_mode == 'polling'
+            telegram_webhook_enabled = bot_run_mode == 'webhook'
+
+            payment_webhooks_enabled = any(
+                [
+                    settings.TRIBUTE_ENABLED,
+                    settings.is_cryptobot_enabled(),
+                    settings.is_mulenpay_enabled(),
+                    settings.is_yookassa_enabled(),
+                    settings.is_pal24_enabled(),
+                    settings.is_wata_enabled(),
+                    settings.is_heleket_enabled(),
+                    settings.is_apple_iap_enabled(),
+                ]
+            )
+
             should_start_web_app = (
                 settings.is_web_api_enabled()
                 or telegram_webhook_enabled
@@ -583,11 +704,16 @@ async def main():
             else:
                 stage.skip('HTTP-сервисы отключены настройками')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'telegram_webhook',
             'Telegram webhook',
             '🤖',
+            depends_on=('web_server',),
+            timeout=stage_timeout,
+            fail_on_timeout=True,
             success_message='Telegram webhook настроен',
-        ) as stage:
+        )
+        async def set_telegram_webhook(stage):
             if telegram_webhook_enabled:
                 webhook_url = settings.get_telegram_webhook_url()
                 if not webhook_url:
@@ -607,19 +733,27 @@ async def main():
             else:
                 stage.skip('Режим webhook отключен')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'monitoring',
             'Служба мониторинга',
             '📈',
+            depends_on=services_ready,
             success_message='Служба мониторинга запущена',
-        ) as stage:
+        )
+        async def start_monitoring(stage):
+            nonlocal monitoring_task
             monitoring_task = asyncio.create_task(monitoring_service.start_monitoring())
             stage.log(f'Интервал опроса: {settings.MONITORING_INTERVAL}с')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'maintenance',
             'Служба техработ',
             '🛡️',
+            depends_on=services_ready,
             success_message='Служба техработ запущена',
-        ) as stage:
+        )
+        async def start_maintenance(stage):
+            nonlocal maintenance_task
             if not settings.is_maintenance_monitoring_enabled():
                 maintenance_task = None
                 stage.skip('Мониторинг техработ отключен настройками')
@@ -631,11 +765,15 @@ async def main():
                 maintenance_task = None
                 stage.skip('Служба техработ уже активна')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'traffic_monitoring',
             'Мониторинг трафика',
             '📊',
+            depends_on=services_ready,
             success_message='Мониторинг трафика запущен',
-        ) as stage:
+        )
+        async def start_traffic_monitoring(stage):
+            nonlocal traffic_monitoring_task
             if traffic_monitoring_scheduler.is_enabled():
                 traffic_monitoring_task = asyncio.create_task(traffic_monitoring_scheduler.start_monitoring())
                 # Показываем информацию о новом мониторинге v2
@@ -645,11 +783,15 @@ async def main():
                 traffic_monitoring_task = None
                 stage.skip('Мониторинг трафика отключен настройками')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'daily_subscriptions',
             'Суточные подписки',
             '💳',
+            depends_on=services_ready,
             success_message='Сервис суточных подписок запущен',
-        ) as stage:
+        )
+        async def start_daily_subscriptions(stage):
+            nonlocal daily_subscription_task
             if daily_subscription_service.is_enabled():
                 daily_subscription_task = asyncio.create_task(daily_subscription_service.start_monitoring())
                 interval_minutes = daily_subscription_service.get_check_interval_minutes()
@@ -663,11 +805,15 @@ async def main():
                 )
                 stage.log('Суточные тарифы выключены — запущен только сброс докупок трафика')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'version_check',
             'Сервис проверки версий',
             '📄',
+            depends_on=services_ready,
             success_message='Проверка версий запущена',
-        ) as stage:
+        )
+        async def start_version_check(stage):
+            nonlocal version_check_task
             if settings.is_version_check_enabled():
                 version_check_task = asyncio.create_task(version_service.start_periodic_check())
                 stage.log(f'Интервал проверки: {settings.VERSION_CHECK_INTERVAL_HOURS}ч')
@@ -675,11 +821,15 @@ async def main():
                 version_check_task = None
                 stage.skip('Проверка версий отключена настройками')
 
-        async with timeline.stage(
+        @orchestrator.stage(
+            'polling',
             'Запуск polling',
             '🤖',
+            depends_on=('web_server',),
             success_message='Aiogram polling запущен',
-        ) as stage:
+        )
+        async def start_polling(stage):
+            nonlocal polling_task
             if polling_enabled:
                 polling_task = asyncio.create_task(dp.start_polling(bot, skip_updates=False))
                 stage.log('skip_updates=False — накопившиеся обновления будут обработаны')
@@ -687,6 +837,18 @@ async def main():
                 polling_task = None
                 stage.skip('Polling отключен режимом работы')
 
+        await orchestrator.run()
+
+        # Разовая фоновая чистка накопившихся дублей тарифных подписок (multi-tariff):
+        # лишние истёкшие дубли удаляются из БД и панели вместе, как штатное удаление.
+        # Идемпотентно — после первой чистки no-op; панель легла — повторит на след. старте.
+        try:
+            from app.services.subscription_dedup_service import dedupe_expired_tariff_subscriptions
+
+            asyncio.create_task(dedupe_expired_tariff_subscriptions())
+        except Exception as e:
+            logger.warning('Не удалось запустить чистку дублей подписок', error=e)
+
         webhook_lines: list[str] = []
         base_url = settings.WEBHOOK_URL or f'http://{settings.WEB_API_HOST}:{settings.WEB_API_PORT}'
 
@@ -825,6 +987,8 @@ async def main():
         raise
 
     finally:
+        # Фоновые этапы запуска могли ещё не закончиться — останавливаем их до остановки сервисов
+        await orchestrator.cancel()
         if not summary_logged:
             timeline.log_summary()
             summary_logged = True
@@ -911,6 +1075,30 @@ async def main():
             except Exception as e:
                 logger.error('Ошибка остановки сервиса ротации логов', error=e)
 
+        try:
+            await cache_invalidation_bus.stop()
+        except Exception as e:
+            logger.error('Ошибка остановки шины инвалидации кешей', error=e)
+
+        logger.info('ℹ️ Остановка доставки webhooks...')
+        try:
+            await webhook_service.stop()
+        except Exception as e:
+            logger.error('Ошибка остановки доставки webhooks', error=e)
+
+        logger.info('ℹ️ Остановка фоновых массовых действий...')
+        try:
+            await bulk_action_job_service.stop()
+        except Exception as e:
+            logger.error('Ошибка остановки фоновых массовых действий', error=e)
+
+        if settings.REMNAWAVE_WRITE_COALESCE_ENABLED:
+            logger.info('ℹ️ Отправка накопленных изменений в панель RemnaWave...')
+            try:
+                await get_panel_write_coalescer().flush()
+            except Exception as e:
+                logger.error('Ошибка отправки накопленных изменений в панель', error=e)
+
         logger.info('ℹ️ Остановка очереди чеков NaloGO...')
         try:
             await nalogo_queue_service.stop()
@@ -931,7 +1119,7 @@ async def main():
             except asyncio.CancelledError:
                 pass
 
-        if telegram_webhook_enabled and 'bot' in locals():
+        if telegram_webhook_enabled and bot is not None:
             logger.info('ℹ️ Снятие Telegram webhook...')
             try:
                 await bot.delete_webhook(drop_pending_updates=False)
@@ -951,13 +1139,16 @@ async def main():
         except Exception as e:
             logger.error('Ошибка закрытия сессии RioPay', error=e)
 
-        if 'bot' in locals():
+        if bot is not None:
             try:
                 await bot.session.close()
                 logger.info('✅ Сессия бота закрыта')
             except Exception as e:
                 logger.error('Ошибка закрытия сессии бота', error=e)
 
+        # Последним: пулы Redis общие для FSM, кеша и остальных остановленных выше сервисов
+        await redis_registry.close()
+
         logger.info('✅ Завершение работы бота завершено')
 
 
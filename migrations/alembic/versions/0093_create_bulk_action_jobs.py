@@ -0,0 +1,50 @@
+"""create bulk_action_jobs table for background admin bulk actions
+
+Revision ID: 0093
+Revises: 0092
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0093'
+down_revision: Union[str, None] = '0092'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'bulk_action_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('action', sa.String(50), nullable=False),
+        sa.Column('target_type', sa.String(20), nullable=False),
+        sa.Column('target_ids', sa.JSON(), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('processed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('synced', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('success_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('skipped_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('panel_error_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('errors', sa.JSON(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('admin_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_bulk_action_jobs_id', 'bulk_action_jobs', ['id'])
+    op.create_index('ix_bulk_action_jobs_status', 'bulk_action_jobs', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bulk_action_jobs_status', table_name='bulk_action_jobs')
+    op.drop_index('ix_bulk_action_jobs_id', table_name='bulk_action_jobs')
+    op.drop_table('bulk_action_jobs')
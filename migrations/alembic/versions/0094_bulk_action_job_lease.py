@@ -0,0 +1,25 @@
+"""add executor lease to bulk_action_jobs
+
+Revision ID: 0094
+Revises: 0093
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0094'
+down_revision: Union[str, None] = '0093'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bulk_action_jobs', sa.Column('lease_owner', sa.String(length=64), nullable=True))
+    op.add_column('bulk_action_jobs', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('bulk_action_jobs', 'lease_expires_at')
+    op.drop_column('bulk_action_jobs', 'lease_owner')
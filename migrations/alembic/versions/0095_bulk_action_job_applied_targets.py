@@ -0,0 +1,32 @@
+"""add bulk_action_job_applied_targets for per-target bulk action progress
+
+Revision ID: 0095
+Revises: 0094
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0095'
+down_revision: Union[str, None] = '0094'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'bulk_action_job_applied_targets',
+        sa.Column(
+            'job_id',
+            sa.Integer(),
+            sa.ForeignKey('bulk_action_jobs.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('target_id', sa.Integer(), primary_key=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('bulk_action_job_applied_targets')
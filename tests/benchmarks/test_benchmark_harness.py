@@ -0,0 +1,119 @@
+"""Benchmark harness: baseline comparison and a short run of every scenario on a tiny database."""
+
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from benchmarks.harness import BaselineMismatchError, Result, compare, load_baseline, median_result, save_baseline
+
+
+# tests/conftest.py подменяет aiosqlite пустым модулем; здесь нужен настоящий драйвер
+if not hasattr(sys.modules.get('aiosqlite'), 'connect'):
+    sys.modules.pop('aiosqlite', None)
+pytest.importorskip('aiosqlite')
+
+ENVIRONMENT = {'scale': 100, 'redis': 'off'}
+
+
+def _result(name: str, ops: float, peak: float = 100.0, retained: float = 0.0) -> Result:
+    return Result(name=name, ops_per_sec=ops, iterations=10, alloc_peak_kib=peak, retained_bytes_per_op=retained)
+
+
+def test_compare_flags_metrics_beyond_thresholds(tmp_path) -> None:
+    path = tmp_path / 'baseline.json'
+    save_baseline(path, [_result('a', 1000), _result('b', 1000), _result('c', 1000, retained=100)], ENVIRONMENT)
+
+    regressions = compare(
+        [
+            _result('a', 850),  # -15%: в пределах 20%
+            _result('b', 700, peak=140),  # -30% ops, +40% памяти
+            _result('c', 1000, retained=400),  # рост ниже порога шума
+            _result('new', 1),  # нет в baseline
+        ],
+        load_baseline(path),
+        ENVIRONMENT,
+        threshold=0.2,
+        alloc_threshold=0.25,
+    )
+
+    assert [(item.name, item.metric) for item in regressions] == [('b', 'ops_per_sec'), ('b', 'alloc_peak_kib')]
+    assert regressions[0].change == pytest.approx(0.3)
+
+    leak = compare(
+        [_result('c', 1000, retained=4096)], load_baseline(path), ENVIRONMENT, threshold=0.2, alloc_threshold=0.25
+    )
+    assert [item.metric for item in leak] == ['retained_bytes_per_op']
+
+
+def test_retained_noise_floor_scales_with_allocation_peak(tmp_path) -> None:
+    path = tmp_path / 'baseline.json'
+    save_baseline(
+        path, [_result('small', 1000, retained=500), _result('big', 1000, peak=1500, retained=20_000)], ENVIRONMENT
+    )
+
+    # 1% пика: +8 КиБ на пике 1.5 МиБ — шум, а +1 КиБ на 100 КиБ — уже нет
+    noisy = compare(
+        [_result('small', 1000, retained=1000), _result('big', 1000, peak=1500, retained=28_000)],
+        load_baseline(path),
+        ENVIRONMENT,
+        threshold=0.2,
+        alloc_threshold=0.5,
+    )
+    assert noisy == []
+
+    leak = compare(
+        [_result('small', 1000, retained=1600), _result('big', 1000, peak=1500, retained=40_000)],
+        load_baseline(path),
+        ENVIRONMENT,
+        threshold=0.2,
+        alloc_threshold=0.5,
+    )
+    assert [(item.name, item.metric) for item in leak] == [
+        ('small', 'retained_bytes_per_op'),
+        ('big', 'retained_bytes_per_op'),
+    ]
+
+
+def test_median_result_ignores_one_disturbed_run() -> None:
+    runs = [_result('a', 1000, retained=500), _result('a', 300, peak=900, retained=9000), _result('a', 1100)]
+
+    result = median_result(runs)
+
+    assert (result.ops_per_sec, result.alloc_peak_kib, result.retained_bytes_per_op) == (1000, 100.0, 500)
+    assert result.iterations == 30
+
+
+def test_partial_update_keeps_other_entries_and_environment_change_resets(tmp_path) -> None:
+    path = tmp_path / 'baseline.json'
+    save_baseline(path, [_result('a', 1000), _result('b', 1000)], ENVIRONMENT)
+    save_baseline(path, [_result('a', 2000)], ENVIRONMENT)
+
+    baseline = load_baseline(path)
+    assert baseline['benchmarks']['a']['ops_per_sec'] == 2000
+    assert baseline['benchmarks']['b']['ops_per_sec'] == 1000
+
+    other = {'scale': 100, 'redis': 'fakeredis'}
+    with pytest.raises(BaselineMismatchError):
+        compare([_result('a', 2000)], baseline, other, threshold=0.2, alloc_threshold=0.25)
+
+    save_baseline(path, [_result('a', 500)], other)
+    assert list(load_baseline(path)['benchmarks']) == ['a']
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_every_scenario_runs_on_a_small_database() -> None:
+    from benchmarks.harness import registered
+    from benchmarks.run import run_benchmarks
+
+    # Один проход без прогрева: проверяется, что сценарии работают, а не их скорость
+    results, environment = await run_benchmarks(
+        patterns=None, scale=60, duration=0.01, redis='off', repeat=1, rounds=1, warmup=0, alloc_iterations=1
+    )
+
+    assert [result.name for result in results] == [item.name for item in registered()]
+    assert len(results) >= 7
+    assert all(result.ops_per_sec > 0 and result.iterations > 0 for result in results)
+    assert environment == {'scale': 60, 'redis': 'off'}
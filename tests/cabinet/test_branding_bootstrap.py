@@ -0,0 +1,70 @@
+"""Aggregated /branding/bootstrap: single payload, content-hash ETag and invalidation."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.cabinet.routes import branding
+
+
+def _request(if_none_match: str | None = None) -> MagicMock:
+    request = MagicMock()
+    request.headers = {'if-none-match': if_none_match} if if_none_match else {}
+    return request
+
+
+@pytest.fixture
+def stored_settings(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    values = {
+        branding.BRANDING_NAME_KEY: 'Bedolaga',
+        branding.LITE_MODE_ENABLED_KEY: 'true',
+        branding.ENABLED_THEMES_KEY: json.dumps({'dark': True, 'light': False}),
+    }
+
+    async def fake_get_setting_value(_db, key: str) -> str | None:
+        return values.get(key)
+
+    monkeypatch.setattr(branding, 'get_setting_value', AsyncMock(side_effect=fake_get_setting_value))
+    monkeypatch.setattr(branding, 'has_custom_logo', lambda: False)
+    monkeypatch.setattr(branding, '_bootstrap_local', None)
+    return values
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_aggregates_public_settings(stored_settings: dict[str, str]) -> None:
+    response = await branding.get_branding_bootstrap(_request(), db=MagicMock())
+
+    payload = json.loads(response.body)
+    assert payload['branding']['name'] == 'Bedolaga'
+    assert payload['lite_mode'] == {'enabled': True}
+    assert payload['themes'] == {'dark': True, 'light': False}
+    assert payload['gift'] == {'enabled': False}
+    assert payload['colors']['accent'] == branding.DEFAULT_THEME_COLORS['accent']
+    assert set(payload) == set(branding.BrandingBootstrapResponse.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_is_cached_and_answers_304(stored_settings: dict[str, str]) -> None:
+    first = await branding.get_branding_bootstrap(_request(), db=MagicMock())
+    reads = branding.get_setting_value.await_count
+
+    cached = await branding.get_branding_bootstrap(_request(first.headers['etag']), db=MagicMock())
+
+    assert cached.status_code == 304
+    assert branding.get_setting_value.await_count == reads
+
+
+@pytest.mark.asyncio
+async def test_setting_change_produces_new_etag(stored_settings: dict[str, str]) -> None:
+    first = await branding.get_branding_bootstrap(_request(), db=MagicMock())
+
+    stored_settings[branding.GIFT_ENABLED_KEY] = 'true'
+    await branding.invalidate_branding_bootstrap()
+    second = await branding.get_branding_bootstrap(_request(first.headers['etag']), db=MagicMock())
+
+    assert second.status_code == 200
+    assert second.headers['etag'] != first.headers['etag']
+    assert json.loads(second.body)['gift'] == {'enabled': True}
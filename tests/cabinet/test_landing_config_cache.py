@@ -0,0 +1,84 @@
+"""Public landing config: cached render, ETag/304 and admin invalidation."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.cabinet.routes.landing as landing_routes
+from app.cabinet.routes.landing import LandingConfigResponse, get_landing_config
+from app.cabinet.services.landing_cache import LandingConfigCache, landing_expires_at
+from app.config import settings
+
+
+def _request(if_none_match: str | None = None) -> MagicMock:
+    request = MagicMock()
+    request.headers = {'if-none-match': if_none_match} if if_none_match else {}
+    return request
+
+
+@pytest.fixture
+def landing_env(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    landing = SimpleNamespace(slug='promo', discount_starts_at=None, discount_ends_at=None)
+    load_landing = AsyncMock(return_value=landing)
+    build = AsyncMock(
+        return_value=LandingConfigResponse(
+            slug='promo', title='Promo', features=[], tariffs=[], payment_methods=[], gift_enabled=False
+        )
+    )
+    landing_cache = LandingConfigCache()
+
+    monkeypatch.setattr(landing_routes.RateLimitCache, 'is_ip_rate_limited', AsyncMock(return_value=False))
+    monkeypatch.setattr(landing_routes, 'get_client_ip', lambda _request: '203.0.113.1')
+    monkeypatch.setattr(landing_routes, 'get_active_landing_by_slug', load_landing)
+    monkeypatch.setattr(landing_routes, '_build_landing_config', build)
+    monkeypatch.setattr(landing_routes, 'landing_config_cache', landing_cache)
+    return SimpleNamespace(load_landing=load_landing, build=build, cache=landing_cache)
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_skip_database_and_revalidate(landing_env: SimpleNamespace) -> None:
+    first = await get_landing_config(_request(), slug='promo', lang='ru', db=MagicMock())
+    second = await get_landing_config(_request(), slug='promo', lang='ru', db=MagicMock())
+
+    assert first.status_code == 200
+    assert second.body == first.body
+    etag = first.headers['etag']
+    assert etag.startswith('"') and second.headers['etag'] == etag
+    assert first.headers['cache-control'].startswith('public, max-age=')
+    landing_env.load_landing.assert_awaited_once()
+    landing_env.build.assert_awaited_once()
+
+    not_modified = await get_landing_config(_request(etag), slug='promo', lang='ru', db=MagicMock())
+    assert not_modified.status_code == 304
+    assert not_modified.body == b''
+
+    # Другой язык — отдельная запись
+    await get_landing_config(_request(), slug='promo', lang='en', db=MagicMock())
+    assert landing_env.build.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_rebuild(landing_env: SimpleNamespace) -> None:
+    await get_landing_config(_request(), slug='promo', lang='ru', db=MagicMock())
+    await landing_env.cache.invalidate()
+    await get_landing_config(_request(), slug='promo', lang='ru', db=MagicMock())
+
+    assert landing_env.build.await_count == 2
+
+
+def test_expiry_is_capped_by_discount_window() -> None:
+    now = datetime(2026, 1, 1, tzinfo=UTC)
+    ttl = settings.LANDING_CONFIG_CACHE_TTL_SECONDS
+
+    plain = SimpleNamespace(discount_starts_at=None, discount_ends_at=None)
+    assert landing_expires_at(plain, now) == now.timestamp() + ttl
+
+    ending = SimpleNamespace(discount_starts_at=now - timedelta(days=1), discount_ends_at=now + timedelta(seconds=5))
+    assert landing_expires_at(ending, now) == now.timestamp() + 5
+
+    starting = SimpleNamespace(discount_starts_at=now + timedelta(seconds=7), discount_ends_at=now + timedelta(days=1))
+    assert landing_expires_at(starting, now) == now.timestamp() + 7
@@ -0,0 +1,165 @@
+"""Disk-cached Telegram media proxy: single upstream fetch, coalescing, eviction, 304."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.responses import FileResponse
+
+import app.cabinet.routes.media as media_routes
+from app.cabinet.routes.media import download_media, make_media_token
+from app.cabinet.services.media_proxy import TelegramMediaProxy
+
+
+FID = 'BAADAgADabcdef_-1234567890'
+OTHER = 'BQADdifferent_-9876543210zy'
+
+
+async def _serve(response: FileResponse, headers: list[tuple[bytes, bytes]] | None = None) -> list[dict]:
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers or []}
+    await response(scope, receive, send)
+    return sent
+
+
+def _write_file(path: Path, size: int) -> None:
+    path.write_bytes(b'x' * size)
+
+
+def _make_bot(sizes: dict[str, int], gate: asyncio.Event | None = None) -> MagicMock:
+    async def get_file(file_id: str) -> SimpleNamespace:
+        return SimpleNamespace(file_unique_id=f'uniq-{file_id}', file_path=f'photos/{file_id}.jpg')
+
+    async def download_file(file_path: str, destination: Path, **_: object) -> None:
+        if gate is not None:
+            await gate.wait()
+        _write_file(Path(destination), sizes[Path(file_path).stem])
+
+    bot = MagicMock()
+    bot.get_file = AsyncMock(side_effect=get_file)
+    bot.download_file = AsyncMock(side_effect=download_file)
+    return bot
+
+
+def _make_proxy(tmp_path: Path, bot: MagicMock, max_bytes: int = 1024) -> TelegramMediaProxy:
+    proxy = TelegramMediaProxy(cache_dir=tmp_path / 'media', max_bytes=max_bytes)
+    proxy._bot = bot
+    return proxy
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_are_served_from_disk(tmp_path: Path) -> None:
+    bot = _make_bot({FID: 10})
+    proxy = _make_proxy(tmp_path, bot)
+
+    first = await proxy.get(FID)
+    proxy.release(first)
+    second = await proxy.get(FID)
+
+    assert second is first
+    assert first.path.read_bytes() == b'x' * 10
+    assert first.media_type == 'image/jpeg'
+    bot.get_file.assert_awaited_once()
+    bot.download_file.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_download(tmp_path: Path) -> None:
+    gate = asyncio.Event()
+    bot = _make_bot({FID: 10}, gate)
+    proxy = _make_proxy(tmp_path, bot)
+
+    tasks = [asyncio.create_task(proxy.get(FID)) for _ in range(5)]
+    await asyncio.sleep(0)
+    gate.set()
+    entries = await asyncio.gather(*tasks)
+
+    assert {id(entry) for entry in entries} == {id(entries[0])}
+    assert entries[0].in_use == 5
+    bot.download_file.assert_awaited_once()
+    assert not list((tmp_path / 'media').glob('*.part'))
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_skips_files_in_use(tmp_path: Path) -> None:
+    bot = _make_bot({FID: 600, OTHER: 600})
+    proxy = _make_proxy(tmp_path, bot, max_bytes=1000)
+
+    pinned = await proxy.get(FID)
+    other = await proxy.get(OTHER)
+    # Оба файла заняты — лимит временно превышен, ничего не удаляется
+    assert pinned.path.exists() and other.path.exists()
+
+    proxy.release(pinned)
+    proxy.release(other)
+    assert not pinned.path.exists()
+    assert other.path.exists()
+
+    # Индекс восстанавливается с диска новым процессом
+    restored = _make_proxy(tmp_path, _make_bot({}), max_bytes=1000)
+    restored._load_index()
+    assert list(restored._entries) == [other.key]
+
+
+@pytest.mark.asyncio
+async def test_download_route_streams_file_and_answers_304(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    proxy = _make_proxy(tmp_path, _make_bot({FID: 10}))
+    monkeypatch.setattr(media_routes, 'telegram_media_proxy', proxy)
+    token = make_media_token(FID)
+
+    response = await download_media(file_id=FID, token=token, if_none_match=None)
+    assert isinstance(response, FileResponse)
+    assert response.headers['etag'].strip('"') == proxy.cache_key(f'uniq-{FID}')
+    assert 'no-store' not in response.headers['cache-control']
+    await _serve(response)
+
+    cached = await download_media(file_id=FID, token=token, if_none_match=response.headers['etag'])
+    assert cached.status_code == 304
+    assert all(entry.in_use == 0 for entry in proxy._entries.values())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(('range_header', 'status_code'), [(b'bytes=100-200', 416), (b'bytes=oops', 400)])
+async def test_download_route_releases_pin_on_rejected_range(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, range_header: bytes, status_code: int
+) -> None:
+    """Starlette skips background tasks on 400/416 Range answers — the pin must be released anyway."""
+    proxy = _make_proxy(tmp_path, _make_bot({FID: 10}))
+    monkeypatch.setattr(media_routes, 'telegram_media_proxy', proxy)
+
+    response = await download_media(file_id=FID, token=make_media_token(FID), if_none_match=None)
+    sent = await _serve(response, [(b'range', range_header)])
+
+    assert sent[0]['status'] == status_code
+    assert all(entry.in_use == 0 for entry in proxy._entries.values())
+
+
+@pytest.mark.asyncio
+async def test_download_route_releases_pin_when_client_disconnects(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    proxy = _make_proxy(tmp_path, _make_bot({FID: 10}))
+    monkeypatch.setattr(media_routes, 'telegram_media_proxy', proxy)
+    response = await download_media(file_id=FID, token=make_media_token(FID), if_none_match=None)
+
+    async def send(message: dict) -> None:
+        raise OSError('client went away')
+
+    async def receive() -> dict:
+        return {'type': 'http.disconnect'}
+
+    with pytest.raises(OSError):
+        await response({'type': 'http', 'method': 'GET', 'path': '/', 'headers': []}, receive, send)
+
+    assert all(entry.in_use == 0 for entry in proxy._entries.values())
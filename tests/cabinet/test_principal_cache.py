@@ -0,0 +1,209 @@
+"""Cabinet principal cache: hits skip the full auth check, misses on new initData, expiry and invalidation."""
+
+from __future__ import annotations
+
+import sys
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException, status
+from sqlalchemy import event, insert
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from app.cabinet import principal_cache as principal_cache_module
+from app.cabinet.dependencies import (
+    get_cabinet_principal,
+    get_current_cabinet_user,
+    get_current_cabinet_user_with_relations,
+)
+from app.cabinet.principal_cache import CabinetPrincipal, principal_cache
+from app.database.crud.user import get_user_by_id
+from app.database.models import AdminRole, Base, User, UserRole, UserStatus
+
+
+# tests/conftest.py подменяет aiosqlite пустым модулем; здесь нужен настоящий драйвер
+if not hasattr(sys.modules.get('aiosqlite'), 'connect'):
+    sys.modules.pop('aiosqlite', None)
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_as_json(_type, _compiler, **_kw) -> str:
+    return 'JSON'
+
+
+def _make_user(*, user_id: int = 100, telegram_id: int = 555) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=user_id,
+        telegram_id=telegram_id,
+        username='user',
+        email=None,
+        email_verified=False,
+        language='ru',
+        status=UserStatus.ACTIVE.value,
+        cabinet_last_login=datetime.now(UTC),
+    )
+
+
+def _make_request(init_data: str | None = 'signed-init-data') -> MagicMock:
+    request = MagicMock()
+    request.headers.get = MagicMock(side_effect=lambda key: init_data if key == 'X-Telegram-Init-Data' else None)
+    return request
+
+
+@pytest.fixture
+def auth_mocks():
+    user = _make_user()
+    mocks = SimpleNamespace(
+        user=user,
+        get_user_by_id=AsyncMock(return_value=user),
+        validate=MagicMock(return_value={'id': user.telegram_id}),
+        blacklist=AsyncMock(return_value=(False, None)),
+    )
+    principal_cache.clear()
+    with (
+        patch('app.cabinet.dependencies.settings.CABINET_PRINCIPAL_CACHE_TTL_SECONDS', 30),
+        patch('app.cabinet.dependencies.get_token_payload', return_value={'sub': '100', 'exp': 4102444800}),
+        patch('app.cabinet.dependencies.get_user_by_id', mocks.get_user_by_id),
+        patch('app.cabinet.dependencies.validate_telegram_init_data', mocks.validate),
+        patch('app.cabinet.dependencies.blacklist_service.is_user_blacklisted', mocks.blacklist),
+        patch('app.cabinet.dependencies.maintenance_service.is_maintenance_active', return_value=False),
+        patch('app.cabinet.dependencies.settings.CHANNEL_IS_REQUIRED_SUB', False, create=True),
+    ):
+        yield mocks
+    principal_cache.clear()
+
+
+async def _principal(init_data: str | None = 'signed-init-data') -> CabinetPrincipal:
+    return await get_cabinet_principal(
+        request=_make_request(init_data), credentials=MagicMock(credentials='jwt'), db=AsyncMock()
+    )
+
+
+@pytest.mark.asyncio
+async def test_second_request_is_answered_from_the_cache(auth_mocks) -> None:
+    first = await _principal()
+    second = await _principal()
+
+    assert first == second == CabinetPrincipal.from_user(auth_mocks.user)
+    assert auth_mocks.get_user_by_id.await_count == 1
+    assert auth_mocks.validate.call_count == 1
+    assert auth_mocks.blacklist.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_full_user_route_skips_init_data_and_blacklist_on_hit(auth_mocks) -> None:
+    await _principal()
+
+    db = AsyncMock()
+    db.get.return_value = auth_mocks.user
+    user = await get_current_cabinet_user(request=_make_request(), credentials=MagicMock(credentials='jwt'), db=db)
+
+    assert user is auth_mocks.user
+    db.get.assert_awaited_once_with(User, 100)
+    # Полная загрузка со связями — только при первой, полной проверке
+    assert auth_mocks.get_user_by_id.await_count == 1
+    assert auth_mocks.validate.call_count == 1
+    assert auth_mocks.blacklist.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_full_user_route_rechecks_when_status_changed_behind_the_cache(auth_mocks) -> None:
+    await _principal()
+    auth_mocks.user.status = UserStatus.BLOCKED.value
+
+    db = AsyncMock()
+    db.get.return_value = auth_mocks.user
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_cabinet_user(request=_make_request(), credentials=MagicMock(credentials='jwt'), db=db)
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+    assert len(principal_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_loads_the_user_row_with_one_statement(auth_mocks, tmp_path) -> None:
+    pytest.importorskip('aiosqlite')
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "cabinet.db"}')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{'id': 100, 'telegram_id': 555, 'status': UserStatus.ACTIVE.value}])
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    statements: list[str] = []
+    event.listen(engine.sync_engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    await _principal()
+
+    async with sessionmaker() as db:
+        user = await get_current_cabinet_user(request=_make_request(), credentials=MagicMock(credentials='jwt'), db=db)
+    assert user.id == 100
+    assert len(statements) == 1
+
+    statements.clear()
+    with patch('app.cabinet.dependencies.get_user_by_id', wraps=get_user_by_id):
+        async with sessionmaker() as db:
+            user = await get_current_cabinet_user_with_relations(
+                request=_make_request(), credentials=MagicMock(credentials='jwt'), db=db
+            )
+            assert user.subscriptions == []
+    # Связи для маршрутов подписок догружаются сразу, одним selectin на каждую
+    assert len(statements) > 1
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_other_init_data_and_blacklist_refresh_miss_the_cache(auth_mocks) -> None:
+    await _principal()
+    await _principal(init_data='other-account-init-data')
+    assert auth_mocks.validate.call_count == 2
+
+    with patch.object(principal_cache_module.blacklist_service, 'last_update', datetime.now(UTC)):
+        await _principal()
+
+    assert auth_mocks.blacklist.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_runs_the_full_check_every_time(auth_mocks) -> None:
+    with patch('app.cabinet.dependencies.settings.CABINET_PRINCIPAL_CACHE_TTL_SECONDS', 0):
+        await _principal()
+        await _principal()
+
+    assert auth_mocks.blacklist.await_count == 2
+    assert len(principal_cache) == 0
+
+
+def _session(*, new=(), dirty=(), deleted=()) -> SimpleNamespace:
+    return SimpleNamespace(info={}, new=set(new), dirty=set(dirty), deleted=set(deleted))
+
+
+@pytest.mark.asyncio
+async def test_role_changes_invalidate_the_user_on_commit(auth_mocks) -> None:
+    await _principal()
+    principal_cache.put_role_level(100, 0)
+
+    session = _session(new=[UserRole(user_id=100, role_id=1)])
+    principal_cache_module._track_principal_changes(session, None)
+    assert len(principal_cache) == 1, 'nothing is dropped before commit'
+    principal_cache_module._invalidate_after_commit(session)
+
+    assert len(principal_cache) == 0
+    assert principal_cache.get_role_level(100) is None
+
+
+@pytest.mark.asyncio
+async def test_rollback_keeps_the_cache_and_role_edit_clears_everything(auth_mocks) -> None:
+    await _principal()
+
+    session = _session(new=[UserRole(user_id=100, role_id=1)])
+    principal_cache_module._track_principal_changes(session, None)
+    principal_cache_module._discard_on_rollback(session)
+    principal_cache_module._invalidate_after_commit(session)
+    assert len(principal_cache) == 1
+
+    session = _session(dirty=[AdminRole(name='support', level=10)])
+    principal_cache_module._track_principal_changes(session, None)
+    principal_cache_module._invalidate_after_commit(session)
+    assert len(principal_cache) == 0
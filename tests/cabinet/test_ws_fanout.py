@@ -0,0 +1,104 @@
+"""Cabinet WebSocket fan-out: per-connection queues, slow consumers and cross-replica delivery."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.cabinet.routes.websocket as ws_module
+from app.cabinet.routes.websocket import CabinetConnectionManager
+from app.config import settings
+
+
+class _FakeWebSocket:
+    def __init__(self, *, stall: bool = False) -> None:
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+        self._stall = stall
+
+    async def send_text(self, data: str) -> None:
+        if self._stall:
+            await asyncio.Event().wait()
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.closed_with = code
+
+
+async def _drain() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def redis_client(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    client = MagicMock()
+    client.publish = AsyncMock()
+    monkeypatch.setattr(ws_module, 'cache', SimpleNamespace(_connected=True, redis_client=client))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_message_is_encoded_once_for_all_admins(redis_client: MagicMock) -> None:
+    manager = CabinetConnectionManager()
+    sockets = [_FakeWebSocket() for _ in range(3)]
+    connections = [await manager.connect(ws, user_id, is_admin=True) for user_id, ws in enumerate(sockets, 1)]
+
+    await manager.send_to_admins({'type': 'ticket.new', 'ticket_id': 7})
+    await _drain()
+
+    payloads = [ws.sent[0] for ws in sockets]
+    assert all(payload is payloads[0] for payload in payloads)
+    assert json.loads(payloads[0]) == {'type': 'ticket.new', 'ticket_id': 7}
+    redis_client.publish.assert_awaited_once()
+
+    for connection in connections:
+        await manager.disconnect(connection)
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_closed_without_blocking_others(
+    redis_client: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, 'CABINET_WS_SEND_QUEUE_SIZE', 2)
+    manager = CabinetConnectionManager()
+    slow_ws, fast_ws = _FakeWebSocket(stall=True), _FakeWebSocket()
+    slow = await manager.connect(slow_ws, 1, is_admin=True)
+    fast = await manager.connect(fast_ws, 2, is_admin=True)
+
+    for index in range(5):
+        await manager.send_to_admins({'type': 'ticket.new', 'ticket_id': index})
+        await _drain()
+
+    assert slow.closed
+    assert slow_ws.closed_with == 1013
+    assert len(fast_ws.sent) == 5
+
+    await manager.disconnect(slow)
+    await manager.disconnect(fast)
+
+
+@pytest.mark.asyncio
+async def test_fanout_delivers_on_other_replica_only(redis_client: MagicMock) -> None:
+    replica_a, replica_b = CabinetConnectionManager(), CabinetConnectionManager()
+    ws_a, ws_b = _FakeWebSocket(), _FakeWebSocket()
+    conn_a = await replica_a.connect(ws_a, 42, is_admin=False)
+    conn_b = await replica_b.connect(ws_b, 42, is_admin=False)
+
+    await replica_a.send_to_user(42, {'type': 'balance.topup', 'amount_kopeks': 100})
+    envelope = redis_client.publish.await_args.args[1]
+
+    # Каждая реплика получает и собственную публикацию — она не должна задвоиться
+    replica_a._handle_fanout_message(envelope)
+    replica_b._handle_fanout_message(envelope.encode())
+    await _drain()
+
+    assert len(ws_a.sent) == 1
+    assert ws_b.sent == ws_a.sent
+
+    await replica_a.disconnect(conn_a)
+    await replica_b.disconnect(conn_b)
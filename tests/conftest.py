@@ -46,6 +46,12 @@ if 'redis.asyncio' not in sys.modules:
     class _FakeNoScriptError(_FakeRedisError):
         """Redis script cache miss exception for tests."""
 
+    class _FakeConnectionError(_FakeRedisError):
+        """Redis connection failure for tests."""
+
+    class _FakeTimeoutError(_FakeRedisError):
+        """Redis timeout for tests."""
+
     class _FakeRedisClient:
         async def ping(self):
             """Имитируем успешный ответ ping."""
@@ -84,6 +90,8 @@ if 'redis.asyncio' not in sys.modules:
     redis_async_module.Redis = _FakeRedisClient
     redis_exceptions_module.RedisError = _FakeRedisError
     redis_exceptions_module.NoScriptError = _FakeNoScriptError
+    redis_exceptions_module.ConnectionError = _FakeConnectionError
+    redis_exceptions_module.TimeoutError = _FakeTimeoutError
     sys.modules['redis'] = redis_module
     sys.modules['redis.asyncio'] = redis_async_module
     sys.modules['redis.exceptions'] = redis_exceptions_module
@@ -199,8 +207,12 @@ def fixed_datetime() -> datetime:
 pytest_plugins = ['tests.fixtures.promocode_fixtures']
 
 
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption('--run-slow', action='store_true', default=False, help='запустить тесты с маркером slow')
+
+
 def pytest_configure(config: pytest.Config) -> None:
-    """Регистрируем маркеры для асинхронных тестов."""
+    """Регистрируем маркеры для асинхронных и медленных тестов."""
 
     config.addinivalue_line(
         'markers',
@@ -210,6 +222,21 @@ def pytest_configure(config: pytest.Config) -> None:
         'markers',
         'anyio: запуск асинхронного теста через встроенный цикл событий',
     )
+    config.addinivalue_line(
+        'markers',
+        'slow: долгий тест, запускается только с --run-slow',
+    )
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    """Медленные тесты по умолчанию пропускаются."""
+
+    if config.getoption('--run-slow'):
+        return
+    skip_slow = pytest.mark.skip(reason='медленный тест: запустите с --run-slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
 
 
 def _unwrap_test(obj):
@@ -0,0 +1,157 @@
+"""Read-replica routing on two SQLite files: healthy replica, lag and outage fallback, read-your-writes."""
+
+from __future__ import annotations
+
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from app.database import read_routing
+from app.database.models import Base, User
+from app.database.read_routing import ReplicaRouter, get_user_read_db, read_session, set_current_reader
+
+
+# tests/conftest.py подменяет aiosqlite пустым модулем; здесь нужен настоящий драйвер
+if not hasattr(sys.modules.get('aiosqlite'), 'connect'):
+    sys.modules.pop('aiosqlite', None)
+pytest.importorskip('aiosqlite')
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_as_json(_type, _compiler, **_kw) -> str:
+    return 'JSON'
+
+
+async def _database(path, name: str) -> async_sessionmaker:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text('CREATE TABLE marker (name TEXT)'))
+        await conn.execute(text('INSERT INTO marker VALUES (:name)'), {'name': name})
+    return async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+
+@pytest_asyncio.fixture
+async def router(tmp_path):
+    primary = await _database(tmp_path / 'primary.sqlite', 'primary')
+    replica = await _database(tmp_path / 'replica.sqlite', 'replica')
+    router = ReplicaRouter(primary, replica)
+    with (
+        patch.object(read_routing, 'replica_router', router),
+        patch.object(read_routing.settings, 'DATABASE_READ_REPLICA_MAX_LAG_SECONDS', 5.0),
+        patch.object(read_routing.settings, 'DATABASE_READ_REPLICA_CHECK_INTERVAL_SECONDS', 60.0),
+        patch.object(read_routing.settings, 'DATABASE_READ_REPLICA_PIN_SECONDS', 60.0),
+    ):
+        set_current_reader(None)
+        yield router
+    set_current_reader(None)
+
+
+async def _served_by(user_id: int | None = None) -> str:
+    async with read_session(user_id) as session:
+        return await session.scalar(text('SELECT name FROM marker'))
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_a_healthy_replica(router) -> None:
+    assert await _served_by() == 'replica'
+    assert router.lag == 0.0
+
+
+@pytest.mark.asyncio
+async def test_no_replica_means_primary(router) -> None:
+    with patch.object(read_routing, 'replica_router', ReplicaRouter(router._primary_factory, None)):
+        assert await _served_by() == 'primary'
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_falls_back_until_it_catches_up(router) -> None:
+    with patch.object(router, '_probe_lag', AsyncMock(return_value=30.0)):
+        assert await _served_by() == 'primary'
+        assert router.lag == 30.0
+        # Проверка кэшируется: до истечения интервала реплика не опрашивается
+        assert await _served_by() == 'primary'
+        assert router._probe_lag.await_count == 1
+
+    with patch.object(read_routing.settings, 'DATABASE_READ_REPLICA_CHECK_INTERVAL_SECONDS', 0.0):
+        assert await _served_by() == 'replica'
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_falls_back_to_primary(router, tmp_path) -> None:
+    missing = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/missing/replica.sqlite')
+    router._replica_factory = async_sessionmaker(missing)
+
+    assert await _served_by() == 'primary'
+    assert router.lag is None
+
+
+@pytest.mark.asyncio
+async def test_connection_error_on_replica_switches_reads_to_primary(router) -> None:
+    with pytest.raises(OperationalError):
+        async with read_session() as session:
+            await session.execute(text('SELECT * FROM no_such_table'))
+
+    assert await _served_by() == 'primary'
+
+
+@pytest.mark.asyncio
+async def test_user_reads_own_writes_from_primary(router) -> None:
+    async with router._primary_factory() as session:
+        session.add(User(id=7, telegram_id=7007))
+        await session.commit()
+
+    assert await _served_by(7) == 'primary'
+    assert await _served_by(8) == 'replica'
+    assert await _served_by() == 'replica'
+
+    with patch.object(read_routing.settings, 'DATABASE_READ_REPLICA_PIN_SECONDS', 0.0):
+        async with router._primary_factory() as session:
+            (await session.get(User, 7)).balance_kopeks = 100
+            await session.commit()
+    assert await _served_by(7) == 'replica'
+
+
+@pytest.mark.asyncio
+async def test_current_reader_is_pinned_by_any_commit_and_rollback_pins_nobody(router) -> None:
+    set_current_reader(42)
+    async with router._primary_factory() as session:
+        session.add(User(id=9, telegram_id=9009))
+        await session.flush()
+        await session.rollback()
+    assert await _served_by() == 'replica'
+
+    async with router._primary_factory() as session:
+        session.add(User(id=9, telegram_id=9009))
+        await session.commit()
+
+    assert await _served_by() == 'primary'
+    assert await _served_by(9) == 'primary'
+    set_current_reader(None)
+    assert await _served_by() == 'replica'
+
+
+@pytest.mark.asyncio
+async def test_per_user_endpoint_reads_written_user_from_primary_by_either_id(router) -> None:
+    """PATCH /partners/referrers/{id}/… then GET /partners/referrers/{id}: the path id may be id or telegram_id."""
+    async with router._primary_factory() as session:
+        session.add(User(id=11, telegram_id=11011))
+        await session.commit()
+    router._pinned.clear()
+
+    async with router._primary_factory() as session:
+        (await session.get(User, 11)).referral_commission_percent = 25
+        await session.commit()
+
+    for path_user_id, expected in ((11, 'primary'), (11011, 'primary'), (12, 'replica')):
+        dependency = get_user_read_db(path_user_id)
+        session = await anext(dependency)
+        assert await session.scalar(text('SELECT name FROM marker')) == expected
+        await dependency.aclose()
@@ -394,20 +394,21 @@ class TestCabinetAppleIAPRoutes:
 
         clients: list[FakeRedis] = []
 
-        def from_url(url: str) -> FakeRedis:
-            assert url == settings.REDIS_URL
-            client = FakeRedis()
-            clients.append(client)
-            return client
+        def client(name: str) -> FakeRedis:
+            assert name == 'apple_iap'
+            redis_client = FakeRedis()
+            clients.append(redis_client)
+            return redis_client
 
         app = FastAPI()
-        monkeypatch.setattr(apple_iap_routes.redis, 'from_url', from_url)
+        monkeypatch.setattr(apple_iap_routes.redis_registry, 'client', client)
 
         async with apple_iap_routes.apple_iap_lifespan(app):
             assert len(clients) == 1
             assert getattr(app.state, apple_iap_routes.APPLE_IAP_REDIS_STATE_KEY) is clients[0]
 
-        assert clients[0].closed is True
+        # Пул общий с остальными потребителями Redis — его закрывает redis_registry при остановке
+        assert clients[0].closed is False
         assert getattr(app.state, apple_iap_routes.APPLE_IAP_REDIS_STATE_KEY) is None
 
     @pytest.mark.anyio('asyncio')
@@ -423,7 +424,7 @@ class TestCabinetAppleIAPRoutes:
         client = FakeRedis()
         app = FastAPI()
         app.include_router(apple_iap_routes.router)
-        monkeypatch.setattr(apple_iap_routes.redis, 'from_url', lambda _url: client)
+        monkeypatch.setattr(apple_iap_routes.redis_registry, 'client', lambda _name: client)
 
         async with app.router.lifespan_context(app):
             assert getattr(app.state, apple_iap_routes.APPLE_IAP_REDIS_STATE_KEY) is client
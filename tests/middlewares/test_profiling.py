@@ -0,0 +1,139 @@
+"""Per-update profiling: middleware timings, slow-update buffer with stack samples and call attribution."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram import Dispatcher
+from aiogram.types import CallbackQuery, Chat, Message, User
+
+from app.middlewares.profiling import ProfilingMiddleware, _TimedMiddleware, describe_event, setup_profiling
+from app.utils import update_profiler
+from app.utils.update_profiler import SlowUpdateLog, UpdateProfile
+
+
+_USER = User(id=42, is_bot=False, first_name='Test')
+
+
+def _message(text: str) -> Message:
+    return Message(message_id=1, date=0, chat=Chat(id=42, type='private'), from_user=_USER, text=text)
+
+
+@pytest.fixture
+def slow_log(monkeypatch: pytest.MonkeyPatch) -> SlowUpdateLog:
+    log = SlowUpdateLog(10)
+    monkeypatch.setattr('app.middlewares.profiling.slow_updates', log)
+    return log
+
+
+def test_describe_event_hides_message_text() -> None:
+    callback = CallbackQuery(id='1', from_user=_USER, chat_instance='c', data='buy_traffic_10')
+
+    assert describe_event(callback) == 'callback:buy_traffic_10'
+    assert describe_event(_message('/start ref_123')) == 'command:/start'
+    assert describe_event(_message('my secret text')) == 'message:text'
+
+
+def test_record_helpers_are_noops_without_active_update() -> None:
+    update_profiler.record_db_query(0.1)
+
+    profile = UpdateProfile('message', 'command:/start')
+    token = update_profiler.activate(profile)
+    try:
+        update_profiler.record_db_query(0.01)
+        update_profiler.record_db_query(0.02)
+        update_profiler.record_telegram_call(0.05)
+        update_profiler.record_panel_call(0.2)
+    finally:
+        update_profiler.deactivate(token)
+
+    assert update_profiler.current_profile() is None
+    assert (profile.db_queries, profile.telegram_calls, profile.panel_calls) == (2, 1, 1)
+    assert profile.db_time == pytest.approx(0.03)
+
+
+@pytest.mark.asyncio
+async def test_middleware_own_time_excludes_the_rest_of_the_chain(slow_log: SlowUpdateLog) -> None:
+    async def slow_middleware(handler, event, data):
+        await asyncio.sleep(0.02)
+        return await handler(event, data)
+
+    async def sample_handler(event, data):
+        update_profiler.record_db_query(0.001)
+        await asyncio.sleep(0.05)
+        return 'ok'
+
+    profiling = ProfilingMiddleware('message')
+    profiling.threshold = 0.0
+    timed = _TimedMiddleware(slow_middleware)
+    data = {'handler': SimpleNamespace(callback=sample_handler)}
+
+    async def chain(event, data):
+        return await timed(sample_handler, event, data)
+
+    assert await profiling(chain, _message('/start'), data) == 'ok'
+
+    [profile] = slow_log.snapshot()
+    assert profile.summary == 'command:/start'
+    assert profile.user_id == 42
+    assert profile.handler.endswith('sample_handler')
+    assert 0.015 <= profile.middlewares['slow_middleware'] < 0.045
+    assert profile.handler_time >= 0.045
+    assert profile.db_queries == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_update_keeps_stack_samples_and_fast_ones_are_only_counted(slow_log: SlowUpdateLog) -> None:
+    async def waits_on_panel():
+        await asyncio.sleep(0.08)
+
+    async def sample_handler(event, data):
+        await waits_on_panel()
+
+    profiling = ProfilingMiddleware('message')
+    profiling.threshold = 0.03
+    profiling.interval = 0.01
+    data = {'handler': SimpleNamespace(callback=sample_handler)}
+
+    async def fast_handler(event, data):
+        return None
+
+    await profiling(sample_handler, _message('/slow'), data)
+    await profiling(fast_handler, _message('/fast'), data)
+
+    assert slow_log.profiled_total == 2
+    assert slow_log.slow_total == 1
+    [profile] = slow_log.snapshot()
+    assert profile.summary == 'command:/slow'
+    assert any('waits_on_panel' in stack for stack in profile.stacks)
+
+
+@pytest.mark.asyncio
+async def test_errors_are_recorded_and_reraised(slow_log: SlowUpdateLog) -> None:
+    async def broken(event, data):
+        raise ValueError('bad')
+
+    profiling = ProfilingMiddleware('message')
+    profiling.threshold = 0.0
+
+    with pytest.raises(ValueError):
+        await profiling(broken, _message('/x'), {})
+
+    assert slow_log.snapshot()[0].error == 'ValueError'
+
+
+def test_setup_profiling_puts_profiler_first_and_wraps_existing_middlewares() -> None:
+    async def existing(handler, event, data):
+        return await handler(event, data)
+
+    dp = Dispatcher()
+    dp.message.middleware(existing)
+
+    setup_profiling(dp)
+
+    chain = list(dp.message.middleware)
+    assert isinstance(chain[0], ProfilingMiddleware)
+    assert isinstance(chain[1], _TimedMiddleware) and chain[1].inner is existing
+    assert isinstance(next(iter(dp.callback_query.middleware)), ProfilingMiddleware)
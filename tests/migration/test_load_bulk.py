@@ -0,0 +1,205 @@
+"""Bulk migration loader: same database state and stats as the per-row loader, resume from a checkpoint."""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import replace
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from app.database.models import Base, PromoGroup, Subscription, Tariff, User
+from tools.migration.load_bulk import _BulkLoader, load_migration_data_bulk
+from tools.migration.load_postgres import load_migration_data
+from tools.migration.models import CampaignUser, MigrationSubscription, Seller
+
+
+# tests/conftest.py подменяет aiosqlite пустым модулем; здесь нужен настоящий драйвер
+if not hasattr(sys.modules.get('aiosqlite'), 'connect'):
+    sys.modules.pop('aiosqlite', None)
+pytest.importorskip('aiosqlite')
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_as_json(_type, _compiler, **_kw) -> str:
+    return 'JSON'
+
+
+SQUAD_UUIDS = {'premium': 'sq-premium', 'basic': 'sq-basic', 's3': 'sq-s3', 's4': 'sq-s4'}
+END_DATE = datetime(2026, 9, 1, tzinfo=UTC)
+
+
+def _fixture_dataset() -> tuple[list[MigrationSubscription], list[CampaignUser], list[Seller]]:
+    subscribers = []
+    for n in range(60):
+        telegram_id = 1000 + n % 40  # каждый второй из первых 20 — с двумя подписками
+        subscribers.append(
+            MigrationSubscription(
+                telegram_id=telegram_id,
+                # tariff 1 без squad_keys — подписка пропускается
+                tariff_id=(1, 2, 3)[n % 3] if n % 11 else 1,
+                squad_keys=['s3', 's4'] if n % 11 else [],
+                end_date=END_DATE + timedelta(days=n),
+                remaining_bytes=0,
+                traffic_limit_gb=10 + n,
+                old_emails=[f'e{n}'],
+                old_uuids=[f'uuid-{n}'] if n % 4 else [],
+                # повторяющийся email у одного пользователя — дубль подписки
+                source_email=f'e{n % 50}',
+                username=f'user{telegram_id}',
+                first_name=f'Name {telegram_id}',
+                wallet=n * 100,
+            )
+        )
+    # Пересекаются с подписчиками (1030-1039), с уже существующими (900-904) и сами с собой
+    campaign_users = [
+        CampaignUser(telegram_id=tg, username=f'camp{tg}', first_name=None, wallet=tg)
+        for tg in [*range(1030, 1040), *range(900, 905), *range(2000, 2030), 2000, 2001]
+    ]
+    sellers = [Seller(telegram_id=tg, percent=10 + tg % 7) for tg in (901, 1001, 1035, 2005, 2000)]
+    return subscribers, campaign_users, sellers
+
+
+async def _seeded_sessionmaker(path) -> async_sessionmaker:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Tariff), [{'id': 1, 'name': 'Template', 'period_prices': {'30': 100}}])
+        await conn.execute(insert(PromoGroup), [{'id': 1, 'name': 'Default', 'is_default': True}])
+        # Уже зарегистрированные: 900-904 и 1000-1002 (у 1000 есть vless_uuid и подписка)
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    'id': 500 + n,
+                    'telegram_id': tg,
+                    'referral_code': f'refold{n}',
+                    'vless_uuid': 'kept-uuid' if tg == 1000 else None,
+                    'promo_group_id': 1,
+                }
+                for n, tg in enumerate([900, 901, 902, 903, 904, 1000, 1001, 1002])
+            ],
+        )
+        await conn.execute(
+            insert(Subscription),
+            [{'user_id': 505, 'remnawave_short_id': 'old001', 'account_sequence': 1, 'end_date': END_DATE}],
+        )
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def _snapshot(sessionmaker: async_sessionmaker) -> tuple[dict, list]:
+    async with sessionmaker() as db:
+        users = {
+            user.telegram_id: (
+                user.username,
+                user.first_name,
+                user.language,
+                user.balance_kopeks,
+                user.vless_uuid,
+                user.partner_status,
+                user.referral_commission_percent,
+                user.promo_group_id,
+                user.has_had_paid_subscription,
+                bool(user.referral_code),
+            )
+            for user in (await db.execute(select(User))).scalars()
+        }
+        subscriptions = sorted(
+            (
+                telegram_id,
+                sub.account_sequence,
+                sub.status,
+                sub.is_trial,
+                sub.end_date.replace(tzinfo=UTC),
+                sub.traffic_limit_gb,
+                sub.device_limit,
+                tuple(sub.connected_squads or ()),
+                sub.tariff_id,
+                sub.autopay_enabled,
+                sub.autopay_days_before,
+                len(sub.remnawave_short_id),
+            )
+            for sub, telegram_id in (await db.execute(select(Subscription, User.telegram_id).join(User))).all()
+        )
+    return users, subscriptions
+
+
+@pytest.mark.asyncio
+async def test_bulk_loader_matches_per_row_loader(tmp_path) -> None:
+    subscribers, campaign_users, sellers = _fixture_dataset()
+    per_row_db = await _seeded_sessionmaker(tmp_path / 'per_row.sqlite')
+    bulk_db = await _seeded_sessionmaker(tmp_path / 'bulk.sqlite')
+
+    async with per_row_db() as db:
+        per_row_stats = await load_migration_data(db, subscribers, campaign_users, sellers, SQUAD_UUIDS, dry_run=False)
+    async with bulk_db() as db:
+        bulk_stats = await load_migration_data_bulk(
+            db, subscribers, campaign_users, sellers, SQUAD_UUIDS, dry_run=False, chunk_size=7
+        )
+
+    assert bulk_stats == per_row_stats
+    assert min(per_row_stats.values()) > 0
+    assert await _snapshot(bulk_db) == await _snapshot(per_row_db)
+
+
+@pytest.mark.asyncio
+async def test_interrupted_bulk_load_resumes_from_checkpoint(tmp_path) -> None:
+    subscribers, campaign_users, sellers = _fixture_dataset()
+    per_row_db = await _seeded_sessionmaker(tmp_path / 'per_row.sqlite')
+    bulk_db = await _seeded_sessionmaker(tmp_path / 'bulk.sqlite')
+    checkpoint = tmp_path / 'checkpoint.json'
+
+    async with per_row_db() as db:
+        per_row_stats = await load_migration_data(db, subscribers, campaign_users, sellers, SQUAD_UUIDS, dry_run=False)
+
+    original = _BulkLoader.load_subscribers
+    calls = 0
+
+    async def fail_on_fifth_chunk(self, *args):
+        nonlocal calls
+        calls += 1
+        if calls == 5:
+            raise ConnectionError('connection lost')
+        await original(self, *args)
+
+    with patch.object(_BulkLoader, 'load_subscribers', fail_on_fifth_chunk), pytest.raises(ConnectionError):
+        async with bulk_db() as db:
+            await load_migration_data_bulk(
+                db,
+                subscribers,
+                campaign_users,
+                sellers,
+                SQUAD_UUIDS,
+                dry_run=False,
+                checkpoint_path=checkpoint,
+                chunk_size=7,
+            )
+
+    # Тот же объём, другое содержимое — чекпоинт не подходит
+    changed = [replace(subscribers[0], wallet=subscribers[0].wallet + 1), *subscribers[1:]]
+    with pytest.raises(RuntimeError, match='different input'):
+        async with bulk_db() as db:
+            await load_migration_data_bulk(
+                db, changed, campaign_users, sellers, SQUAD_UUIDS, dry_run=False, checkpoint_path=checkpoint
+            )
+
+    async with bulk_db() as db:
+        bulk_stats = await load_migration_data_bulk(
+            db,
+            subscribers,
+            campaign_users,
+            sellers,
+            SQUAD_UUIDS,
+            dry_run=False,
+            checkpoint_path=checkpoint,
+            chunk_size=7,
+        )
+
+    assert bulk_stats == per_row_stats
+    assert await _snapshot(bulk_db) == await _snapshot(per_row_db)
+    assert not checkpoint.exists()
@@ -0,0 +1,275 @@
+"""Background bulk-action jobs: chunk cursor, pause, resume after restart and bounded panel sync."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.cabinet.routes.admin_bulk_actions as cabinet_bulk
+import app.services.bulk_action_job_service as jobs
+from app.cabinet.schemas.bulk_actions import BulkActionParams, BulkActionType
+from app.database.crud.bulk_actions import BulkApplyResult, resolve_user_subscriptions
+from app.database.models import BulkActionJob, BulkActionJobAppliedTarget
+
+
+class _Session:
+    def __init__(self) -> None:
+        self.db = AsyncMock()
+
+    async def __aenter__(self) -> AsyncMock:
+        return self.db
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+
+def _run(action: BulkActionType, targets: list[int], *, by_subscription: bool = True, **cursor) -> jobs._JobRun:
+    return jobs._JobRun(
+        id=1,
+        action=action,
+        by_subscription=by_subscription,
+        target_ids=targets,
+        params=BulkActionParams(device_limit=3, days=7),
+        admin_id=None,
+        processed=cursor.get('processed', 0),
+        synced=cursor.get('synced', 0),
+        errors=[],
+    )
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch) -> jobs.BulkActionJobService:
+    monkeypatch.setattr(jobs, 'AsyncSessionLocal', _Session)
+    monkeypatch.setattr(jobs.settings, 'BULK_ACTION_CHUNK_SIZE', 2)
+    monkeypatch.setattr(jobs.settings, 'BULK_ACTION_PANEL_CONCURRENCY', 2)
+
+    service = jobs.BulkActionJobService()
+    service.progress = []
+
+    async def save_progress(db, run, outcome, **kwargs) -> None:
+        service.progress.append((run.processed, run.synced, outcome))
+
+    service._save_progress = save_progress
+    service._current_status = AsyncMock(return_value='running')
+    service._finish = AsyncMock()
+    service._sync_subscription = AsyncMock(return_value=None)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_resolve_prefers_active_subscription_over_newest() -> None:
+    now = datetime.now(UTC)
+    db = AsyncMock()
+    db.execute.return_value = [
+        (30, 1, 'expired', now - timedelta(days=1)),
+        (20, 1, 'active', now + timedelta(days=5)),
+        (10, 1, 'active', now + timedelta(days=9)),
+        (40, 2, 'disabled', now + timedelta(days=3)),
+        (35, 2, 'expired', now - timedelta(days=3)),
+    ]
+
+    assert await resolve_user_subscriptions(db, [1, 2, 3]) == {1: 20, 2: 40}
+
+
+@pytest.mark.asyncio
+async def test_chunks_move_cursor_then_sync_and_count_missing_as_skipped(service, monkeypatch) -> None:
+    monkeypatch.setattr(jobs, 'get_existing_subscription_ids', AsyncMock(side_effect=lambda db, ids: set(ids) - {4}))
+    set_limit = AsyncMock(side_effect=lambda db, ids, limit: BulkApplyResult(applied=list(ids)))
+    monkeypatch.setattr(jobs, 'bulk_set_device_limit', set_limit)
+    service._claim = AsyncMock(return_value=_run(BulkActionType.SET_DEVICES, [1, 2, 3, 4, 5]))
+
+    await service._run(1)
+
+    assert [call.args[1] for call in set_limit.await_args_list] == [[1, 2], [3], [5]]
+    # Каждая пачка: сначала курсор БД, затем отметка синхронизации с панелью
+    assert [(processed, synced) for processed, synced, _ in service.progress] == [
+        (2, 0),
+        (2, 2),
+        (4, 2),
+        (4, 4),
+        (5, 4),
+        (5, 5),
+    ]
+    assert sum(outcome.success for *_, outcome in service.progress) == 4
+    assert sum(outcome.skipped for *_, outcome in service.progress) == 1
+    # Отсутствующую подписку пропускает сам _sync_subscription
+    assert sorted(call.args[0] for call in service._sync_subscription.await_args_list) == [1, 2, 3, 4, 5]
+    service._finish.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_pause_stops_at_chunk_boundary(service, monkeypatch) -> None:
+    monkeypatch.setattr(jobs, 'get_existing_subscription_ids', AsyncMock(side_effect=lambda db, ids: set(ids)))
+    monkeypatch.setattr(
+        jobs, 'bulk_set_device_limit', AsyncMock(side_effect=lambda db, ids, limit: BulkApplyResult(applied=ids))
+    )
+    service._claim = AsyncMock(return_value=_run(BulkActionType.SET_DEVICES, [1, 2, 3, 4, 5]))
+    service._current_status = AsyncMock(side_effect=['running', 'paused'])
+
+    await service._run(1)
+
+    assert service.progress[-1][:2] == (2, 2)
+    service._finish.assert_not_awaited()
+    assert not service.is_job_running(1)
+
+
+@pytest.mark.asyncio
+async def test_restart_resyncs_chunk_that_never_reached_the_panel(service, monkeypatch) -> None:
+    extend = AsyncMock(side_effect=lambda db, ids, days: BulkApplyResult(applied=ids))
+    monkeypatch.setattr(jobs, 'bulk_extend_subscriptions', extend)
+    monkeypatch.setattr(jobs, 'get_existing_user_ids', AsyncMock(side_effect=lambda db, ids: set(ids)))
+    monkeypatch.setattr(
+        jobs, 'resolve_user_subscriptions', AsyncMock(side_effect=lambda db, ids: {uid: uid * 10 for uid in ids})
+    )
+    service._claim = AsyncMock(
+        return_value=_run(BulkActionType.EXTEND_SUBSCRIPTION, [1, 2, 3], by_subscription=False, processed=2, synced=0)
+    )
+
+    await service._run(1)
+
+    synced = [call.args[0] for call in service._sync_subscription.await_args_list]
+    assert sorted(synced[:2]) == [10, 20]
+    assert synced[2:] == [30]
+    # Уже применённые цели повторно не продлеваются
+    assert [call.args[1] for call in extend.await_args_list] == [[30]]
+
+
+@pytest.mark.asyncio
+async def test_users_without_subscription_are_errors_and_panel_failures_counted_apart(service, monkeypatch) -> None:
+    monkeypatch.setattr(jobs, 'get_existing_user_ids', AsyncMock(side_effect=lambda db, ids: set(ids)))
+    monkeypatch.setattr(jobs, 'resolve_user_subscriptions', AsyncMock(return_value={1: 10}))
+    monkeypatch.setattr(jobs, 'bulk_add_subscription_traffic', AsyncMock(return_value=BulkApplyResult(applied=[10])))
+    service._sync_subscription = AsyncMock(return_value='panel down')
+    run = _run(BulkActionType.ADD_TRAFFIC, [1, 2], by_subscription=False)
+    run.params = BulkActionParams(traffic_gb=5)
+    service._claim = AsyncMock(return_value=run)
+
+    await service._run(1)
+
+    apply_outcome, sync_outcome = service.progress[0][2], service.progress[1][2]
+    assert (apply_outcome.success, apply_outcome.errors) == (1, 1)
+    assert apply_outcome.messages == [{'target_id': 2, 'message': 'No subscription found'}]
+    assert (sync_outcome.errors, sync_outcome.panel_errors) == (0, 1)
+    assert service._sync_subscription.await_args.kwargs == {'enable': True}
+
+
+@pytest.mark.asyncio
+async def test_panel_sync_respects_concurrency_limit(service, monkeypatch) -> None:
+    active = peak = 0
+
+    async def sync(sub_id: int, *, enable: bool) -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    service._sync_subscription = sync
+    monkeypatch.setattr(jobs.settings, 'BULK_ACTION_CHUNK_SIZE', 10)
+    monkeypatch.setattr(jobs, 'get_existing_subscription_ids', AsyncMock(side_effect=lambda db, ids: set(ids)))
+    monkeypatch.setattr(
+        jobs, 'bulk_set_device_limit', AsyncMock(side_effect=lambda db, ids, limit: BulkApplyResult(applied=ids))
+    )
+    service._claim = AsyncMock(return_value=_run(BulkActionType.SET_DEVICES, list(range(1, 9))))
+
+    await service._run(1)
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_cursor_moved_by_another_executor_rolls_back_and_stops(monkeypatch) -> None:
+    """Курсор сдвигается только с ожидаемого значения; иначе пачка откатывается без _fail и _finish."""
+    session = _Session()
+    session.db.execute = AsyncMock(return_value=SimpleNamespace(rowcount=0))
+    monkeypatch.setattr(jobs, 'AsyncSessionLocal', lambda: session)
+    monkeypatch.setattr(jobs.settings, 'BULK_ACTION_CHUNK_SIZE', 2)
+    monkeypatch.setattr(jobs, 'get_existing_subscription_ids', AsyncMock(side_effect=lambda db, ids: set(ids)))
+    set_limit = AsyncMock(side_effect=lambda db, ids, limit: BulkApplyResult(applied=list(ids)))
+    monkeypatch.setattr(jobs, 'bulk_set_device_limit', set_limit)
+
+    service = jobs.BulkActionJobService()
+    service._claim = AsyncMock(return_value=_run(BulkActionType.SET_DEVICES, [1, 2, 3], processed=2, synced=2))
+    service._current_status = AsyncMock(return_value='running')
+    service._finish = AsyncMock()
+    service._fail = AsyncMock()
+    service._sync_subscription = AsyncMock(return_value=None)
+
+    await service._run(1)
+
+    assert [call.args[1] for call in set_limit.await_args_list] == [[3]]
+    progress = session.db.execute.await_args_list[0].args[0].compile()
+    assert {'processed_1', 'lease_owner_1'} <= set(progress.params)
+    assert progress.params['processed_1'] == 2
+    assert progress.params['lease_owner_1'] == service._owner
+    session.db.rollback.assert_awaited()
+    # Единственный commit — освобождение аренды после остановки
+    assert session.db.commit.await_count == 1
+    assert session.db.execute.await_count == 2
+    service._sync_subscription.assert_not_awaited()
+    service._finish.assert_not_awaited()
+    service._fail.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_row_chunk_rerun_skips_targets_committed_before_lease_loss(monkeypatch, tmp_path) -> None:
+    """Отметка цели фиксируется вместе с её изменениями: повтор пачки не применяет её второй раз."""
+    # tests/conftest.py подменяет aiosqlite пустым модулем; здесь нужен настоящий драйвер
+    if not hasattr(sys.modules.get('aiosqlite'), 'connect'):
+        sys.modules.pop('aiosqlite', None)
+    pytest.importorskip('aiosqlite')
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/jobs.sqlite')
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            BulkActionJob.metadata.create_all,
+            tables=[BulkActionJob.__table__, BulkActionJobAppliedTarget.__table__],
+        )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(jobs, 'AsyncSessionLocal', session_factory)
+
+    applied: list[int] = []
+
+    async def delete_user(db, uid, action, params, tariff, dry_run, admin_id=0):
+        applied.append(uid)
+        await db.commit()  # обработчик кабинета фиксирует изменения цели сам
+        return SimpleNamespace(success=True, message='User deleted')
+
+    monkeypatch.setattr(cabinet_bulk, '_execute_for_user', delete_user)
+
+    crashed, takeover = jobs.BulkActionJobService(), jobs.BulkActionJobService()
+    async with session_factory() as db:
+        db.add(
+            BulkActionJob(
+                id=1,
+                action=BulkActionType.DELETE_USER.value,
+                target_type='users',
+                target_ids=[1, 2, 3],
+                params={},
+                status='running',
+                processed=0,
+                lease_owner=takeover._owner,  # аренду уже забрал другой процесс
+            )
+        )
+        await db.commit()
+
+    with pytest.raises(jobs._LeaseLostError):
+        await crashed._apply_row_chunk(_run(BulkActionType.DELETE_USER, [1, 2, 3], by_subscription=False), [1, 2])
+    assert applied == [1, 2]
+
+    run = _run(BulkActionType.DELETE_USER, [1, 2, 3], by_subscription=False)
+    await takeover._apply_row_chunk(run, [1, 2, 3])
+
+    assert applied == [1, 2, 3]
+    async with session_factory() as db:
+        job = await db.get(BulkActionJob, 1)
+        assert (job.processed, job.success_count) == (3, 3)
+        assert (await db.scalars(select(BulkActionJobAppliedTarget))).all() == []
+    await engine.dispose()
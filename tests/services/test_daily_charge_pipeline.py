@@ -0,0 +1,130 @@
+"""Daily charge pipeline on SQLite: same charged/suspended/error counts and balances as the serial path."""
+
+from __future__ import annotations
+
+import random
+import sys
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from app.database.crud.subscription import get_daily_subscriptions_for_charge
+from app.database.models import Base, Subscription, SubscriptionStatus, Tariff, Transaction, User, UserStatus
+from app.services.daily_subscription_service import DailySubscriptionService
+
+
+# tests/conftest.py подменяет aiosqlite пустым модулем; здесь нужен настоящий драйвер
+if not hasattr(sys.modules.get('aiosqlite'), 'connect'):
+    sys.modules.pop('aiosqlite', None)
+pytest.importorskip('aiosqlite')
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_as_json(_type, _compiler, **_kw) -> str:
+    return 'JSON'
+
+
+def _seed_rows(seed: int = 45) -> tuple[list[dict], list[dict]]:
+    """2000 пользователей и ~2400 подписок: хватает денег, не хватает, две подписки на одного, ошибки."""
+    rng = random.Random(seed)
+    now = datetime.now(UTC)
+    users, subscriptions = [], []
+    for user_id in range(1, 2001):
+        users.append(
+            {
+                'id': user_id,
+                'telegram_id': 10_000 + user_id,
+                'balance_kopeks': rng.choice([0, 5, 10, 15, 30, 100]),
+                'status': UserStatus.ACTIVE.value if rng.random() > 0.02 else UserStatus.BLOCKED.value,
+                'remnawave_uuid': f'uuid-{user_id}',
+            }
+        )
+        for _ in range(2 if rng.random() < 0.2 else 1):
+            # Большинство уже списано сегодня — к списанию около 400
+            last_charge = rng.choices([None, now - timedelta(hours=30), now - timedelta(hours=2)], weights=[1, 1, 8])[0]
+            subscriptions.append(
+                {
+                    'user_id': user_id,
+                    # 1 — суточный 10 ₽, 2 — суточный с нулевой ценой (ошибка), 3 — не суточный
+                    'tariff_id': rng.choices([1, 2, 3], weights=[90, 4, 6])[0],
+                    'status': SubscriptionStatus.ACTIVE.value,
+                    'is_trial': rng.random() < 0.03,
+                    'is_daily_paused': rng.random() < 0.03,
+                    'last_daily_charge_at': last_charge,
+                    'end_date': now + timedelta(hours=rng.choice([-5, 3, 30])),
+                    'connected_squads': ['squad-1'],
+                    'remnawave_short_id': f'short-{len(subscriptions)}',
+                }
+            )
+    return users, subscriptions
+
+
+async def _seeded_sessionmaker(path) -> async_sessionmaker:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+    users, subscriptions = _seed_rows()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Tariff),
+            [
+                {'id': 1, 'name': 'Daily', 'is_daily': True, 'daily_price_kopeks': 1000},
+                {'id': 2, 'name': 'Broken daily', 'is_daily': True, 'daily_price_kopeks': 0},
+                {'id': 3, 'name': 'Monthly', 'is_daily': False, 'daily_price_kopeks': 1000},
+            ],
+        )
+        await conn.execute(insert(User), users)
+        await conn.execute(insert(Subscription), subscriptions)
+    return async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+
+async def _snapshot(sessionmaker: async_sessionmaker) -> tuple[dict, dict, int]:
+    async with sessionmaker() as db:
+        balances = dict((await db.execute(select(User.id, User.balance_kopeks))).all())
+        statuses = dict((await db.execute(select(Subscription.id, Subscription.status))).all())
+        transactions = await db.scalar(select(func.count()).select_from(Transaction))
+    return balances, statuses, transactions
+
+
+@pytest.fixture
+def panel_and_admin_notifications():
+    panel = MagicMock(update_remnawave_user=AsyncMock(), create_remnawave_user=AsyncMock())
+    with (
+        patch('app.services.subscription_service.SubscriptionService', return_value=panel),
+        patch('app.services.subscription_renewal_service.with_admin_notification_service', AsyncMock()),
+    ):
+        yield panel.update_remnawave_user
+
+
+@pytest.mark.asyncio
+async def test_pipeline_matches_serial_charging(tmp_path, panel_and_admin_notifications) -> None:
+    serial_db = await _seeded_sessionmaker(tmp_path / 'serial.sqlite')
+    pipeline_db = await _seeded_sessionmaker(tmp_path / 'pipeline.sqlite')
+
+    with patch('app.services.daily_subscription_service.AsyncSessionLocal', serial_db):
+        async with serial_db() as db:
+            due = sorted(subscription.id for subscription in await get_daily_subscriptions_for_charge(db))
+        serial_stats = await DailySubscriptionService()._process_serially(due)
+    panel_calls_serial = panel_and_admin_notifications.await_count
+    panel_and_admin_notifications.reset_mock()
+
+    with (
+        patch('app.services.daily_subscription_service.AsyncSessionLocal', pipeline_db),
+        patch('app.services.daily_subscription_service.settings.DAILY_SUBSCRIPTIONS_CHARGE_BATCH_SIZE', 150),
+    ):
+        pipeline_stats = await DailySubscriptionService().process_daily_charges()
+
+    assert pipeline_stats['checked'] == len(due) > 300
+    assert {key: pipeline_stats[key] for key in ('charged', 'suspended', 'errors')} == serial_stats
+    assert min(serial_stats.values()) > 0
+    assert panel_and_admin_notifications.await_count == panel_calls_serial == serial_stats['charged']
+    assert await _snapshot(pipeline_db) == await _snapshot(serial_db)
+
+    # Повторный прогон ничего не находит: списанные продлены, приостановленные отключены
+    with patch('app.services.daily_subscription_service.AsyncSessionLocal', pipeline_db):
+        again = await DailySubscriptionService().process_daily_charges()
+    assert again == {'checked': serial_stats['errors'], 'charged': 0, 'suspended': 0, 'errors': serial_stats['errors']}
@@ -1,12 +1,14 @@
 """Тесты для MenuLayoutService."""
 
-from unittest.mock import MagicMock, patch
+import copy
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from aiogram.types import InlineKeyboardButton
 
 from app.services.menu_layout.context import MenuContext
-from app.services.menu_layout.service import MenuLayoutService
+from app.services.menu_layout.service import BOT_MENU_LAYOUT_TOPIC, MenuLayoutService
+from app.utils.cache_invalidation import cache_invalidation_bus
 
 
 @pytest.mark.anyio
@@ -193,3 +195,114 @@ async def test_build_button_simple_subscription_uses_menu_buy_in_multi_tariff():
 
     assert button is not None
     assert button.callback_data == 'menu_buy'
+
+
+# --- Скомпилированный шаблон меню ---
+
+
+_TEMPLATE_CONFIG = {
+    'version': 1,
+    'rows': [
+        {'id': 'balance_row', 'buttons': ['balance'], 'max_per_row': 1},
+        {'id': 'main_row', 'buttons': ['support', 'disabled', 'missing'], 'max_per_row': 2},
+        {'id': 'admin_row', 'buttons': ['admin'], 'conditions': {'is_admin': True}, 'max_per_row': 1},
+    ],
+    'buttons': {
+        'balance': {
+            'type': 'builtin',
+            'text': {'ru': 'Баланс: {balance}', 'en': 'Balance: {balance}'},
+            'action': 'menu_balance',
+            'dynamic_text': True,
+        },
+        'support': {'type': 'builtin', 'text': {'ru': 'Поддержка', 'en': 'Support'}, 'action': 'menu_support'},
+        'disabled': {'type': 'builtin', 'text': {'ru': 'Выкл'}, 'action': 'noop', 'enabled': False},
+        'admin': {'type': 'builtin', 'text': {'ru': 'Админка'}, 'action': 'admin_panel'},
+    },
+}
+
+
+@pytest.fixture
+def template_config():
+    MenuLayoutService.invalidate_cache()
+    MenuLayoutService._cache = copy.deepcopy(_TEMPLATE_CONFIG)
+    yield MenuLayoutService._cache
+    MenuLayoutService.invalidate_cache()
+
+
+def _keyboard_texts(keyboard) -> list[list[str]]:
+    return [[button.text for button in row] for row in keyboard.inline_keyboard]
+
+
+def _texts_stub():
+    texts = MagicMock()
+    texts.format_balance = lambda kopeks: f'{kopeks / 100:.0f} ₽'
+    return texts
+
+
+@pytest.mark.anyio
+async def test_build_keyboard_uses_compiled_template(template_config):
+    """Тест: раскладка кешируется по сигнатуре, динамический текст заполняется для каждого пользователя."""
+    with patch('app.services.menu_layout.template.get_texts', return_value=_texts_stub()):
+        first = await MenuLayoutService.build_keyboard(None, MenuContext(language='ru', balance_kopeks=10000))
+        second = await MenuLayoutService.build_keyboard(None, MenuContext(language='ru', balance_kopeks=25000))
+        admin = await MenuLayoutService.build_keyboard(
+            None, MenuContext(language='ru', is_admin=True, balance_kopeks=0)
+        )
+
+    assert _keyboard_texts(first) == [['Баланс: 100 ₽'], ['Поддержка']]
+    assert _keyboard_texts(second) == [['Баланс: 250 ₽'], ['Поддержка']]
+    assert _keyboard_texts(admin) == [['Баланс: 0 ₽'], ['Поддержка'], ['Админка']]
+
+    template = MenuLayoutService._template
+    assert template is not None
+    assert template.misses == 2
+    assert template.hits == 1
+    # Статическая кнопка собирается один раз на язык и переиспользуется
+    assert first.inline_keyboard[1][0] is second.inline_keyboard[1][0]
+
+
+@pytest.mark.anyio
+async def test_compiled_template_dropped_on_invalidate(template_config):
+    """Тест: сохранение конфигурации сбрасывает скомпилированный шаблон."""
+    template = await MenuLayoutService.get_template(None)
+    assert await MenuLayoutService.get_template(None) is template
+
+    MenuLayoutService.invalidate_cache()
+    MenuLayoutService._cache = copy.deepcopy(_TEMPLATE_CONFIG)
+
+    assert MenuLayoutService._template is None
+    assert await MenuLayoutService.get_template(None) is not template
+
+
+@pytest.mark.anyio
+async def test_compiled_template_detects_referral_data_usage(template_config):
+    """Тест: статистика рефералов нужна только при соответствующих плейсхолдерах или условиях."""
+    template = await MenuLayoutService.get_template(None)
+    assert template.needs_referral_stats is False
+
+    template_config['rows'].append({'id': 'ref_row', 'buttons': ['support'], 'conditions': {'has_referrals': True}})
+    MenuLayoutService._template = None
+
+    template = await MenuLayoutService.get_template(None)
+    assert template.needs_referral_stats is True
+
+
+@pytest.mark.anyio
+async def test_save_config_invalidates_template_in_other_processes(template_config):
+    """Тест: сохранение публикует топик, а его обработчик сбрасывает шаблон в остальных процессах."""
+    db = MagicMock(commit=AsyncMock())
+    with (
+        patch('app.services.menu_layout.service.upsert_system_setting', new=AsyncMock()),
+        patch.object(cache_invalidation_bus, 'publish', new=AsyncMock()) as publish,
+    ):
+        await MenuLayoutService.save_config(db, _TEMPLATE_CONFIG)
+
+    publish.assert_awaited_once_with(BOT_MENU_LAYOUT_TOPIC)
+
+    # Другой процесс: шаблон собран, приходит сообщение шины
+    MenuLayoutService._cache = copy.deepcopy(_TEMPLATE_CONFIG)
+    await MenuLayoutService.get_template(None)
+    await cache_invalidation_bus._handlers[BOT_MENU_LAYOUT_TOPIC](None)
+
+    assert MenuLayoutService._cache is None
+    assert MenuLayoutService._template is None
@@ -0,0 +1,336 @@
+"""NaloGO receipt queue: at-least-once claims, reclaim after a crash, duplicate index and bounded submission."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import UTC, date, datetime, timedelta
+from typing import Self
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.nalogo_queue_service import NalogoQueueService
+from app.services.nalogo_service import (
+    NALOGO_LEASES_KEY,
+    NALOGO_PROCESSING_KEY,
+    NALOGO_QUEUE_KEY,
+    IncomeIndex,
+    NaloGoService,
+    ReceiptMaybeCreatedError,
+)
+from app.utils.cache import cache
+
+
+class _FakePipeline:
+    def __init__(self, redis: _FakeRedis) -> None:
+        self._redis = redis
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list:
+        results = [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+        self._calls.clear()
+        return results
+
+
+class _FakeRedis:
+    """Lists, the lease sorted set and plain keys — only what the receipt queue uses."""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.values: dict[str, str] = {}
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def lpush(self, key, *values):
+        self.lists.setdefault(key, [])[:0] = reversed(values)
+        return len(self.lists[key])
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    async def lmove(self, source, destination, src, dest):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        value = items.pop() if src == 'RIGHT' else items.pop(0)
+        target = self.lists.setdefault(destination, [])
+        target.insert(0, value) if dest == 'LEFT' else target.append(value)
+        return value.encode()
+
+    async def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def lrange(self, key, start, end):
+        return [item.encode() for item in self.lists.get(key, [])]
+
+    async def zadd(self, key, mapping, nx=False):
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if not (nx and member in zset):
+                zset[member] = score
+        return len(mapping)
+
+    async def zrem(self, key, member):
+        return int(self.zsets.get(key, {}).pop(member, None) is not None)
+
+    async def zrange(self, key, start, end, withscores=False):
+        return [(member.encode(), score) for member, score in self.zsets.get(key, {}).items()]
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def delete(self, key):
+        return int(self.values.pop(key, None) is not None)
+
+    async def exists(self, key):
+        return int(key in self.values)
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch) -> _FakeRedis:
+    fake = _FakeRedis()
+    monkeypatch.setattr(cache, 'redis_client', fake)
+    monkeypatch.setattr(cache, '_connected', True)
+    return fake
+
+
+def _receipt(payment_id: str, amount: float = 100.0, **extra) -> str:
+    data = {
+        'name': 'Пополнение',
+        'amount': amount,
+        'quantity': 1,
+        'payment_id': payment_id,
+        'created_at': '2026-10-18T12:00:00+00:00',
+        'attempts': 0,
+        **extra,
+    }
+    return json.dumps(data)
+
+
+def _income(receipt_uuid: str, amount: float, operation_time: datetime) -> dict:
+    return {'approvedReceiptUuid': receipt_uuid, 'totalAmount': amount, 'operationTime': operation_time.isoformat()}
+
+
+def _queue_service(nalogo: NaloGoService, monkeypatch: pytest.MonkeyPatch) -> NalogoQueueService:
+    monkeypatch.setattr('app.services.nalogo_queue_service.settings.NALOGO_QUEUE_RECEIPT_DELAY', 0)
+    return NalogoQueueService(nalogo)
+
+
+@pytest.mark.asyncio
+async def test_claimed_receipt_stays_until_acknowledged(redis: _FakeRedis) -> None:
+    service = NaloGoService()
+    await redis.lpush(NALOGO_QUEUE_KEY, _receipt('p1'), _receipt('p2'))
+
+    claim, data = await service.claim_receipt(visibility_timeout=60)
+
+    assert data['payment_id'] == 'p1'
+    assert await service.get_queue_length() == 2
+    assert redis.lists[NALOGO_PROCESSING_KEY] == [claim]
+
+    await service.ack_receipt(claim)
+
+    assert await service.get_queue_length() == 1
+    assert not redis.zsets[NALOGO_LEASES_KEY]
+
+
+@pytest.mark.asyncio
+async def test_expired_claims_return_to_the_front_with_duplicate_check(redis: _FakeRedis) -> None:
+    service = NaloGoService()
+    await redis.lpush(NALOGO_QUEUE_KEY, _receipt('crashed'), _receipt('next'))
+    claim, _ = await service.claim_receipt(visibility_timeout=60)
+
+    assert await service.reclaim_expired_receipts(visibility_timeout=60) == 0
+
+    redis.zsets[NALOGO_LEASES_KEY][claim] = 0
+    assert await service.reclaim_expired_receipts(visibility_timeout=60) == 1
+
+    assert not redis.lists[NALOGO_PROCESSING_KEY]
+    _, data = await service.claim_receipt(visibility_timeout=60)
+    assert data['payment_id'] == 'crashed'
+    assert data['check_duplicate'] is True
+
+
+@pytest.mark.asyncio
+async def test_claim_without_lease_gets_one_instead_of_being_reclaimed(redis: _FakeRedis) -> None:
+    service = NaloGoService()
+    redis.lists[NALOGO_PROCESSING_KEY] = [_receipt('p1')]
+
+    assert await service.reclaim_expired_receipts(visibility_timeout=60) == 0
+    assert _receipt('p1') in redis.zsets[NALOGO_LEASES_KEY]
+
+
+def test_income_index_matches_nearest_unclaimed_receipt() -> None:
+    index = IncomeIndex(refresh_interval=60)
+    paid_at = datetime(2026, 10, 18, 12, 0, tzinfo=UTC)
+    index.add_incomes(
+        paid_at.date(),
+        [
+            _income('far', 100.0, paid_at + timedelta(minutes=30)),
+            _income('near', 100.0, paid_at + timedelta(minutes=2)),
+            _income('other-amount', 99.0, paid_at),
+            _income('closest', 100.0, paid_at - timedelta(seconds=30)),
+        ],
+    )
+
+    assert index.find(10000, paid_at, timedelta(minutes=10)) == 'closest'
+    index.claim('closest')
+    assert index.find(10000, paid_at, timedelta(minutes=10)) == 'near'
+    assert index.find(10000, paid_at + timedelta(hours=2), timedelta(minutes=10)) is None
+
+
+@pytest.mark.asyncio
+async def test_duplicate_lookup_loads_a_day_once_and_reads_past_fifty_incomes(monkeypatch) -> None:
+    service = NaloGoService()
+    service.configured = True
+    paid_at = datetime(2026, 10, 18, 9, 0, tzinfo=UTC)
+    day = [_income(f'r{i}', 50.0, paid_at + timedelta(minutes=30 + i)) for i in range(150)]
+    day.append(_income('target', 100.0, paid_at))
+
+    async def get_incomes(from_date: date, to_date: date, limit: int, offset: int):
+        return day[offset : offset + limit]
+
+    service.get_incomes = AsyncMock(side_effect=get_incomes)
+
+    assert await service.find_duplicate_receipt(100.0, paid_at) == 'target'
+    assert service.get_incomes.await_count == 2
+
+    # Тот же день в пределах интервала обновления — без запросов к налоговой
+    assert await service.find_duplicate_receipt(100.0, paid_at + timedelta(seconds=5)) is None
+    assert service.get_incomes.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_incremental_refresh_stops_at_the_search_window(monkeypatch) -> None:
+    service = NaloGoService()
+    service.configured = True
+    paid_at = datetime(2026, 10, 18, 9, 0, tzinfo=UTC)
+    day = [_income(f'r{i}', 50.0, paid_at + timedelta(hours=3) - timedelta(minutes=i)) for i in range(300)]
+    service.get_incomes = AsyncMock(side_effect=lambda from_date, to_date, limit, offset: day[offset : offset + limit])
+
+    await service.find_duplicate_receipt(100.0, paid_at)
+    loaded = service.get_incomes.await_count
+
+    monkeypatch.setattr(service._income_index, 'refresh_interval', 0)
+    day.insert(0, _income('late', 100.0, paid_at + timedelta(hours=2, minutes=59)))
+    assert await service.find_duplicate_receipt(100.0, paid_at + timedelta(hours=2, minutes=58)) == 'late'
+    assert service.get_incomes.await_count == loaded + 1
+
+
+@pytest.mark.asyncio
+async def test_worker_acks_submitted_receipts_and_skips_found_duplicates(redis, monkeypatch) -> None:
+    nalogo = NaloGoService()
+    nalogo.configured = True
+    nalogo.create_receipt = AsyncMock(return_value='new-uuid')
+    nalogo.find_duplicate_receipt = AsyncMock(return_value='existing-uuid')
+    await redis.lpush(NALOGO_QUEUE_KEY, _receipt('fresh'), _receipt('retried', check_duplicate=True))
+
+    await _queue_service(nalogo, monkeypatch)._process_pending_receipts()
+
+    assert await nalogo.get_queue_length() == 0
+    assert nalogo.create_receipt.await_count == 1
+    assert nalogo.create_receipt.await_args.kwargs['payment_id'] == 'fresh'
+    assert json.loads(redis.values['nalogo:created:retried']) == 'existing-uuid'
+
+
+@pytest.mark.asyncio
+async def test_failed_submission_is_requeued_and_stops_the_run(redis, monkeypatch) -> None:
+    nalogo = NaloGoService()
+    nalogo.configured = True
+    nalogo.create_receipt = AsyncMock(return_value=None)
+    await redis.lpush(NALOGO_QUEUE_KEY, *(_receipt(f'p{i}') for i in range(5)))
+    monkeypatch.setattr('app.services.nalogo_queue_service.settings.NALOGO_QUEUE_CONCURRENCY', 1)
+
+    await _queue_service(nalogo, monkeypatch)._process_pending_receipts()
+
+    assert nalogo.create_receipt.await_count == 1
+    assert await nalogo.get_queue_length() == 5
+    assert not redis.lists[NALOGO_PROCESSING_KEY]
+    requeued = json.loads(redis.lists[NALOGO_QUEUE_KEY][0])
+    assert requeued['payment_id'] == 'p0'
+    assert requeued['attempts'] == 1
+    # Отказ без отправленного запроса: чек точно не создан, искать дубль не нужно
+    assert requeued['check_duplicate'] is False
+
+
+@pytest.mark.asyncio
+async def test_submissions_run_concurrently_up_to_the_limit(redis, monkeypatch) -> None:
+    nalogo = NaloGoService()
+    nalogo.configured = True
+    active = peak = 0
+
+    async def create_receipt(**kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return f'uuid-{kwargs["payment_id"]}'
+
+    nalogo.create_receipt = create_receipt
+    await redis.lpush(NALOGO_QUEUE_KEY, *(_receipt(f'p{i}') for i in range(6)))
+    monkeypatch.setattr('app.services.nalogo_queue_service.settings.NALOGO_QUEUE_CONCURRENCY', 3)
+
+    await _queue_service(nalogo, monkeypatch)._process_pending_receipts()
+
+    assert peak == 3
+    assert await nalogo.get_queue_length() == 0
+
+
+@pytest.mark.asyncio
+async def test_same_amount_payments_each_get_their_own_receipt(redis, monkeypatch) -> None:
+    """A receipt bound to one payment is never taken as the lost receipt of another with the same amount."""
+    paid_at = datetime(2026, 10, 18, 12, 0, tzinfo=UTC)
+    incomes: list[dict] = []
+
+    first = NaloGoService()
+    first.configured = True
+    first.get_incomes = AsyncMock(
+        side_effect=lambda from_date, to_date, limit, offset: incomes[offset : offset + limit]
+    )
+    await first.bind_receipt('pay-1', 'receipt-1')
+    incomes.append(_income('receipt-1', 100.0, paid_at))
+
+    # Второй платёж той же суммы через минуту: создание упало по таймауту
+    second = NaloGoService()
+    second.configured = True
+    second.get_incomes = first.get_incomes
+    second.create_receipt = AsyncMock(side_effect=[ReceiptMaybeCreatedError('timeout'), 'receipt-2'])
+    await redis.lpush(NALOGO_QUEUE_KEY, _receipt('pay-2', created_at=(paid_at + timedelta(minutes=1)).isoformat()))
+    queue_service = _queue_service(second, monkeypatch)
+
+    await queue_service._process_pending_receipts()
+    requeued = json.loads(redis.lists[NALOGO_QUEUE_KEY][0])
+    assert requeued['check_duplicate'] is True
+
+    await queue_service._process_pending_receipts()
+
+    assert second.create_receipt.await_count == 2
+    assert await second.get_queue_length() == 0
+    assert 'nalogo:created:pay-2' not in redis.values
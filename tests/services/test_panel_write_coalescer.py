@@ -0,0 +1,149 @@
+"""RemnaWave bulk user endpoints and the write coalescer against the local fake panel."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestServer
+
+from app.external import remnawave_api
+from app.external.remnawave_api import RemnaWaveAPI, RemnaWaveAPIError, UserStatus
+from app.services.remnawave_service import PanelWriteCoalescer
+from tools.fake_remnawave_panel import FakeRemnaWavePanel
+
+
+@pytest_asyncio.fixture
+async def panel():
+    fake = FakeRemnaWavePanel()
+    server = TestServer(fake.build_app())
+    await server.start_server()
+    fake.base_url = str(server.make_url('')).rstrip('/')
+    yield fake
+    await server.close()
+
+
+def _client_factory(panel: FakeRemnaWavePanel):
+    @asynccontextmanager
+    async def factory():
+        async with RemnaWaveAPI(panel.base_url, 'test-key') as api:
+            yield api
+
+    return factory
+
+
+def _actions(panel: FakeRemnaWavePanel, action: str) -> int:
+    return sum(count for request, count in panel.requests.items() if request.endswith(f'/actions/{action}'))
+
+
+def _coalescer(panel: FakeRemnaWavePanel, **overrides) -> PanelWriteCoalescer:
+    options = {'window': 0.02, 'max_batch': 100, 'fallback_concurrency': 3, **overrides}
+    return PanelWriteCoalescer(_client_factory(panel), **options)
+
+
+@pytest.mark.asyncio
+async def test_bulk_methods_chunk_uuids_and_sum_affected_rows(panel, monkeypatch) -> None:
+    monkeypatch.setattr(remnawave_api, 'BULK_USERS_CHUNK_SIZE', 2)
+    uuids = panel.add_users(5)
+
+    async with RemnaWaveAPI(panel.base_url, 'test-key') as api:
+        affected = await api.bulk_update_users([*uuids, 'missing'], status=UserStatus.DISABLED, hwid_device_limit=2)
+        squads = await api.bulk_update_squads(uuids[:2], ['squad-1'])
+        deleted = await api.bulk_delete_users(uuids[4:])
+
+    assert (affected, squads, deleted) == (5, 2, 1)
+    assert panel.requests['POST /api/users/bulk/update'] == 3
+    assert {user['status'] for user in panel.users.values()} == {'DISABLED'}
+    assert panel.users[uuids[0]]['hwidDeviceLimit'] == 2
+    assert panel.users[uuids[1]]['activeInternalSquads'] == ['squad-1']
+    assert uuids[4] not in panel.users
+
+
+@pytest.mark.asyncio
+async def test_same_shaped_updates_within_the_window_become_one_bulk_call(panel) -> None:
+    uuids = panel.add_users(20)
+    coalescer = _coalescer(panel)
+
+    await asyncio.gather(*(coalescer.update_user(uuid, status=UserStatus.DISABLED) for uuid in uuids))
+
+    assert panel.requests == {'POST /api/users/bulk/update': 1}
+    assert {user['status'] for user in panel.users.values()} == {'DISABLED'}
+
+
+@pytest.mark.asyncio
+async def test_different_shapes_and_full_batches_are_written_separately(panel) -> None:
+    uuids = panel.add_users(6)
+    coalescer = _coalescer(panel, max_batch=2)
+
+    await asyncio.gather(
+        *(coalescer.update_user(uuid, status=UserStatus.DISABLED) for uuid in uuids[:4]),
+        *(coalescer.update_user_squads(uuid, ['squad-1']) for uuid in uuids[4:]),
+    )
+
+    assert panel.requests == {'POST /api/users/bulk/update': 2, 'POST /api/users/bulk/update-squads': 1}
+
+
+@pytest.mark.asyncio
+async def test_unknown_uuid_fails_only_its_own_caller(panel) -> None:
+    uuids = panel.add_users(3)
+    coalescer = _coalescer(panel)
+
+    results = await asyncio.gather(
+        *(coalescer.update_user(uuid, status=UserStatus.DISABLED) for uuid in [*uuids, 'stale-uuid']),
+        return_exceptions=True,
+    )
+
+    assert results[:3] == [None, None, None]
+    assert isinstance(results[3], RemnaWaveAPIError) and results[3].status_code == 404
+    # Bulk затронул 3 из 4 — пачка переиграна поштучно через /actions/disable, повтор не ошибка
+    assert _actions(panel, 'disable') == 4
+    assert 'PATCH /api/users' not in panel.requests
+    assert {user['status'] for user in panel.users.values()} == {'DISABLED'}
+
+
+@pytest.mark.asyncio
+async def test_panel_without_bulk_endpoints_falls_back_to_per_user_writes(panel) -> None:
+    panel.bulk_enabled = False
+    uuids = panel.add_users(4)
+    coalescer = _coalescer(panel)
+
+    await asyncio.gather(*(coalescer.update_user(uuid, status=UserStatus.DISABLED) for uuid in uuids[:2]))
+    await asyncio.gather(*(coalescer.update_user(uuid, status=UserStatus.DISABLED) for uuid in uuids[2:]))
+
+    assert not coalescer.bulk_supported
+    assert panel.requests['POST /api/users/bulk/update'] == 1
+    assert _actions(panel, 'disable') == 4
+    assert 'PATCH /api/users' not in panel.requests
+    assert {user['status'] for user in panel.users.values()} == {'DISABLED'}
+
+
+@pytest.mark.asyncio
+async def test_later_change_of_the_same_user_waits_for_the_earlier_one(panel) -> None:
+    [uuid] = panel.add_users(1)
+    coalescer = _coalescer(panel, window=0.05)
+
+    disable = asyncio.create_task(coalescer.update_user(uuid, status=UserStatus.DISABLED))
+    await asyncio.sleep(0)
+    await coalescer.update_user(uuid, status=UserStatus.ACTIVE)
+    await disable
+
+    assert panel.users[uuid]['status'] == 'ACTIVE'
+    assert (_actions(panel, 'disable'), _actions(panel, 'enable')) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_per_user_fallback_patches_only_fields_other_than_status(panel) -> None:
+    panel.bulk_enabled = False
+    uuids = panel.add_users(2)
+    coalescer = _coalescer(panel)
+    coalescer.bulk_supported = False
+
+    await asyncio.gather(
+        coalescer.update_user(uuids[0], status=UserStatus.DISABLED, hwid_device_limit=2),
+        coalescer.update_user(uuids[1], hwid_device_limit=3),
+    )
+
+    assert panel.requests == {'PATCH /api/users': 2}
+    assert panel.users[uuids[0]]['status'] == 'DISABLED'
@@ -0,0 +1,114 @@
+"""Batch tariff quotes match per-item pricing; catalog snapshot filters like get_tariffs_for_user."""
+
+from __future__ import annotations
+
+import random
+import time
+from types import MappingProxyType, SimpleNamespace
+
+import pytest
+
+from app.database.models import PromoGroup, Tariff
+from app.services.pricing_catalog import CatalogSnapshot
+from app.services.pricing_engine import PricingContext, PricingEngine, pricing_engine
+
+
+_PERIODS = (1, 7, 14, 30, 60, 90, 180, 360)
+
+
+def _random_promo_group(rng: random.Random, group_id: int) -> PromoGroup:
+    return PromoGroup(
+        id=group_id,
+        name=f'group-{group_id}',
+        is_default=False,
+        period_discounts={str(period): rng.randint(0, 60) for period in rng.sample(_PERIODS, rng.randint(0, 4))},
+        device_discount_percent=rng.choice((0, 0, 10, 25, 100)),
+    )
+
+
+def _random_tariff(rng: random.Random, tariff_id: int, groups: list[PromoGroup]) -> Tariff:
+    is_daily = rng.random() < 0.2
+    return Tariff(
+        id=tariff_id,
+        name=f'tariff-{tariff_id}',
+        is_active=True,
+        is_daily=is_daily,
+        daily_price_kopeks=rng.randint(0, 5_000) if is_daily else 0,
+        period_prices={str(period): rng.randint(0, 500_000) for period in rng.sample(_PERIODS, rng.randint(1, 5))},
+        device_limit=rng.randint(0, 5),
+        device_price_kopeks=rng.choice((None, 0, 5_000, 12_345)),
+        allowed_promo_groups=rng.sample(groups, rng.randint(0, len(groups))) if rng.random() < 0.4 else [],
+    )
+
+
+def _random_user(rng: random.Random, groups: list[PromoGroup]) -> SimpleNamespace:
+    promo_group = rng.choice([None, *groups])
+    return SimpleNamespace(
+        promo_group=promo_group,
+        promo_group_id=promo_group.id if promo_group else None,
+        promo_offer_discount_percent=rng.choice((0, 0, 5, 15, 50)),
+        promo_offer_discount_expires_at=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_quotes_equal_per_item_prices() -> None:
+    rng = random.Random(20260115)
+
+    for _ in range(200):
+        groups = [_random_promo_group(rng, group_id) for group_id in range(1, rng.randint(1, 4) + 1)]
+        tariffs = [_random_tariff(rng, tariff_id, groups) for tariff_id in range(1, rng.randint(1, 4) + 1)]
+        user = _random_user(rng, groups)
+        device_limits = rng.sample(range(8), rng.randint(1, 3))
+
+        quotes = pricing_engine.quote_tariffs(PricingContext.for_user(user), tariffs, device_limits=device_limits)
+
+        expected_keys = {
+            (tariff.id, period, limit)
+            for tariff in tariffs
+            for period in PricingEngine.quotable_periods(tariff)
+            for limit in device_limits
+        }
+        assert set(quotes) == expected_keys
+        for (tariff_id, period, limit), quote in quotes.items():
+            tariff = tariffs[tariff_id - 1]
+            single = await pricing_engine.calculate_tariff_purchase_price(tariff, period, device_limit=limit, user=user)
+            assert quote == single
+
+
+def test_included_devices_quote_matches_stacked_listing_price() -> None:
+    rng = random.Random(7)
+
+    for _ in range(200):
+        groups = [_random_promo_group(rng, 1)]
+        tariff = _random_tariff(rng, 1, groups)
+        tariff.allowed_promo_groups = []
+        user = _random_user(rng, groups)
+
+        quotes = pricing_engine.quote_tariffs(PricingContext.for_user(user), [tariff])
+
+        for period_str, price in tariff.period_prices.items():
+            period = int(period_str)
+            if price == 0 or (tariff.is_daily and period <= 1):
+                continue
+            group_pct = user.promo_group.get_discount_percent('period', period) if user.promo_group else 0
+            expected, _, _ = PricingEngine.apply_stacked_discounts(price, group_pct, user.promo_offer_discount_percent)
+            assert quotes[(1, period, tariff.device_limit)].final_total == expected
+
+
+def test_snapshot_filters_tariffs_by_promo_group() -> None:
+    vip = PromoGroup(id=5, name='vip', is_default=False)
+    public = Tariff(id=1, name='public', allowed_promo_groups=[])
+    restricted = Tariff(id=2, name='vip-only', allowed_promo_groups=[vip])
+    snapshot = CatalogSnapshot(
+        version=1,
+        loaded_at=time.monotonic(),
+        tariffs=(public, restricted),
+        servers=MappingProxyType({}),
+        promo_groups=MappingProxyType({vip.id: vip}),
+    )
+
+    assert snapshot.tariffs_for_user(SimpleNamespace(promo_group_id=None)) == [public]
+    assert snapshot.tariffs_for_user(SimpleNamespace(promo_group_id=5)) == [public, restricted]
+    assert snapshot.tariff(2) is restricted
+    assert snapshot.tariff(3) is None
@@ -0,0 +1,326 @@
+"""Incremental referral-contest leaderboard: rebuild, atomic updates, top-N/rank ordering and drift check."""
+
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from typing import Self
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.services.referral_contest_leaderboard as leaderboard_module
+from app.services.referral_contest_leaderboard import ContestLeaderboardStore, leaderboard_score
+
+
+def _bound(value: str | float) -> tuple[float, bool]:
+    if value == '+inf':
+        return float('inf'), False
+    if isinstance(value, str) and value.startswith('('):
+        return float(value[1:]), True
+    return float(value), False
+
+
+class _FakePipeline:
+    def __init__(self, redis: _FakeRedis) -> None:
+        self._redis = redis
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list:
+        results = [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+        self._calls.clear()
+        return results
+
+
+class _FakeRedis:
+    """Only the commands the leaderboard uses; ``evalsha`` mirrors the Lua record script."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, object] = {}
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def script_load(self, script: str) -> str:
+        return 'sha'
+
+    async def evalsha(
+        self,
+        sha,
+        numkeys,
+        ready,
+        scores,
+        totals,
+        dirty,
+        rebuilding,
+        member,
+        count_delta,
+        amount_delta,
+        shift,
+        cap,
+        dirty_ttl,
+    ):
+        if ready not in self.data or rebuilding in self.data:
+            self.data[dirty] = 1
+        if ready not in self.data:
+            return -1
+        hash_ = self.data.setdefault(totals, {})
+        member = str(member)
+        count = hash_[f'{member}:c'] = int(hash_.get(f'{member}:c', 0)) + count_delta
+        amount = hash_[f'{member}:a'] = int(hash_.get(f'{member}:a', 0)) + amount_delta
+        zset = self.data.setdefault(scores, {})
+        if count <= 0:
+            hash_.pop(f'{member}:c'), hash_.pop(f'{member}:a')
+            zset.pop(member, None)
+            return 0
+        zset[member] = float(count * shift + min(max(amount, 0), cap))
+        return count
+
+    async def eval(self, script, numkeys, ready, scores, totals, dirty, tmp_scores, tmp_totals, ttl, built_at):
+        """Mirrors the Lua swap script."""
+        if dirty in self.data:
+            await self.delete(dirty, tmp_scores, tmp_totals)
+            return 0
+        if tmp_scores in self.data:
+            await self.rename(tmp_scores, scores)
+            await self.rename(tmp_totals, totals)
+        else:
+            await self.delete(scores, totals)
+        self.data[ready] = built_at
+        return 1
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def rename(self, src, dst):
+        self.data[dst] = self.data.pop(src)
+        return True
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update({member: float(score) for member, score in mapping.items()})
+        return len(mapping)
+
+    async def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({field: str(value) for field, value in mapping.items()})
+        return len(mapping)
+
+    async def hmget(self, key, fields):
+        hash_ = self.data.get(key, {})
+        return [hash_.get(field) for field in fields]
+
+    def _sorted(self, key) -> list[tuple[str, float]]:
+        return sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+    async def zrange(self, key, start, end):
+        items = self._sorted(key)
+        return [member for member, _ in items[start : None if end == -1 else end + 1]]
+
+    async def zrevrange(self, key, start, end, withscores=False):
+        items = self._sorted(key)[::-1][start : None if end == -1 else end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    async def zrangebyscore(self, key, low, high):
+        return [member for member, score in self._sorted(key) if float(low) <= score <= float(high)]
+
+    async def zcount(self, key, low, high):
+        (low_value, low_open), (high_value, _) = _bound(low), _bound(high)
+        return sum(
+            1
+            for score in self.data.get(key, {}).values()
+            if (score > low_value if low_open else score >= low_value) and score <= high_value
+        )
+
+    async def zscore(self, key, member):
+        return self.data.get(key, {}).get(member)
+
+    async def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+
+def _reference(totals: dict[int, list[int]]) -> list[tuple[int, int, int]]:
+    rows = [(referrer_id, count, amount) for referrer_id, (count, amount) in totals.items() if count > 0]
+    return sorted(rows, key=lambda row: (-row[1], -row[2], row[0]))
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch) -> _FakeRedis:
+    client = _FakeRedis()
+    monkeypatch.setattr(leaderboard_module, 'cache', SimpleNamespace(_connected=True, redis_client=client))
+    return client
+
+
+@pytest.fixture
+def db() -> MagicMock:
+    session = MagicMock()
+    session.get = AsyncMock(return_value=SimpleNamespace(id=1, end_at=datetime.now(UTC) + timedelta(days=3)))
+    return session
+
+
+@pytest.mark.asyncio
+async def test_incremental_updates_match_sql_ordering(
+    redis: _FakeRedis, db: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rng = random.Random(36)
+    totals: dict[int, list[int]] = {}
+    # Суммы выше 2**32 проверяют порядок при усечённом счёте в sorted set
+    amounts = (0, 0, 10_000, 50_000, 2**32 + 7, 2**32 + 9)
+
+    for _ in range(300):
+        referrer = rng.randint(1, 40)
+        entry = totals.setdefault(referrer, [0, 0])
+        entry[0] += 1
+        entry[1] += rng.choice(amounts)
+
+    snapshot = _reference(totals)
+    monkeypatch.setattr(leaderboard_module, 'get_contest_referrer_totals', AsyncMock(return_value=snapshot))
+    store = ContestLeaderboardStore()
+    assert await store.rebuild(db, 1) == len(snapshot)
+
+    for _ in range(300):
+        referrer = rng.randint(1, 50)
+        amount = rng.choice(amounts)
+        entry = totals.setdefault(referrer, [0, 0])
+        entry[0] += 1
+        entry[1] += amount
+        await store.record(1, referrer, count_delta=1, amount_delta=amount)
+
+    expected = _reference(totals)
+    for limit in (None, 1, 3, 10, 100):
+        top = await store.top(db, 1, limit=limit)
+        assert [(e.referrer_id, e.referral_count, e.amount_kopeks) for e in top] == expected[:limit]
+
+    for position, (referrer_id, _, _) in enumerate(expected, start=1):
+        assert await store.rank(db, 1, referrer_id) == position
+    assert await store.rank(db, 1, 999) == 0
+    assert await store.size(db, 1) == len(expected)
+
+
+@pytest.mark.asyncio
+async def test_first_read_rebuilds_and_updates_wait_for_ready(
+    redis: _FakeRedis, db: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    totals = AsyncMock(return_value=[(7, 2, 300)])
+    monkeypatch.setattr(leaderboard_module, 'get_contest_referrer_totals', totals)
+    store = ContestLeaderboardStore()
+
+    await store.record(1, 7, count_delta=1, amount_delta=100)  # ещё не построен — пропускается
+    assert 'contest_leaderboard:{1}:totals' not in redis.data
+
+    top = await store.top(db, 1, limit=5)
+    await store.top(db, 1, limit=5)
+
+    assert [(e.referrer_id, e.referral_count, e.amount_kopeks) for e in top] == [(7, 2, 300)]
+    totals.assert_awaited_once()
+
+    await store.drop(1)
+    await store.top(db, 1)
+    assert totals.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_event_recorded_during_rebuild_is_not_lost(
+    redis: _FakeRedis, db: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """An event committed after the SQL snapshot makes the rebuild take a fresh one instead of dropping it."""
+    store = ContestLeaderboardStore()
+    snapshots = [[(7, 1, 100)], [(7, 1, 100), (8, 1, 0)]]
+
+    async def _totals(db, contest):
+        snapshot = snapshots.pop(0)
+        if len(snapshot) == 1:
+            # Событие реферера 8 закоммичено уже после снимка
+            await store.record(1, 8, count_delta=1)
+        return snapshot
+
+    monkeypatch.setattr(leaderboard_module, 'get_contest_referrer_totals', _totals)
+
+    assert await store.rebuild(db, 1) == 2
+
+    top = await store.top(db, 1)
+    assert [(e.referrer_id, e.referral_count, e.amount_kopeks) for e in top] == [(7, 1, 100), (8, 1, 0)]
+    assert 'contest_leaderboard:{1}:dirty' not in redis.data
+    assert 'contest_leaderboard:{1}:ready:rebuilding' not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_event_recorded_during_repair_of_built_leaderboard_is_not_lost(
+    redis: _FakeRedis, db: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A rebuild over a ready leaderboard must not rename its snapshot over an event applied to the live keys."""
+    store = ContestLeaderboardStore()
+    snapshots = [[(7, 1, 100)], [(7, 1, 100)], [(7, 1, 100), (8, 1, 0)]]
+
+    async def _totals(db, contest):
+        snapshot = snapshots.pop(0)
+        if len(snapshots) == 1:
+            # Лидерборд построен; событие реферера 8 закоммичено уже после снимка
+            await store.record(1, 8, count_delta=1)
+        return snapshot
+
+    monkeypatch.setattr(leaderboard_module, 'get_contest_referrer_totals', _totals)
+    assert await store.rebuild(db, 1) == 1
+
+    assert await store.rebuild(db, 1) == 2
+
+    top = await store.top(db, 1)
+    assert [(e.referrer_id, e.referral_count, e.amount_kopeks) for e in top] == [(7, 1, 100), (8, 1, 0)]
+    assert 'contest_leaderboard:{1}:dirty' not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_verify_reports_drift(redis: _FakeRedis, db: MagicMock, monkeypatch: pytest.MonkeyPatch) -> None:
+    totals = AsyncMock(return_value=[(1, 3, 0), (2, 1, 500)])
+    monkeypatch.setattr(leaderboard_module, 'get_contest_referrer_totals', totals)
+    store = ContestLeaderboardStore()
+    await store.rebuild(db, 1)
+    assert (await store.verify(db, 1)).is_consistent
+
+    await store.record(1, 2, count_delta=0, amount_delta=100)
+    await store.record(1, 3, count_delta=1)
+    totals.return_value = [(1, 3, 0), (2, 1, 500), (4, 1, 0)]
+
+    check = await store.verify(db, 1)
+    assert not check.is_consistent
+    assert (check.missing, check.unexpected, check.mismatched) == ((4,), (3,), (2,))
+
+
+@pytest.mark.asyncio
+async def test_unavailable_redis_falls_back(monkeypatch: pytest.MonkeyPatch, db: MagicMock) -> None:
+    monkeypatch.setattr(leaderboard_module, 'cache', SimpleNamespace(_connected=False, redis_client=None))
+    store = ContestLeaderboardStore()
+
+    await store.record(1, 7, count_delta=1)
+    assert await store.top(db, 1) is None
+    assert await store.rank(db, 1, 7) is None
+
+
+def test_score_orders_by_count_then_amount() -> None:
+    assert leaderboard_score(2, 0) > leaderboard_score(1, 2**40)
+    assert leaderboard_score(1, 500) > leaderboard_score(1, 100)
+    assert leaderboard_score(3, 2**40) < 2**53
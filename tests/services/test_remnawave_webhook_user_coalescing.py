@@ -0,0 +1,356 @@
+"""Tests for RemnaWave user-event coalescing in RemnaWaveWebhookService."""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.services.remnawave_webhook_service as webhook_module
+from app.services.remnawave_webhook_service import RemnaWaveWebhookService
+
+
+@pytest.fixture
+def webhook_service() -> RemnaWaveWebhookService:
+    service = RemnaWaveWebhookService(MagicMock())
+    service._USER_EVENT_COALESCE_WINDOW_SECONDS = 60.0
+    return service
+
+
+@pytest.fixture
+def fake_session(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    session = MagicMock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+
+    @asynccontextmanager
+    async def _session_factory():
+        yield session
+
+    monkeypatch.setattr(webhook_module, 'AsyncSessionLocal', _session_factory)
+    return session
+
+
+async def _cancel_flush(service: RemnaWaveWebhookService) -> None:
+    task = service._user_event_flush_task
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_user_events_coalesce_latest_state_wins(webhook_service: RemnaWaveWebhookService) -> None:
+    """Repeated user.modified for one user keep only the latest payload; one flush task is scheduled."""
+    for traffic in (1, 2, 3):
+        assert await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-1', 'traffic': traffic})
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-2', 'traffic': 9})
+
+    assert len(webhook_service._user_event_buffer) == 2
+    _, latest = webhook_service._user_event_buffer[('uuid:u-1', 'user.modified')]
+    assert latest['traffic'] == 3
+    assert webhook_service._user_event_flush_task is not None
+    assert len(webhook_service._user_event_pending_tasks) == 1
+
+    await _cancel_flush(webhook_service)
+
+
+@pytest.mark.asyncio
+async def test_flush_resolves_batch_once_in_arrival_order(
+    webhook_service: RemnaWaveWebhookService, fake_session: MagicMock
+) -> None:
+    """Flush prefetches every buffered user in one call and runs handlers by arrival order."""
+    await webhook_service.process_event(None, 'user.disabled', {'uuid': 'u-1'})
+    await webhook_service.process_event(None, 'user.enabled', {'uuid': 'u-1'})
+    await webhook_service.process_event(None, 'user.disabled', {'uuid': 'u-1', 'final': True})
+    await _cancel_flush(webhook_service)
+
+    webhook_service._prefetch_webhook_users = AsyncMock(return_value={})
+    webhook_service._process_user_event = AsyncMock(return_value=True)
+
+    await webhook_service._flush_user_events_after_delay(0)
+
+    webhook_service._prefetch_webhook_users.assert_awaited_once()
+    assert len(webhook_service._prefetch_webhook_users.await_args.args[1]) == 2
+    processed = [call.args[1] for call in webhook_service._process_user_event.await_args_list]
+    # enabled пришёл раньше последнего disabled — итоговое состояние «disabled»
+    assert processed == ['user.enabled', 'user.disabled']
+    assert webhook_service._process_user_event.await_args_list[-1].args[2] == {'uuid': 'u-1', 'final': True}
+    assert webhook_service._user_event_buffer == {}
+    assert fake_session.commit.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_one_off_event_drains_buffered_state_of_same_user(
+    webhook_service: RemnaWaveWebhookService,
+) -> None:
+    """user.deleted is processed immediately, after the buffered events of the same user."""
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-1'})
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-2'})
+    await _cancel_flush(webhook_service)
+
+    db = MagicMock()
+    db.commit = AsyncMock()
+    webhook_service._prefetch_webhook_users = AsyncMock(return_value={})
+    webhook_service._process_user_event = AsyncMock(return_value=True)
+
+    await webhook_service.process_event(db, 'user.deleted', {'uuid': 'u-1'})
+
+    processed = [call.args[1] for call in webhook_service._process_user_event.await_args_list]
+    assert processed == ['user.modified', 'user.deleted']
+    assert list(webhook_service._user_event_buffer) == [('uuid:u-2', 'user.modified')]
+
+
+class _JournalRedis:
+    """In-memory subset of Redis used by the user-event journal."""
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.sets: dict[str, set[str]] = {}
+        self.strings: dict[str, str] = {}
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        target = self.hashes.setdefault(key, {})
+        if field is not None:
+            target[field] = value
+        target.update(mapping or {})
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+        if not self.hashes.get(key):
+            self.hashes.pop(key, None)
+
+    async def hgetall(self, key):
+        return {field.encode(): value.encode() for field, value in self.hashes.get(key, {}).items()}
+
+    async def rename(self, source, destination):
+        if source not in self.hashes:
+            raise RuntimeError('ERR no such key')
+        self.hashes[destination] = self.hashes.pop(source)
+
+    async def set(self, key, value, ex=None):
+        self.strings[key] = value
+
+    async def exists(self, key):
+        return int(key in self.strings or key in self.hashes)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.strings.pop(key, None)
+            self.hashes.pop(key, None)
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    async def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+
+    async def smembers(self, key):
+        return {member.encode() for member in self.sets.get(key, set())}
+
+
+@pytest.fixture
+def journal_redis(monkeypatch: pytest.MonkeyPatch) -> _JournalRedis:
+    redis_client = _JournalRedis()
+    monkeypatch.setattr(webhook_module, 'cache', SimpleNamespace(_connected=True, redis_client=redis_client))
+    return redis_client
+
+
+@pytest.mark.asyncio
+async def test_start_claims_only_orphaned_journals(
+    webhook_service: RemnaWaveWebhookService, journal_redis: _JournalRedis
+) -> None:
+    """Journals of stopped processes are moved into ours; a live replica's journal is left alone."""
+    journal_redis.sets['remnawave_webhook:user_event_journals'] = {'dead', 'alive'}
+    journal_redis.strings['remnawave_webhook:user_events_owner:alive'] = '1'
+    journal_redis.hashes['remnawave_webhook:user_events:alive'] = {
+        'user.modified|uuid:u-9|1': json.dumps({'uuid': 'u-9'}),
+    }
+    journal_redis.hashes['remnawave_webhook:user_events:dead'] = {
+        'user.modified|uuid:u-1|4': json.dumps({'uuid': 'u-1', 'traffic': 4}),
+        'user.expired|tg:42|7': json.dumps({'telegramId': 42}),
+        'garbage': '{}',
+    }
+
+    await webhook_service.start()
+
+    assert webhook_service._user_event_buffer == {
+        ('uuid:u-1', 'user.modified'): (4, {'uuid': 'u-1', 'traffic': 4}),
+        ('tg:42', 'user.expired'): (7, {'telegramId': 42}),
+    }
+    assert webhook_service._user_event_seq == 7
+    own_journal = f'remnawave_webhook:user_events:{webhook_service._journal_instance_id}'
+    assert set(journal_redis.hashes) == {'remnawave_webhook:user_events:alive', own_journal}
+    assert set(journal_redis.hashes[own_journal]) == {'user.modified|uuid:u-1|4', 'user.expired|tg:42|7'}
+    assert journal_redis.sets['remnawave_webhook:user_event_journals'] == {
+        'alive',
+        webhook_service._journal_instance_id,
+    }
+
+    await _cancel_flush(webhook_service)
+    await webhook_service._release_journal()
+    assert f'remnawave_webhook:user_events_owner:{webhook_service._journal_instance_id}' not in journal_redis.strings
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_claims_journal_of_quickly_restarted_process(
+    webhook_service: RemnaWaveWebhookService, fake_session: MagicMock, journal_redis: _JournalRedis
+) -> None:
+    """A journal whose lease was still running at startup is picked up once the lease expires."""
+    webhook_service._USER_EVENT_JOURNAL_LEASE_SECONDS = 0.03
+    webhook_service._prefetch_webhook_users = AsyncMock(return_value={})
+    webhook_service._process_user_event = AsyncMock(return_value=True)
+    journal_redis.sets['remnawave_webhook:user_event_journals'] = {'previous'}
+    journal_redis.strings['remnawave_webhook:user_events_owner:previous'] = '1'
+    journal_redis.hashes['remnawave_webhook:user_events:previous'] = {
+        'user.modified|uuid:u-1|3': json.dumps({'uuid': 'u-1'}),
+    }
+
+    await webhook_service.start()
+    assert webhook_service._user_event_buffer == {}
+
+    del journal_redis.strings['remnawave_webhook:user_events_owner:previous']
+    await asyncio.sleep(0.05)
+
+    webhook_service._process_user_event.assert_awaited_once()
+    assert webhook_service._process_user_event.await_args.args[1:3] == ('user.modified', {'uuid': 'u-1'})
+    assert 'remnawave_webhook:user_events:previous' not in journal_redis.hashes
+    assert webhook_service._journal_key not in journal_redis.hashes
+
+    await _cancel_flush(webhook_service)
+    await webhook_service._release_journal()
+
+
+@pytest.mark.asyncio
+async def test_flush_does_not_overtake_journal_write(
+    webhook_service: RemnaWaveWebhookService, fake_session: MagicMock, journal_redis: _JournalRedis
+) -> None:
+    """An event is flushed only after its journal entry is written, so its HDEL can't precede the HSET."""
+    webhook_service._prefetch_webhook_users = AsyncMock(return_value={})
+    webhook_service._process_user_event = AsyncMock(return_value=True)
+    hset_started, release_hset = asyncio.Event(), asyncio.Event()
+    original_hset = journal_redis.hset
+
+    async def _slow_hset(*args, **kwargs):
+        hset_started.set()
+        await release_hset.wait()
+        await original_hset(*args, **kwargs)
+
+    journal_redis.hset = _slow_hset
+    enqueue = asyncio.create_task(webhook_service.process_event(None, 'user.modified', {'uuid': 'u-1'}))
+    await hset_started.wait()
+    flush = asyncio.create_task(webhook_service._flush_user_events())
+    await asyncio.sleep(0)
+    release_hset.set()
+    await asyncio.gather(enqueue, flush)
+    await _cancel_flush(webhook_service)
+
+    webhook_service._process_user_event.assert_awaited_once()
+    assert webhook_service._journal_key not in journal_redis.hashes
+
+
+@pytest.mark.asyncio
+async def test_failed_event_does_not_stop_batch_and_stays_journaled(
+    webhook_service: RemnaWaveWebhookService, fake_session: MagicMock, journal_redis: _JournalRedis
+) -> None:
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-1'})
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-2'})
+    await _cancel_flush(webhook_service)
+
+    webhook_service._prefetch_webhook_users = AsyncMock(return_value={})
+    webhook_service._process_user_event = AsyncMock(side_effect=[RuntimeError('db is gone'), True])
+
+    await webhook_service._flush_user_events_after_delay(0)
+
+    assert webhook_service._process_user_event.await_count == 2
+    fake_session.rollback.assert_awaited_once()
+    journal = journal_redis.hashes[webhook_service._journal_key]
+    assert list(journal) == ['user.modified|uuid:u-1|1']
+
+
+@pytest.mark.asyncio
+async def test_direct_event_waits_for_in_flight_flush_of_same_user(
+    webhook_service: RemnaWaveWebhookService, fake_session: MagicMock
+) -> None:
+    """user.deleted arriving while the flush applies the user's buffered events is handled after them."""
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-1'})
+    await _cancel_flush(webhook_service)
+
+    processed: list[str] = []
+    release = asyncio.Event()
+
+    async def _process(db, event_name, data, handler, **kwargs):
+        processed.append(f'{event_name}:start')
+        if event_name == 'user.modified':
+            await release.wait()
+        processed.append(f'{event_name}:end')
+        return True
+
+    webhook_service._prefetch_webhook_users = AsyncMock(return_value={})
+    webhook_service._process_user_event = _process
+
+    flush = asyncio.create_task(webhook_service._flush_user_events_after_delay(0))
+    await asyncio.sleep(0.01)
+    direct = asyncio.create_task(webhook_service.process_event(fake_session, 'user.deleted', {'uuid': 'u-1'}))
+    await asyncio.sleep(0.01)
+    assert processed == ['user.modified:start']
+
+    release.set()
+    await asyncio.gather(flush, direct)
+
+    assert processed == ['user.modified:start', 'user.modified:end', 'user.deleted:start', 'user.deleted:end']
+    assert webhook_service._user_event_user_locks == {}
+
+
+@pytest.mark.asyncio
+async def test_only_one_flush_runs_and_late_events_get_a_new_window(
+    webhook_service: RemnaWaveWebhookService, fake_session: MagicMock
+) -> None:
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-1'})
+    await _cancel_flush(webhook_service)
+
+    release = asyncio.Event()
+    running = 0
+    max_running = 0
+
+    async def _process(db, event_name, data, handler, **kwargs):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await release.wait()
+        running -= 1
+        return True
+
+    webhook_service._prefetch_webhook_users = AsyncMock(return_value={})
+    webhook_service._process_user_event = _process
+
+    webhook_service._schedule_user_event_flush(0)
+    first = webhook_service._user_event_flush_task
+    await asyncio.sleep(0.01)
+    # Событие пришло во время flush'а: новая задача не планируется, пока идёт текущая
+    await webhook_service.process_event(None, 'user.modified', {'uuid': 'u-2'})
+    assert webhook_service._user_event_flush_task is first
+    webhook_service._schedule_user_event_flush(0)
+    await asyncio.sleep(0.01)
+    assert max_running == 1
+
+    release.set()
+    await first
+    await asyncio.sleep(0.01)
+    assert max_running == 1
+    assert webhook_service._user_event_buffer == {}
+    await _cancel_flush(webhook_service)
+
+
+def test_events_without_window_are_not_coalesced(webhook_service: RemnaWaveWebhookService) -> None:
+    assert webhook_service.is_coalesced_event('user.modified')
+    assert not webhook_service.is_coalesced_event('user.deleted')
+    assert not webhook_service.is_coalesced_event('torrent_blocker.report')
+
+    webhook_service._USER_EVENT_COALESCE_WINDOW_SECONDS = 0
+    assert not webhook_service.is_coalesced_event('user.modified')
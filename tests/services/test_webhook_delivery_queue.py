@@ -0,0 +1,130 @@
+"""Outbound webhook queue: outbox enqueue, retries with backoff and per-endpoint circuit breaker."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.services.webhook_service as webhook_module
+from app.config import settings
+from app.services.webhook_service import DeliveryResult, WebhookService, WebhookTarget, _DeliveryJob
+
+
+def _session() -> MagicMock:
+    db = MagicMock()
+    db.commit = AsyncMock()
+    db.flush = AsyncMock()
+    return db
+
+
+def _job(webhook_id: int = 1, attempt_number: int = 0) -> _DeliveryJob:
+    return _DeliveryJob(
+        delivery_id=100 + attempt_number,
+        target=WebhookTarget(id=webhook_id, url='https://example.com/hook', secret=None),
+        event_type='user.created',
+        payload={'user_id': 1},
+        attempt_number=attempt_number,
+    )
+
+
+def _http_result(status: str) -> DeliveryResult:
+    return DeliveryResult(
+        webhook=None,
+        event_type='user.created',
+        payload={},
+        status=status,
+        response_status=200 if status == 'success' else 502,
+        error_message=None if status == 'success' else 'HTTP 502',
+    )
+
+
+@pytest.mark.asyncio
+async def test_enqueue_writes_pending_rows_without_http(monkeypatch: pytest.MonkeyPatch) -> None:
+    service = WebhookService()
+    webhooks = [SimpleNamespace(id=1, url='https://a', secret=None), SimpleNamespace(id=2, url='https://b', secret='s')]
+    load_targets = AsyncMock(return_value=webhooks)
+    monkeypatch.setattr(webhook_module, 'get_active_webhooks_for_event', load_targets)
+    service._deliver_webhook_http = AsyncMock()
+
+    db = _session()
+    created_at = datetime(2026, 1, 1, tzinfo=UTC)
+    assert await service.enqueue(db, 'user.created', {'user_id': 5, 'created_at': created_at}) == 2
+    assert await service.enqueue(db, 'user.created', {'user_id': 6}, commit=False) == 2
+
+    rows = db.add_all.call_args_list[0].args[0]
+    assert [row.webhook_id for row in rows] == [1, 2]
+    assert {row.status for row in rows} == {'pending'}
+    assert rows[0].payload == {'user_id': 5, 'created_at': str(created_at)}
+    db.commit.assert_awaited_once()
+    db.flush.assert_awaited_once()
+    load_targets.assert_awaited_once()
+    service._deliver_webhook_http.assert_not_called()
+
+    service.invalidate_targets()
+    await service.enqueue(db, 'user.created', {'user_id': 7})
+    assert load_targets.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_attempt_is_rescheduled_then_given_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, 'WEBHOOK_DELIVERY_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(settings, 'WEBHOOK_DELIVERY_CIRCUIT_THRESHOLD', 100)
+    service = WebhookService()
+    service._deliver_webhook_http = AsyncMock(return_value=_http_result('failed'))
+
+    retry = await service._attempt(_job(attempt_number=0))
+    assert retry['status'] == 'pending'
+    assert retry['attempt_number'] == 1
+    assert retry['next_retry_at'] > datetime.now(UTC)
+
+    final = await service._attempt(_job(attempt_number=2))
+    assert final['status'] == 'failed'
+    assert final['next_retry_at'] is None
+
+    service._deliver_webhook_http = AsyncMock(return_value=_http_result('success'))
+    delivered = await service._attempt(_job(attempt_number=1))
+    assert delivered['status'] == 'success'
+    assert delivered['delivered_at'] is not None
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_defers_without_spending_attempts(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, 'WEBHOOK_DELIVERY_CIRCUIT_THRESHOLD', 2)
+    service = WebhookService()
+    service._deliver_webhook_http = AsyncMock(return_value=_http_result('failed'))
+
+    await service._attempt(_job(webhook_id=1))
+    await service._attempt(_job(webhook_id=1))
+    deferred = await service._attempt(_job(webhook_id=1))
+    other = await service._attempt(_job(webhook_id=2))
+
+    assert 'status' not in deferred
+    assert deferred['deferred_until'] > datetime.now(UTC)
+    assert other['status'] == 'pending'
+    assert service._deliver_webhook_http.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_process_due_deliveries_records_batch_once() -> None:
+    service = WebhookService()
+    service._claim_due_deliveries = AsyncMock(return_value=[_job(webhook_id=1), _job(webhook_id=2)])
+    service._deliver_webhook_http = AsyncMock(return_value=_http_result('success'))
+    service._record_outcomes = AsyncMock()
+
+    assert await service.process_due_deliveries() == 2
+
+    service._record_outcomes.assert_awaited_once()
+    outcomes = service._record_outcomes.await_args.args[0]
+    assert [outcome['status'] for outcome in outcomes] == ['success', 'success']
+
+
+def test_delivery_lease_covers_a_batch_sent_to_one_endpoint(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, 'WEBHOOK_DELIVERY_WORKERS', 8)
+    monkeypatch.setattr(settings, 'WEBHOOK_DELIVERY_PER_ENDPOINT_CONCURRENCY', 2)
+
+    # 100 доставок по 2 параллельно, каждая до 10с таймаута
+    assert WebhookService._delivery_lease_seconds(100) >= 500
+    assert WebhookService._delivery_lease_seconds(1) < WebhookService._delivery_lease_seconds(100)
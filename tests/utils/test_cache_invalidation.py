@@ -0,0 +1,88 @@
+"""Cross-process cache invalidation bus: key-level reloads, gap detection and version catch-up."""
+
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.utils.cache_invalidation as bus_module
+from app.utils.cache_invalidation import CacheInvalidationBus
+
+
+@pytest.fixture
+def redis_client(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    client = MagicMock()
+    client.incr = AsyncMock(return_value=1)
+    client.publish = AsyncMock()
+    client.mget = AsyncMock(return_value=[None])
+    monkeypatch.setattr(bus_module, 'cache', SimpleNamespace(_connected=True, redis_client=client))
+    return client
+
+
+def _message(topic: str, version: int, keys: list[str] | None, origin: str = 'other') -> str:
+    return json.dumps({'topic': topic, 'version': version, 'keys': keys, 'origin': origin})
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_other_process_with_changed_keys(redis_client: MagicMock) -> None:
+    writer, reader = CacheInvalidationBus(), CacheInvalidationBus()
+    writer_handler, reader_handler = AsyncMock(), AsyncMock()
+    writer.register('system_settings', writer_handler)
+    reader.register('system_settings', reader_handler)
+    await reader.check_versions()  # точка отсчёта: версия 0
+
+    await writer.publish('system_settings', ['PRICE_30_DAYS'])
+    envelope = redis_client.publish.await_args.args[1]
+
+    await writer.handle_message(envelope)
+    await reader.handle_message(envelope)
+    await reader.handle_message(envelope)  # дубликат игнорируется
+
+    writer_handler.assert_not_awaited()
+    reader_handler.assert_awaited_once_with(frozenset({'PRICE_30_DAYS'}))
+
+
+@pytest.mark.asyncio
+async def test_version_gap_triggers_full_reload(redis_client: MagicMock) -> None:
+    bus = CacheInvalidationBus()
+    handler = AsyncMock()
+    bus.register('rules', handler)
+    await bus.check_versions()
+
+    await bus.handle_message(_message('rules', 1, ['ru']))
+    await bus.handle_message(_message('rules', 3, ['en']))
+
+    assert [call.args[0] for call in handler.await_args_list] == [frozenset({'ru'}), None]
+
+
+@pytest.mark.asyncio
+async def test_periodic_check_catches_up_missed_messages(redis_client: MagicMock) -> None:
+    bus = CacheInvalidationBus()
+    handler = AsyncMock(side_effect=[RuntimeError('db down'), None])
+    bus.register('button_styles', handler)
+
+    redis_client.mget.return_value = [b'4']
+    await bus.check_versions()
+    handler.assert_not_awaited()
+
+    redis_client.mget.return_value = [b'6']
+    await bus.check_versions()  # обработчик упал — версия не сдвигается
+    await bus.check_versions()
+
+    assert handler.await_count == 2
+    assert handler.await_args.args == (None,)
+    await bus.check_versions()
+    assert handler.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_publish_after_commit_without_session_publishes_immediately(redis_client: MagicMock) -> None:
+    bus = CacheInvalidationBus()
+
+    await bus.publish_after_commit(object(), 'system_settings', ['SALES_MODE'])
+
+    redis_client.incr.assert_awaited_once()
+    assert json.loads(redis_client.publish.await_args.args[1])['keys'] == ['SALES_MODE']
@@ -0,0 +1,116 @@
+"""Tag-based cache invalidation and the KEYS guard in CacheService."""
+
+from __future__ import annotations
+
+import fnmatch
+from typing import Self
+
+import pytest
+
+from app.config import settings
+from app.utils.cache import CacheService
+
+
+class _FakePipeline:
+    def __init__(self, redis: _FakeRedis) -> None:
+        self._redis = redis
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list:
+        results = [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+        self._calls.clear()
+        return results
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, object] = {}
+        self.commands: list[str] = []
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        return True
+
+    async def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+        return len(members)
+
+    async def expire(self, key, seconds, nx=False, gt=False):
+        return True
+
+    async def persist(self, key):
+        return True
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def unlink(self, *keys):
+        self.commands.append('UNLINK')
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def dbsize(self):
+        return len(self.data)
+
+    async def keys(self, pattern):
+        self.commands.append('KEYS')
+        return [key for key in self.data if fnmatch.fnmatch(key, pattern)]
+
+    async def scan_iter(self, match, count):
+        self.commands.append('SCAN')
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+
+@pytest.fixture
+def service() -> CacheService:
+    service = CacheService()
+    service.redis_client = _FakeRedis()
+    service._connected = True
+    return service
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_removes_only_tagged_keys(service: CacheService) -> None:
+    await service.set('available_countries:all', [1], 300, tags=['available_countries'])
+    await service.set('available_countries:5', [2], 60, tags=['available_countries'])
+    await service.set('unrelated', 1, 60)
+
+    assert await service.invalidate_tags('available_countries') == 2
+
+    assert set(service.redis_client.data) == {'unrelated'}
+    assert 'KEYS' not in service.redis_client.commands
+    assert await service.invalidate_tags('available_countries') == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_pattern_uses_scan_on_large_keyspace(
+    service: CacheService, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for index in range(5):
+        await service.set(f'legacy:{index}', index)
+    await service.set('other', 1)
+
+    monkeypatch.setattr(settings, 'CACHE_KEYS_COMMAND_MAX_KEYSPACE', 3)
+    assert await service.delete_pattern('legacy:*') == 5
+    assert service.redis_client.commands[0] == 'SCAN'
+
+    monkeypatch.setattr(settings, 'CACHE_KEYS_COMMAND_MAX_KEYSPACE', 100)
+    assert await service.get_keys('*') == ['other']
+    assert service.redis_client.commands[-1] == 'KEYS'
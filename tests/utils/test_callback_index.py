@@ -0,0 +1,102 @@
+"""Callback dispatch index: filter classification, same handler as the linear chain, fallback and rebuild."""
+
+from __future__ import annotations
+
+import pytest
+from aiogram import Dispatcher, F
+from aiogram.dispatcher.event.handler import FilterObject
+from aiogram.filters import StateFilter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import CallbackQuery, User
+
+from app.utils.callback_index import (
+    CallbackDispatchIndex,
+    classify_filter,
+    first_matching_handler,
+    setup_callback_index,
+)
+
+
+class _Form(StatesGroup):
+    waiting = State()
+
+
+def _callback(data: str | None) -> CallbackQuery:
+    return CallbackQuery(id='1', from_user=User(id=1, is_bot=False, first_name='T'), chat_instance='c', data=data)
+
+
+def _handler(name: str):
+    async def handler(callback: CallbackQuery) -> str:
+        return name
+
+    handler.__name__ = name
+    return handler
+
+
+@pytest.mark.parametrize(
+    ('magic', 'expected'),
+    [
+        (F.data == 'menu', ('exact', ('menu',))),
+        (F.data.in_(['a', 'b']), ('exact', ('a', 'b'))),
+        (F.data.startswith('buy_'), ('prefix', ('buy_',))),
+        (F.data.startswith(('x_', 'y_')), ('prefix', ('x_', 'y_'))),
+        (F.data.startswith('buy_') & ~F.data.endswith('_back'), ('prefix', ('buy_',))),
+        (F.data.startswith('buy_') | (F.data == 'menu'), None),
+        (F.data.regexp(r'^\d+$'), None),
+        (F.data != 'menu', None),
+        (F.message.text == 'menu', None),
+    ],
+)
+def test_classify_filter(magic, expected) -> None:
+    assert classify_filter(FilterObject(magic)) == expected
+
+
+def _dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+    register = dp.callback_query.register
+    register(_handler('buy_in_state'), F.data.startswith('buy_'), StateFilter(_Form.waiting))
+    register(_handler('buy_exact'), F.data == 'buy_10')
+    register(_handler('lambda_any_digit'), lambda c: (c.data or '').endswith('7'))
+    register(_handler('buy_prefix'), F.data.startswith('buy_'))
+    register(_handler('admin_or_menu'), F.data.startswith('admin_') | (F.data == 'menu'))
+    register(_handler('menu'), F.data == 'menu')
+    register(_handler('settings'), F.data.in_({'settings', 'prefs'}))
+    register(_handler('no_data'), F.data.is_(None))
+    return dp
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('raw_state', [None, _Form.waiting.state])
+@pytest.mark.parametrize(
+    'data', ['buy_10', 'buy_17', 'buy_', 'menu', 'admin_x', 'prefs', 'settings_1', 'unknown', 'buy', '', None]
+)
+async def test_index_picks_the_same_handler_as_the_linear_chain(data, raw_state) -> None:
+    observer = _dispatcher().callback_query
+    index = CallbackDispatchIndex(observer)
+    event = _callback(data)
+
+    linear = await first_matching_handler(observer.handlers, event, raw_state=raw_state)
+    indexed = await first_matching_handler(index.candidates(data), event, raw_state=raw_state)
+
+    assert indexed is linear
+
+
+@pytest.mark.asyncio
+async def test_setup_replaces_trigger_and_picks_up_late_registrations() -> None:
+    dp = _dispatcher()
+    [index] = setup_callback_index(dp)
+
+    assert await dp.callback_query.trigger(_callback('buy_10'), raw_state=None) == 'buy_exact'
+    # admin_or_menu, лямбда и F.data.is_(None) не индексируются и проверяются всегда
+    assert [handler.callback.__name__ for handler in index.candidates('buy_10')] == [
+        'buy_in_state',
+        'buy_exact',
+        'lambda_any_digit',
+        'buy_prefix',
+        'admin_or_menu',
+        'no_data',
+    ]
+
+    dp.callback_query.register(_handler('late'), F.data == 'late')
+
+    assert await dp.callback_query.trigger(_callback('late'), raw_state=None) == 'late'
@@ -0,0 +1,38 @@
+"""JSON log format (LOG_FORMAT=json)."""
+
+from __future__ import annotations
+
+import json
+import logging
+
+import structlog
+
+from app.logging_config import _json_dumps, _json_processors
+
+
+def _record(level: int, msg: str = 'message', name: str = 'app.test') -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+def test_json_formatter_renders_one_object_per_line() -> None:
+    formatter = structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=[structlog.stdlib.add_log_level, structlog.stdlib.add_logger_name],
+        processors=_json_processors(),
+    )
+    try:
+        raise ValueError('bad')
+    except ValueError as error:
+        record = _record(logging.ERROR, 'Платёж не прошёл: %s')
+        record.args = (42,)
+        record.exc_info = (type(error), error, error.__traceback__)
+
+    payload = json.loads(formatter.format(record))
+
+    assert payload['event'] == 'Платёж не прошёл: 42'
+    assert payload['level'] == 'error'
+    assert payload['logger'] == 'app.test'
+    assert 'ValueError: bad' in payload['exception']
+
+
+def test_json_dumps_handles_non_serializable_values() -> None:
+    assert json.loads(_json_dumps({'value': object, 1: 'x'}, default=str)) == {'value': str(object), '1': 'x'}
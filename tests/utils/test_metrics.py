@@ -0,0 +1,114 @@
+"""In-process metrics registry: exposition format, histogram buckets, collectors and label normalisation."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.middlewares.metrics import HANDLER_DURATION, HANDLER_ERRORS, MetricsMiddleware
+from app.utils.metrics import MetricsRegistry, endpoint_template, statement_fingerprint
+
+
+def _samples(text: str) -> dict[str, str]:
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if line and not line.startswith('#'))
+
+
+def test_render_counters_and_gauges_with_escaped_labels() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('path',))
+    requests.labels('/a"b\\c\n').inc()
+    requests.labels('/a"b\\c\n').inc(2)
+    registry.gauge('depth', 'Queue depth').set(7)
+
+    text = registry.render()
+
+    assert '# TYPE remnabot_requests_total counter' in text
+    assert '# TYPE remnabot_depth gauge' in text
+    samples = _samples(text)
+    assert samples['remnabot_requests_total{path="/a\\"b\\\\c\\n"}'] == '3'
+    assert samples['remnabot_depth'] == '7'
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latency', ('op',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels('read').observe(value)
+
+    samples = _samples(registry.render())
+
+    assert samples['remnabot_latency_seconds_bucket{op="read",le="0.1"}'] == '2'
+    assert samples['remnabot_latency_seconds_bucket{op="read",le="1"}'] == '3'
+    assert samples['remnabot_latency_seconds_bucket{op="read",le="+Inf"}'] == '4'
+    assert samples['remnabot_latency_seconds_count{op="read"}'] == '4'
+    assert float(samples['remnabot_latency_seconds_sum{op="read"}']) == pytest.approx(3.65)
+
+
+def test_registry_reuses_metrics_and_rejects_conflicts() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter('events_total', 'Events', ('kind',))
+
+    assert registry.counter('events_total', 'Events', ('kind',)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge('events_total', 'Events', ('kind',))
+    with pytest.raises(ValueError):
+        counter.labels('a', 'b')
+
+
+@pytest.mark.asyncio
+async def test_collectors_run_before_exposition_and_failures_are_isolated() -> None:
+    registry = MetricsRegistry()
+    depth = registry.gauge('queue_depth', 'Depth', ('queue',))
+
+    async def collect_async() -> None:
+        depth.labels('async').set(4)
+
+    def broken() -> None:
+        raise RuntimeError('boom')
+
+    registry.register_collector('sync', lambda: depth.labels('sync').set(2))
+    registry.register_collector('broken', broken)
+    registry.register_collector('async', collect_async)
+
+    samples = _samples(await registry.expose())
+
+    assert samples['remnabot_queue_depth{queue="sync"}'] == '2'
+    assert samples['remnabot_queue_depth{queue="async"}'] == '4'
+
+
+@pytest.mark.parametrize(
+    ('statement', 'expected'),
+    [
+        ('SELECT users.id FROM users WHERE users.id = $1', ('SELECT', 'users')),
+        ('INSERT INTO "public"."transactions" (amount) VALUES ($1)', ('INSERT', 'transactions')),
+        ('/* comment */ UPDATE subscriptions SET status=$1', ('UPDATE', 'subscriptions')),
+        ('WITH t AS (SELECT 1) DELETE FROM cart_items WHERE id IN (SELECT * FROM t)', ('DELETE', 'cart_items')),
+        ('BEGIN', ('BEGIN', '')),
+        ('', ('OTHER', '')),
+    ],
+)
+def test_statement_fingerprint(statement: str, expected: tuple[str, str]) -> None:
+    assert statement_fingerprint(statement) == expected
+
+
+def test_endpoint_template_hides_identifiers() -> None:
+    assert endpoint_template('/api/users/3fa85f64-5717-4562-b3fc-2c963f66afa6') == '/api/users/:uuid'
+    assert endpoint_template('/api/users/by-telegram-id/123456789?size=10') == '/api/users/by-telegram-id/:id'
+    assert endpoint_template('/api/sub/AbCdEfGhIjKlMnOpQrStUvWxYz012') == '/api/sub/:token'
+    assert endpoint_template('/api/nodes') == '/api/nodes'
+
+
+@pytest.mark.asyncio
+async def test_middleware_records_latency_and_errors() -> None:
+    async def sample_handler(event, data):
+        raise ValueError('bad input')
+
+    data = {'handler': SimpleNamespace(callback=sample_handler)}
+    name = f'{__name__}.test_middleware_records_latency_and_errors.<locals>.sample_handler'
+
+    with pytest.raises(ValueError):
+        await MetricsMiddleware('message')(sample_handler, object(), data)
+
+    assert HANDLER_ERRORS.labels('message', name, 'ValueError').value == 1
+    assert HANDLER_DURATION.labels('message', name).count == 1
@@ -0,0 +1,166 @@
+"""Redis registry: shared pools per name, circuit breaking for every client, pool stats and shutdown."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+
+from app.config import settings
+from app.utils import redis_registry as registry_module
+from app.utils.redis_registry import PUBSUB_POOL, RedisCircuitOpenError, RedisRegistry
+
+
+class _FakePool:
+    created: list[_FakePool] = []
+
+    def __init__(self, url: str, **kwargs) -> None:
+        self.url = url
+        self.kwargs = kwargs
+        self.max_connections = kwargs['max_connections']
+        self._in_use_connections = set()
+        self._available_connections = []
+        self.closed = False
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> _FakePool:
+        pool = cls(url, **kwargs)
+        cls.created.append(pool)
+        return pool
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class _FakePipeline:
+    def __init__(self, client: _FakeRedis) -> None:
+        self.client = client
+
+    async def execute(self) -> list:
+        return await self.client.execute_command('EXEC')
+
+
+class _FakeRedis:
+    def __init__(self, connection_pool: _FakePool) -> None:
+        self.connection_pool = connection_pool
+        self.errors: list[Exception] = []
+        self.commands: list[tuple] = []
+
+    async def execute_command(self, *args, **options):
+        self.commands.append(args)
+        if self.errors:
+            raise self.errors.pop(0)
+        return b'PONG' if args == ('PING',) else 'OK'
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def ping(self):
+        return await self.execute_command('PING')
+
+    async def aclose(self, close_connection_pool: bool | None = None) -> None:
+        if close_connection_pool:
+            await self.connection_pool.aclose()
+
+
+@pytest.fixture
+def registry(monkeypatch: pytest.MonkeyPatch) -> RedisRegistry:
+    _FakePool.created = []
+    monkeypatch.setattr(registry_module, 'redis', SimpleNamespace(Redis=_FakeRedis, BlockingConnectionPool=_FakePool))
+    monkeypatch.setattr(settings, 'REDIS_URL', 'redis://redis:6379/0')
+    monkeypatch.setattr(settings, 'REDIS_MAX_CONNECTIONS', 7)
+    monkeypatch.setattr(settings, 'REDIS_SOCKET_TIMEOUT_SECONDS', 3.0)
+    monkeypatch.setattr(settings, 'REDIS_POOL_TIMEOUT_SECONDS', 0)
+    monkeypatch.setattr(settings, 'REDIS_CIRCUIT_THRESHOLD', 2)
+    monkeypatch.setattr(settings, 'REDIS_CIRCUIT_OPEN_SECONDS', 30.0)
+    return RedisRegistry()
+
+
+def test_named_clients_share_one_pool_and_pubsub_has_its_own(registry: RedisRegistry) -> None:
+    cache_client = registry.client('cache')
+
+    assert registry.client('cache') is cache_client
+    assert registry.client('cart').connection_pool is cache_client.connection_pool
+
+    subscriber = registry.client('listener', pool=PUBSUB_POOL)
+    assert subscriber.connection_pool is not cache_client.connection_pool
+
+    shared, pubsub = _FakePool.created
+    assert shared.url == 'redis://redis:6379/0'
+    assert shared.kwargs['max_connections'] == 7
+    assert shared.kwargs['timeout'] is None  # 0 — ждать свободное соединение без ограничения
+    assert shared.kwargs['socket_timeout'] == 3.0
+    assert pubsub.kwargs['socket_timeout'] is None
+
+
+@pytest.mark.asyncio
+async def test_connection_errors_open_the_circuit_for_every_client(registry: RedisRegistry) -> None:
+    cart = registry.client('cart')
+    cart.errors = [RedisConnectionError('refused'), RedisConnectionError('refused')]
+
+    for _ in range(2):
+        with pytest.raises(RedisConnectionError):
+            await cart.execute_command('GET', 'key')
+    assert registry.circuit_open
+
+    fsm = registry.client('fsm')
+    with pytest.raises(RedisCircuitOpenError):
+        await fsm.execute_command('GET', 'state')
+    with pytest.raises(RedisError):
+        await fsm.pipeline().execute()
+    assert fsm.commands == []
+
+    # Пауза истекла: первая успешная команда замыкает размыкатель
+    registry._circuit.open_until = 0.0
+    assert await fsm.execute_command('GET', 'state') == 'OK'
+    assert not registry.circuit_open
+    assert registry._circuit.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_command_errors_do_not_trip_the_circuit(registry: RedisRegistry) -> None:
+    client = registry.client('cache')
+    client.errors = [RedisError('WRONGTYPE'), RedisError('WRONGTYPE'), RedisError('WRONGTYPE')]
+
+    for _ in range(3):
+        with pytest.raises(RedisError):
+            await client.pipeline().execute()
+
+    assert not registry.circuit_open
+    assert registry._circuit.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_health_reports_pools_and_close_releases_them(registry: RedisRegistry) -> None:
+    registry.client('cache').connection_pool._in_use_connections.update({'a', 'b'})
+
+    health = await registry.health()
+
+    assert health['status'] == 'ok'
+    assert health['latency_ms'] is not None
+    assert health['clients'] == ['cache', 'health']
+    assert health['pools'] == {'default': {'in_use': 2, 'idle': 0, 'max': 7}}
+
+    registry._circuit.open_until = float('inf')
+    assert (await registry.health())['status'] == 'unavailable'
+
+    pool = _FakePool.created[0]
+    await registry.close()
+    assert pool.closed
+    assert registry.pool_stats() == {}
+    assert registry.client('cache').connection_pool is not pool
+
+
+@pytest.mark.asyncio
+async def test_fsm_storage_close_leaves_shared_pool_to_registry(registry: RedisRegistry) -> None:
+    client = registry.client('fsm')
+    pool = _FakePool.created[0]
+
+    await client.aclose(close_connection_pool=True)  # так закрывает клиента RedisStorage.close() aiogram
+
+    assert not pool.closed
+    assert registry.client('cache').connection_pool is pool
+
+    await registry.close()
+    assert pool.closed
@@ -0,0 +1,192 @@
+"""Startup orchestrator: dependency order, parallel stages, timeouts, background stages and the critical path."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.utils.startup_orchestrator import StartupOrchestrator
+from app.utils.startup_timeline import StartupTimeline
+
+
+class _Logger:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict]] = []
+
+    def info(self, event: str, **kwargs) -> None:
+        self.events.append((event, kwargs))
+
+    warning = error = exception = info
+
+
+def _orchestrator(parallel: bool = True) -> tuple[StartupOrchestrator, StartupTimeline]:
+    timeline = StartupTimeline(_Logger(), 'test')
+    return StartupOrchestrator(timeline, parallel=parallel), timeline
+
+
+def _statuses(timeline: StartupTimeline) -> dict[str, tuple[str, str]]:
+    return {step.title: (step.status_label, step.message) for step in timeline.steps}
+
+
+def _sleeper(order: list[str], name: str, delay: float):
+    async def stage(_handle) -> None:
+        order.append(f'{name}:start')
+        await asyncio.sleep(delay)
+        order.append(f'{name}:end')
+
+    return stage
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently_and_dependents_wait() -> None:
+    orchestrator, timeline = _orchestrator()
+    order: list[str] = []
+    orchestrator.stage('a', 'A')(_sleeper(order, 'a', 0.1))
+    orchestrator.stage('b', 'B')(_sleeper(order, 'b', 0.1))
+    orchestrator.stage('c', 'C', depends_on=('a', 'b'))(_sleeper(order, 'c', 0.0))
+
+    started = time.perf_counter()
+    await orchestrator.run()
+
+    assert time.perf_counter() - started < 0.18
+    assert order[:2] == ['a:start', 'b:start']
+    assert order.index('c:start') > max(order.index('a:end'), order.index('b:end'))
+    assert {status for status, _ in _statuses(timeline).values()} == {'Готово'}
+
+
+@pytest.mark.asyncio
+async def test_sequential_mode_keeps_declaration_order() -> None:
+    orchestrator, timeline = _orchestrator(parallel=False)
+    order: list[str] = []
+    orchestrator.stage('a', 'A')(_sleeper(order, 'a', 0.01))
+    orchestrator.stage('b', 'B')(_sleeper(order, 'b', 0.01))
+    orchestrator.stage('bg', 'BG', background=True)(_sleeper(order, 'bg', 0.01))
+
+    await orchestrator.run()
+
+    assert order == ['a:start', 'a:end', 'b:start', 'b:end', 'bg:start', 'bg:end']
+    assert timeline.critical_path == ['A', 'B', 'BG']
+
+
+def test_declaration_rejects_unknown_and_background_dependencies() -> None:
+    orchestrator, _ = _orchestrator()
+    orchestrator.stage('bg', 'BG', background=True)(_sleeper([], 'bg', 0))
+
+    with pytest.raises(ValueError, match='необъявленного'):
+        orchestrator.stage('x', 'X', depends_on=('missing',))(_sleeper([], 'x', 0))
+    with pytest.raises(ValueError, match='фоновый'):
+        orchestrator.stage('y', 'Y', depends_on=('bg',))(_sleeper([], 'y', 0))
+    with pytest.raises(ValueError, match='уже объявлен'):
+        orchestrator.stage('bg', 'BG again')(_sleeper([], 'bg', 0))
+
+
+@pytest.mark.asyncio
+async def test_timeout_becomes_a_warning_and_dependents_still_run() -> None:
+    orchestrator, timeline = _orchestrator()
+    order: list[str] = []
+    orchestrator.stage('slow', 'Slow', timeout=0.05)(_sleeper(order, 'slow', 10))
+    orchestrator.stage('next', 'Next', depends_on=('slow',))(_sleeper(order, 'next', 0))
+
+    await orchestrator.run()
+
+    statuses = _statuses(timeline)
+    assert statuses['Slow'] == ('Предупреждение', 'Прервано по таймауту 0.05с')
+    assert statuses['Next'][0] == 'Готово'
+    assert 'slow:end' not in order
+
+
+@pytest.mark.asyncio
+async def test_required_stage_timeout_fails_startup() -> None:
+    orchestrator, timeline = _orchestrator()
+    order: list[str] = []
+    orchestrator.stage('bot', 'Bot', timeout=0.05, fail_on_timeout=True)(_sleeper(order, 'bot', 10))
+    orchestrator.stage('services', 'Services', depends_on=('bot',))(_sleeper(order, 'services', 0))
+
+    with pytest.raises(TimeoutError):
+        await orchestrator.run()
+
+    assert _statuses(timeline)['Bot'] == ('Ошибка', 'Прервано по таймауту 0.05с')
+    assert order == ['bot:start']
+
+
+@pytest.mark.asyncio
+async def test_foreground_failure_cancels_remaining_stages() -> None:
+    orchestrator, timeline = _orchestrator()
+    order: list[str] = []
+
+    @orchestrator.stage('broken', 'Broken')
+    async def broken(_handle) -> None:
+        await asyncio.sleep(0.01)
+        raise RuntimeError('boom')
+
+    orchestrator.stage('long', 'Long')(_sleeper(order, 'long', 10))
+    orchestrator.stage('after', 'After', depends_on=('broken',))(_sleeper(order, 'after', 0))
+
+    with pytest.raises(RuntimeError, match='boom'):
+        await orchestrator.run()
+
+    assert order == ['long:start']
+    assert _statuses(timeline)['Broken'] == ('Ошибка', 'boom')
+    assert 'After' not in _statuses(timeline)
+
+
+@pytest.mark.asyncio
+async def test_background_stages_finish_after_run_and_failures_skip_dependents() -> None:
+    orchestrator, timeline = _orchestrator()
+    order: list[str] = []
+    orchestrator.stage('core', 'Core')(_sleeper(order, 'core', 0))
+
+    @orchestrator.stage('bg', 'Background', depends_on=('core',), background=True)
+    async def background(_handle) -> None:
+        await asyncio.sleep(0.05)
+        raise RuntimeError('panel is down')
+
+    orchestrator.stage('bg_next', 'Background next', depends_on=('bg',), background=True)(_sleeper(order, 'bg_next', 0))
+
+    await orchestrator.run()
+    assert 'Background' not in _statuses(timeline)
+
+    await orchestrator.wait_background()
+
+    statuses = _statuses(timeline)
+    assert statuses['Background'] == ('Ошибка', 'panel is down')
+    assert statuses['Background next'] == ('Пропущено', 'Не выполнены этапы: Background')
+    assert 'bg_next:start' not in order
+    assert any('Фоновые этапы запуска завершены' in event for event, _ in timeline.logger.events)
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_unfinished_background_stages() -> None:
+    orchestrator, _ = _orchestrator()
+    order: list[str] = []
+    orchestrator.stage('bg', 'Background', background=True)(_sleeper(order, 'bg', 10))
+
+    await orchestrator.run()
+    await asyncio.sleep(0)
+    await orchestrator.cancel()
+
+    assert order == ['bg:start']
+
+
+@pytest.mark.asyncio
+async def test_critical_path_follows_the_latest_dependency() -> None:
+    orchestrator, timeline = _orchestrator()
+    order: list[str] = []
+    orchestrator.stage('db', 'DB')(_sleeper(order, 'db', 0.01))
+    orchestrator.stage('fast', 'Fast', depends_on=('db',))(_sleeper(order, 'fast', 0.01))
+    orchestrator.stage('slow', 'Slow', depends_on=('db',))(_sleeper(order, 'slow', 0.06))
+    orchestrator.stage('bot', 'Bot', depends_on=('fast', 'slow'))(_sleeper(order, 'bot', 0.01))
+    orchestrator.stage('side', 'Side', depends_on=('db',))(_sleeper(order, 'side', 0.02))
+    orchestrator.stage('bg', 'Background', background=True)(_sleeper(order, 'bg', 0.2))
+
+    await orchestrator.run()
+
+    assert timeline.critical_path == ['DB', 'Slow', 'Bot']
+
+    timeline.log_summary()
+    summary = [event for event, _ in timeline.logger.events]
+    assert any('Критический путь:' in line for line in summary)
+    assert any('→ Slow' in line for line in summary)
+    await orchestrator.cancel()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Benchmark: callback handler resolution, linear filter chain vs. dispatch index.
+
+Registers the bot's real handler set on a fresh Dispatcher (app.bot.register_handlers)
+and, for every exact callback_data value and every registered prefix (with a suffix
+appended), finds the handler aiogram would pick: once by walking all callback_query
+handlers in order, once through CallbackDispatchIndex candidates. Handlers are not
+called. Also checks that both paths pick the same handler for every sample.
+
+Usage:
+    docker compose run --rm bot python tools/bench_callback_dispatch.py
+    docker compose run --rm bot python tools/bench_callback_dispatch.py --rounds 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import structlog
+from aiogram import Dispatcher
+from aiogram.types import CallbackQuery, User
+
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.bot import register_handlers
+from app.utils.callback_index import CallbackDispatchIndex, classify_filter, first_matching_handler
+
+
+def _samples(dp: Dispatcher) -> list[str]:
+    exact, prefixes = [], []
+    for handler in dp.callback_query.handlers:
+        for filter_object in handler.filters or ():
+            condition = classify_filter(filter_object)
+            if condition:
+                (exact if condition[0] == 'exact' else prefixes).extend(condition[1])
+                break
+    return list(dict.fromkeys(exact + [f'{prefix}1' for prefix in prefixes]))
+
+
+def _percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def _run(rounds: int) -> None:
+    dp = Dispatcher()
+    register_handlers(dp)
+    observer = dp.callback_query
+    index = CallbackDispatchIndex(observer)
+    samples = _samples(dp)
+    user = User(id=1, is_bot=False, first_name='Bench')
+    events = [CallbackQuery(id='1', from_user=user, chat_instance='c', data=data) for data in samples]
+
+    print(
+        f'{len(observer.handlers)} callback handlers, {index.indexed_count} indexed, '
+        f'{len(index.unindexed)} always checked; {len(samples)} callback_data samples x {rounds} rounds'
+    )
+
+    mismatches = 0
+    for event in events:
+        linear = await first_matching_handler(observer.handlers, event, raw_state=None)
+        if await first_matching_handler(index.candidates(event.data), event, raw_state=None) is not linear:
+            mismatches += 1
+            print(f'  MISMATCH: {event.data}')
+
+    for name, resolve in (
+        ('linear chain', lambda event: first_matching_handler(observer.handlers, event, raw_state=None)),
+        ('dispatch index', lambda event: first_matching_handler(index.candidates(event.data), event, raw_state=None)),
+    ):
+        timings = []
+        for _ in range(rounds):
+            for event in events:
+                started = time.perf_counter()
+                await resolve(event)
+                timings.append((time.perf_counter() - started) * 1_000_000)
+        print(
+            f'  {name:<15} mean {statistics.fmean(timings):8.1f} us  '
+            f'p50 {_percentile(timings, 0.5):8.1f} us  p99 {_percentile(timings, 0.99):8.1f} us'
+        )
+
+    print(f'  mismatches: {mismatches}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    # Регистрация обработчиков пишет много debug-логов — не смешиваем их с результатом
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    asyncio.run(_run(parser.parse_args().rounds))
+
+
+if __name__ == '__main__':
+    main()
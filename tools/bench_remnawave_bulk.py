@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark: disabling many panel users per-user vs. through the write coalescer.
+
+Starts the local fake panel (tools/fake_remnawave_panel.py) on a free port with
+--users users and a fixed --latency-ms per request, then disables every user
+twice: one PATCH /api/users per user with --concurrency in flight (what the
+expiry sweep and sync do today), and through PanelWriteCoalescer, which turns
+the same calls into POST /api/users/bulk/update batches. Nothing leaves the
+machine.
+
+Usage:
+    docker compose run --rm bot python tools/bench_remnawave_bulk.py
+    docker compose run --rm bot python tools/bench_remnawave_bulk.py --users 20000 --latency-ms 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import structlog
+from aiohttp.test_utils import TestServer
+
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.external.remnawave_api import RemnaWaveAPI, UserStatus
+from app.services.remnawave_service import PanelWriteCoalescer
+from tools.fake_remnawave_panel import FakeRemnaWavePanel
+
+
+async def _per_user(base_url: str, uuids: list[str], concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    async with RemnaWaveAPI(base_url, 'bench') as api:
+
+        async def disable(uuid: str) -> None:
+            async with semaphore:
+                await api.update_user(uuid, status=UserStatus.DISABLED)
+
+        await asyncio.gather(*(disable(uuid) for uuid in uuids))
+
+
+async def _coalesced(base_url: str, uuids: list[str], window: float, max_batch: int) -> None:
+    @asynccontextmanager
+    async def client():
+        async with RemnaWaveAPI(base_url, 'bench') as api:
+            yield api
+
+    coalescer = PanelWriteCoalescer(client, window=window, max_batch=max_batch, fallback_concurrency=5)
+    await asyncio.gather(*(coalescer.update_user(uuid, status=UserStatus.DISABLED) for uuid in uuids))
+
+
+async def _run(args: argparse.Namespace) -> None:
+    panel = FakeRemnaWavePanel(latency=args.latency_ms / 1000)
+    uuids = panel.add_users(args.users)
+    server = TestServer(panel.build_app())
+    await server.start_server()
+    base_url = str(server.make_url('')).rstrip('/')
+
+    try:
+        print(f'{args.users} users, {args.latency_ms:.0f} ms per request')
+        for name, workload in (
+            (f'per-user PATCH x{args.concurrency}', _per_user(base_url, uuids, args.concurrency)),
+            ('coalesced bulk', _coalesced(base_url, uuids, args.window_ms / 1000, args.max_batch)),
+        ):
+            panel.requests.clear()
+            started = time.perf_counter()
+            await workload
+            elapsed = time.perf_counter() - started
+            print(f'  {name:<22} {elapsed:8.2f} s  {sum(panel.requests.values()):>7} requests')
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--concurrency', type=int, default=5, help='Как concurrent_limit в sync_users_to_panel')
+    parser.add_argument('--window-ms', type=float, default=50.0)
+    parser.add_argument('--max-batch', type=int, default=500)
+    # Лог на каждый PATCH замерял бы консоль, а не панель
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
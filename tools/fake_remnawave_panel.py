@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Local fake of the RemnaWave panel user API for tests and benchmarks.
+
+Keeps users in memory and serves the per-user PATCH /api/users and
+/api/users/{uuid}/actions/enable|disable plus the /api/users/bulk/* endpoints with the same request and response shapes as the
+panel. --latency-ms adds a fixed delay to every request to model the network
+round trip to a remote panel; a real panel also spends time per row, which the
+fake does not model.
+
+Usage:
+    docker compose run --rm bot python tools/fake_remnawave_panel.py --users 10000 --port 3010
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import uuid as uuid_lib
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+
+from aiohttp import web
+
+
+_UPDATABLE_FIELDS = (
+    'status',
+    'trafficLimitBytes',
+    'trafficLimitStrategy',
+    'expireAt',
+    'telegramId',
+    'email',
+    'hwidDeviceLimit',
+    'description',
+    'tag',
+    'activeInternalSquads',
+    'externalSquadUuid',
+)
+
+
+class FakeRemnaWavePanel:
+    def __init__(self, *, latency: float = 0.0, bulk_enabled: bool = True) -> None:
+        self.latency = latency
+        self.bulk_enabled = bulk_enabled
+        self.users: dict[str, dict] = {}
+        self.requests: Counter[str] = Counter()
+
+    def add_users(self, count: int) -> list[str]:
+        now = datetime.now(UTC)
+        uuids = []
+        for _ in range(count):
+            user_uuid = str(uuid_lib.uuid4())
+            self.users[user_uuid] = {
+                'uuid': user_uuid,
+                'shortUuid': user_uuid[:8],
+                'username': f'user_{len(self.users) + 1}',
+                'status': 'ACTIVE',
+                'trafficLimitBytes': 0,
+                'trafficLimitStrategy': 'NO_RESET',
+                'expireAt': (now + timedelta(days=30)).isoformat(),
+                'activeInternalSquads': [],
+                'createdAt': now.isoformat(),
+                'updatedAt': now.isoformat(),
+            }
+            uuids.append(user_uuid)
+        return uuids
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._count_and_delay])
+        app.router.add_patch('/api/users', self._update_user)
+        app.router.add_post('/api/users/{uuid}/actions/{action:enable|disable}', self._user_action)
+        app.router.add_post('/api/users/bulk/update', self._bulk_update)
+        app.router.add_post('/api/users/bulk/update-squads', self._bulk_update_squads)
+        app.router.add_post('/api/users/bulk/extend-expiration-date', self._bulk_extend)
+        app.router.add_post('/api/users/bulk/reset-traffic', self._bulk_touch)
+        app.router.add_post('/api/users/bulk/revoke-subscription', self._bulk_touch)
+        app.router.add_post('/api/users/bulk/delete', self._bulk_delete)
+        return app
+
+    @web.middleware
+    async def _count_and_delay(self, request: web.Request, handler):
+        self.requests[f'{request.method} {request.path}'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if request.path.startswith('/api/users/bulk/') and not self.bulk_enabled:
+            return web.json_response({'message': 'Cannot POST ' + request.path}, status=404)
+        return await handler(request)
+
+    def _apply(self, user: dict, fields: dict) -> None:
+        for field in _UPDATABLE_FIELDS:
+            if field in fields:
+                user[field] = fields[field]
+        user['updatedAt'] = datetime.now(UTC).isoformat()
+
+    async def _update_user(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        user = self.users.get(data.get('uuid'))
+        if user is None:
+            return web.json_response({'message': 'User not found', 'errorCode': 'A063'}, status=404)
+        self._apply(user, data)
+        return web.json_response({'response': user})
+
+    async def _user_action(self, request: web.Request) -> web.Response:
+        user = self.users.get(request.match_info['uuid'])
+        if user is None:
+            return web.json_response({'message': 'User not found', 'errorCode': 'A063'}, status=404)
+        status = 'ACTIVE' if request.match_info['action'] == 'enable' else 'DISABLED'
+        if user['status'] == status:
+            return web.json_response({'message': f'User already {request.match_info["action"]}d'}, status=400)
+        self._apply(user, {'status': status})
+        return web.json_response({'response': user})
+
+    def _bulk(self, uuids: list[str], change) -> web.Response:
+        affected = 0
+        for user_uuid in uuids:
+            user = self.users.get(user_uuid)
+            if user is not None:
+                change(user)
+                affected += 1
+        return web.json_response({'response': {'affectedRows': affected}})
+
+    async def _bulk_update(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        return self._bulk(data['uuids'], lambda user: self._apply(user, data.get('fields') or {}))
+
+    async def _bulk_update_squads(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        squads = data['activeInternalSquads']
+        return self._bulk(data['uuids'], lambda user: self._apply(user, {'activeInternalSquads': squads}))
+
+    async def _bulk_extend(self, request: web.Request) -> web.Response:
+        data = await request.json()
+
+        def extend(user: dict) -> None:
+            expire_at = datetime.fromisoformat(user['expireAt']) + timedelta(days=data['extendDays'])
+            self._apply(user, {'expireAt': expire_at.isoformat()})
+
+        return self._bulk(data['uuids'], extend)
+
+    async def _bulk_touch(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        return self._bulk(data['uuids'], lambda user: self._apply(user, {}))
+
+    async def _bulk_delete(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        deleted = [user_uuid for user_uuid in data['uuids'] if self.users.pop(user_uuid, None) is not None]
+        return web.json_response({'response': {'affectedRows': len(deleted)}})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--port', type=int, default=3010)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--no-bulk', action='store_true', help='Отвечать 404 на /api/users/bulk/* (старая панель)')
+    args = parser.parse_args()
+
+    panel = FakeRemnaWavePanel(latency=args.latency_ms / 1000, bulk_enabled=not args.no_bulk)
+    panel.add_users(args.users)
+    web.run_app(panel.build_app(), port=args.port)
+
+
+if __name__ == '__main__':
+    main()
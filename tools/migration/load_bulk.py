@@ -0,0 +1,357 @@
+"""Set-based variant of load_postgres.load_migration_data.
+
+Same decisions as the per-row loader (which stays as the reference), but each chunk of
+subscribers / campaign users costs a handful of statements instead of several per row:
+existing users are prefetched by telegram_id, new users and subscriptions are written
+with multi-row INSERT (users ON CONFLICT (telegram_id) DO NOTHING), updates of existing
+users go out as one executemany UPDATE. Every committed chunk is recorded in a checkpoint
+file keyed on a hash of the input, so an interrupted load of the same input resumes after
+the last committed chunk; the file is removed once the load finishes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import secrets
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import structlog
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config import settings
+from app.database.crud.user import _get_or_create_default_promo_group, generate_referral_code
+from app.database.models import PartnerStatus, Subscription, SubscriptionStatus, User
+from app.utils.validators import sanitize_telegram_name
+from tools.migration.config import BATCH_SIZE
+from tools.migration.load_postgres import _resolve_connected_squads, ensure_migration_tariffs, load_migration_data
+from tools.migration.models import CampaignUser, MigrationSubscription, Seller
+
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class _KnownUser:
+    id: int
+    vless_uuid: str | None
+    next_sequence: int
+
+
+def _input_digest(
+    subscribers: list[MigrationSubscription],
+    campaign_users: list[CampaignUser],
+    sellers: list[Seller],
+    squad_uuids: dict[str, str],
+) -> str:
+    """Hash of everything the loader's decisions depend on: a checkpoint resumes only the same input."""
+    payload = {
+        'subscribers': [asdict(sub) for sub in subscribers],
+        'campaign_users': [asdict(user) for user in campaign_users],
+        'sellers': [asdict(seller) for seller in sellers],
+        'squad_uuids': squad_uuids,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class _Checkpoint:
+    def __init__(self, path: Path | None, input_digest: str) -> None:
+        self.path = path
+        self.input_digest = input_digest
+        self.subscribers_done = 0
+        self.campaign_done = 0
+        self.stats: dict[str, int] | None = None
+
+        if path is None or not path.is_file():
+            return
+        data = json.loads(path.read_text(encoding='utf-8'))
+        if data.get('input_sha256') != input_digest:
+            raise RuntimeError(f'checkpoint {path} was written for a different input, remove it to start over')
+        self.subscribers_done = data['subscribers_done']
+        self.campaign_done = data['campaign_done']
+        self.stats = data['stats']
+        logger.info(
+            'resuming migration load from checkpoint',
+            subscribers_done=self.subscribers_done,
+            campaign_done=self.campaign_done,
+        )
+
+    def save(self, stats: dict[str, int]) -> None:
+        if self.path is None:
+            return
+        payload = {
+            'input_sha256': self.input_digest,
+            'subscribers_done': self.subscribers_done,
+            'campaign_done': self.campaign_done,
+            'stats': stats,
+        }
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp.write_text(json.dumps(payload, indent=2), encoding='utf-8')
+        tmp.replace(self.path)
+
+    def clear(self) -> None:
+        """The load finished: a leftover checkpoint would make the next run skip the whole input."""
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+def _chunks(items: list, start: int, size: int):
+    """(processed count after the chunk, chunk) from position start."""
+    for offset in range(start, len(items), size):
+        chunk = items[offset : offset + size]
+        yield offset + len(chunk), chunk
+
+
+async def _fetch_users(db, telegram_ids: set[int]) -> dict[int, _KnownUser]:
+    if not telegram_ids:
+        return {}
+    rows = (
+        await db.execute(select(User.telegram_id, User.id, User.vless_uuid).where(User.telegram_id.in_(telegram_ids)))
+    ).all()
+    sequences = dict(
+        (
+            await db.execute(
+                select(Subscription.user_id, func.max(Subscription.account_sequence))
+                .where(Subscription.user_id.in_([row.id for row in rows]))
+                .group_by(Subscription.user_id)
+            )
+        ).all()
+    )
+    return {row.telegram_id: _KnownUser(row.id, row.vless_uuid, (sequences.get(row.id) or 0) + 1) for row in rows}
+
+
+async def _unique_values(db, column, count: int, generate) -> list[str]:
+    """count fresh values for a unique column: no duplicates among themselves or in the table."""
+    values: set[str] = set()
+    while len(values) < count:
+        candidates = {generate() for _ in range(count - len(values))} - values
+        taken = set((await db.execute(select(column).where(column.in_(candidates)))).scalars().all())
+        values |= candidates - taken
+    return list(values)
+
+
+def _insert_ignoring_duplicates(db, model, index_elements: list[str]):
+    dialect_insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+
+class _BulkLoader:
+    def __init__(self, db, seller_by_tg: dict[int, Seller], promo_group_id: int, chunk_size: int) -> None:
+        self.db = db
+        self.seller_by_tg = seller_by_tg
+        self.promo_group_id = promo_group_id
+        self.chunk_size = chunk_size
+        self.known: dict[int, _KnownUser] = {}
+
+    def _apply_partner(self, values: dict, telegram_id: int) -> None:
+        seller = self.seller_by_tg.get(telegram_id)
+        if seller is None:
+            return
+        values['partner_status'] = PartnerStatus.APPROVED.value
+        values['referral_commission_percent'] = seller.percent
+
+    def _new_user_row(self, telegram_id: int, username: str | None, first_name: str | None, wallet: int) -> dict:
+        row = {
+            'telegram_id': telegram_id,
+            'username': username,
+            'first_name': sanitize_telegram_name(first_name),
+            'last_name': None,
+            'language': 'fa',
+            'referred_by_id': None,
+            'balance_kopeks': wallet,
+            'has_had_paid_subscription': False,
+            'has_made_first_topup': False,
+            'promo_group_id': self.promo_group_id,
+            'vless_uuid': None,
+            'partner_status': PartnerStatus.NONE.value,
+            'referral_commission_percent': None,
+        }
+        self._apply_partner(row, telegram_id)
+        return row
+
+    async def _prefetch(self, telegram_ids: set[int]) -> None:
+        self.known.update(await _fetch_users(self.db, telegram_ids - self.known.keys()))
+
+    async def _write_users(self, new_users: dict[int, dict], updates: dict[int, dict]) -> None:
+        """Insert new users, pick up their ids and flush pending updates of existing ones."""
+        if new_users:
+            rows = list(new_users.values())
+            codes = await _unique_values(self.db, User.referral_code, len(rows), generate_referral_code)
+            for row, code in zip(rows, codes, strict=True):
+                row['referral_code'] = code
+            stmt = _insert_ignoring_duplicates(self.db, User, ['telegram_id']).returning(User.telegram_id)
+            inserted = set((await self.db.scalars(stmt, rows)).all())
+            fetched = await _fetch_users(self.db, set(new_users))
+            # Пользователь появился параллельно (ON CONFLICT) — обновляем его, как построчный путь
+            for telegram_id in new_users.keys() - inserted:
+                row, user = new_users[telegram_id], fetched[telegram_id]
+                target = updates.setdefault(user.id, {'id': user.id})
+                target['balance_kopeks'] = row['balance_kopeks']
+                if row['vless_uuid'] and not user.vless_uuid:
+                    target['vless_uuid'] = user.vless_uuid = row['vless_uuid']
+                self._apply_partner(target, telegram_id)
+            self.known.update(fetched)
+        if updates:
+            await self.db.execute(update(User), list(updates.values()))
+
+    async def load_subscribers(self, chunk: list[MigrationSubscription], squad_uuids, email_keys, stats) -> None:
+        await self._prefetch({sub.telegram_id for sub in chunk})
+        new_users: dict[int, dict] = {}
+        updates: dict[int, dict] = {}
+        pending: list[tuple[int, dict]] = []
+
+        for sub in chunk:
+            connected = _resolve_connected_squads(sub, squad_uuids)
+            if not connected:
+                logger.warning('no squad uuids for subscriber', telegram_id=sub.telegram_id, keys=sub.squad_keys)
+                stats['skipped_subs'] += 1
+                continue
+
+            known = self.known.get(sub.telegram_id)
+            if known is None and sub.telegram_id not in new_users:
+                row = self._new_user_row(sub.telegram_id, sub.username, sub.first_name, sub.wallet)
+                if sub.old_uuids:
+                    row['vless_uuid'] = sub.old_uuids[0]
+                new_users[sub.telegram_id] = row
+                stats['created_users'] += 1
+            else:
+                if known is None:
+                    target = new_users[sub.telegram_id]
+                    vless_uuid = target['vless_uuid']
+                else:
+                    target = updates.setdefault(known.id, {'id': known.id})
+                    vless_uuid = known.vless_uuid
+                target['balance_kopeks'] = sub.wallet
+                if sub.old_uuids and not vless_uuid:
+                    target['vless_uuid'] = sub.old_uuids[0]
+                    if known is not None:
+                        known.vless_uuid = sub.old_uuids[0]
+                self._apply_partner(target, sub.telegram_id)
+                stats['updated_users'] += 1
+
+            email_key = (sub.telegram_id, sub.source_email)
+            if email_key in email_keys:
+                stats['skipped_subs'] += 1
+                continue
+            email_keys.add(email_key)
+
+            pending.append(
+                (
+                    sub.telegram_id,
+                    {
+                        'status': SubscriptionStatus.ACTIVE.value,
+                        'is_trial': False,
+                        'end_date': sub.end_date,
+                        'traffic_limit_gb': sub.traffic_limit_gb,
+                        'traffic_used_gb': 0.0,
+                        'device_limit': 1,
+                        'connected_squads': connected,
+                        'remnawave_short_uuid': None,
+                        'subscription_url': '',
+                        'subscription_crypto_link': '',
+                        'autopay_enabled': settings.is_autopay_enabled_by_default(),
+                        'autopay_days_before': settings.DEFAULT_AUTOPAY_DAYS_BEFORE,
+                        'tariff_id': sub.tariff_id,
+                    },
+                )
+            )
+            stats['created_subs'] += 1
+
+        await self._write_users(new_users, updates)
+        if not pending:
+            return
+        short_ids = await _unique_values(
+            self.db, Subscription.remnawave_short_id, len(pending), lambda: secrets.token_hex(3)
+        )
+        rows = []
+        for (telegram_id, row), short_id in zip(pending, short_ids, strict=True):
+            user = self.known[telegram_id]
+            row.update(user_id=user.id, account_sequence=user.next_sequence, remnawave_short_id=short_id)
+            user.next_sequence += 1
+            rows.append(row)
+        await self.db.execute(insert(Subscription), rows)
+
+    async def load_campaign_users(self, chunk: list[CampaignUser], stats) -> None:
+        await self._prefetch({camp.telegram_id for camp in chunk})
+        new_users: dict[int, dict] = {}
+        updates: dict[int, dict] = {}
+
+        for camp in chunk:
+            known = self.known.get(camp.telegram_id)
+            if known is not None or camp.telegram_id in new_users:
+                stats['skipped_users'] += 1
+                if camp.telegram_id in self.seller_by_tg:
+                    target = new_users.get(camp.telegram_id) or updates.setdefault(known.id, {'id': known.id})
+                    self._apply_partner(target, camp.telegram_id)
+                continue
+
+            new_users[camp.telegram_id] = self._new_user_row(
+                camp.telegram_id, camp.username, camp.first_name, camp.wallet
+            )
+            stats['campaign_users'] += 1
+
+        await self._write_users(new_users, updates)
+
+
+async def load_migration_data_bulk(
+    db,
+    subscribers: list[MigrationSubscription],
+    campaign_users: list[CampaignUser],
+    sellers: list[Seller],
+    squad_uuids: dict[str, str],
+    *,
+    dry_run: bool = True,
+    checkpoint_path: Path | None = None,
+    chunk_size: int = BATCH_SIZE,
+) -> dict[str, int]:
+    if dry_run:
+        return await load_migration_data(db, subscribers, campaign_users, sellers, squad_uuids, dry_run=True)
+
+    checkpoint = _Checkpoint(checkpoint_path, _input_digest(subscribers, campaign_users, sellers, squad_uuids))
+    stats = checkpoint.stats or {
+        'created_users': 0,
+        'updated_users': 0,
+        'created_subs': 0,
+        'skipped_subs': 0,
+        'skipped_users': 0,
+        'campaign_users': 0,
+        'partners': 0,
+    }
+
+    await ensure_migration_tariffs(db, squad_uuids)
+    promo_group = await _get_or_create_default_promo_group(db)
+    loader = _BulkLoader(db, {s.telegram_id: s for s in sellers}, promo_group.id, chunk_size)
+
+    # Дедупликация по (telegram_id, email) охватывает уже загруженные чанки
+    email_keys = {
+        (sub.telegram_id, sub.source_email)
+        for sub in subscribers[: checkpoint.subscribers_done]
+        if _resolve_connected_squads(sub, squad_uuids)
+    }
+
+    for done, chunk in _chunks(subscribers, checkpoint.subscribers_done, chunk_size):
+        await loader.load_subscribers(chunk, squad_uuids, email_keys, stats)
+        await db.commit()
+        checkpoint.subscribers_done = done
+        checkpoint.save(stats)
+        logger.info('migration subscriber batch committed', count=done)
+
+    for done, chunk in _chunks(campaign_users, checkpoint.campaign_done, chunk_size):
+        await loader.load_campaign_users(chunk, stats)
+        await db.commit()
+        checkpoint.campaign_done = done
+        checkpoint.save(stats)
+        logger.info('migration campaign batch committed', count=done)
+
+    stats['partners'] = (
+        await db.execute(
+            select(func.count()).select_from(User).where(User.partner_status == PartnerStatus.APPROVED.value)
+        )
+    ).scalar_one()
+    await db.commit()
+    checkpoint.clear()
+    return stats
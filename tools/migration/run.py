@@ -18,6 +18,7 @@ from tools.migration.config import MIGRATION_OUTPUT_DIR, load_squad_uuids
 from tools.migration.extract_rookari import parse_rookari_tables
 from tools.migration.extract_xui import extract_all_xui_clients
 from tools.migration.join_filter import build_migration_cohorts
+from tools.migration.load_bulk import load_migration_data_bulk
 from tools.migration.load_postgres import load_migration_data
 from tools.migration.purge import purge_bot_users, purge_panel_users
 from tools.migration.sync_remnawave import sync_all
@@ -89,7 +90,7 @@ async def cmd_extract(out_dir: Path) -> dict:
     return payload['counts']
 
 
-async def cmd_load(execute: bool) -> dict:
+async def cmd_load(execute: bool, *, per_row: bool = False, checkpoint: Path | None = None) -> dict:
     if execute:
         require_backup_gate()
 
@@ -105,14 +106,25 @@ async def cmd_load(execute: bool) -> dict:
             raise
 
     async with get_db_session() as db:
-        result = await load_migration_data(
-            db,
-            subscribers,
-            campaign_users,
-            sellers,
-            squad_uuids,
-            dry_run=not execute,
-        )
+        if per_row:
+            result = await load_migration_data(
+                db,
+                subscribers,
+                campaign_users,
+                sellers,
+                squad_uuids,
+                dry_run=not execute,
+            )
+        else:
+            result = await load_migration_data_bulk(
+                db,
+                subscribers,
+                campaign_users,
+                sellers,
+                squad_uuids,
+                dry_run=not execute,
+                checkpoint_path=checkpoint,
+            )
     print(json.dumps(result, indent=2))
     return result
 
@@ -161,6 +173,14 @@ def main() -> None:
 
     load_p = sub.add_parser('load', help='Load cohorts into PostgreSQL')
     load_p.add_argument('--execute', action='store_true', help='Requires MIGRATION_BACKUP_DIR')
+    load_p.add_argument('--per-row', action='store_true', help='Row-by-row reference loader (slow)')
+    load_p.add_argument(
+        '--checkpoint',
+        type=Path,
+        default=MIGRATION_OUTPUT_DIR / 'load_checkpoint.json',
+        help='Progress file of the bulk loader; an interrupted load of the same input resumes from it, '
+        'a finished load removes it',
+    )
 
     sync_p = sub.add_parser('sync', help='Sync subscriptions to Remnawave panel')
     sync_p.add_argument('--execute', action='store_true')
@@ -186,7 +206,7 @@ def main() -> None:
     elif args.cmd == 'extract':
         asyncio.run(cmd_extract(args.output))
     elif args.cmd == 'load':
-        asyncio.run(cmd_load(args.execute))
+        asyncio.run(cmd_load(args.execute, per_row=args.per_row, checkpoint=args.checkpoint))
     elif args.cmd == 'sync':
         asyncio.run(cmd_sync(args.execute))
     elif args.cmd == 'purge':
@@ -0,0 +1,56 @@
+"""Ops: compare referral-contest leaderboards in Redis with contest events.
+
+Checks every active contest (or the ones passed via --contest). Dry-run by
+default; pass --execute to rebuild leaderboards that drifted or are missing.
+
+Usage:
+    docker compose run --rm bot python tools/rebuild_contest_leaderboards.py
+    docker compose run --rm bot python tools/rebuild_contest_leaderboards.py --contest 12 --execute
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.database.crud.referral_contest import get_contests_for_summaries
+from app.database.database import AsyncSessionLocal
+from app.services.referral_contest_service import referral_contest_service
+from app.utils.cache import cache
+
+
+async def main(contest_ids: list[int], execute: bool) -> None:
+    await cache.connect()
+    if not cache._connected:
+        print('❌ Redis is unavailable')
+        return
+
+    try:
+        async with AsyncSessionLocal() as db:
+            if not contest_ids:
+                contest_ids = [contest.id for contest in await get_contests_for_summaries(db)]
+
+            for contest_id in contest_ids:
+                check = await referral_contest_service.check_leaderboard(db, contest_id, repair=execute)
+                if check is None:
+                    print(f'contest={contest_id}: not found')
+                    continue
+                status = 'ok' if check.is_consistent else ('rebuilt' if execute else 'DRIFT')
+                print(
+                    f'contest={contest_id}: {status} ready={check.ready} referrers={check.expected_referrers} '
+                    f'missing={len(check.missing)} unexpected={len(check.unexpected)} '
+                    f'mismatched={len(check.mismatched)}'
+                )
+
+        if not execute:
+            print('Dry-run only. Re-run with --execute to rebuild drifted leaderboards.')
+    finally:
+        await cache.disconnect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check and rebuild referral-contest leaderboards')
+    parser.add_argument('--contest', type=int, action='append', default=[], help='Contest id (repeatable)')
+    parser.add_argument('--execute', action='store_true', help='Rebuild drifted leaderboards (default: dry-run)')
+    args = parser.parse_args()
+    asyncio.run(main(args.contest, execute=args.execute))